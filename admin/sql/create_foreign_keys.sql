@@ -115,6 +115,18 @@ ALTER TABLE recommendation.similar_user
     REFERENCES "user" (id)
     ON DELETE CASCADE;
 
+ALTER TABLE recommendation.top_similar_user
+    ADD CONSTRAINT top_similar_user_user_id_foreign_key
+    FOREIGN KEY (user_id)
+    REFERENCES "user" (id)
+    ON DELETE CASCADE;
+
+ALTER TABLE recommendation.top_similar_user
+    ADD CONSTRAINT top_similar_user_other_user_id_foreign_key
+    FOREIGN KEY (other_user_id)
+    REFERENCES "user" (id)
+    ON DELETE CASCADE;
+
 ALTER TABLE missing_musicbrainz_data
     ADD CONSTRAINT missing_mb_data_user_id_foreign_key
     FOREIGN KEY (user_id)
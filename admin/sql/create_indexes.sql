@@ -40,6 +40,7 @@ CREATE INDEX user_id_mbid_ndx_rec_feedback ON recording_feedback (user_id, recor
 
 -- NOTE: If the indexes for the similar_user table changes, update the code in listenbrainz/db/similar_users.py !
 CREATE UNIQUE INDEX user_id_ndx_similar_user ON recommendation.similar_user (user_id);
+CREATE INDEX similarity_ndx_top_similar_user ON recommendation.top_similar_user (similarity DESC);
 CREATE UNIQUE INDEX user_id_entity_ndx_do_not_recommend ON recommendation.do_not_recommend (user_id, entity, entity_mbid);
 
 CREATE INDEX user_0_user_relationship_ndx ON user_relationship (user_0);
@@ -64,4 +65,7 @@ CREATE UNIQUE INDEX user_id_ndx_user_setting ON user_setting (user_id);
 
 CREATE UNIQUE INDEX user_id_year_in_music_uniq_idx ON statistics.year_in_music (user_id, year);
 
+CREATE INDEX created_ndx_data_dump ON data_dump (created);
+CREATE INDEX dump_type_created_ndx_data_dump ON data_dump (dump_type, created);
+
 COMMIT;
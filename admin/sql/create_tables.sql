@@ -45,7 +45,8 @@ ALTER TABLE api_compat.token ADD CONSTRAINT token_token_uniq UNIQUE (token);
 
 CREATE TABLE data_dump (
   id          SERIAL,
-  created     TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+  created     TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+  dump_type   data_dump_type_type -- NULL for dumps created before the type was recorded
 );
 
 CREATE TABLE missing_musicbrainz_data (
@@ -93,6 +94,12 @@ CREATE TABLE recommendation.similar_user (
   last_updated    TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
 );
 
+CREATE TABLE recommendation.top_similar_user (
+  user_id         INTEGER NOT NULL, -- FK to "user".id, the lower id of the pair
+  other_user_id   INTEGER NOT NULL, -- FK to "user".id
+  similarity      DOUBLE PRECISION NOT NULL
+);
+
 CREATE TABLE user_timeline_event (
   id                    SERIAL, -- PK
   user_id               INTEGER, -- FK to "user"
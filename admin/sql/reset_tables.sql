@@ -15,6 +15,7 @@ DELETE FROM recommendation.cf_recording    CASCADE;
 -- DELETE FROM recommendation.recommender_session    CASCADE;
 -- DELETE FROM recommendation.recording_session    CASCADE;
 DELETE FROM recommendation.similar_user    CASCADE;
+DELETE FROM recommendation.top_similar_user CASCADE;
 
 DELETE FROM user_timeline_event            CASCADE;
 DELETE FROM hide_user_timeline_event       CASCADE;
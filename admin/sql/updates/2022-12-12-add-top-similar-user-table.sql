@@ -0,0 +1,37 @@
+BEGIN;
+
+CREATE TABLE recommendation.top_similar_user (
+  user_id         INTEGER NOT NULL, -- FK to "user".id, the lower id of the pair
+  other_user_id   INTEGER NOT NULL, -- FK to "user".id
+  similarity      DOUBLE PRECISION NOT NULL
+);
+
+ALTER TABLE recommendation.top_similar_user
+    ADD CONSTRAINT top_similar_user_user_id_foreign_key
+    FOREIGN KEY (user_id)
+    REFERENCES "user" (id)
+    ON DELETE CASCADE;
+
+ALTER TABLE recommendation.top_similar_user
+    ADD CONSTRAINT top_similar_user_other_user_id_foreign_key
+    FOREIGN KEY (other_user_id)
+    REFERENCES "user" (id)
+    ON DELETE CASCADE;
+
+CREATE INDEX similarity_ndx_top_similar_user ON recommendation.top_similar_user (similarity DESC);
+
+-- Populate from the current similar users, afterwards the table is updated on every import of similar users
+INSERT INTO recommendation.top_similar_user (user_id, other_user_id, similarity)
+     SELECT LEAST(r.user_id, j.key::int)
+          , GREATEST(r.user_id, j.key::int)
+          , MAX((j.value->>1)::double precision)
+       FROM recommendation.similar_user r
+       JOIN jsonb_each(r.similar_users) j
+         ON TRUE
+       JOIN "user" ou
+         ON j.key::int = ou.id
+   GROUP BY 1, 2
+   ORDER BY 3 DESC
+      LIMIT 1000;
+
+COMMIT;
@@ -0,0 +1,11 @@
+BEGIN;
+
+CREATE TYPE data_dump_type_type AS ENUM ('incremental', 'full');
+
+-- the type of the existing dumps is not known, they are left NULL
+ALTER TABLE data_dump ADD COLUMN dump_type data_dump_type_type;
+
+CREATE INDEX created_ndx_data_dump ON data_dump (created);
+CREATE INDEX dump_type_created_ndx_data_dump ON data_dump (dump_type, created);
+
+COMMIT;
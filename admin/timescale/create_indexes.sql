@@ -36,6 +36,13 @@ CREATE UNIQUE INDEX mb_metadata_cache_idx_recording_mbid ON mapping.mb_metadata_
 CREATE INDEX mb_metadata_cache_idx_artist_mbids ON mapping.mb_metadata_cache USING gin(artist_mbids);
 CREATE INDEX mb_metadata_cache_idx_dirty ON mapping.mb_metadata_cache (dirty);
 
+-- these indexes are defined in listenbrainz/mbid_mapping/mapping/recording_gid_redirect.py and
+-- listenbrainz/mbid_mapping/mapping/canonical_recording_redirect.py and created in production there.
+-- this definition is only for tests and local development. remember to keep both in sync.
+CREATE UNIQUE INDEX recording_gid_redirect_idx_recording_mbid ON mapping.recording_gid_redirect (recording_mbid);
+CREATE INDEX canonical_recording_redirect_ndx_canonical_recording_mbid ON mapping.canonical_recording_redirect (canonical_recording_mbid);
+CREATE UNIQUE INDEX canonical_recording_redirect_ndx_recording_mbid ON mapping.canonical_recording_redirect (recording_mbid);
+
 CREATE UNIQUE INDEX recording_msid_ndx_mbid_mapping ON mbid_mapping (recording_msid);
 CREATE INDEX recording_mbid_ndx_mbid_mapping ON mbid_mapping (recording_mbid);
 CREATE INDEX match_type_ndx_mbid_mapping ON mbid_mapping (match_type);
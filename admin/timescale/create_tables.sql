@@ -13,7 +13,8 @@ CREATE TABLE listen_delete_metadata (
     id                  SERIAL                      NOT NULL,
     user_id             INTEGER                     NOT NULL,
     listened_at         BIGINT                      NOT NULL,
-    recording_msid      UUID                        NOT NULL
+    recording_msid      UUID                        NOT NULL,
+    created             TIMESTAMP WITH TIME ZONE    NOT NULL DEFAULT NOW()
 );
 
 CREATE TABLE listen_user_metadata (
@@ -102,7 +103,25 @@ CREATE TABLE mapping.mb_metadata_cache (
     recording_data      JSONB NOT NULL,
     artist_data         JSONB NOT NULL,
     tag_data            JSONB NOT NULL,
-    release_data        JSONB NOT NULL
+    release_data        JSONB NOT NULL,
+    artist_credit_names         TEXT[] NOT NULL,
+    artist_credit_join_phrases  TEXT[] NOT NULL
+);
+
+-- this table is defined in listenbrainz/mbid_mapping/mapping/recording_gid_redirect.py and created in production
+-- there. this definition is only for tests and local development. remember to keep both in sync.
+CREATE TABLE mapping.recording_gid_redirect (
+    recording_mbid      UUID NOT NULL,
+    new_recording_mbid  UUID NOT NULL
+);
+
+-- this table is defined in listenbrainz/mbid_mapping/mapping/canonical_recording_redirect.py and created in production
+-- there. this definition is only for tests and local development. remember to keep both in sync.
+CREATE TABLE mapping.canonical_recording_redirect (
+    id                          SERIAL,
+    recording_mbid              UUID NOT NULL,
+    canonical_recording_mbid    UUID NOT NULL,
+    canonical_release_mbid      UUID NOT NULL
 );
 
 -- postgres does not enforce dimensionality of arrays. add explicit check to avoid regressions (once burnt, twice shy!).
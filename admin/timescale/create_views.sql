@@ -17,4 +17,19 @@ CREATE MATERIALIZED VIEW mbid_manual_mapping_top AS (
          , max(created) DESC
 );
 
+-- number of listens of each user per day (UTC). the refresh policy materializes days with new, updated or deleted
+-- listens up to one day ago, listens of more recent days are counted from the listen table at query time. requires
+-- the integer_now function of the listen table, see create_functions.sql.
+CREATE MATERIALIZED VIEW listen_count_day
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+    SELECT user_id
+         , time_bucket(86400, listened_at) AS day
+         , count(*) AS count
+      FROM listen
+  GROUP BY user_id
+         , day
+WITH NO DATA;
+
+SELECT add_continuous_aggregate_policy('listen_count_day', start_offset => NULL, end_offset => 86400, schedule_interval => INTERVAL '1 hour');
+
 COMMIT;
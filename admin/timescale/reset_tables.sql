@@ -5,6 +5,8 @@ DELETE FROM listen_delete_metadata      CASCADE;
 DELETE FROM listen_user_metadata        CASCADE;
 DELETE FROM mbid_mapping                CASCADE;
 DELETE FROM mapping.mb_metadata_cache   CASCADE;
+DELETE FROM mapping.recording_gid_redirect  CASCADE;
+DELETE FROM mapping.canonical_recording_redirect    CASCADE;
 DELETE FROM messybrainz.submissions     CASCADE;
 DELETE FROM mbid_manual_mapping         CASCADE;
 
@@ -0,0 +1,31 @@
+BEGIN;
+
+-- store the artist credit names and join phrases flattened, in the order of artist_mbids, so that readers of
+-- the cache do not need to unnest artist_data. the mbid mapping writes these columns from now on.
+ALTER TABLE mapping.mb_metadata_cache ADD COLUMN artist_credit_names TEXT[];
+ALTER TABLE mapping.mb_metadata_cache ADD COLUMN artist_credit_join_phrases TEXT[];
+
+UPDATE mapping.mb_metadata_cache
+   SET artist_credit_names = ARRAY(
+            SELECT artist->>'name'
+              FROM jsonb_array_elements(artist_data->'artists') WITH ORDINALITY AS artists(artist, position)
+          ORDER BY position
+       )
+     , artist_credit_join_phrases = ARRAY(
+            SELECT artist->>'join_phrase'
+              FROM jsonb_array_elements(artist_data->'artists') WITH ORDINALITY AS artists(artist, position)
+          ORDER BY position
+       );
+
+ALTER TABLE mapping.mb_metadata_cache ALTER COLUMN artist_credit_names SET NOT NULL;
+ALTER TABLE mapping.mb_metadata_cache ALTER COLUMN artist_credit_join_phrases SET NOT NULL;
+
+-- the redirects are mirrored from MB by the mbid mapping (`build-mb-metadata-cache` or `update-mb-metadata-cache`),
+-- create an empty table so that lookups work until it runs next.
+CREATE TABLE IF NOT EXISTS mapping.recording_gid_redirect (
+    recording_mbid      UUID NOT NULL,
+    new_recording_mbid  UUID NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS recording_gid_redirect_idx_recording_mbid ON mapping.recording_gid_redirect (recording_mbid);
+
+COMMIT;
@@ -0,0 +1,14 @@
+-- creating a continuous aggregate with data cannot be done inside a transaction, run this script with psql
+-- without wrapping it in one. materializing all existing listens takes a while.
+
+CREATE MATERIALIZED VIEW listen_count_day
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+    SELECT user_id
+         , time_bucket(86400, listened_at) AS day
+         , count(*) AS count
+      FROM listen
+  GROUP BY user_id
+         , day
+WITH DATA;
+
+SELECT add_continuous_aggregate_policy('listen_count_day', start_offset => NULL, end_offset => 86400, schedule_interval => INTERVAL '1 hour');
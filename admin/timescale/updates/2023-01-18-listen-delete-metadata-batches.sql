@@ -0,0 +1,8 @@
+BEGIN;
+
+-- record when a delete was queued to monitor the lag of the delete processor, and index the id which
+-- the processor selects batches by
+ALTER TABLE listen_delete_metadata ADD COLUMN created TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW();
+ALTER TABLE listen_delete_metadata ADD CONSTRAINT listen_delete_metadata_pkey PRIMARY KEY (id);
+
+COMMIT;
@@ -206,6 +206,9 @@ export default class Listens extends React.Component<
       const playingNow = JSON.parse(data) as Listen;
       this.receiveNewPlayingNow(playingNow);
     });
+    this.socket.on("listen_batch", (data: string) => {
+      this.receiveNewListenBatch(data);
+    });
   };
 
   receiveNewListen = (newListen: string): void => {
@@ -236,6 +239,39 @@ export default class Listens extends React.Component<
     }
   };
 
+  receiveNewListenBatch = (newListens: string): void => {
+    let jsonListens;
+    try {
+      jsonListens = JSON.parse(newListens);
+    } catch (error) {
+      const { newAlert } = this.props;
+      newAlert(
+        "danger",
+        "Coudn't parse the new listens as JSON: ",
+        error.toString()
+      );
+      return;
+    }
+    // the listens of a batch are in the order in which they were sent, same as separate "listen" events
+    const listens = jsonListens
+      .map((json: any) => formatWSMessageToListen(json))
+      .filter((listen: Listen | null) => listen !== null);
+
+    if (listens.length) {
+      this.setState((prevState) => {
+        const { listens: prevListens } = prevState;
+        listens.forEach((listen: Listen) => {
+          // Crop listens array to 100 max
+          while (prevListens.length >= 100) {
+            prevListens.pop();
+          }
+          prevListens.unshift(listen);
+        });
+        return { listens: prevListens };
+      });
+    }
+  };
+
   receiveNewPlayingNow = async (newPlayingNow: Listen): Promise<void> => {
     const playingNow = newPlayingNow;
     const { APIService } = this.context;
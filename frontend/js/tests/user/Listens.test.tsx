@@ -334,6 +334,43 @@ describe("Listens page", () => {
     });
   });
 
+  describe("receiveNewListenBatch", () => {
+    const mockListen: Listen = {
+      track_metadata: {
+        artist_name: "Coldplay",
+        track_name: "Viva La Vida",
+        additional_info: {
+          recording_msid: "2edee875-55c3-4dad-b3ea-e8741484f4b5",
+        },
+      },
+      listened_at: 1586580524,
+      listened_at_iso: "2020-04-10T10:12:04Z",
+    };
+    const mockListenTwo: Listen = {
+      ...mockListen,
+      listened_at: 1586580624,
+      listened_at_iso: "2020-04-10T10:13:44Z",
+    };
+
+    it("inserts the received listens in the same order as separate listen events", async () => {
+      wrapper = mount<Listens>(<Listens {...propsOneListen} />, mountOptions);
+      const instance = wrapper.instance();
+      const result: Array<Listen> = Array.from(
+        recentListensPropsOneListen.listens
+      );
+      result.unshift(mockListen);
+      result.unshift(mockListenTwo);
+      await act(() => {
+        instance.receiveNewListenBatch(
+          JSON.stringify([mockListen, mockListenTwo])
+        );
+      });
+      await waitForComponentToPaint(wrapper);
+
+      expect(wrapper.state("listens")).toEqual(result);
+    });
+  });
+
   describe("receiveNewPlayingNow", () => {
     const mockListenOne: Listen = {
       track_metadata: {
@@ -0,0 +1,3 @@
+from listenbrainz.webserver import create_api_app
+
+application = create_api_app()
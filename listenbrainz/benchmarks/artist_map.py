@@ -0,0 +1,56 @@
+""" Benchmarks the latency of the artist map stats endpoint. Runs against the configured couchdb, redis and
+labs api, the artist stats of the given users need to be present. """
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from flask import url_for
+from requests import HTTPError
+
+import listenbrainz.db.user as db_user
+from listenbrainz.benchmarks.utils import print_latencies
+from listenbrainz.db import couchdb
+from listenbrainz.webserver import create_app
+
+
+def _timed_get(app, url, stats_range):
+    with app.test_client() as client:
+        t0 = time.perf_counter()
+        response = client.get(url, query_string={"range": stats_range})
+        duration = time.perf_counter() - t0
+    if response.status_code != 200:
+        click.echo("%s returned %d" % (url, response.status_code))
+    return duration
+
+
+@click.command()
+@click.option("--user", "-u", "user_names", multiple=True, required=True, help="the users to get artist maps of")
+@click.option("--range", "-r", "stats_range", default="all_time", help="the stats range of the artist maps")
+@click.option("--concurrency", "-c", type=int, default=4, help="the number of concurrent requests per user")
+@click.option("--repeat", type=int, default=20, help="the number of requests per user once the artist map is stored")
+def benchmark_artist_map(user_names, stats_range, concurrency, repeat):
+    """ Time artist map requests of the given users when the artist maps are missing and when they are stored.
+    The requests for a missing artist map are sent concurrently, only one of them should compute it.
+    Deletes the stored artist maps of the users first. """
+    app = create_app()
+    with app.app_context(), app.test_request_context():
+        database = couchdb.list_databases(f"artistmap_{stats_range}")[0]
+        urls = []
+        for user_name in user_names:
+            user = db_user.get_by_mb_id(user_name)
+            try:
+                couchdb.delete_data(database, user["id"])
+            except HTTPError:
+                pass  # the artist map is not stored
+            urls.append(url_for("stats_api_v1.get_artist_map", user_name=user_name))
+
+        missing = []
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for url in urls:
+                futures = [executor.submit(_timed_get, app, url, stats_range) for _ in range(concurrency)]
+                missing.extend(future.result() for future in futures)
+
+        stored = [_timed_get(app, url, stats_range) for url in urls for _ in range(repeat)]
+
+        print_latencies("artist map missing, concurrent requests", missing)
+        print_latencies("artist map stored", stored)
@@ -0,0 +1,154 @@
+""" Benchmarks exporting all listens and feedback of a user with one server side cursor against fetching them
+page by page with repeated queries, as the export views did before. Inserts a synthetic user with the requested
+number of listens and feedback into the configured databases. """
+import logging
+
+import click
+import orjson
+from sqlalchemy import text
+
+import listenbrainz.db.feedback as db_feedback
+import listenbrainz.db.user as db_user
+from listenbrainz import db
+from listenbrainz.benchmarks.utils import measure
+from listenbrainz.db import timescale
+from listenbrainz.listenstore.timescale_listenstore import TimescaleListenStore
+from listenbrainz.webserver import create_app
+from listenbrainz.webserver.views.profile import EXPORT_FETCH_COUNT
+
+BENCHMARK_USER_ROW_ID = 1 << 30
+BENCHMARK_USER_NAME = "export_benchmark_user"
+
+# timestamp of the latest synthetic listen, the listens before it are one minute apart
+LATEST_LISTEN_TS = 1650000000
+
+
+def insert_listens(user, count):
+    """ Replace the listens of the user with count synthetic listens, and update the user's listen metadata """
+    query = """
+        INSERT INTO listen (listened_at, track_name, user_name, user_id, data)
+             SELECT :latest_ts - i * 60
+                  , 'Track ' || i
+                  , :user_name
+                  , :user_id
+                  , jsonb_build_object(
+                        'user_id', :user_id,
+                        'track_metadata', jsonb_build_object(
+                            'artist_name', 'Artist ' || (i % 1000),
+                            'release_name', 'Release ' || (i % 10000),
+                            'additional_info', jsonb_build_object(
+                                'recording_msid', uuid_generate_v4()::text,
+                                'submission_client', 'export benchmark'
+                            )
+                        )
+                    )
+               FROM generate_series(0, :count - 1) AS i
+    """
+    metadata_query = """
+        INSERT INTO listen_user_metadata (user_id, count, min_listened_at, max_listened_at, created)
+             VALUES (:user_id, :count, :latest_ts - (:count - 1) * 60, :latest_ts, NOW())
+    """
+    args = {"user_id": user["id"], "user_name": user["musicbrainz_id"], "count": count, "latest_ts": LATEST_LISTEN_TS}
+    with timescale.engine.begin() as connection:
+        connection.execute(text("DELETE FROM listen WHERE user_id = :user_id"), args)
+        connection.execute(text("DELETE FROM listen_user_metadata WHERE user_id = :user_id"), args)
+        connection.execute(text(query), args)
+        connection.execute(text(metadata_query), args)
+
+
+def insert_feedback(user, count):
+    """ Replace the feedback of the user with count synthetic feedback """
+    query = """
+        INSERT INTO recording_feedback (user_id, recording_msid, score, created)
+             SELECT :user_id
+                  , uuid_generate_v4()
+                  , CASE WHEN i % 3 = 0 THEN -1 ELSE 1 END
+                  , NOW() - i * INTERVAL '1 minute'
+               FROM generate_series(0, :count - 1) AS i
+    """
+    args = {"user_id": user["id"], "count": count}
+    with db.engine.begin() as connection:
+        connection.execute(text("DELETE FROM recording_feedback WHERE user_id = :user_id"), args)
+        connection.execute(text(query), args)
+
+
+def delete_data(user):
+    """ Delete the synthetic listens and feedback of the user """
+    args = {"user_id": user["id"]}
+    with timescale.engine.begin() as connection:
+        connection.execute(text("DELETE FROM listen WHERE user_id = :user_id"), args)
+        connection.execute(text("DELETE FROM listen_user_metadata WHERE user_id = :user_id"), args)
+    with db.engine.begin() as connection:
+        connection.execute(text("DELETE FROM recording_feedback WHERE user_id = :user_id"), args)
+
+
+def page_listens(listenstore, user, batch_size):
+    """ Fetch the listens with one query per page, as the export did before """
+    to_ts = LATEST_LISTEN_TS + 1
+    while True:
+        batch, _, _ = listenstore.fetch_listens(user, to_ts=to_ts, limit=batch_size)
+        if not batch:
+            break
+        for listen in batch:
+            yield orjson.dumps(listen.to_api())
+        to_ts = batch[-1].ts_since_epoch
+
+
+def page_feedback(user, batch_size):
+    """ Fetch the feedback with one query per page, as the export did before """
+    offset = 0
+    while True:
+        batch = db_feedback.get_feedback_for_user(user_id=user["id"], limit=batch_size, offset=offset)
+        if not batch:
+            break
+        for fb in batch:
+            yield orjson.dumps(fb.to_api())
+        offset += len(batch)
+
+
+def consume(iterator):
+    """ Exhaust the iterator of serialized items and return the number of bytes produced """
+    return sum(len(item) for item in iterator)
+
+
+@click.command()
+@click.option("--listens", "-l", type=int, default=2_000_000, help="the number of listens of the synthetic user")
+@click.option("--feedback", "-f", type=int, default=100_000, help="the number of feedback of the synthetic user")
+@click.option("--batch-size", "-b", type=int, default=EXPORT_FETCH_COUNT,
+              help="the number of rows fetched per page or cursor batch")
+@click.option("--skip-paging", is_flag=True, help="only run the export iterators, paging through millions of listens is slow")
+@click.option("--keep", is_flag=True, help="keep the synthetic listens and feedback after the benchmark")
+def benchmark_export(listens, feedback, batch_size, skip_paging, keep):
+    """ Time exporting all listens and feedback of a synthetic user, and the peak memory used while doing it. """
+    app = create_app()
+    with app.app_context():
+        listenstore = TimescaleListenStore(logging.getLogger(__name__))
+        user = db_user.get_or_create(BENCHMARK_USER_ROW_ID, BENCHMARK_USER_NAME)
+
+        click.echo("Inserting %d listens and %d feedback for %s" % (listens, feedback, BENCHMARK_USER_NAME))
+        insert_listens(user, listens)
+        insert_feedback(user, feedback)
+
+        try:
+            with measure("listens: server side cursor", listens):
+                consume(listenstore.iter_listens_for_export(user, batch_size))
+            with measure("listens: server side cursor", listens, trace_memory=True):
+                consume(listenstore.iter_listens_for_export(user, batch_size))
+            if not skip_paging:
+                with measure("listens: paged fetch_listens", listens):
+                    consume(page_listens(listenstore, user, batch_size))
+                with measure("listens: paged fetch_listens", listens, trace_memory=True):
+                    consume(page_listens(listenstore, user, batch_size))
+
+            with measure("feedback: server side cursor", feedback):
+                consume(db_feedback.iter_feedback_for_export(user["id"], user["musicbrainz_id"], batch_size))
+            with measure("feedback: server side cursor", feedback, trace_memory=True):
+                consume(db_feedback.iter_feedback_for_export(user["id"], user["musicbrainz_id"], batch_size))
+            if not skip_paging:
+                with measure("feedback: limit/offset pages", feedback):
+                    consume(page_feedback(user, batch_size))
+                with measure("feedback: limit/offset pages", feedback, trace_memory=True):
+                    consume(page_feedback(user, batch_size))
+        finally:
+            if not keep:
+                delete_data(user)
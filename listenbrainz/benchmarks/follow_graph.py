@@ -0,0 +1,104 @@
+""" Benchmarks the follow graph cached in redis. Counts the queries run by feed requests with the follow graph
+of the user cached and not cached, and times relationship checks with and without the cache. Creates synthetic
+users in the configured database and deletes them afterwards. """
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import click
+from sqlalchemy import event
+
+import listenbrainz.db.user as db_user
+import listenbrainz.db.user_relationship as db_user_relationship
+from listenbrainz import db
+from listenbrainz.benchmarks.utils import print_latencies
+from listenbrainz.db import timescale
+from listenbrainz.webserver import create_app
+
+# musicbrainz row ids of the synthetic users start from here
+BENCHMARK_USER_ROW_ID = 1 << 29
+
+
+@contextmanager
+def count_queries():
+    """ Count the queries run on the listenbrainz and timescale databases in the block """
+    counts = Counter()
+
+    def listener(engine_name):
+        def before_cursor_execute(*args, **kwargs):
+            counts[engine_name] += 1
+        return before_cursor_execute
+
+    listeners = [(db.engine, listener("postgres")), (timescale.engine, listener("timescale"))]
+    for engine, fn in listeners:
+        event.listen(engine, "before_cursor_execute", fn)
+    try:
+        yield counts
+    finally:
+        for engine, fn in listeners:
+            event.remove(engine, "before_cursor_execute", fn)
+
+
+def create_users(following):
+    """ Create a user following the given number of users and return both """
+    user = db_user.get_or_create(BENCHMARK_USER_ROW_ID, "follow_graph_benchmark_user")
+    followed = []
+    for i in range(1, following + 1):
+        followed_user = db_user.get_or_create(BENCHMARK_USER_ROW_ID + i, "follow_graph_benchmark_user_%d" % i)
+        if not db_user_relationship.is_following_user(user["id"], followed_user["id"]):
+            db_user_relationship.insert(user["id"], followed_user["id"], "follow")
+        followed.append(followed_user)
+    return user, followed
+
+
+def delete_users(users):
+    for user in users:
+        db_user.delete(user["id"])
+    db_user_relationship.invalidate_follow_cache(following_of=[user["id"] for user in users],
+                                                 followers_of=[user["id"] for user in users])
+
+
+@click.command()
+@click.option("--following", "-f", type=int, default=100, help="the number of users followed by the feed's user")
+@click.option("--requests", "-r", type=int, default=10, help="the number of feed requests and relationship checks")
+def benchmark_follow_graph(following, requests):
+    """ Count the queries of feed requests and time relationship checks with and without the follow cache. """
+    app = create_app()
+    with app.app_context():
+        user, followed = create_users(following)
+        url = "/1/user/%s/feed/events" % user["musicbrainz_id"]
+        headers = {"Authorization": "Token %s" % user["auth_token"]}
+        client = app.test_client()
+
+        try:
+            for cached in (False, True):
+                durations = []
+                counts = Counter()
+                for _ in range(requests):
+                    if not cached:
+                        db_user_relationship.invalidate_follow_cache(following_of=[user["id"]])
+                    with count_queries() as request_counts:
+                        t0 = time.perf_counter()
+                        response = client.get(url, headers=headers)
+                        durations.append(time.perf_counter() - t0)
+                    if response.status_code != 200:
+                        raise click.ClickException("Feed request failed: %s" % response.data)
+                    counts.update(request_counts)
+                name = "feed, follow graph %s" % ("cached" if cached else "not cached")
+                print_latencies(name, durations)
+                click.echo("%-45s %9.1f postgres, %.1f timescale queries per request" % (
+                    "", counts["postgres"] / requests, counts["timescale"] / requests))
+
+            checks = [(user["id"], followed_user["id"]) for followed_user in followed[:requests]]
+            for name, check in [("is_following_user (database)", db_user_relationship.is_following_user),
+                                ("is_following (cached)", db_user_relationship.is_following)]:
+                durations = []
+                with count_queries() as counts:
+                    for follower, followed_id in checks:
+                        t0 = time.perf_counter()
+                        check(follower, followed_id)
+                        durations.append(time.perf_counter() - t0)
+                print_latencies(name, durations)
+                click.echo("%-45s %9d postgres queries" % ("", counts["postgres"]))
+        finally:
+            delete_users([user] + followed)
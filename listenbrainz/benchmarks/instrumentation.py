@@ -0,0 +1,37 @@
+""" Benchmarks the overhead of the request instrumentation on a minimal flask app which does not use any
+backends, with instrumentation disabled and enabled. """
+import click
+from flask import Flask
+
+from listenbrainz.benchmarks.utils import measure
+from listenbrainz.webserver import instrumentation
+
+
+def create_app(enabled):
+    app = Flask(__name__)
+    app.config["INSTRUMENTATION_ENABLED"] = enabled
+
+    @app.route("/")
+    def index():
+        with instrumentation.timed("rabbitmq"):
+            pass
+        return "ok"
+
+    instrumentation.init_instrumentation(app)
+    return app
+
+
+@click.command()
+@click.option("--requests", "-r", type=int, default=20000, help="the number of requests to make")
+def benchmark_instrumentation(requests):
+    """ Time requests to a minimal app with instrumentation disabled and enabled """
+    # enabling the instrumentation patches requests for the process, so the disabled app goes first
+    for enabled in (False, True):
+        client = create_app(enabled).test_client()
+        with measure("instrumentation %s" % ("enabled" if enabled else "disabled"), requests):
+            for _ in range(requests):
+                client.get("/")
+
+    with measure("generate /metrics", 100):
+        for _ in range(100):
+            instrumentation.generate_metrics()
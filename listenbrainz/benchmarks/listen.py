@@ -0,0 +1,92 @@
+""" Memory and throughput benchmarks for the Listen and ListenRow conversions used in bulk paths. """
+import uuid
+
+import click
+import orjson
+
+from listenbrainz.benchmarks.utils import measure
+from listenbrainz.listen import Listen, ListenRow
+
+BASE_TIMESTAMP = 1500000000
+
+
+def generate_json_listens(count):
+    """ Generate listens in the json format of the listen dumps, each with its own dicts """
+    template = {
+        "user_id": 1,
+        "user_name": "iliekcomputers",
+        "timestamp": BASE_TIMESTAMP,
+        "recording_msid": str(uuid.uuid4()),
+        "track_metadata": {
+            "artist_name": "Majid Jordan",
+            "release_name": "Majid Jordan",
+            "track_name": "Every Step Every Way",
+            "additional_info": {
+                "artist_mbids": ["abaa7001-0d80-4e58-be5d-d2d246fd9d87"],
+                "release_mbid": "8294645a-f996-44b6-9060-7f189b9f59f3",
+                "recording_msid": None,
+                "tags": ["sing", "song"],
+                "media_player": "BrainzPlayer",
+                "submission_client": "ListenBrainz Web",
+                "duration_ms": 215000
+            }
+        }
+    }
+    serialized = orjson.dumps(template)
+    listens = []
+    for i in range(count):
+        listen = orjson.loads(serialized)
+        listen["timestamp"] += i
+        listens.append(listen)
+    return listens
+
+
+def generate_timescale_rows(count):
+    """ Generate rows as returned from the listen table """
+    rows = []
+    for listen in generate_json_listens(count):
+        listened_at, track_name, _, user_id, data = Listen.from_json(listen).to_timescale()
+        rows.append((listened_at, track_name, user_id, orjson.loads(data)))
+    return rows
+
+
+@click.command()
+@click.option("--count", "-c", type=int, default=1000000, help="the number of listens to use")
+@click.option("--trace-memory/--no-trace-memory", default=False,
+              help="report peak memory used, this slows down the benchmarks")
+def benchmark_listen(count, trace_memory):
+    """ Benchmark from_json, to_json, to_timescale and from_timescale of Listen and ListenRow. """
+    # the factories modify the input dicts in place, so each one gets its own copy
+    json_listens = generate_json_listens(count)
+    with measure("Listen.from_json", count, trace_memory):
+        listens = [Listen.from_json(j) for j in json_listens]
+    with measure("Listen.to_json + orjson.dumps", count, trace_memory):
+        for listen in listens:
+            orjson.dumps(listen.to_json())
+    with measure("Listen.to_timescale", count, trace_memory):
+        for listen in listens:
+            listen.to_timescale()
+    del listens
+
+    json_listens = generate_json_listens(count)
+    with measure("ListenRow.from_json", count, trace_memory):
+        rows = [ListenRow.from_json(j) for j in json_listens]
+    with measure("ListenRow.to_json", count, trace_memory):
+        for row in rows:
+            row.to_json()
+    with measure("ListenRow.to_timescale", count, trace_memory):
+        for row in rows:
+            row.to_timescale()
+    del rows, json_listens
+
+    timescale_rows = generate_timescale_rows(count)
+    with measure("Listen.from_timescale", count, trace_memory):
+        listens = [Listen.from_timescale(listened_at, track_name, user_id, None, data, user_name="iliekcomputers")
+                   for listened_at, track_name, user_id, data in timescale_rows]
+    del listens
+
+    timescale_rows = generate_timescale_rows(count)
+    with measure("ListenRow.from_timescale", count, trace_memory):
+        rows = [ListenRow.from_timescale(listened_at, track_name, user_id, data, user_name="iliekcomputers")
+                for listened_at, track_name, user_id, data in timescale_rows]
+    del rows
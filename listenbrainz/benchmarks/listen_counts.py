@@ -0,0 +1,65 @@
+""" Benchmarks per-day listen counts of users read from the listen_count_day continuous aggregate against
+counting the same listens in the listen table. Runs against the configured timescale database. """
+import logging
+
+import click
+from sqlalchemy import text
+
+from listenbrainz.benchmarks.utils import measure
+from listenbrainz.db import timescale
+from listenbrainz.listenstore.timescale_listenstore import TimescaleListenStore
+from listenbrainz.webserver import create_app
+
+
+def sample_users(count):
+    """ Pick the users with the most listens, the ones for which scanning listens is the slowest """
+    query = """
+        SELECT user_id
+             , min_listened_at
+             , max_listened_at
+          FROM listen_user_metadata
+         WHERE min_listened_at IS NOT NULL
+      ORDER BY count DESC
+         LIMIT :count
+    """
+    with timescale.engine.connect() as connection:
+        result = connection.execute(text(query), {"count": count})
+        return result.fetchall()
+
+
+def _count_listens_by_day(user_id, from_ts, to_ts):
+    """ The per-day listen counts computed from the listen table """
+    query = """
+        SELECT time_bucket(86400, listened_at) AS day
+             , count(*) AS listen_count
+          FROM listen
+         WHERE user_id = :user_id
+           AND listened_at >= :from_ts
+           AND listened_at < :to_ts
+      GROUP BY day
+      ORDER BY day
+    """
+    with timescale.engine.connect() as connection:
+        return connection.execute(text(query), {"user_id": user_id, "from_ts": from_ts, "to_ts": to_ts}).fetchall()
+
+
+@click.command()
+@click.option("--users", "-u", type=int, default=20, help="the number of users to get listen counts for")
+@click.option("--period", "-p", type=click.Choice(["day", "month"]), default="day",
+              help="the period to group the listen counts from the aggregate by")
+def benchmark_listen_counts(users, period):
+    """ Time getting the listen counts of the users with the most listens, over their entire listening history. """
+    app = create_app()
+    with app.app_context():
+        listenstore = TimescaleListenStore(logging.getLogger(__name__))
+        rows = sample_users(users)
+        click.echo("Counting listens of %d users by %s" % (len(rows), period))
+
+        with measure("listen_count_day aggregate", len(rows)):
+            for row in rows:
+                listenstore.get_listen_counts_by_period(row.user_id, row.min_listened_at,
+                                                        row.max_listened_at + 1, period)
+
+        with measure("listen table scan", len(rows)):
+            for row in rows:
+                _count_listens_by_day(row.user_id, row.min_listened_at, row.max_listened_at + 1)
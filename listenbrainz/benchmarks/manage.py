@@ -0,0 +1,17 @@
+""" This module contains a click group with commands to run the benchmarks. """
+import click
+
+from listenbrainz.benchmarks import listen, validate_listen, recording, listen_counts, artist_map, startup, export, \
+    follow_graph, instrumentation
+
+cli = click.Group()
+
+cli.add_command(listen.benchmark_listen, name="listen")
+cli.add_command(validate_listen.benchmark_validate_listen, name="validate_listen")
+cli.add_command(recording.benchmark_recording_lookup, name="recording_lookup")
+cli.add_command(listen_counts.benchmark_listen_counts, name="listen_counts")
+cli.add_command(artist_map.benchmark_artist_map, name="artist_map")
+cli.add_command(startup.benchmark_startup, name="startup")
+cli.add_command(export.benchmark_export, name="export")
+cli.add_command(follow_graph.benchmark_follow_graph, name="follow_graph")
+cli.add_command(instrumentation.benchmark_instrumentation, name="instrumentation")
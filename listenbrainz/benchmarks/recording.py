@@ -0,0 +1,65 @@
+""" Benchmarks the lookup of recording metadata with redirects and canonical recordings resolved. Runs against
+the configured timescale database, the mb_metadata_cache and its related tables need to be populated. """
+import click
+import psycopg2
+from psycopg2.extras import DictCursor
+
+from listenbrainz.benchmarks.utils import measure
+from listenbrainz.db.recording import load_recordings_from_mbids_with_redirects, resolve_redirect_mbids, \
+    load_recordings_from_mbids, resolve_canonical_mbids
+from listenbrainz.webserver import create_app
+
+
+def sample_mbids(ts_curs, count):
+    """ Pick random recording mbids to look up, about a tenth of them are redirected mbids """
+    redirect_count = count // 10
+    ts_curs.execute("""
+        SELECT recording_mbid::TEXT
+          FROM mapping.recording_gid_redirect
+      ORDER BY random()
+         LIMIT %s
+    """, (redirect_count,))
+    mbids = [row[0] for row in ts_curs.fetchall()]
+    ts_curs.execute("""
+        SELECT recording_mbid::TEXT
+          FROM mapping.mb_metadata_cache
+      ORDER BY random()
+         LIMIT %s
+    """, (count - len(mbids),))
+    mbids.extend(row[0] for row in ts_curs.fetchall())
+    return mbids
+
+
+def _load_recordings_with_separate_queries(mb_curs, ts_curs, mbids):
+    """ The lookup as done before the redirects were mirrored to timescale: one round trip each for the
+    redirects on MB, the metadata and the canonical recordings. """
+    redirected_mbids, _, _ = resolve_redirect_mbids(mb_curs, "recording", mbids)
+    load_recordings_from_mbids(ts_curs, redirected_mbids)
+    resolve_canonical_mbids(ts_curs, redirected_mbids)
+
+
+@click.command()
+@click.option("--count", "-c", type=int, default=1000, help="the number of recording mbids to resolve per lookup")
+@click.option("--repeat", "-r", type=int, default=20, help="the number of lookups to time")
+def benchmark_recording_lookup(count, repeat):
+    """ Time resolving recording mbids to metadata with redirects and canonical recordings. If MB_DATABASE_URI is
+    configured, the previous lookup using separate queries is timed as well. """
+    app = create_app()
+    with app.app_context(), \
+            psycopg2.connect(app.config["SQLALCHEMY_TIMESCALE_URI"]) as ts_conn, \
+            ts_conn.cursor(cursor_factory=DictCursor) as ts_curs:
+        mbids = sample_mbids(ts_curs, count)
+        click.echo("Resolving %d mbids %d times" % (len(mbids), repeat))
+
+        with measure("load_recordings_from_mbids_with_redirects", len(mbids) * repeat):
+            for _ in range(repeat):
+                load_recordings_from_mbids_with_redirects(ts_curs, mbids)
+
+        if not app.config.get("MB_DATABASE_URI"):
+            return
+
+        with psycopg2.connect(app.config["MB_DATABASE_URI"]) as mb_conn, \
+                mb_conn.cursor(cursor_factory=DictCursor) as mb_curs:
+            with measure("separate redirect, metadata and canonical queries", len(mbids) * repeat):
+                for _ in range(repeat):
+                    _load_recordings_with_separate_queries(mb_curs, ts_curs, mbids)
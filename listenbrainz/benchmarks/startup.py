@@ -0,0 +1,53 @@
+""" Measures the cold start time of the webserver app factories, and the modules that take the longest to
+import. Creating the apps connects to the configured services, so they need to be up. """
+import statistics
+import subprocess
+import sys
+import time
+
+import click
+
+from listenbrainz.benchmarks.utils import get_import_times
+
+APP_FACTORIES = {
+    "api": "create_api_app",
+    "web": "create_web_app",
+}
+
+#: Time in seconds within which a new process should have created the api app
+API_APP_STARTUP_BUDGET = 3.0
+
+
+def measure_startup(factory, iterations):
+    """ Returns the median wall clock time in seconds for a new python process to create the app """
+    code = f"from listenbrainz.webserver import {factory}; {factory}()"
+    durations = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)
+        durations.append(time.perf_counter() - t0)
+    return statistics.median(durations)
+
+
+@click.command()
+@click.option("--iterations", type=int, default=3, help="Number of processes started per app")
+@click.option("--top", type=int, default=15, help="Number of the slowest imported modules to print")
+@click.option("--budget", type=float, default=API_APP_STARTUP_BUDGET,
+              help="Startup time in seconds above which the benchmark fails for the api app")
+def benchmark_startup(iterations, top, budget):
+    """ Benchmark the time taken to start the api and the web app """
+    startup_times = {}
+    for name, factory in APP_FACTORIES.items():
+        import_times = get_import_times(f"from listenbrainz.webserver import {factory}; {factory}()")
+        total_import_time = sum(self_time for self_time, _ in import_times.values()) / 1_000_000
+        startup_times[name] = measure_startup(factory, iterations)
+        click.echo("%-5s app: startup %6.2fs (median of %d), %4d modules imported in %6.2fs" % (
+            name, startup_times[name], iterations, len(import_times), total_import_time))
+
+        slowest = sorted(import_times.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        for module, (self_time, cumulative_time) in slowest:
+            click.echo("    %-60s self %8.1fms  cumulative %8.1fms" % (module, self_time / 1000, cumulative_time / 1000))
+
+    if startup_times["api"] > budget:
+        raise click.ClickException("api app startup took %.2fs, over the budget of %.2fs" % (startup_times["api"], budget))
+    click.echo("api app startup is within the budget of %.2fs" % budget)
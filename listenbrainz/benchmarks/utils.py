@@ -0,0 +1,68 @@
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import click
+
+
+@contextmanager
+def measure(name, count, trace_memory=False):
+    """ Print the wall clock time and throughput of the code executed in the block.
+
+    Args:
+        name: the name of the benchmark to print
+        count: the number of items processed in the block
+        trace_memory: if True, also print the peak memory allocated in the block. tracemalloc
+            slows down allocations considerably so the throughput is not comparable in this mode.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - t0
+        line = "%-45s %9d items in %8.3fs %12.0f items/s" % (name, count, duration, count / duration if duration else 0)
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            line += "  peak memory %8.1f MB" % (peak / (1024 * 1024))
+        click.echo(line)
+
+
+def print_latencies(name, durations):
+    """ Print the median, 95th percentile and maximum of the given durations in seconds """
+    if not durations:
+        return
+    durations = sorted(durations)
+
+    def percentile(p):
+        return durations[min(len(durations) - 1, int(round(p / 100 * (len(durations) - 1))))]
+
+    click.echo("%-45s %9d calls  p50 %8.1fms  p95 %8.1fms  max %8.1fms" % (
+        name, len(durations), percentile(50) * 1000, percentile(95) * 1000, durations[-1] * 1000))
+
+
+def get_import_times(code):
+    """ Run the given python code in a new interpreter with -X importtime and parse its report.
+
+    Returns:
+        a dict of the name of each module imported by the code to a tuple of the time in microseconds
+        spent importing the module itself and the cumulative time including its own imports
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError("Running the code failed:\n%s" % result.stderr)
+
+    import_times = {}
+    for line in result.stderr.splitlines():
+        # lines look like "import time:       494 |     120237 |   flask", the first one is a header
+        if not line.startswith("import time:"):
+            continue
+        self_time, cumulative_time, module = line[len("import time:"):].split("|")
+        if not self_time.strip().isdigit():
+            continue
+        import_times[module.strip()] = (int(self_time), int(cumulative_time))
+    return import_times
@@ -0,0 +1,245 @@
+""" Replays a corpus of listen submissions through both listen validators, checking that they
+produce the same results and comparing their throughput. """
+import glob
+import os
+import time
+
+from typing import Dict
+
+import click
+import orjson
+import sentry_sdk
+
+from listenbrainz.listenstore import LISTEN_MINIMUM_TS
+from listenbrainz.webserver.errors import APIError, ListenValidationError
+from listenbrainz.webserver.views.api_tools import validate_listen, LISTEN_TYPE_SINGLE, LISTEN_TYPE_IMPORT, \
+    LISTEN_TYPE_PLAYING_NOW, MAX_TAGS_PER_LISTEN, MAX_TAG_SIZE, MAX_DURATION_LIMIT, MAX_DURATION_MS_LIMIT, \
+    validate_listened_at, validate_duration_field, is_valid_uuid, check_for_unicode_null_recursively
+
+TEST_DATA_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'testdata')
+
+LISTEN_TYPES = {
+    'single': LISTEN_TYPE_SINGLE,
+    'import': LISTEN_TYPE_IMPORT,
+    'playing_now': LISTEN_TYPE_PLAYING_NOW,
+}
+
+
+def validate_listen_multi_pass(listen: Dict, listen_type) -> Dict:
+    """ The previous implementation of validate_listen which does a separate pass over the
+    listen for each group of checks, the reference for validate_listen. """
+
+    if listen is None:
+        raise ListenValidationError("Listen is empty and cannot be validated.")
+
+    if listen_type in (LISTEN_TYPE_SINGLE, LISTEN_TYPE_IMPORT):
+        validate_listened_at(listen)
+
+        if "track_metadata" not in listen:
+            raise ListenValidationError("JSON document must contain the key track_metadata"
+                                        " at the top level.", listen)
+
+        if len(listen) > 2:
+            raise ListenValidationError("JSON document may only contain listened_at and "
+                                        "track_metadata top level keys", listen)
+
+        # check that listened_at value is greater than last.fm founding year.
+        if listen['listened_at'] < LISTEN_MINIMUM_TS:
+            raise ListenValidationError("Value for key listened_at is too low. listened_at timestamp "
+                                        "should be greater than 1033410600 (2002-10-01 00:00:00 UTC).", listen)
+
+    elif listen_type == LISTEN_TYPE_PLAYING_NOW:
+        if "listened_at" in listen:
+            raise ListenValidationError("JSON document must not contain listened_at while submitting"
+                                        " playing_now.", listen)
+
+        if "track_metadata" not in listen:
+            raise ListenValidationError("JSON document must contain the key track_metadata"
+                                        " at the top level.", listen)
+
+        if len(listen) > 1:
+            raise ListenValidationError("JSON document may only contain track_metadata as top level"
+                                        " key when submitting playing_now.", listen)
+
+    if listen["track_metadata"] is None:
+        raise ListenValidationError("JSON document may not have track_metadata with null value.", listen)
+
+    # Basic metadata
+    validate_basic_metadata(listen, "track_name")
+    validate_basic_metadata(listen, "artist_name")
+    validate_basic_metadata(listen, "release_name", required=False)
+
+    if 'additional_info' in listen['track_metadata']:
+        # Tags
+        if 'tags' in listen['track_metadata']['additional_info']:
+            tags = listen['track_metadata']['additional_info']['tags']
+            if len(tags) > MAX_TAGS_PER_LISTEN:
+                raise ListenValidationError("JSON document may not contain more than %d items in "
+                                            "track_metadata.additional_info.tags." % MAX_TAGS_PER_LISTEN, listen)
+            for tag in tags:
+                if len(tag) > MAX_TAG_SIZE:
+                    raise ListenValidationError("JSON document may not contain track_metadata.additional_info.tags "
+                                                "longer than %d characters." % MAX_TAG_SIZE, listen)
+
+        # if both duration and duration_ms are given and valid, an error will be raised.
+        if 'duration' in listen['track_metadata']['additional_info'] and 'duration_ms' in listen['track_metadata']['additional_info']:
+            raise ListenValidationError("JSON document should not contain both duration and duration_ms.", listen)
+        # check duration validity
+        validate_duration_field(listen, "duration", MAX_DURATION_LIMIT)
+        validate_duration_field(listen, "duration_ms", MAX_DURATION_MS_LIMIT)
+
+        # MBIDs, both of the mbid validation methods mutate the listen payload if needed.
+        single_mbid_keys = ['release_mbid', 'recording_mbid', 'release_group_mbid', 'track_mbid']
+        for key in single_mbid_keys:
+            validate_single_mbid_field(listen, key)
+        multiple_mbid_keys = ['artist_mbids', 'work_mbids']
+        for key in multiple_mbid_keys:
+            validate_multiple_mbids_field(listen, key)
+
+    # monitor performance of unicode null check because it might be a potential bottleneck
+    with sentry_sdk.start_span(op="null check", description="check for unicode null in submitted listen json"):
+        # If unicode null is present in the listen, postgres will raise an
+        # error while trying to insert it. hence, reject such listens.
+        check_for_unicode_null_recursively(listen)
+
+    return listen
+
+
+def validate_basic_metadata(listen, key, required=True):
+    if key in listen["track_metadata"]:
+        if not isinstance(listen["track_metadata"][key], str):
+            raise ListenValidationError(f"track_metadata.{key} must be a single string.", listen)
+
+        listen['track_metadata'][key] = listen['track_metadata'][key].strip()
+        if len(listen['track_metadata'][key]) == 0:
+            raise ListenValidationError(f"field track_metadata.{key} is empty.", listen)
+    elif required:
+        raise ListenValidationError(f"JSON document does not contain required field track_metadata.{key}.", listen)
+
+
+def validate_single_mbid_field(listen, key):
+    """ Verify that mbid if present in the listen with given key is valid.
+    A ValidationError is raised for invalid values of mbids.
+
+    NOTE: If the mbid at the key is None or "", the key is dropped without
+     raising an error.
+
+    Args:
+        listen: listen data
+        key: the key whose mbid is to be validated
+    """
+    if key in listen['track_metadata']['additional_info']:
+        mbid = listen['track_metadata']['additional_info'][key]
+        if not mbid:  # the mbid field is None or "", hence drop the field and return
+            del listen['track_metadata']['additional_info'][key]
+            return
+
+        if not is_valid_uuid(mbid):  # if the mbid is invalid raise an error
+            raise ListenValidationError("%s MBID format invalid." % (key,), listen)
+
+
+def validate_multiple_mbids_field(listen, key):
+    """ Verify that all the mbids in the list if present in the listen with
+    given key are valid. An ValidationError error is raised for if any mbid is
+    invalid.
+
+    NOTE: If an mbid in the list is None or "", it is dropped from the list
+    without an error. If the key is an empty list or None, it is dropped
+    without raising an error.
+
+    Args:
+        listen: listen data
+        key: the key whose mbids is to be validated
+    """
+    if key in listen['track_metadata']['additional_info']:
+        mbids = listen['track_metadata']['additional_info'][key]
+        if not mbids:  # empty list or None, drop the field and return
+            del listen['track_metadata']['additional_info'][key]
+            return
+
+        mbids = [x for x in mbids if x]  # drop None and "" from list of mbids if any
+
+        for mbid in mbids:
+            if not is_valid_uuid(mbid):   # if the mbid is invalid raise an error
+                raise ListenValidationError("%s MBID format invalid." % (key,), listen)
+
+        listen['track_metadata']['additional_info'][key] = mbids  # set the filtered in the listen payload
+
+
+def load_corpus(path=None):
+    """ Load submissions from a file with one submit-listens request body per line. If no path is
+    given, the submissions in the test data directory are used.
+
+    Returns:
+        a list of (listen, listen_type) tuples, the listens are serialized to bytes so that each
+        replay can work on a fresh copy.
+    """
+    if path:
+        with open(path, 'rb') as f:
+            documents = [orjson.loads(line) for line in f if line.strip()]
+    else:
+        documents = []
+        for file_name in sorted(glob.glob(os.path.join(TEST_DATA_PATH, '*.json'))):
+            with open(file_name, 'rb') as f:
+                try:
+                    document = orjson.loads(f.read())
+                except orjson.JSONDecodeError:
+                    continue
+            if isinstance(document, dict) and document.get('listen_type') in LISTEN_TYPES:
+                documents.append(document)
+
+    corpus = []
+    for document in documents:
+        if not isinstance(document.get('payload'), list):
+            continue
+        listen_type = LISTEN_TYPES.get(document.get('listen_type'))
+        for listen in document['payload']:
+            corpus.append((orjson.dumps(listen), listen_type))
+    return corpus
+
+
+def run_validator(validator, listen, listen_type):
+    """ Validate the listen and return the outcome in a comparable form """
+    try:
+        return 'ok', validator(listen, listen_type)
+    except (ListenValidationError, APIError) as e:
+        return type(e).__name__, e.message, e.payload
+
+
+def compare_validators(corpus):
+    """ Returns the list of listens for which the validators produce different results """
+    mismatches = []
+    for serialized, listen_type in corpus:
+        expected = run_validator(validate_listen_multi_pass, orjson.loads(serialized), listen_type)
+        actual = run_validator(validate_listen, orjson.loads(serialized), listen_type)
+        if expected != actual:
+            mismatches.append((serialized, expected, actual))
+    return mismatches
+
+
+def _time_validator(validator, corpus, repeat):
+    listens = [(orjson.loads(serialized), listen_type) for _ in range(repeat) for serialized, listen_type in corpus]
+    t0 = time.perf_counter()
+    for listen, listen_type in listens:
+        run_validator(validator, listen, listen_type)
+    return len(listens), time.perf_counter() - t0
+
+
+@click.command()
+@click.option("--corpus", "-c", type=click.Path(exists=True, dir_okay=False), default=None,
+              help="file with one captured submit-listens json document per line, defaults to the test data")
+@click.option("--repeat", "-r", type=int, default=1000, help="the number of times to replay the corpus")
+def benchmark_validate_listen(corpus, repeat):
+    """ Compare validate_listen against validate_listen_multi_pass on a corpus of submissions. """
+    corpus = load_corpus(corpus)
+    click.echo("Loaded %d listens" % len(corpus))
+
+    mismatches = compare_validators(corpus)
+    for serialized, expected, actual in mismatches:
+        click.echo("Mismatch for %s:\n  multi pass: %s\n  single pass: %s" % (serialized.decode("utf-8"), expected, actual))
+    click.echo("%d mismatches" % len(mismatches))
+
+    for name, validator in (("validate_listen_multi_pass", validate_listen_multi_pass),
+                            ("validate_listen", validate_listen)):
+        count, duration = _time_validator(validator, corpus, repeat)
+        click.echo("%-30s %9d listens in %8.3fs %12.0f listens/s" % (name, count, duration, count / duration))
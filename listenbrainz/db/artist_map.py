@@ -0,0 +1,166 @@
+""" Artist maps show how many artists from each country a user has listened to.
+
+Artist maps are derived from the user's artist stats and the countries of the artists, which are looked up
+from MusicBrainz through the labs api. When artist stats are received from spark, the artist maps of all
+users in the message are computed in the background with one country lookup for all of their artists.
+The api only computes an artist map if it is missing, and concurrent requests for the same missing artist
+map wait a few seconds for the first one to compute it instead of computing it again.
+"""
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, Iterable, List, Callable, Optional
+
+import pycountry
+import requests
+from brainzutils import cache
+from flask import current_app
+
+from data.model.user_artist_map import UserArtistMapRecord, UserArtistMapArtist
+
+#: Maximum number of artist mbids to look up in one request to the labs api
+ARTIST_COUNTRY_LOOKUP_BATCH_SIZE = 5000
+
+ARTIST_MAP_LOCK_PREFIX = "artist_map_lock."
+
+#: Time in seconds after which the lock of an artist map computation expires, if it is not released before
+ARTIST_MAP_LOCK_TIMEOUT = 60
+
+# deletes the lock at KEYS[1] only if it still holds the token ARGV[1] of the caller, so that a computation which
+# took longer than the lock timeout does not release the lock taken by another computation after the expiry
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+#: Maximum time in seconds a request waits for a concurrent computation of the same artist map before
+#: computing it itself, kept short because the request is blocked while waiting
+ARTIST_MAP_LOCK_WAIT = 5
+
+#: Time in seconds between checks whether a concurrent computation of an artist map has completed
+ARTIST_MAP_LOCK_POLL_INTERVAL = 0.1
+
+
+def get_artist_mbid_counts(artists: Iterable[dict]) -> Dict[str, int]:
+    """ Sum up the listen counts of the artists of artist stats by artist mbid, artists without mbid are skipped """
+    artist_mbid_counts = defaultdict(int)
+    for artist in artists:
+        if artist.get("artist_mbid"):
+            artist_mbid_counts[artist["artist_mbid"]] += artist["listen_count"]
+    return artist_mbid_counts
+
+
+def get_artist_country_codes(artist_mbids: Iterable[str]) -> Dict[str, Dict]:
+    """ Look up the names and country codes of the given artists from the labs api.
+
+        Returns:
+            a dict of artist mbid to a dict with artist_mbid, artist_name and country_code. artists not found
+            in MusicBrainz are omitted.
+
+        Raises:
+            requests.RequestException: if a request to the labs api failed
+    """
+    artist_mbids = list(artist_mbids)
+    artist_country_codes = {}
+    for i in range(0, len(artist_mbids), ARTIST_COUNTRY_LOOKUP_BATCH_SIZE):
+        request_data = [{"artist_mbid": mbid} for mbid in artist_mbids[i:i + ARTIST_COUNTRY_LOOKUP_BATCH_SIZE]]
+        result = requests.post(
+            f"{current_app.config['LISTENBRAINZ_LABS_API_URL']}/artist-country-code-from-artist-mbid/json",
+            json=request_data,
+            params={"count": len(request_data)}
+        )
+        # Raise error if non 200 response is received
+        result.raise_for_status()
+        for entry in result.json():
+            artist_country_codes[entry["artist_mbid"]] = entry
+    return artist_country_codes
+
+
+def get_country_wise_counts(artist_mbid_counts: Dict[str, int],
+                            artist_country_codes: Dict[str, Dict]) -> List[UserArtistMapRecord]:
+    """ Get country wise listen counts and artist lists from dict of given artist_mbids and listen counts and
+     the country codes of the artists """
+    result = defaultdict(lambda: {
+        "artist_count": 0,
+        "listen_count": 0,
+        "artists": []
+    })
+    for artist_mbid, listen_count in artist_mbid_counts.items():
+        if artist_mbid in artist_country_codes:
+            # TODO: add a test to handle the case where pycountry doesn't recognize the country
+            country_alpha_3 = pycountry.countries.get(alpha_2=artist_country_codes[artist_mbid]["country_code"])
+            if country_alpha_3 is None:
+                continue
+            result[country_alpha_3.alpha_3]["artist_count"] += 1
+            result[country_alpha_3.alpha_3]["listen_count"] += listen_count
+            result[country_alpha_3.alpha_3]["artists"].append(
+                UserArtistMapArtist(
+                    artist_mbid=artist_mbid,
+                    # we use the artist name from the country code endpoint because the
+                    # other artist name we have in stats is actually artist credit name where
+                    # this artist name is the actual artist name associated with the mbid
+                    artist_name=artist_country_codes[artist_mbid]["artist_name"],
+                    listen_count=listen_count
+                )
+            )
+
+    artist_map_data = []
+    for country, data in result.items():
+        # sort artists within each country based on descending order of listen counts
+        data["artists"].sort(key=lambda x: x.listen_count, reverse=True)
+        artist_map_data.append(UserArtistMapRecord(country=country, **data))
+    return artist_map_data
+
+
+def compute_artist_maps(user_artist_stats: List[dict]) -> List[dict]:
+    """ Compute the artist maps of several users with a single country lookup for all of their artists.
+
+        Args:
+            user_artist_stats: a list of artist stats documents, dicts with the user_id and the artist
+                records in data.
+
+        Returns:
+            a list of dicts with the user_id and the artist map in data, ready to be inserted in couchdb
+    """
+    artist_mbid_counts = {doc["user_id"]: get_artist_mbid_counts(doc["data"]) for doc in user_artist_stats}
+
+    all_artist_mbids = set()
+    for counts in artist_mbid_counts.values():
+        all_artist_mbids.update(counts.keys())
+    artist_country_codes = get_artist_country_codes(all_artist_mbids)
+
+    return [
+        {
+            "user_id": user_id,
+            "data": [x.dict() for x in get_country_wise_counts(counts, artist_country_codes)]
+        }
+        for user_id, counts in artist_mbid_counts.items()
+    ]
+
+
+def coalesce(key: str, fetch: Callable[[], Optional[object]], compute: Callable[[], object]):
+    """ Compute a missing value only once across concurrent callers.
+
+        The first caller for the key takes a lock in redis and calls compute, which should also store the value.
+        The other callers wait until the lock is released, for at most ARTIST_MAP_LOCK_WAIT seconds, and call
+        fetch to get the stored value. If it is still not available, for example because the first caller failed
+        or is slow, they compute it themselves.
+    """
+    lock_key = cache._prep_key(ARTIST_MAP_LOCK_PREFIX + key)
+    token = uuid.uuid4().hex
+    if cache._r.set(lock_key, token, nx=True, ex=ARTIST_MAP_LOCK_TIMEOUT):
+        try:
+            return compute()
+        finally:
+            cache._r.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+    deadline = time.monotonic() + ARTIST_MAP_LOCK_WAIT
+    while cache._r.exists(lock_key) and time.monotonic() < deadline:
+        time.sleep(ARTIST_MAP_LOCK_POLL_INTERVAL)
+
+    value = fetch()
+    if value is not None:
+        return value
+    return compute()
@@ -1,8 +1,94 @@
+""" Resolve the cover art of releases.
+
+Cover art is looked up in three steps: an in-process LRU, the mapping.release_cover_art_cache table
+which the mbid mapping builds and updates from CAA/MB changes, and finally, for releases missing from
+that table (e.g. the table has not been built yet or the release was added after the last update),
+the query on the CAA tables.
+"""
+import threading
+import time
+from collections import OrderedDict
 from typing import Iterable
 from uuid import UUID
 
 from psycopg2.extras import execute_values
 
+#: Time in seconds for which resolved cover art is kept in the process
+COVER_ART_LOCAL_CACHE_EXPIRY = 60 * 60
+
+#: Maximum number of releases to keep in the in-process cache
+COVER_ART_LOCAL_CACHE_SIZE = 50000
+
+#: Time in seconds after which a missing release cover art cache table is looked for again
+COVER_ART_CACHE_TABLE_RECHECK_INTERVAL = 10 * 60
+
+_local_cache = OrderedDict()
+_lock = threading.Lock()
+
+# whether the release cover art cache table exists and until when the answer is valid. once the table
+# exists it is not dropped so only its absence is checked again, to use it once it has been built.
+_cache_table_exists = False
+_cache_table_checked_until = 0.0
+
+
+def _get_local(release_mbids):
+    """ Returns the cached cover art for the given releases, releases not in the cache are omitted """
+    now = time.monotonic()
+    result = {}
+    with _lock:
+        for mbid in release_mbids:
+            entry = _local_cache.get(mbid)
+            if entry is None:
+                continue
+            expires_at, row = entry
+            if expires_at < now:
+                del _local_cache[mbid]
+                continue
+            _local_cache.move_to_end(mbid)
+            result[mbid] = row
+    return result
+
+
+def _set_local(rows):
+    expires_at = time.monotonic() + COVER_ART_LOCAL_CACHE_EXPIRY
+    with _lock:
+        for mbid, row in rows.items():
+            _local_cache[mbid] = (expires_at, row)
+            _local_cache.move_to_end(mbid)
+        while len(_local_cache) > COVER_ART_LOCAL_CACHE_SIZE:
+            _local_cache.popitem(last=False)
+
+
+def _has_cache_table(curs) -> bool:
+    """ Returns whether the release cover art cache table exists, checking the database only the first
+    time and while the table is missing, every COVER_ART_CACHE_TABLE_RECHECK_INTERVAL seconds. """
+    global _cache_table_exists, _cache_table_checked_until
+    if _cache_table_exists or time.monotonic() < _cache_table_checked_until:
+        return _cache_table_exists
+
+    curs.execute("SELECT to_regclass('mapping.release_cover_art_cache') IS NOT NULL AS exists")
+    _cache_table_exists = curs.fetchone()[0]
+    _cache_table_checked_until = time.monotonic() + COVER_ART_CACHE_TABLE_RECHECK_INTERVAL
+    return _cache_table_exists
+
+
+def get_caa_ids_from_cache_table(curs, release_mbids: Iterable[str]):
+    """ Look up the cover art of the given releases in the release cover art cache table. Releases which are
+    not in the table are omitted from the result, an empty dict is returned if the table doesn't exist.
+    """
+    if not _has_cache_table(curs):
+        return {}
+
+    query = """
+        SELECT release_mbid::TEXT AS original_mbid
+             , caa_id
+             , caa_release_mbid::TEXT AS caa_release_mbid
+          FROM mapping.release_cover_art_cache
+         WHERE release_mbid = ANY(%s::UUID[])
+    """
+    curs.execute(query, ([str(mbid) for mbid in release_mbids],))
+    return {row["original_mbid"]: dict(row) for row in curs.fetchall()}
+
 
 def get_caa_ids_for_release_mbids(curs, release_mbids: Iterable[str]):
     """ Given a list of release mbids, find the associated cover art for the releases. If cover art
@@ -10,6 +96,29 @@ def get_caa_ids_for_release_mbids(curs, release_mbids: Iterable[str]):
 
      Returns a dictionary keyed by provided releases mbids, each key further maps to a dict having 3
      keys original_mbid (mbid of the provided release), caa_id and caa_release_mbid.
+    """
+    release_mbids = [str(mbid) for mbid in release_mbids]
+    result = _get_local(release_mbids)
+
+    missing = [mbid for mbid in release_mbids if mbid not in result]
+    if missing:
+        fetched = get_caa_ids_from_cache_table(curs, missing)
+        missing = [mbid for mbid in missing if mbid not in fetched]
+        if missing:
+            fetched.update(query_caa_ids_for_release_mbids(curs, missing))
+        _set_local(fetched)
+        result.update(fetched)
+
+    return result
+
+
+def query_caa_ids_for_release_mbids(curs, release_mbids: Iterable[str]):
+    """ Given a list of release mbids, find the associated cover art for the releases by querying the
+     CAA tables. If cover art is missing for the release, fallback to the release group cover art if present.
+     The release cover art cache in the mbid mapping uses a set-based version of this query, keep both in sync.
+
+     Returns a dictionary keyed by provided releases mbids, each key further maps to a dict having 3
+     keys original_mbid (mbid of the provided release), caa_id and caa_release_mbid.
 
      Example:
 
@@ -95,4 +204,4 @@ def get_caa_ids_for_release_mbids(curs, release_mbids: Iterable[str]):
                   ON rm.mbid = rgca.original_mbid
     """
     result = execute_values(curs, query, [(UUID(mbid),) for mbid in release_mbids], fetch=True)
-    return {row["original_mbid"]: row for row in result}
+    return {row["original_mbid"]: dict(row) for row in result}
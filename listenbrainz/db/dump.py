@@ -35,6 +35,7 @@ from typing import Tuple, Optional
 
 import sqlalchemy
 import orjson
+from brainzutils import cache
 from brainzutils.mail import send_mail
 from flask import current_app, render_template
 from psycopg2.sql import Identifier, SQL, Composable
@@ -52,6 +53,11 @@ FULLEXPORT_MAX_AGE = 17  # days
 INCREMENTAL_MAX_AGE = 26  # hours
 FEEDBACK_MAX_AGE = 8  # days
 
+DUMP_TYPES = ("full", "incremental")
+
+# cache key of the status api response for the latest dump of a type in DUMP_TYPES or "all" for any type
+LATEST_DUMP_INFO_CACHE_KEY = "latest_dump_info.%s"
+
 # this dict contains the tables dumped in public dump as keys
 # and a tuple of columns that should be dumped as values
 PUBLIC_TABLES_DUMP = {
@@ -626,11 +632,12 @@ def copy_table(cursor, location, columns, table_name):
         cursor.copy_expert(query, f)
 
 
-def add_dump_entry(timestamp):
+def add_dump_entry(timestamp, dump_type: Optional[str] = None):
     """ Adds an entry to the data_dump table with specified time.
 
         Args:
             timestamp: the unix timestamp to be added
+            dump_type: the type of the dump, 'full' or 'incremental'
 
         Returns:
             id (int): the id of the new entry added
@@ -638,11 +645,12 @@ def add_dump_entry(timestamp):
 
     with db.engine.begin() as connection:
         result = connection.execute(sqlalchemy.text("""
-                INSERT INTO data_dump (created)
-                     VALUES (TO_TIMESTAMP(:ts))
+                INSERT INTO data_dump (created, dump_type)
+                     VALUES (TO_TIMESTAMP(:ts), :dump_type)
                   RETURNING id
             """), {
             'ts': timestamp,
+            'dump_type': dump_type,
         })
         return result.fetchone().id
 
@@ -661,6 +669,31 @@ def get_dump_entries():
         return result.mappings().all()
 
 
+def get_latest_dump_entry(dump_type: Optional[str] = None):
+    """ Returns the latest entry in the data_dump table, or None if there are no dumps.
+
+        Args:
+            dump_type: if given, the latest dump of this type, 'full' or 'incremental'
+    """
+    filter_clause = "WHERE dump_type = :dump_type" if dump_type else ""
+    with db.engine.connect() as connection:
+        result = connection.execute(sqlalchemy.text(f"""
+            SELECT id, created
+              FROM data_dump
+              {filter_clause}
+          ORDER BY created DESC
+             LIMIT 1
+        """), {
+            'dump_type': dump_type,
+        })
+        return result.mappings().first()
+
+
+def invalidate_latest_dump_info():
+    """ Remove the cached responses of the status api for the latest dumps, must be called when a dump is added """
+    cache.delete_many([LATEST_DUMP_INFO_CACHE_KEY % dump_type for dump_type in ("all",) + DUMP_TYPES])
+
+
 def get_dump_entry(dump_id):
     with db.engine.connect() as connection:
         result = connection.execute(sqlalchemy.text("""
@@ -35,7 +35,7 @@ import listenbrainz.db.dump as db_dump
 from listenbrainz.db import mapping_dump
 from listenbrainz.db import DUMP_DEFAULT_THREAD_COUNT
 from listenbrainz.db.year_in_music import insert_playlists
-from listenbrainz.listenstore.dump_listenstore import DumpListenStore
+from listenbrainz.listenstore.dump_listenstore import DumpListenStore, DUMP_DEFAULT_LISTEN_WORKER_COUNT
 from listenbrainz.utils import create_path
 from listenbrainz.webserver import create_app
 from listenbrainz.db.dump import check_ftp_dump_ages
@@ -119,6 +119,8 @@ def create_mbcanonical(location, use_lb_conn):
               help="path to the directory where the dump should be made")
 @click.option('--threads', '-t', type=int, default=DUMP_DEFAULT_THREAD_COUNT,
               help="the number of threads to be used while compression")
+@click.option('--listen-workers', type=int, default=DUMP_DEFAULT_LISTEN_WORKER_COUNT,
+              help="the number of processes to be used for exporting months of listens in parallel")
 @click.option('--dump-id', type=int, default=None,
               help="the ID of the ListenBrainz data dump")
 @click.option('--listen/--no-listen', 'do_listen_dump', default=True)
@@ -126,7 +128,7 @@ def create_mbcanonical(location, use_lb_conn):
 @click.option('--db/--no-db', 'do_db_dump', type=bool, default=True)
 @click.option('--timescale/--no-timescale', 'do_timescale_dump', type=bool, default=True)
 @click.option('--stats/--no-stats', 'do_stats_dump', type=bool, default=True)
-def create_full(location, threads, dump_id, do_listen_dump: bool, do_spark_dump: bool,
+def create_full(location, threads, listen_workers, dump_id, do_listen_dump: bool, do_spark_dump: bool,
                 do_db_dump: bool, do_timescale_dump: bool, do_stats_dump: bool):
     """ Create a ListenBrainz data dump which includes a private dump, a statistics dump
         and a dump of the actual listens from the listenstore.
@@ -134,6 +136,7 @@ def create_full(location, threads, dump_id, do_listen_dump: bool, do_spark_dump:
         Args:
             location (str): path to the directory where the dump should be made
             threads (int): the number of threads to be used while compression
+            listen_workers (int): the number of processes to be used for exporting listens
             dump_id (int): the ID of the ListenBrainz data dump
             do_listen_dump: If True, make a listens dump
             do_spark_dump: If True, make a spark listens dump
@@ -146,7 +149,8 @@ def create_full(location, threads, dump_id, do_listen_dump: bool, do_spark_dump:
         ls = DumpListenStore(app)
         if dump_id is None:
             end_time = datetime.now()
-            dump_id = db_dump.add_dump_entry(int(end_time.strftime('%s')))
+            dump_id = db_dump.add_dump_entry(int(end_time.strftime('%s')), "full")
+            db_dump.invalidate_latest_dump_info()
         else:
             dump_entry = db_dump.get_dump_entry(dump_id)
             if dump_entry is None:
@@ -168,7 +172,8 @@ def create_full(location, threads, dump_id, do_listen_dump: bool, do_spark_dump:
             db_dump.dump_timescale_db(dump_path, end_time, threads)
             expected_num_dumps += 2
         if do_listen_dump:
-            ls.dump_listens(dump_path, dump_id=dump_id, end_time=end_time, threads=threads)
+            ls.dump_listens(dump_path, dump_id=dump_id, end_time=end_time, threads=threads,
+                            listen_workers=listen_workers)
             expected_num_dumps += 1
         if do_spark_dump:
             ls.dump_listens_for_spark(dump_path, dump_id=dump_id, dump_type="full", end_time=end_time)
@@ -205,14 +210,16 @@ def create_full(location, threads, dump_id, do_listen_dump: bool, do_spark_dump:
 @cli.command(name="create_incremental")
 @click.option('--location', '-l', default=os.path.join(os.getcwd(), 'listenbrainz-export'))
 @click.option('--threads', '-t', type=int, default=DUMP_DEFAULT_THREAD_COUNT)
+@click.option('--listen-workers', type=int, default=DUMP_DEFAULT_LISTEN_WORKER_COUNT)
 @click.option('--dump-id', type=int, default=None)
-def create_incremental(location, threads, dump_id):
+def create_incremental(location, threads, listen_workers, dump_id):
     app = create_app()
     with app.app_context():
         ls = DumpListenStore(app)
         if dump_id is None:
             end_time = datetime.now()
-            dump_id = db_dump.add_dump_entry(int(end_time.strftime('%s')))
+            dump_id = db_dump.add_dump_entry(int(end_time.strftime('%s')), "incremental")
+            db_dump.invalidate_latest_dump_info()
         else:
             dump_entry = db_dump.get_dump_entry(dump_id)
             if dump_entry is None:
@@ -235,7 +242,8 @@ def create_incremental(location, threads, dump_id):
         dump_path = os.path.join(location, dump_name)
         create_path(dump_path)
 
-        ls.dump_listens(dump_path, dump_id=dump_id, start_time=start_time, end_time=end_time, threads=threads)
+        ls.dump_listens(dump_path, dump_id=dump_id, start_time=start_time, end_time=end_time, threads=threads,
+                        listen_workers=listen_workers)
         ls.dump_listens_for_spark(dump_path, dump_id=dump_id, dump_type="incremental",
                                   start_time=start_time, end_time=end_time)
 
@@ -1,10 +1,11 @@
+import orjson
 import sqlalchemy
 from sqlalchemy import text
 
 from listenbrainz import db
 from listenbrainz.db.msid_mbid_mapping import fetch_track_metadata_for_items
 from listenbrainz.db.model.feedback import Feedback
-from typing import List
+from typing import Iterator, List
 
 INSERT_QUERIES = {
     "msid": """
@@ -141,6 +142,45 @@ def get_feedback_for_user(user_id: int, limit: int, offset: int, score: int = No
     return feedback
 
 
+def iter_feedback_for_export(user_id: int, user_name: str, batch_size: int) -> Iterator[bytes]:
+    """ Iterate over all recording feedback given by the user in descending order of their creation,
+        for exporting it.
+
+        All feedback is read with one server side cursor in batches of batch_size rows, instead of
+        one query per page. Each feedback is yielded already serialized to json in the same format
+        as Feedback.to_api.
+
+        Args:
+            user_id: the row ID of the user in the DB
+            user_name: the MusicBrainz ID of the user
+            batch_size: the number of rows fetched from the cursor at a time
+    """
+    query = """ SELECT recording_msid::text
+                     , recording_mbid::text
+                     , score
+                     , created
+                  FROM recording_feedback
+                 WHERE user_id = :user_id
+              ORDER BY created DESC
+    """
+    with db.engine.connect() as connection:
+        result = connection.execution_options(stream_results=True)\
+            .execute(sqlalchemy.text(query), {"user_id": user_id})
+        while True:
+            rows = result.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield orjson.dumps({
+                    "recording_msid": row.recording_msid,
+                    "recording_mbid": row.recording_mbid,
+                    "track_metadata": None,
+                    "user_id": user_name,
+                    "score": row.score,
+                    "created": int(row.created.timestamp()) if row.created is not None else None,
+                })
+
+
 def get_feedback_count_for_user(user_id: int, score=None) -> int:
     """ Get total number of recording feedback given by the user
 
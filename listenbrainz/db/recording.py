@@ -60,6 +60,23 @@ def resolve_canonical_mbids(curs, mbids):
     return _resolve_mbids_helper(curs, query, mbids)
 
 
+def _get_artists(data):
+    """ Build the artist credit of a recording from the flattened artist columns of mb_metadata_cache and
+    remove those columns from the data.
+    """
+    ac_names = data.pop("ac_names")
+    ac_join_phrases = data.pop("ac_join_phrases")
+
+    artists = []
+    for (mbid, name, join_phrase) in zip(data["artist_mbids"], ac_names, ac_join_phrases):
+        artists.append({
+            "artist_mbid": mbid,
+            "artist_credit_name": name,
+            "join_phrase": join_phrase
+        })
+    return artists
+
+
 def load_recordings_from_mbids(ts_curs, mbids: Iterable[str]) -> dict:
     """ Given a list of mbids return a map with mbid as key and the recording info as value.
 
@@ -81,69 +98,69 @@ def load_recordings_from_mbids(ts_curs, mbids: Iterable[str]) -> dict:
              , release_data->>'name' AS release
              , (release_data->>'caa_id')::bigint AS caa_id
              , release_data->>'caa_release_mbid' AS caa_release_mbid
-             , array_agg(artist->>'name' ORDER BY position) AS ac_names
-             , array_agg(artist->>'join_phrase' ORDER BY position) AS ac_join_phrases
+             , artist_credit_names AS ac_names
+             , artist_credit_join_phrases AS ac_join_phrases
           FROM (VALUES %s) AS m (recording_mbid)
           JOIN mapping.mb_metadata_cache mbc
             ON mbc.recording_mbid = m.recording_mbid::uuid
-  JOIN LATERAL jsonb_array_elements(artist_data->'artists') WITH ORDINALITY artists(artist, position)
-            ON TRUE
-      GROUP BY mbc.recording_mbid
-             , release_mbid
-             , artist_mbids
-             , artist_data->>'name'
-             , artist_data->>'artist_credit_id'
-             , recording_data->>'name'
-             , recording_data->>'length'
-             , release_data->>'name'
-             , release_data->>'caa_id'
-             , release_data->>'caa_release_mbid'
     """
     results = execute_values(ts_curs, query, [(mbid,) for mbid in mbids], fetch=True)
     rows = {}
     for row in results:
         data = dict(row)
-        recording_mbid = data["recording_mbid"]
+        data["artists"] = _get_artists(data)
+        rows[data["recording_mbid"]] = data
 
-        ac_names = data.pop("ac_names")
-        ac_join_phrases = data.pop("ac_join_phrases")
+    return rows
 
-        artists = []
-        for (mbid, name, join_phrase) in zip(data["artist_mbids"], ac_names, ac_join_phrases):
-            artists.append({
-                "artist_mbid": mbid,
-                "artist_credit_name": name,
-                "join_phrase": join_phrase
-            })
-        data["artists"] = artists
-        rows[recording_mbid] = data
 
-    return rows
+def load_recordings_from_mbids_with_redirects(ts_curs, mbids):
+    """ Given a list of recording mbids, resolve redirects if any and return metadata for all recordings.
 
+    The redirects, the metadata and the canonical recordings are all looked up in a single query on the
+    mirrors of these tables in timescale. The output has one entry for each input mbid, in the same order.
+    """
+    if not mbids:
+        return []
 
-def load_recordings_from_mbids_with_redirects(mb_curs, ts_curs, mbids):
-    """ Given a list of recording mbids, resolve redirects if any and return metadata for all recordings """
-    redirected_mbids, index, inverse_index = resolve_redirect_mbids(mb_curs, "recording", mbids)
-    recording_index = load_recordings_from_mbids(ts_curs, redirected_mbids)
-    _, canonical_index, _ = resolve_canonical_mbids(ts_curs, redirected_mbids)
+    query = """
+          WITH mbids (position, gid) AS (VALUES %s)
+        SELECT mbids.position
+             , mbids.gid AS original_recording_mbid
+             , mbc.recording_mbid::TEXT
+             , COALESCE(crr.canonical_recording_mbid, mbc.recording_mbid)::TEXT AS canonical_recording_mbid
+             , mbc.artist_mbids::TEXT[]
+             , mbc.artist_data->>'name' AS artist
+             , (mbc.artist_data->>'artist_credit_id')::bigint AS artist_credit_id
+             , mbc.recording_data->>'name' AS title
+             , (mbc.recording_data->>'length')::bigint AS length
+             , (mbc.release_data->>'caa_id')::bigint AS caa_id
+             , mbc.release_data->>'caa_release_mbid' AS caa_release_mbid
+          FROM mbids
+     LEFT JOIN mapping.recording_gid_redirect rgr
+            ON rgr.recording_mbid = mbids.gid::UUID
+     LEFT JOIN mapping.mb_metadata_cache mbc
+            ON mbc.recording_mbid = COALESCE(rgr.new_recording_mbid, mbids.gid::UUID)
+     LEFT JOIN mapping.canonical_recording_redirect crr
+            ON crr.recording_mbid = mbc.recording_mbid
+    """
+    values = [(position, mbid) for position, mbid in enumerate(mbids)]
+    results = execute_values(ts_curs, query, values, page_size=len(values), fetch=True)
 
-    # Finally collate all the results, ensuring that we have one entry with original_recording_mbid for each input
-    output = []
-    for mbid in mbids:
-        redirected_mbid = index.get(mbid, mbid)
-        if redirected_mbid in recording_index:
-            data = recording_index[redirected_mbid]
+    output = [None] * len(values)
+    for row in results:
+        if row["recording_mbid"] is not None:
             r = {
-                "recording_mbid": redirected_mbid,
-                "recording_name": data["title"],
-                "length": data["length"],
-                "artist_credit_id": data["artist_credit_id"],
-                "artist_credit_name": data["artist"],
-                "[artist_credit_mbids]": data["artist_mbids"],
-                "caa_id": data["caa_id"],
-                "caa_release_mbid": data["caa_release_mbid"],
-                "original_recording_mbid": mbid,
-                "canonical_recording_mbid": canonical_index.get(redirected_mbid, redirected_mbid)
+                "recording_mbid": row["recording_mbid"],
+                "recording_name": row["title"],
+                "length": row["length"],
+                "artist_credit_id": row["artist_credit_id"],
+                "artist_credit_name": row["artist"],
+                "[artist_credit_mbids]": row["artist_mbids"],
+                "caa_id": row["caa_id"],
+                "caa_release_mbid": row["caa_release_mbid"],
+                "original_recording_mbid": row["original_recording_mbid"],
+                "canonical_recording_mbid": row["canonical_recording_mbid"]
             }
         else:
             r = {
@@ -154,7 +171,7 @@ def load_recordings_from_mbids_with_redirects(mb_curs, ts_curs, mbids):
                 'artist_credit_name': None,
                 '[artist_credit_mbids]': None,
                 'canonical_recording_mbid': None,
-                'original_recording_mbid': mbid
+                'original_recording_mbid': row["original_recording_mbid"]
             }
-        output.append(r)
+        output[row["position"]] = r
     return output
@@ -1,4 +1,4 @@
-from operator import itemgetter
+import logging
 import time
 
 import psycopg2
@@ -11,8 +11,13 @@ from sqlalchemy import text
 from listenbrainz import db
 
 
+logger = logging.getLogger(__name__)
+
 ROWS_PER_BATCH = 1000
 
+# Number of most similar pairs of users stored in the top_similar_user table
+TOP_SIMILAR_USERS_COUNT = 1000
+
 
 def import_user_similarities(data):
     """ Import the user similarities into the DB by inserting the data into a new table
@@ -27,6 +32,7 @@ def import_user_similarities(data):
 
     user_count = 0
     target_user_count = 0
+    t0 = time.monotonic()
     # Start by importing the data into an import table
     conn = db.engine.raw_connection()
     try:
@@ -54,6 +60,9 @@ def import_user_similarities(data):
             "Error: Cannot import user similarites: %s" % str(err))
         return (0, 0.0, "Error: Cannot import user similarites: %s" % str(err))
 
+    t1 = time.monotonic()
+    logger.info("Inserted similar users of %d users in %.2fs", user_count, t1 - t0)
+
     # Next lookup user names and insert them into the new similar_users table
     try:
         with conn.cursor() as curs:
@@ -88,9 +97,26 @@ def import_user_similarities(data):
             "Error: Cannot correlate user similarity user name: %s" % str(err))
         return (0, 0.0, "Error: Cannot correlate user similarity user name: %s" % str(err))
 
-    # Finally rotate the table into place
+    t2 = time.monotonic()
+    logger.info("Created and indexed the new similar users table in %.2fs", t2 - t1)
+
+    # Finally rotate the table into place, replacing the top similar users in the same transaction
     try:
         with conn.cursor() as curs:
+            curs.execute("""DELETE FROM recommendation.top_similar_user""")
+            # Each pair of users may appear in the similar users of both users, keep the pair once
+            curs.execute("""INSERT INTO recommendation.top_similar_user (user_id, other_user_id, similarity)
+                                 SELECT LEAST(r.user_id, j.key::int)
+                                      , GREATEST(r.user_id, j.key::int)
+                                      , MAX((j.value->>1)::double precision) -- second element of array is global_similarity
+                                   FROM recommendation.tmp_similar_user r
+                                   JOIN jsonb_each(r.similar_users) j
+                                     ON TRUE
+                                   JOIN "user" ou
+                                     ON j.key::int = ou.id
+                               GROUP BY 1, 2
+                               ORDER BY 3 DESC
+                                  LIMIT %s""", (TOP_SIMILAR_USERS_COUNT,))
             curs.execute("""ALTER TABLE recommendation.similar_user
                               RENAME TO delete_similar_user""")
             curs.execute("""ALTER TABLE recommendation.tmp_similar_user
@@ -102,6 +128,9 @@ def import_user_similarities(data):
             "Error: Failed to rotate similar_users table into place: %s" % str(err))
         return (0, 0.0, "Error: Failed to rotate similar_users table into place: %s" % str(err))
 
+    t3 = time.monotonic()
+    logger.info("Computed top similar users and rotated the table into place in %.2fs", t3 - t2)
+
     # Last, delete the old table
     try:
         with conn.cursor() as curs:
@@ -115,44 +144,36 @@ def import_user_similarities(data):
             "Error: Failed to clean up old similar user table: %s" % str(err))
         return (0, 0.0, "Error: Failed to clean up old similar user table: %s" % str(err))
 
+    logger.info("Imported similar users in %.2fs", time.monotonic() - t0)
     return (user_count, target_user_count / user_count, "")
 
 
 def get_top_similar_users(count: int = 200):
     """
         Fetch the count top similar users and return a tuple(user1, user2, score(0.0-1.0))
-        If global_similarity is True, the return the user similarity on a global (not
-        per user) scale.
+        The user similarity is on a global (not per user) scale. At most TOP_SIMILAR_USERS_COUNT
+        pairs are available, these are computed when the similar users are imported.
     """
-    similar_users = {}
+    similar_users = []
     try:
         with db.engine.connect() as connection:
             result = connection.execute(text("""
                 SELECT u.musicbrainz_id AS user_name
                      , ou.musicbrainz_id AS other_user_name
-                     , value->1 AS similarity -- first element of array is similarity, second is global_similarity
-                  FROM recommendation.similar_user r 
-                  JOIN jsonb_each(r.similar_users) j
-                    ON TRUE
-                  JOIN "user" ou
-                    ON j.key::int = ou.id  -- user_name of other user stored in jsonb
+                     , similarity
+                  FROM recommendation.top_similar_user t
                   JOIN "user" u
-                   ON r.user_id = u.id -- user_name of the user_id stored directly in column
-            """))
-            while True:
-                row = result.fetchone()
-                if not row:
-                    break
-                user = row.user_name
-                other_user = row.other_user_name
-                similarity = "%.3f" % row.similarity
-                if user < other_user:
-                    similar_users[user + other_user] = (user, other_user, similarity)
-                else:
-                    similar_users[other_user + user] = (other_user, user, similarity)
+                    ON t.user_id = u.id
+                  JOIN "user" ou
+                    ON t.other_user_id = ou.id
+              ORDER BY similarity DESC
+                 LIMIT :count
+            """), {"count": count})
+            for row in result:
+                user, other_user = sorted((row.user_name, row.other_user_name))
+                similar_users.append((user, other_user, "%.3f" % row.similarity))
     except psycopg2.errors.OperationalError as err:
         current_app.logger.error("Error: Failed to fetch top similar users %s" % str(err))
         return []
 
-    similar_users = [similar_users[u] for u in similar_users]
-    return sorted(similar_users, key=itemgetter(2), reverse=True)[:count]
+    return similar_users
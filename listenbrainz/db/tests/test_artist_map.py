@@ -0,0 +1,113 @@
+import unittest
+from unittest.mock import patch, MagicMock
+
+from flask import Flask
+
+from listenbrainz.db import artist_map
+
+COLDPLAY = "cc197bad-dc9c-440d-a5b5-d52ba2e14234"
+RADIOHEAD = "a74b1b7f-71a5-4011-9441-d0b5e4122711"
+DAFT_PUNK = "056e4f3e-d505-4dad-8ec1-d04f521cbb56"
+
+
+class ArtistMapTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["LISTENBRAINZ_LABS_API_URL"] = "https://labs.api.listenbrainz.org"
+
+    @patch("listenbrainz.db.artist_map.ARTIST_COUNTRY_LOOKUP_BATCH_SIZE", 2)
+    @patch("listenbrainz.db.artist_map.requests.post")
+    def test_get_artist_country_codes(self, mock_post):
+        mock_post.return_value.json.side_effect = [
+            [{"artist_mbid": COLDPLAY, "artist_name": "Coldplay", "country_code": "GB"}],
+            [{"artist_mbid": DAFT_PUNK, "artist_name": "Daft Punk", "country_code": "FR"}],
+        ]
+        with self.app.app_context():
+            result = artist_map.get_artist_country_codes([COLDPLAY, RADIOHEAD, DAFT_PUNK])
+
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(mock_post.call_args_list[1].kwargs["json"], [{"artist_mbid": DAFT_PUNK}])
+        self.assertEqual(set(result.keys()), {COLDPLAY, DAFT_PUNK})
+
+    @patch("listenbrainz.db.artist_map.get_artist_country_codes")
+    def test_compute_artist_maps(self, mock_country_codes):
+        mock_country_codes.return_value = {
+            COLDPLAY: {"artist_mbid": COLDPLAY, "artist_name": "Coldplay", "country_code": "GB"},
+            RADIOHEAD: {"artist_mbid": RADIOHEAD, "artist_name": "Radiohead", "country_code": "GB"},
+        }
+        result = artist_map.compute_artist_maps([
+            {
+                "user_id": 1,
+                "data": [
+                    {"artist_name": "Coldplay", "artist_mbid": COLDPLAY, "listen_count": 10},
+                    {"artist_name": "Radiohead", "artist_mbid": RADIOHEAD, "listen_count": 20},
+                    {"artist_name": "Unknown", "listen_count": 5},
+                ]
+            },
+            {
+                "user_id": 2,
+                "data": [{"artist_name": "Daft Punk", "artist_mbid": DAFT_PUNK, "listen_count": 3}]
+            }
+        ])
+
+        # a single lookup for the artists of all users
+        mock_country_codes.assert_called_once_with({COLDPLAY, RADIOHEAD, DAFT_PUNK})
+        self.assertEqual(result, [
+            {
+                "user_id": 1,
+                "data": [{
+                    "country": "GBR",
+                    "artist_count": 2,
+                    "listen_count": 30,
+                    "artists": [
+                        {"artist_name": "Radiohead", "artist_mbid": RADIOHEAD, "listen_count": 20},
+                        {"artist_name": "Coldplay", "artist_mbid": COLDPLAY, "listen_count": 10},
+                    ]
+                }]
+            },
+            {"user_id": 2, "data": []}
+        ])
+
+    @patch("listenbrainz.db.artist_map.cache")
+    def test_coalesce_lock_acquired(self, mock_cache):
+        mock_cache._r.set.return_value = True
+        fetch, compute = MagicMock(), MagicMock(return_value="computed")
+
+        self.assertEqual(artist_map.coalesce("1.all_time", fetch, compute), "computed")
+        compute.assert_called_once()
+        fetch.assert_not_called()
+        # the lock is released only if it still holds the token it was taken with
+        lock_key, token = mock_cache._r.set.call_args[0]
+        mock_cache._r.eval.assert_called_once_with(artist_map.RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+    @patch("listenbrainz.db.artist_map.ARTIST_MAP_LOCK_POLL_INTERVAL", 0)
+    @patch("listenbrainz.db.artist_map.cache")
+    def test_coalesce_wait_for_lock(self, mock_cache):
+        mock_cache._r.set.return_value = None
+        mock_cache._r.exists.side_effect = [True, True, False]
+        fetch, compute = MagicMock(return_value="stored"), MagicMock()
+
+        self.assertEqual(artist_map.coalesce("1.all_time", fetch, compute), "stored")
+        compute.assert_not_called()
+        mock_cache._r.eval.assert_not_called()
+
+        # the computation holding the lock failed to store the result, compute it here instead
+        mock_cache._r.exists.side_effect = None
+        mock_cache._r.exists.return_value = False
+        fetch.return_value = None
+        compute.return_value = "computed"
+        self.assertEqual(artist_map.coalesce("1.all_time", fetch, compute), "computed")
+
+    @patch("listenbrainz.db.artist_map.ARTIST_MAP_LOCK_WAIT", 0)
+    @patch("listenbrainz.db.artist_map.cache")
+    def test_coalesce_lock_wait_timeout(self, mock_cache):
+        # the lock is still held after waiting, compute the artist map instead of blocking the request longer
+        mock_cache._r.set.return_value = None
+        mock_cache._r.exists.return_value = True
+        fetch, compute = MagicMock(return_value=None), MagicMock(return_value="computed")
+
+        self.assertEqual(artist_map.coalesce("1.all_time", fetch, compute), "computed")
+        fetch.assert_called_once()
+        compute.assert_called_once()
+        mock_cache._r.eval.assert_not_called()
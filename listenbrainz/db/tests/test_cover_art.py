@@ -0,0 +1,77 @@
+import unittest
+from unittest.mock import patch, MagicMock
+
+from listenbrainz.db import cover_art
+
+RELEASE_1 = "be5f714d-02eb-4c89-9a06-5e544f132604"
+RELEASE_2 = "773e54bb-3f43-4813-826c-ca762bfa8318"
+
+
+def _row(mbid, caa_id=None, caa_release_mbid=None):
+    return {"original_mbid": mbid, "caa_id": caa_id, "caa_release_mbid": caa_release_mbid}
+
+
+class CoverArtTestCase(unittest.TestCase):
+
+    def setUp(self):
+        cover_art._local_cache.clear()
+
+    @patch("listenbrainz.db.cover_art.query_caa_ids_for_release_mbids")
+    @patch("listenbrainz.db.cover_art.get_caa_ids_from_cache_table")
+    def test_get_caa_ids_for_release_mbids(self, mock_cache_table, mock_query):
+        curs = MagicMock()
+        mock_cache_table.return_value = {RELEASE_1: _row(RELEASE_1, 2273480607, RELEASE_1)}
+        mock_query.return_value = {RELEASE_2: _row(RELEASE_2)}
+
+        result = cover_art.get_caa_ids_for_release_mbids(curs, [RELEASE_1, RELEASE_2])
+        self.assertEqual(result, {
+            RELEASE_1: _row(RELEASE_1, 2273480607, RELEASE_1),
+            RELEASE_2: _row(RELEASE_2)
+        })
+        mock_cache_table.assert_called_once_with(curs, [RELEASE_1, RELEASE_2])
+        # only the release missing from the cache table is queried from the CAA tables
+        mock_query.assert_called_once_with(curs, [RELEASE_2])
+
+        # the second lookup is served from the in-process cache, including releases without cover art
+        result = cover_art.get_caa_ids_for_release_mbids(curs, [RELEASE_2, RELEASE_1])
+        self.assertEqual(len(result), 2)
+        self.assertEqual(mock_cache_table.call_count, 1)
+        self.assertEqual(mock_query.call_count, 1)
+
+    @patch("listenbrainz.db.cover_art.query_caa_ids_for_release_mbids")
+    @patch("listenbrainz.db.cover_art.get_caa_ids_from_cache_table")
+    def test_local_cache_size(self, mock_cache_table, mock_query):
+        mock_query.return_value = {}
+        mock_cache_table.side_effect = lambda curs, mbids: {mbid: _row(mbid) for mbid in mbids}
+
+        with patch("listenbrainz.db.cover_art.COVER_ART_LOCAL_CACHE_SIZE", 1):
+            cover_art.get_caa_ids_for_release_mbids(MagicMock(), [RELEASE_1])
+            cover_art.get_caa_ids_for_release_mbids(MagicMock(), [RELEASE_2])
+        self.assertListEqual(list(cover_art._local_cache.keys()), [RELEASE_2])
+        mock_query.assert_not_called()
+
+    def test_cache_table_existence_checked_once(self):
+        curs = MagicMock()
+        curs.fetchone.return_value = [True]
+        curs.fetchall.return_value = []
+        with patch("listenbrainz.db.cover_art._cache_table_exists", False), \
+                patch("listenbrainz.db.cover_art._cache_table_checked_until", 0.0):
+            cover_art.get_caa_ids_from_cache_table(curs, [RELEASE_1])
+            cover_art.get_caa_ids_from_cache_table(curs, [RELEASE_2])
+        queries = [call.args[0] for call in curs.execute.call_args_list]
+        self.assertEqual(sum("to_regclass" in query for query in queries), 1)
+        self.assertEqual(len(queries), 3)
+
+    def test_missing_cache_table_checked_again_later(self):
+        curs = MagicMock()
+        curs.fetchone.return_value = [False]
+        with patch("listenbrainz.db.cover_art._cache_table_exists", False), \
+                patch("listenbrainz.db.cover_art._cache_table_checked_until", 0.0):
+            self.assertEqual(cover_art.get_caa_ids_from_cache_table(curs, [RELEASE_1]), {})
+            self.assertEqual(cover_art.get_caa_ids_from_cache_table(curs, [RELEASE_1]), {})
+            self.assertEqual(curs.execute.call_count, 1)
+
+            with patch("listenbrainz.db.cover_art.time.monotonic",
+                       return_value=cover_art._cache_table_checked_until + 1):
+                cover_art.get_caa_ids_from_cache_table(curs, [RELEASE_1])
+            self.assertEqual(curs.execute.call_count, 2)
@@ -102,6 +102,15 @@ class DumpTestCase(DatabaseTestCase):
         now_dumps = db_dump.get_dump_entries()
         self.assertEqual(len(now_dumps), len(prev_dumps) + 1)
 
+    def test_get_latest_dump_entry(self):
+        self.assertIsNone(db_dump.get_latest_dump_entry())
+        full_dump_id = db_dump.add_dump_entry(datetime(2023, 1, 1).strftime('%s'), "full")
+        incremental_dump_id = db_dump.add_dump_entry(datetime(2023, 1, 2).strftime('%s'), "incremental")
+
+        self.assertEqual(db_dump.get_latest_dump_entry()["id"], incremental_dump_id)
+        self.assertEqual(db_dump.get_latest_dump_entry("full")["id"], full_dump_id)
+        self.assertEqual(db_dump.get_latest_dump_entry("incremental")["id"], incremental_dump_id)
+
     def test_copy_table(self):
         db_dump.add_dump_entry(datetime.today().strftime('%s'))
         with db.engine.connect() as connection:
@@ -1,3 +1,4 @@
+import orjson
 import sqlalchemy
 
 from listenbrainz.db.model.feedback import Feedback
@@ -72,7 +73,7 @@ class FeedbackDatabaseTestCase(DatabaseTestCase, TimescaleTestCase):
         self.sample_feedback_with_metadata[0]["recording_mbid"] = mbid
 
         query = """INSERT INTO mapping.mb_metadata_cache
-                               (recording_mbid, artist_mbids, release_mbid, recording_data, artist_data, tag_data, release_data, dirty)
+                               (recording_mbid, artist_mbids, release_mbid, recording_data, artist_data, tag_data, release_data, dirty, artist_credit_names, artist_credit_join_phrases)
                         VALUES ('2f3d422f-8890-41a1-9762-fbe16f107c31'
                               , '{8f6bd1e4-fbe1-4f50-aa9b-94c450ec0f11}'::UUID[]
                               , '76df3287-6cda-33eb-8e9a-044b5e15ffdd'
@@ -81,6 +82,8 @@ class FeedbackDatabaseTestCase(DatabaseTestCase, TimescaleTestCase):
                               , '{"artist": [], "recording": [], "release_group": []}'
                               , '{"mbid": "76df3287-6cda-33eb-8e9a-044b5e15ffdd", "name": "Dummy"}'
                               , 'f'
+                              , '{"Portishead"}'
+                              , '{""}'
                                )"""
 
         with ts.engine.begin() as connection:
@@ -243,6 +246,15 @@ class FeedbackDatabaseTestCase(DatabaseTestCase, TimescaleTestCase):
         self.assertEqual(result[0].track_metadata["additional_info"]["recording_mbid"], "2f3d422f-8890-41a1-9762-fbe16f107c31")
         self.assertEqual(result[0].track_metadata["additional_info"]["release_mbid"], "76df3287-6cda-33eb-8e9a-044b5e15ffdd")
 
+    def test_iter_feedback_for_export(self):
+        count = self.insert_test_data(self.user["id"])
+        expected = db_feedback.get_feedback_for_user(user_id=self.user["id"], limit=25, offset=0)
+
+        # a batch size smaller than the number of feedback to fetch multiple batches from the cursor
+        exported = list(db_feedback.iter_feedback_for_export(self.user["id"], self.user["musicbrainz_id"], 2))
+        self.assertEqual(len(exported), count)
+        self.assertEqual([orjson.loads(fb) for fb in exported], [fb.to_api() for fb in expected])
+
     def test_get_feedback_count_for_user(self):
         count = self.insert_test_data(self.user["id"])
         result = db_feedback.get_feedback_count_for_user(user_id=self.user["id"])
@@ -42,8 +42,8 @@ class MappingTestCase(TimescaleTestCase):
 
                 connection.execute(text("""
                     INSERT INTO mapping.mb_metadata_cache
-                            (recording_mbid, artist_mbids, release_mbid, recording_data, artist_data, tag_data, release_data, dirty)
-                     VALUES (:recording_mbid ::UUID, :artist_mbids ::UUID[], :release_mbid ::UUID, :recording_data, :artist_data, :tag_data, :release_data, 'f')
+                            (recording_mbid, artist_mbids, release_mbid, recording_data, artist_data, tag_data, release_data, dirty, artist_credit_names, artist_credit_join_phrases)
+                     VALUES (:recording_mbid ::UUID, :artist_mbids ::UUID[], :release_mbid ::UUID, :recording_data, :artist_data, :tag_data, :release_data, 'f', :artist_credit_names, :artist_credit_join_phrases)
                 """), {
                     "recording_mbid": recording["recording_mbid"],
                     "artist_mbids": recording["artist_mbids"],
@@ -51,7 +51,9 @@ class MappingTestCase(TimescaleTestCase):
                     "recording_data": json.dumps({"name": recording["title"]}),
                     "artist_data": json.dumps(artist_data),
                     "release_data": json.dumps(release_data),
-                    "tag_data": json.dumps({"artist": [], "recording": [], "release_group": []})
+                    "tag_data": json.dumps({"artist": [], "recording": [], "release_group": []}),
+                    "artist_credit_names": [a["name"] for a in artists],
+                    "artist_credit_join_phrases": [a["join_phrase"] for a in artists]
                 })
 
             connection.execute(
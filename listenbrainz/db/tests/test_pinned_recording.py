@@ -1,6 +1,7 @@
 from datetime import datetime
 
 import sqlalchemy
+from brainzutils import cache
 from pydantic import ValidationError
 import time
 
@@ -16,6 +17,8 @@ import listenbrainz.db.user_relationship as db_user_relationship
 from listenbrainz.db.testing import DatabaseTestCase, TimescaleTestCase
 from listenbrainz.db import timescale as ts
 from listenbrainz import messybrainz as msb_db
+from listenbrainz import config
+from listenbrainz.utils import init_cache
 
 
 class PinnedRecDatabaseTestCase(DatabaseTestCase, TimescaleTestCase):
@@ -23,6 +26,8 @@ class PinnedRecDatabaseTestCase(DatabaseTestCase, TimescaleTestCase):
     def setUp(self):
         DatabaseTestCase.setUp(self)
         TimescaleTestCase.setUp(self)
+        # following users is cached in redis
+        init_cache(config.REDIS_HOST, config.REDIS_PORT, config.REDIS_NAMESPACE)
         self.user = db_user.get_or_create(1, "test_user")
         self.followed_user_1 = db_user.get_or_create(2, "followed_user_1")
         self.followed_user_2 = db_user.get_or_create(3, "followed_user_2")
@@ -50,6 +55,10 @@ class PinnedRecDatabaseTestCase(DatabaseTestCase, TimescaleTestCase):
             },
         ]
 
+    def tearDown(self):
+        cache._r.flushdb()
+        super(PinnedRecDatabaseTestCase, self).tearDown()
+
     def insert_test_data(self, user_id: int, limit: int = 4):
         """Inserts test data into the database.
 
@@ -111,7 +120,7 @@ class PinnedRecDatabaseTestCase(DatabaseTestCase, TimescaleTestCase):
         with ts.engine.begin() as connection:
             query = """
                     INSERT INTO mapping.mb_metadata_cache
-                               (recording_mbid, artist_mbids, release_mbid, recording_data, artist_data, tag_data, release_data, dirty)
+                               (recording_mbid, artist_mbids, release_mbid, recording_data, artist_data, tag_data, release_data, dirty, artist_credit_names, artist_credit_join_phrases)
                         VALUES ('2f3d422f-8890-41a1-9762-fbe16f107c31'
                               , '{8f6bd1e4-fbe1-4f50-aa9b-94c450ec0f11}'::UUID[]
                               , '76df3287-6cda-33eb-8e9a-044b5e15ffdd'
@@ -120,6 +129,8 @@ class PinnedRecDatabaseTestCase(DatabaseTestCase, TimescaleTestCase):
                               , '{"artist": [], "recording": [], "release_group": []}'
                               , '{"mbid": "76df3287-6cda-33eb-8e9a-044b5e15ffdd", "name": "Dummy"}'
                               , 'f'
+                              , '{"Portishead"}'
+                              , '{""}'
                                )
             """
             connection.execute(sqlalchemy.text(query))
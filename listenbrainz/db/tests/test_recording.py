@@ -0,0 +1,87 @@
+import json
+
+from psycopg2.extras import DictCursor
+from sqlalchemy import text
+
+from listenbrainz.db import timescale
+from listenbrainz.db.recording import load_recordings_from_mbids_with_redirects
+from listenbrainz.db.testing import TimescaleTestCase
+
+RECORDING_MBID = "2f3d422f-8890-41a1-9762-fbe16f107c31"
+REDIRECTED_MBID = "e97f805a-ab48-4c52-855e-07049142113d"
+CANONICAL_MBID = "97e69767-5d34-4c97-b36a-f3b2b1ef9dae"
+MISSING_MBID = "a1e97901-7ddf-4a0d-87ff-7f601ad3ccd3"
+
+
+class RecordingTestCase(TimescaleTestCase):
+
+    def insert_recording(self):
+        with timescale.engine.begin() as connection:
+            connection.execute(text("""
+                INSERT INTO mapping.mb_metadata_cache
+                           (recording_mbid, artist_mbids, release_mbid, recording_data, artist_data, tag_data,
+                            release_data, dirty, artist_credit_names, artist_credit_join_phrases)
+                    VALUES (:recording_mbid ::UUID, :artist_mbids ::UUID[], :release_mbid ::UUID, :recording_data,
+                            :artist_data, :tag_data, :release_data, 'f', :artist_credit_names, :artist_credit_join_phrases)
+            """), {
+                "recording_mbid": RECORDING_MBID,
+                "artist_mbids": ["8f6bd1e4-fbe1-4f50-aa9b-94c450ec0f11"],
+                "release_mbid": "76df3287-6cda-33eb-8e9a-044b5e15ffdd",
+                "recording_data": json.dumps({"name": "Strangers", "rels": [], "length": 291160}),
+                "artist_data": json.dumps({"name": "Portishead", "artist_credit_id": 204,
+                                           "artists": [{"name": "Portishead", "join_phrase": ""}]}),
+                "tag_data": json.dumps({"artist": [], "recording": [], "release_group": []}),
+                "release_data": json.dumps({"mbid": "76df3287-6cda-33eb-8e9a-044b5e15ffdd", "name": "Dummy",
+                                            "caa_id": 1234, "caa_release_mbid": "76df3287-6cda-33eb-8e9a-044b5e15ffdd"}),
+                "artist_credit_names": ["Portishead"],
+                "artist_credit_join_phrases": [""]
+            })
+            connection.execute(text("""
+                INSERT INTO mapping.recording_gid_redirect (recording_mbid, new_recording_mbid)
+                     VALUES (:old, :new)
+            """), {"old": REDIRECTED_MBID, "new": RECORDING_MBID})
+            connection.execute(text("""
+                INSERT INTO mapping.canonical_recording_redirect
+                           (recording_mbid, canonical_recording_mbid, canonical_release_mbid)
+                     VALUES (:recording_mbid, :canonical_mbid, '76df3287-6cda-33eb-8e9a-044b5e15ffdd')
+            """), {"recording_mbid": RECORDING_MBID, "canonical_mbid": CANONICAL_MBID})
+
+    def test_load_recordings_from_mbids_with_redirects(self):
+        self.insert_recording()
+
+        recording = {
+            "recording_mbid": RECORDING_MBID,
+            "recording_name": "Strangers",
+            "length": 291160,
+            "artist_credit_id": 204,
+            "artist_credit_name": "Portishead",
+            "[artist_credit_mbids]": ["8f6bd1e4-fbe1-4f50-aa9b-94c450ec0f11"],
+            "caa_id": 1234,
+            "caa_release_mbid": "76df3287-6cda-33eb-8e9a-044b5e15ffdd",
+            "canonical_recording_mbid": CANONICAL_MBID
+        }
+        missing = {
+            "recording_mbid": None,
+            "recording_name": None,
+            "length": None,
+            "artist_credit_id": None,
+            "artist_credit_name": None,
+            "[artist_credit_mbids]": None,
+            "canonical_recording_mbid": None,
+            "original_recording_mbid": MISSING_MBID
+        }
+
+        connection = timescale.engine.raw_connection()
+        try:
+            with connection.cursor(cursor_factory=DictCursor) as ts_curs:
+                result = load_recordings_from_mbids_with_redirects(
+                    ts_curs, [MISSING_MBID, REDIRECTED_MBID, RECORDING_MBID]
+                )
+        finally:
+            connection.close()
+
+        self.assertEqual(result, [
+            missing,
+            {**recording, "original_recording_mbid": REDIRECTED_MBID},
+            {**recording, "original_recording_mbid": RECORDING_MBID},
+        ])
@@ -1,11 +1,7 @@
-import json
-
 import listenbrainz.db.user as db_user
-import sqlalchemy
 
-from listenbrainz import db
 from listenbrainz.db.testing import DatabaseTestCase
-from listenbrainz.db.similar_users import get_top_similar_users
+from listenbrainz.db.similar_users import get_top_similar_users, import_user_similarities
 
 
 class SimilarUserTestCase(DatabaseTestCase):
@@ -14,22 +10,31 @@ class SimilarUserTestCase(DatabaseTestCase):
         user_id_1 = db_user.create(1, "tom")
         user_id_2 = db_user.create(2, "jerry")
 
-        similar_users_1 = {user_id_2: [0.42, 0.01]}
-        similar_users_2 = {user_id_1: [0.42, 0.02]}
+        similar_users_1 = {str(user_id_2): [0.42, 0.01]}
+        similar_users_2 = {str(user_id_1): [0.42, 0.02]}
 
-        with db.engine.begin() as connection:
-            connection.execute(sqlalchemy.text("""
-            INSERT INTO recommendation.similar_user (user_id, similar_users)
-                 VALUES (:user_id_1, :similar_users_1), (:user_id_2, :similar_users_2)
-            """), {
-                "user_id_1": user_id_1,
-                "similar_users_1": json.dumps(similar_users_1),
-                "user_id_2": user_id_2,
-                "similar_users_2": json.dumps(similar_users_2)
-            })
+        import_user_similarities({str(user_id_1): similar_users_1, str(user_id_2): similar_users_2})
 
         similar_users = get_top_similar_users()
         assert len(similar_users) == 1
         assert similar_users[0][0] == 'jerry'
         assert similar_users[0][1] == 'tom'
         assert similar_users[0][2] == "0.020"
+
+    def test_top_similar_users_are_ordered(self):
+        user_id_1 = db_user.create(1, "tom")
+        user_id_2 = db_user.create(2, "jerry")
+        user_id_3 = db_user.create(3, "spike")
+
+        import_user_similarities({
+            str(user_id_1): {str(user_id_2): [0.4, 0.1], str(user_id_3): [0.7, 0.3]},
+            str(user_id_2): {str(user_id_1): [0.4, 0.1]},
+            str(user_id_3): {str(user_id_1): [0.7, 0.3]},
+        })
+
+        self.assertListEqual(get_top_similar_users(), [("spike", "tom", "0.300"), ("jerry", "tom", "0.100")])
+        self.assertListEqual(get_top_similar_users(count=1), [("spike", "tom", "0.300")])
+
+        # the top similar users of deleted users are removed
+        db_user.delete(user_id_3)
+        self.assertListEqual(get_top_similar_users(), [("jerry", "tom", "0.100")])
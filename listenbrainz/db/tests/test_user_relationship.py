@@ -16,22 +16,31 @@
 # with this program; if not, write to the Free Software Foundation, Inc.,
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
 import time
+from unittest.mock import patch
 
-from listenbrainz import db
+from brainzutils import cache
+
+from listenbrainz import config, db
 from listenbrainz.db.testing import DatabaseTestCase
 from listenbrainz.db.exceptions import DatabaseException
 
 import listenbrainz.db.user as db_user
 import listenbrainz.db.user_relationship as db_user_relationship
+from listenbrainz.utils import init_cache
 
 
 class UserRelationshipTestCase(DatabaseTestCase):
     def setUp(self):
         super(UserRelationshipTestCase, self).setUp()
+        init_cache(config.REDIS_HOST, config.REDIS_PORT, config.REDIS_NAMESPACE)
         self.main_user = db_user.get_or_create(1, 'iliekcomputers')
         self.followed_user_1 = db_user.get_or_create(2, 'followed_user_1')
         self.followed_user_2 = db_user.get_or_create(3, 'followed_user_2')
 
+    def tearDown(self):
+        cache._r.flushdb()
+        super(UserRelationshipTestCase, self).tearDown()
+
     def test_insert(self):
         db_user_relationship.insert(self.main_user['id'], self.followed_user_1['id'], 'follow')
         self.assertTrue(db_user_relationship.is_following_user(self.main_user['id'], self.followed_user_1['id']))
@@ -51,6 +60,56 @@ class UserRelationshipTestCase(DatabaseTestCase):
         db_user_relationship.delete(self.main_user['id'], self.followed_user_1['id'], 'follow')
         self.assertFalse(db_user_relationship.is_following_user(self.main_user['id'], self.followed_user_1['id']))
 
+    def test_is_following(self):
+        self.assertFalse(db_user_relationship.is_following(self.main_user['id'], self.followed_user_1['id']))
+        db_user_relationship.insert(self.main_user['id'], self.followed_user_1['id'], 'follow')
+        self.assertTrue(db_user_relationship.is_following(self.main_user['id'], self.followed_user_1['id']))
+        self.assertFalse(db_user_relationship.is_following(self.followed_user_1['id'], self.main_user['id']))
+        db_user_relationship.delete(self.main_user['id'], self.followed_user_1['id'], 'follow')
+        self.assertFalse(db_user_relationship.is_following(self.main_user['id'], self.followed_user_1['id']))
+
+    def test_follow_cache(self):
+        # the following of a user who follows no one is cached too
+        self.assertSetEqual(db_user_relationship.get_following_ids(self.main_user['id']), set())
+        key = cache._prep_key(db_user_relationship.FOLLOWING_CACHE_KEY % self.main_user['id'])
+        self.assertTrue(cache._r.exists(key))
+
+        # following and unfollowing update the cached sets of both users
+        db_user_relationship.insert(self.main_user['id'], self.followed_user_1['id'], 'follow')
+        db_user_relationship.insert(self.main_user['id'], self.followed_user_2['id'], 'follow')
+        self.assertSetEqual(db_user_relationship.get_following_ids(self.main_user['id']),
+                            {self.followed_user_1['id'], self.followed_user_2['id']})
+        self.assertSetEqual(db_user_relationship.get_follower_ids(self.followed_user_1['id']), {self.main_user['id']})
+
+        db_user_relationship.delete(self.main_user['id'], self.followed_user_1['id'], 'follow')
+        self.assertSetEqual(db_user_relationship.get_following_ids(self.main_user['id']), {self.followed_user_2['id']})
+        self.assertSetEqual(db_user_relationship.get_follower_ids(self.followed_user_1['id']), set())
+
+        # the relationships of a deleted user are removed from the cache once it is invalidated
+        db_user_relationship.get_follower_ids(self.followed_user_2['id'])
+        db_user.delete(self.main_user['id'])
+        db_user_relationship.invalidate_follow_cache(following_of=[self.main_user['id']],
+                                                     followers_of=[self.followed_user_2['id']])
+        self.assertSetEqual(db_user_relationship.get_following_ids(self.main_user['id']), set())
+        self.assertSetEqual(db_user_relationship.get_follower_ids(self.followed_user_2['id']), set())
+
+    def test_follow_cache_not_filled_after_concurrent_invalidation(self):
+        key = cache._prep_key(db_user_relationship.FOLLOWING_CACHE_KEY % self.main_user['id'])
+        connect = db.engine.connect
+
+        def connect_with_concurrent_follow():
+            # another request adds a relationship while the following is read from the database
+            db_user_relationship.insert(self.main_user['id'], self.followed_user_1['id'], 'follow')
+            return connect()
+
+        with patch.object(db.engine, "connect", side_effect=connect_with_concurrent_follow):
+            db_user_relationship.get_following_ids(self.main_user['id'])
+        # the following read concurrently with the change is not cached, so the change is not lost
+        self.assertFalse(cache._r.exists(key))
+        self.assertSetEqual(db_user_relationship.get_following_ids(self.main_user['id']),
+                            {self.followed_user_1['id']})
+        self.assertTrue(cache._r.exists(key))
+
     def test_delete_raises_value_error_for_invalid_relationships(self):
         with self.assertRaises(ValueError):
             db_user_relationship.delete(self.main_user['id'], self.followed_user_1['id'], 'idkwhatrelationshipthisis')
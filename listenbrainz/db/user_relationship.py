@@ -17,7 +17,10 @@
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
 
 from datetime import datetime
-from typing import List, Tuple
+from typing import Iterable, List, Set, Tuple
+
+from brainzutils import cache
+from redis import WatchError
 
 from listenbrainz import db
 from listenbrainz.db.exceptions import DatabaseException
@@ -28,6 +31,22 @@ VALID_RELATIONSHIP_TYPES = (
     'follow',
 )
 
+# keys of the redis sets of the row ids of the users followed by a user and of the users following a user
+FOLLOWING_CACHE_KEY = "user_relationship.following.%d"
+FOLLOWERS_CACHE_KEY = "user_relationship.followers.%d"
+
+#: Time in seconds for which the users followed by and following a user are cached in redis
+FOLLOW_CACHE_EXPIRY = 24 * 60 * 60
+
+# redis does not store empty sets, so this member, which is never a user id, is added to every cached set
+# to tell apart a user who does not follow anyone from a user whose following is not cached
+FOLLOW_CACHE_PLACEHOLDER = 0
+
+# suffix of the key of the counter incremented whenever a cached set is invalidated. a set read from the
+# database is only cached if the counter did not change meanwhile, so that a concurrent change to the
+# relationships cannot be overwritten with the stale set.
+FOLLOW_CACHE_GENERATION_SUFFIX = ".generation"
+
 
 def insert(user_0: int, user_1: int, relationship_type: str) -> None:
     if relationship_type not in VALID_RELATIONSHIP_TYPES:
@@ -42,6 +61,7 @@ def insert(user_0: int, user_1: int, relationship_type: str) -> None:
             "user_1": user_1,
             "relationship_type": relationship_type,
         })
+    invalidate_follow_cache(following_of=[user_0], followers_of=[user_1])
 
 
 def is_following_user(follower: int, followed: int) -> bool:
@@ -59,6 +79,81 @@ def is_following_user(follower: int, followed: int) -> bool:
         return result.fetchone().cnt > 0
 
 
+def _get_cached_user_ids(key: str, query: str, user: int) -> Set[int]:
+    """ Returns the user ids in the redis set at key, if the set is not cached the user ids are
+    fetched with the query and cached unless the set was invalidated while they were fetched. """
+    key = cache._prep_key(key % user)
+    members = cache._r.smembers(key)
+    if members:
+        return {int(member) for member in members} - {FOLLOW_CACHE_PLACEHOLDER}
+
+    with cache._r.pipeline() as pipeline:
+        # watch the generation before reading the database, an invalidation after this makes the transaction fail
+        pipeline.watch(key + FOLLOW_CACHE_GENERATION_SUFFIX)
+        with db.engine.connect() as connection:
+            result = connection.execute(sqlalchemy.text(query), {"user": user})
+            user_ids = {row.id for row in result.fetchall()}
+
+        pipeline.multi()
+        pipeline.sadd(key, FOLLOW_CACHE_PLACEHOLDER, *user_ids)
+        pipeline.expire(key, FOLLOW_CACHE_EXPIRY)
+        try:
+            pipeline.execute()
+        except WatchError:
+            # the relationships changed while they were read, the next call reads them again
+            pass
+    return user_ids
+
+
+def get_following_ids(user: int) -> Set[int]:
+    """ Returns the row ids of the users who the specified user follows, from the cache if possible. """
+    return _get_cached_user_ids(FOLLOWING_CACHE_KEY, """
+        SELECT user_1 AS id
+          FROM user_relationship
+         WHERE user_0 = :user
+           AND relationship_type = 'follow'
+    """, user)
+
+
+def get_follower_ids(user: int) -> Set[int]:
+    """ Returns the row ids of the users who follow the specified user, from the cache if possible. """
+    return _get_cached_user_ids(FOLLOWERS_CACHE_KEY, """
+        SELECT user_0 AS id
+          FROM user_relationship
+         WHERE user_1 = :user
+           AND relationship_type = 'follow'
+    """, user)
+
+
+def is_following(follower: int, followed: int) -> bool:
+    """ Check whether follower follows followed using the cached following of the follower. Unlike
+    is_following_user this does not query the database once the following of the follower is cached. """
+    key = cache._prep_key(FOLLOWING_CACHE_KEY % follower)
+    pipeline = cache._r.pipeline()
+    pipeline.sismember(key, followed)
+    pipeline.exists(key)
+    is_member, exists = pipeline.execute()
+    if exists:
+        return bool(is_member)
+    return followed in get_following_ids(follower)
+
+
+def invalidate_follow_cache(following_of: Iterable[int] = (), followers_of: Iterable[int] = ()) -> None:
+    """ Remove the cached following of the users in following_of and the cached followers of the users
+    in followers_of. Must be called after relationships of these users are added or removed. """
+    keys = [FOLLOWING_CACHE_KEY % user for user in following_of] + \
+           [FOLLOWERS_CACHE_KEY % user for user in followers_of]
+    if not keys:
+        return
+    pipeline = cache._r.pipeline()
+    for key in keys:
+        key = cache._prep_key(key)
+        pipeline.incr(key + FOLLOW_CACHE_GENERATION_SUFFIX)
+        pipeline.expire(key + FOLLOW_CACHE_GENERATION_SUFFIX, FOLLOW_CACHE_EXPIRY)
+        pipeline.delete(key)
+    pipeline.execute()
+
+
 def multiple_users_by_username_following_user(followed: int, followers: List[str]):
     '''
     returns a dictionary, keys being usernames
@@ -103,42 +198,35 @@ def delete(user_0: int, user_1: int, relationship_type: str) -> None:
             "user_1": user_1,
             "relationship_type": relationship_type,
         })
+    invalidate_follow_cache(following_of=[user_0], followers_of=[user_1])
 
 
-def get_followers_of_user(user: int) -> List[dict]:
-    """ Returns a list of users who follow the specified user.
-    """
+def _get_users(user_ids: Set[int]) -> List[dict]:
+    """ Returns the row id and MusicBrainz ID of the users with the given row ids """
+    if not user_ids:
+        return []
     with db.engine.connect() as connection:
         result = connection.execute(sqlalchemy.text("""
-            SELECT "user".musicbrainz_id AS musicbrainz_id, "user".id as id
-              FROM user_relationship
-              JOIN "user"
-                ON "user".id = user_0
-             WHERE user_1 = :followed
-               AND relationship_type = 'follow'
-
+            SELECT musicbrainz_id, id
+              FROM "user"
+             WHERE id = ANY(:user_ids)
+          ORDER BY id
         """), {
-            "followed": user,
+            "user_ids": list(user_ids),
         })
         return result.mappings().all()
 
 
+def get_followers_of_user(user: int) -> List[dict]:
+    """ Returns a list of users who follow the specified user.
+    """
+    return _get_users(get_follower_ids(user))
+
+
 def get_following_for_user(user: int) -> List[dict]:
     """ Returns a list of users who the specified user follows.
     """
-    with db.engine.connect() as connection:
-        result = connection.execute(sqlalchemy.text("""
-            SELECT "user".musicbrainz_id AS musicbrainz_id, "user".id as id
-              FROM user_relationship
-              JOIN "user"
-                ON "user".id = user_1
-             WHERE user_0 = :user
-               AND relationship_type = 'follow'
-
-        """), {
-            "user": user,
-        })
-        return result.mappings().all()
+    return _get_users(get_following_ids(user))
 
 
 def get_follow_events(user_ids: Tuple[int], min_ts: float, max_ts: float, count: int) -> List[dict]:
@@ -22,15 +22,10 @@ class RecordingFromRecordingMBIDQuery(Query):
                 '[artist_credit_mbids]', 'canonical_recording_mbid', 'original_recording_mbid']
 
     def fetch(self, params, offset=-1, count=-1):
-        if not current_app.config["MB_DATABASE_URI"]:
-            return []
-
         mbids = [p['[recording_mbid]'] for p in params]
-        with psycopg2.connect(current_app.config["MB_DATABASE_URI"]) as mb_conn, \
-                psycopg2.connect(current_app.config["SQLALCHEMY_TIMESCALE_URI"]) as ts_conn, \
-                mb_conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as mb_curs, \
+        with psycopg2.connect(current_app.config["SQLALCHEMY_TIMESCALE_URI"]) as ts_conn, \
                 ts_conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as ts_curs:
-            output = load_recordings_from_mbids_with_redirects(mb_curs, ts_curs, mbids)
+            output = load_recordings_from_mbids_with_redirects(ts_curs, mbids)
 
             for item in output:
                 item.pop("caa_id", None)
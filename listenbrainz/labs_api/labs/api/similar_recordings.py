@@ -27,11 +27,11 @@ class SimilarRecordingsViewerQuery(Query):
         return None
 
     @staticmethod
-    def get_recordings_dataset(mb_curs, ts_curs, mbids, score_idx=None, similar_mbid_idx=None):
+    def get_recordings_dataset(ts_curs, mbids, score_idx=None, similar_mbid_idx=None):
         """ Retrieve recording metadata for given list of mbids after resolving redirects, canonical redirects and
         adding similarity data if available
         """
-        metadata = load_recordings_from_mbids_with_redirects(mb_curs, ts_curs, mbids)
+        metadata = load_recordings_from_mbids_with_redirects(ts_curs, mbids)
         for r in metadata:
             if score_idx and similar_mbid_idx:
                 similar_mbid = r["original_recording_mbid"]
@@ -54,12 +54,10 @@ class SimilarRecordingsViewerQuery(Query):
         algorithm = params[0]["algorithm"].strip()
         count = count if count > 0 else 100
 
-        with psycopg2.connect(current_app.config["MB_DATABASE_URI"]) as mb_conn, \
-                psycopg2.connect(current_app.config["SQLALCHEMY_TIMESCALE_URI"]) as ts_conn, \
-                mb_conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as mb_curs, \
+        with psycopg2.connect(current_app.config["SQLALCHEMY_TIMESCALE_URI"]) as ts_conn, \
                 ts_conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as ts_curs:
 
-            references = self.get_recordings_dataset(mb_curs, ts_curs, recording_mbids)
+            references = self.get_recordings_dataset(ts_curs, recording_mbids)
             results = [{"type": "markup", "data": Markup("<p><b>Reference recording</b></p>")}]
             results.append(references)
 
@@ -71,7 +69,7 @@ class SimilarRecordingsViewerQuery(Query):
                 })
                 return results
 
-            similar_dataset = self.get_recordings_dataset(mb_curs, ts_curs, similar_mbids, score_idx, mbid_idx)
+            similar_dataset = self.get_recordings_dataset(ts_curs, similar_mbids, score_idx, mbid_idx)
             results.append({"type": "markup", "data": Markup("<p><b>Similar Recordings</b></p>")})
             results.append(similar_dataset)
 
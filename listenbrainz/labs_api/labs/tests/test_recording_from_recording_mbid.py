@@ -20,72 +20,66 @@ json_request = [
     }
 ]
 
-redirect_db_response = (
-    [
-        "1234a7ae-2af2-4291-aa84-bd0bafe291a1",
-        "8fa0023e-1268-4d32-8341-83bb7506086e",
-        "1636e7a9-229d-446d-aa81-e33071b42d7a",
-        "a1e97901-7ddf-4a0d-87ff-7f601ad3ccd3"
-    ],
+recordings_db_response = [
     {
-        "a96bf3b6-651d-49f4-9a89-eee27cecc18e": "1234a7ae-2af2-4291-aa84-bd0bafe291a1",
-        "5948f779-0b96-4eba-b6a7-d1f0f6c7cf9f": "1636e7a9-229d-446d-aa81-e33071b42d7a"
-    },
-    {
-        "1234a7ae-2af2-4291-aa84-bd0bafe291a1": "a96bf3b6-651d-49f4-9a89-eee27cecc18e",
-        "1636e7a9-229d-446d-aa81-e33071b42d7a": "5948f779-0b96-4eba-b6a7-d1f0f6c7cf9f"
-    }
-)
-
-canonical_db_response = [
-    [
-        "1234a7ae-2af2-4291-aa84-bd0bafe291a1",
-        "ec5b8aa9-7483-4791-a185-1f599a0cdc35",
-        "1636e7a9-229d-446d-aa81-e33071b42d7a",
-        "a1e97901-7ddf-4a0d-87ff-7f601ad3ccd3"
-    ],
-    {"8fa0023e-1268-4d32-8341-83bb7506086e": "ec5b8aa9-7483-4791-a185-1f599a0cdc35"},
-    {"ec5b8aa9-7483-4791-a185-1f599a0cdc35": "8fa0023e-1268-4d32-8341-83bb7506086e"}
-]
-
-metadata_db_response = {
-    "1234a7ae-2af2-4291-aa84-bd0bafe291a1": {
+        "position": 0,
+        "original_recording_mbid": "a96bf3b6-651d-49f4-9a89-eee27cecc18e",
+        "recording_mbid": "1234a7ae-2af2-4291-aa84-bd0bafe291a1",
+        "canonical_recording_mbid": "1234a7ae-2af2-4291-aa84-bd0bafe291a1",
         "artist_mbids": [
             "8f6bd1e4-fbe1-4f50-aa9b-94c450ec0f11"
         ],
         "artist_credit_id": 65,
         "artist": "Portishead",
         "length": 253000,
-        "recording_mbid": "1234a7ae-2af2-4291-aa84-bd0bafe291a1",
         "title": "Sour Times",
         "caa_id": None,
         "caa_release_mbid": None
     },
-    "1636e7a9-229d-446d-aa81-e33071b42d7a": {
+    {
+        "position": 2,
+        "original_recording_mbid": "5948f779-0b96-4eba-b6a7-d1f0f6c7cf9f",
+        "recording_mbid": "1636e7a9-229d-446d-aa81-e33071b42d7a",
+        "canonical_recording_mbid": "1636e7a9-229d-446d-aa81-e33071b42d7a",
         "artist_mbids": [
             "4e024037-14b7-4aea-99ad-c6ace63b9620"
         ],
         "artist_credit_id": 92381,
         "artist": "Madvillain",
         "length": 111666,
-        "recording_mbid": "1636e7a9-229d-446d-aa81-e33071b42d7a",
         "title": "Strange Ways",
         "caa_id": None,
         "caa_release_mbid": None
     },
-    "8fa0023e-1268-4d32-8341-83bb7506086e": {
+    {
+        "position": 1,
+        "original_recording_mbid": "8fa0023e-1268-4d32-8341-83bb7506086e",
+        "recording_mbid": "8fa0023e-1268-4d32-8341-83bb7506086e",
+        "canonical_recording_mbid": "ec5b8aa9-7483-4791-a185-1f599a0cdc35",
         "artist_mbids": [
             "31810c40-932a-4f2d-8cfd-17849844e2a6"
         ],
         "artist_credit_id": 11,
         "artist": "Squirrel Nut Zippers",
         "length": 275333,
-        "recording_mbid": "8fa0023e-1268-4d32-8341-83bb7506086e",
         "title": "Blue Angel",
         "caa_id": None,
         "caa_release_mbid": None
+    },
+    {
+        "position": 3,
+        "original_recording_mbid": "a1e97901-7ddf-4a0d-87ff-7f601ad3ccd3",
+        "recording_mbid": None,
+        "canonical_recording_mbid": None,
+        "artist_mbids": None,
+        "artist_credit_id": None,
+        "artist": None,
+        "length": None,
+        "title": None,
+        "caa_id": None,
+        "caa_release_mbid": None
     }
-}
+]
 
 json_response = [
     {
@@ -148,25 +142,12 @@ class MainTestCase(flask_testing.TestCase):
     def setUp(self):
         self.maxDiff = None
         flask_testing.TestCase.setUp(self)
-        mock_resolve_redirect_mbids = patch(
-            "listenbrainz.db.recording.resolve_redirect_mbids",
-            return_value=redirect_db_response
+        mock_execute_values = patch(
+            "listenbrainz.db.recording.execute_values",
+            return_value=recordings_db_response
         )
-        mock_resolve_canonical_mbids = patch(
-            "listenbrainz.db.recording.resolve_canonical_mbids",
-            return_value=canonical_db_response
-        )
-        mock_metadata_db_response = patch(
-            "listenbrainz.db.recording.load_recordings_from_mbids",
-            return_value=metadata_db_response
-        )
-        mock_resolve_redirect_mbids.start()
-        mock_resolve_canonical_mbids.start()
-        mock_metadata_db_response.start()
-
-        self.addCleanup(mock_resolve_redirect_mbids.stop)
-        self.addCleanup(mock_resolve_canonical_mbids.stop)
-        self.addCleanup(mock_metadata_db_response.stop)
+        mock_execute_values.start()
+        self.addCleanup(mock_execute_values.stop)
 
     def tearDown(self):
         flask_testing.TestCase.tearDown(self)
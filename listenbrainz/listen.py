@@ -2,6 +2,7 @@
 import calendar
 from copy import deepcopy
 from datetime import datetime
+from typing import NamedTuple, Optional
 
 import orjson
 
@@ -28,6 +29,14 @@ def flatten_dict(d, seperator='', parent_key=''):
     return dict(result)
 
 
+def _flatten_if_nested(d):
+    """ Same as flatten_dict(d) but skips building a new dict if d has no nested dicts """
+    for value in d.values():
+        if isinstance(value, dict):
+            return flatten_dict(d)
+    return d
+
+
 def convert_comma_seperated_string_to_list(string):
     if not string:
         return []
@@ -36,9 +45,40 @@ def convert_comma_seperated_string_to_list(string):
     return [val for val in string.split(',')]
 
 
+def _get_mbid_mapping(recording_mbid, release_mbid, artist_mbids, ac_names, ac_join_phrases, caa_id, caa_release_mbid):
+    """ Build the mbid_mapping of the track_metadata of a listen from the mapping columns fetched from timescale """
+    mbid_mapping = {"recording_mbid": str(recording_mbid)}
+
+    if release_mbid is not None:
+        mbid_mapping["release_mbid"] = str(release_mbid)
+
+    if artist_mbids is not None and ac_names is not None and ac_join_phrases is not None:
+        artists = []
+        for (mbid, name, join_phrase) in zip(artist_mbids, ac_names, ac_join_phrases):
+            artists.append({
+                "artist_mbid": mbid,
+                "artist_credit_name": name,
+                "join_phrase": join_phrase
+            })
+
+        mbid_mapping["artists"] = artists
+        mbid_mapping["artist_mbids"] = [str(m) for m in artist_mbids]
+
+    if caa_id is not None and caa_release_mbid is not None:
+        mbid_mapping["caa_id"] = caa_id
+        mbid_mapping["caa_release_mbid"] = caa_release_mbid
+
+    return mbid_mapping
+
+
 class Listen(object):
     """ Represents a listen object """
 
+    # listens are created in bulk by the timescale writer and the dump importer, avoid
+    # a per-instance __dict__ to keep them small
+    __slots__ = ('user_id', 'user_name', 'ts_since_epoch', '_timestamp', 'recording_msid',
+                 'dedup_tag', 'inserted_timestamp', 'data')
+
     # keys that we use ourselves for private usage
     PRIVATE_KEYS = (
         'inserted_timestamp',
@@ -74,16 +114,17 @@ class Listen(object):
         self.user_id = user_id
         self.user_name = user_name
 
-        # determine the type of timestamp and do the right thing
+        # determine the type of timestamp and do the right thing, the datetime for
+        # a numeric timestamp is only created when the timestamp property is accessed
         if isinstance(timestamp, int) or isinstance(timestamp, float):
             self.ts_since_epoch = int(timestamp)
-            self.timestamp = datetime.utcfromtimestamp(self.ts_since_epoch)
+            self._timestamp = None
         else:
             if timestamp:
-                self.timestamp = timestamp
-                self.ts_since_epoch = calendar.timegm(self.timestamp.utctimetuple())
+                self._timestamp = timestamp
+                self.ts_since_epoch = calendar.timegm(timestamp.utctimetuple())
             else:
-                self.timestamp = None
+                self._timestamp = None
                 self.ts_since_epoch = None
 
         self.recording_msid = recording_msid
@@ -93,7 +134,7 @@ class Listen(object):
             self.data = {'additional_info': {}}
         else:
             try:
-                flattened_data = flatten_dict(data['additional_info'])
+                flattened_data = _flatten_if_nested(data['additional_info'])
                 data['additional_info'] = flattened_data
             except TypeError:
                 # TypeError may occur here because PostgresListenStore passes strings
@@ -102,27 +143,29 @@ class Listen(object):
 
             self.data = data
 
+    @property
+    def timestamp(self):
+        if self._timestamp is None and self.ts_since_epoch is not None:
+            self._timestamp = datetime.utcfromtimestamp(self.ts_since_epoch)
+        return self._timestamp
+
     @classmethod
     def from_json(cls, j):
         """Factory to make Listen() objects from a dict"""
 
-        # Let's go play whack-a-mole with our lovely whicket of timestamp fields. Hopefully one will work!
-        try:
-            j['listened_at'] = datetime.utcfromtimestamp(float(j['listened_at']))
-        except KeyError:
-            try:
-                j['listened_at'] = datetime.utcfromtimestamp(float(j['timestamp']))
-            except KeyError:
-                j['listened_at'] = datetime.utcfromtimestamp(float(j['ts_since_epoch']))
+        ts = _get_json_timestamp(j)
+        j['listened_at'] = datetime.utcfromtimestamp(ts)
 
-        return cls(
+        listen = cls(
             user_id=j.get('user_id'),
             user_name=j.get('user_name', ''),
-            timestamp=j['listened_at'],
+            timestamp=ts,
             recording_msid=j.get('recording_msid'),
             dedup_tag=j.get('dedup_tag', 0),
             data=j.get('track_metadata')
         )
+        listen._timestamp = j['listened_at']
+        return listen
 
     @classmethod
     def from_timescale(cls, listened_at, track_name, user_id, created, data,
@@ -134,26 +177,9 @@ class Listen(object):
         data["listened_at"] = datetime.utcfromtimestamp(float(listened_at))
         data["track_metadata"]["track_name"] = track_name
         if recording_mbid is not None:
-            data["track_metadata"]["mbid_mapping"] = {"recording_mbid": str(recording_mbid)}
-
-            if release_mbid is not None:
-                data["track_metadata"]["mbid_mapping"]["release_mbid"] = str(release_mbid)
-
-            if artist_mbids is not None and ac_names is not None and ac_join_phrases is not None:
-                artists = []
-                for (mbid, name, join_phrase) in zip(artist_mbids, ac_names, ac_join_phrases):
-                    artists.append({
-                        "artist_mbid": mbid,
-                        "artist_credit_name": name,
-                        "join_phrase": join_phrase
-                    })
-
-                data["track_metadata"]["mbid_mapping"]["artists"] = artists
-                data["track_metadata"]["mbid_mapping"]["artist_mbids"] = [str(m) for m in artist_mbids]
-
-            if caa_id is not None and caa_release_mbid is not None:
-                data["track_metadata"]["mbid_mapping"]["caa_id"] = caa_id
-                data["track_metadata"]["mbid_mapping"]["caa_release_mbid"] = caa_release_mbid
+            data["track_metadata"]["mbid_mapping"] = _get_mbid_mapping(
+                recording_mbid, release_mbid, artist_mbids, ac_names, ac_join_phrases, caa_id, caa_release_mbid
+            )
 
         return cls(
             user_id=user_id,
@@ -185,6 +211,44 @@ class Listen(object):
 
         return data
 
+    @staticmethod
+    def json_to_api(j):
+        """ Converts a listen in the json format, as queued for the websockets by the timescale writer, to the
+        format in which listens are returned by the api. Same as from_json(j).to_api() without creating the listen,
+        the dict is modified in place. """
+        track_metadata = j['track_metadata']
+        track_metadata['additional_info'] = _flatten_if_nested(track_metadata['additional_info'])
+        return {
+            'track_metadata': track_metadata,
+            'listened_at': int(_get_json_timestamp(j)),
+            'recording_msid': j.get('recording_msid'),
+            'user_name': j.get('user_name', ''),
+            'inserted_at': 0
+        }
+
+    @staticmethod
+    def timescale_to_api(listened_at, track_name, created, data,
+                         recording_mbid=None, release_mbid=None, artist_mbids=None,
+                         ac_names=None, ac_join_phrases=None, user_name=None,
+                         caa_id=None, caa_release_mbid=None):
+        """ Converts a listen as fetched from timescale to the format in which listens are returned by the api.
+        Same as from_timescale(...).to_api() without creating the listen, the data dict is modified in place. """
+        track_metadata = data["track_metadata"]
+        track_metadata["track_name"] = track_name
+        if recording_mbid is not None:
+            track_metadata["mbid_mapping"] = _get_mbid_mapping(
+                recording_mbid, release_mbid, artist_mbids, ac_names, ac_join_phrases, caa_id, caa_release_mbid
+            )
+        recording_msid = track_metadata["additional_info"].get("recording_msid")
+        track_metadata["additional_info"] = _flatten_if_nested(track_metadata["additional_info"])
+        return {
+            'track_metadata': track_metadata,
+            'listened_at': int(listened_at),
+            'recording_msid': recording_msid,
+            'user_name': user_name,
+            'inserted_at': int(created.timestamp()) if created else 0
+        }
+
     def to_json(self):
         return {
             'user_id': self.user_id,
@@ -214,13 +278,89 @@ class Listen(object):
 
     def __repr__(self):
         from pprint import pformat
-        return pformat(vars(self))
+        return pformat({
+            'user_id': self.user_id,
+            'user_name': self.user_name,
+            'timestamp': self.timestamp,
+            'ts_since_epoch': self.ts_since_epoch,
+            'recording_msid': self.recording_msid,
+            'dedup_tag': self.dedup_tag,
+            'inserted_timestamp': self.inserted_timestamp,
+            'data': self.data,
+        })
 
     def __unicode__(self):
         return "<Listen: user_name: %s, time: %s, recording_msid: %s, artist_name: %s, track_name: %s>" % \
                (self.user_name, self.ts_since_epoch, self.recording_msid, self.data['artist_name'], self.data['track_name'])
 
 
+def _get_json_timestamp(j):
+    """ Returns the timestamp of a listen in the json format as a float """
+    # Let's go play whack-a-mole with our lovely whicket of timestamp fields. Hopefully one will work!
+    try:
+        return float(j['listened_at'])
+    except KeyError:
+        try:
+            return float(j['timestamp'])
+        except KeyError:
+            return float(j['ts_since_epoch'])
+
+
+class ListenRow(NamedTuple):
+    """ A lightweight, immutable form of a listen for bulk paths (dump import and export) which
+    keeps the fields in the layout of a row of the listen table.
+
+    Unlike Listen, no datetime objects are created and the track_metadata is stored as it is saved in
+    timescale: without the track_name and with the recording_msid in additional_info. So it can be
+    written to timescale without copying the metadata and to json with a single shallow copy. As with
+    listens fetched from timescale, the json contains the recording_msid in additional_info too.
+    """
+    listened_at: int
+    track_name: str
+    user_id: int
+    user_name: str
+    recording_msid: Optional[str]
+    track_metadata: dict
+
+    @classmethod
+    def from_json(cls, j):
+        """ Factory to make ListenRow objects from a listen in the json/dump format, the dict is modified in place """
+        track_metadata = j['track_metadata']
+        additional_info = track_metadata.get('additional_info')
+        additional_info = {} if additional_info is None else _flatten_if_nested(additional_info)
+        recording_msid = j.get('recording_msid')
+        additional_info['recording_msid'] = recording_msid
+        track_metadata['additional_info'] = additional_info
+        track_name = track_metadata.pop('track_name')
+        return cls(int(_get_json_timestamp(j)), track_name, j.get('user_id'), j.get('user_name', ''),
+                   recording_msid, track_metadata)
+
+    @classmethod
+    def from_timescale(cls, listened_at, track_name, user_id, data, user_name=None):
+        """ Factory to make ListenRow objects from a row of the listen table """
+        track_metadata = data['track_metadata']
+        track_metadata['additional_info'] = additional_info = _flatten_if_nested(track_metadata['additional_info'])
+        return cls(int(listened_at), track_name, user_id, user_name,
+                   additional_info.get('recording_msid'), track_metadata)
+
+    def to_json(self) -> bytes:
+        """ Serialize to the same json as Listen.to_json """
+        return orjson.dumps({
+            'user_id': self.user_id,
+            'user_name': self.user_name,
+            'timestamp': self.listened_at,
+            'track_metadata': {**self.track_metadata, 'track_name': self.track_name},
+            'recording_msid': self.recording_msid
+        })
+
+    def to_timescale(self):
+        """ Returns the listen as a tuple to insert in the listen table, same as Listen.to_timescale """
+        return (self.listened_at, self.track_name, self.user_name, self.user_id, orjson.dumps({
+            'user_id': self.user_id,
+            'track_metadata': self.track_metadata
+        }).decode("utf-8"))
+
+
 class NowPlayingListen:
     """Represents a now playing listen"""
 
@@ -244,6 +384,18 @@ class NowPlayingListen:
             "playing_now": True
         }
 
+    @staticmethod
+    def json_to_api(j):
+        """ Same as NowPlayingListen(data=j["track_metadata"]).to_api() without creating the listen """
+        track_metadata = j["track_metadata"]
+        return {
+            "track_metadata": {
+                **track_metadata,
+                "additional_info": _flatten_if_nested(track_metadata.get("additional_info", {}))
+            },
+            "playing_now": True
+        }
+
     def __repr__(self):
         from pprint import pformat
         return pformat(vars(self))
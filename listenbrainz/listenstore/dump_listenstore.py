@@ -14,12 +14,14 @@ import pyarrow.parquet as pq
 import sqlalchemy
 import tempfile
 import orjson
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from psycopg2.extras import execute_values
 
 from listenbrainz import DUMP_LICENSE_FILE_PATH, db
 from listenbrainz.db import DUMP_DEFAULT_THREAD_COUNT
 from listenbrainz.db import timescale
-from listenbrainz.listen import Listen
+from listenbrainz.listen import Listen, ListenRow
 from listenbrainz.listenstore import LISTENS_DUMP_SCHEMA_VERSION
 from listenbrainz.listenstore.timescale_listenstore import DATA_START_YEAR_IN_SECONDS
 from listenbrainz.utils import create_path
@@ -31,12 +33,130 @@ PARQUET_APPROX_COMPRESSION_RATIO = .57
 # This is the approximate amount of data to write to a parquet file in order to meet the max size
 PARQUET_TARGET_SIZE = 134217728 / PARQUET_APPROX_COMPRESSION_RATIO  # 128MB / compression ratio
 
+# The default number of worker processes used to export listens of different months concurrently,
+# 1 means that the months are exported serially in the main process.
+DUMP_DEFAULT_LISTEN_WORKER_COUNT = 1
+
+# The number of rows to fetch at once from the server side cursor in listen dump workers
+DUMP_LISTENS_FETCH_BATCH_SIZE = 20000
+
+# user id -> user name map, set by _init_dump_worker in each listen dump worker process
+_worker_user_id_map = None
+
+
+def _get_user_id_map():
+    """ Returns a map of user id to user name of all users. """
+    user_id_map = {}
+    query = 'SELECT id, musicbrainz_id FROM "user"'
+    with db.engine.connect() as connection:
+        result = connection.execute(sqlalchemy.text(query))
+        for row in result:
+            user_id_map[row.id] = row.musicbrainz_id
+    return user_id_map
+
+
+def _normalize_time_range(start_time_range, end_time_range):
+    """ Convert the dump time range to naive utc datetimes. """
+    # This right here is why we should ONLY be using seconds timestamps. Someone could
+    # pass in a timezone aware timestamp (when listens have no timezones) or one without.
+    # If you pass the wrong one and a test invokes a command line any failures are
+    # invisible causing massive hair-pulling. FUCK DATETIME.
+    if start_time_range:
+        start_time_range = datetime.utcfromtimestamp(
+            datetime.timestamp(start_time_range))
+    if end_time_range:
+        end_time_range = datetime.utcfromtimestamp(
+            datetime.timestamp(end_time_range))
+    return start_time_range, end_time_range
+
+
+def _get_month_ranges(start_time_range, end_time_range):
+    """ Split the given time range into months.
+
+    Yields:
+        tuples of (year, month, start_time, end_time) for each month in the range, the first
+        and the last month are clamped to the given range.
+    """
+    year = start_time_range.year
+    month = start_time_range.month
+    while True:
+        start_time = datetime(year, month, 1)
+        start_time = max(start_time_range, start_time)
+        if start_time > end_time_range:
+            break
+
+        next_month = month + 1
+        next_year = year
+        if next_month > 12:
+            next_month = 1
+            next_year += 1
+
+        end_time = datetime(next_year, next_month, 1)
+        end_time = end_time - timedelta(seconds=1)
+        if end_time > end_time_range:
+            end_time = end_time_range
+
+        yield year, month, start_time, end_time
+
+        month = next_month
+        year = next_year
+
+
+def _init_dump_worker(connect_str, user_id_map):
+    """ Initializer for listen dump worker processes: open a timescale connection of our own,
+    connections cannot be shared with the parent process. """
+    global _worker_user_id_map
+    _worker_user_id_map = user_id_map
+    timescale.init_db_connection(connect_str)
+
+
+def _dump_listens_for_month(filename, query, args):
+    """ Export the listens returned by the query to a file in the JSON lines format of the listens dump.
+
+    This runs inside a listen dump worker process. The rows are streamed using a server side cursor and
+    serialized as ListenRow objects, the output of a listen is the same as Listen.from_timescale(...).to_json().
+
+    Returns:
+        a tuple of (filename, number of listens written, time taken in seconds), filename is None if
+        the query returned no rows.
+    """
+    t0 = time.monotonic()
+    rows_added = 0
+    out_file = None
+    try:
+        with timescale.engine.connect() as connection:
+            curs = connection.execution_options(stream_results=True).execute(sqlalchemy.text(query), args)
+            while True:
+                rows = curs.fetchmany(DUMP_LISTENS_FETCH_BATCH_SIZE)
+                if not rows:
+                    break
+                if out_file is None:
+                    out_file = open(filename, "wb")
+
+                lines = []
+                for listened_at, track_name, user_id, _, data in rows:
+                    # some listens have user id which is absent from user table
+                    # ignore those listens for now
+                    user_name = _worker_user_id_map.get(user_id)
+                    if not user_name:
+                        continue
+                    lines.append(ListenRow.from_timescale(listened_at, track_name, user_id, data, user_name).to_json())
+                if lines:
+                    out_file.write(b"\n".join(lines) + b"\n")
+                    rows_added += len(lines)
+    finally:
+        if out_file is not None:
+            out_file.close()
+
+    return filename if out_file is not None else None, rows_added, time.monotonic() - t0
+
 
 class DumpListenStore:
 
     def __init__(self, app):
         self.log = app.logger
         self.dump_temp_dir_root = app.config.get('LISTEN_DUMP_TEMP_DIR_ROOT', tempfile.mkdtemp())
+        self.timescale_connect_str = app.config.get('SQLALCHEMY_TIMESCALE_URI')
 
     def get_listens_query_for_dump(self, start_time, end_time):
         """
@@ -134,46 +254,13 @@ class DumpListenStore:
             temp_dir (str): the dir to use to write files before adding to archive
             full_dump (bool): the type of dump
         """
-        user_id_map = {}
-        query = 'SELECT id, musicbrainz_id FROM "user"'
-        with db.engine.connect() as connection:
-            result = connection.execute(sqlalchemy.text(query))
-            for row in result:
-                user_id_map[row.id] = row.musicbrainz_id
+        user_id_map = _get_user_id_map()
 
         t0 = time.monotonic()
         listen_count = 0
 
-        # This right here is why we should ONLY be using seconds timestamps. Someone could
-        # pass in a timezone aware timestamp (when listens have no timezones) or one without.
-        # If you pass the wrong one and a test invokes a command line any failures are
-        # invisible causing massive hair-pulling. FUCK DATETIME.
-        if start_time_range:
-            start_time_range = datetime.utcfromtimestamp(
-                datetime.timestamp(start_time_range))
-        if end_time_range:
-            end_time_range = datetime.utcfromtimestamp(
-                datetime.timestamp(end_time_range))
-
-        year = start_time_range.year
-        month = start_time_range.month
-        while True:
-            start_time = datetime(year, month, 1)
-            start_time = max(start_time_range, start_time)
-            if start_time > end_time_range:
-                break
-
-            next_month = month + 1
-            next_year = year
-            if next_month > 12:
-                next_month = 1
-                next_year += 1
-
-            end_time = datetime(next_year, next_month, 1)
-            end_time = end_time - timedelta(seconds=1)
-            if end_time > end_time_range:
-                end_time = end_time_range
-
+        start_time_range, end_time_range = _normalize_time_range(start_time_range, end_time_range)
+        for year, month, start_time, end_time in _get_month_ranges(start_time_range, end_time_range):
             filename = os.path.join(temp_dir, str(year), "%d.listens" % month)
             try:
                 os.makedirs(os.path.join(temp_dir, str(year)))
@@ -220,12 +307,75 @@ class DumpListenStore:
                                   start_time.strftime("%Y-%m-%d"),
                                   listen_count / (time.monotonic() - t0))
 
-            month = next_month
-            year = next_year
-            rows_added = 0
+    def write_listens_parallel(self, temp_dir, tar_file, archive_name, start_time_range=None, end_time_range=None,
+                               full_dump=True, workers=DUMP_DEFAULT_LISTEN_WORKER_COUNT):
+        """ Dump listens in the format for the ListenBrainz dump, exporting each month in a separate
+        worker process.
+
+        Every worker opens its own timescale connection and streams its month using a server-side
+        cursor, serializing rows straight to JSON lines. The main process adds the finished month
+        files to the archive in month order, so the resulting archive is identical in layout to the
+        one created by write_listens.
+
+        Args:
+            temp_dir (str): the dir to use to write files before adding to archive
+            tar_file (TarFile object): the tar file to add the listen files into
+            archive_name (str): the name of the archive
+            start_time_range, end_time_range (datetime): the range of time for the listens dump.
+            full_dump (bool): the type of dump
+            workers (int): the number of worker processes to use for exporting months
+        """
+        user_id_map = _get_user_id_map()
+
+        start_time_range, end_time_range = _normalize_time_range(start_time_range, end_time_range)
+
+        months, filenames, queries, query_args = [], [], [], []
+        for year, month, start_time, end_time in _get_month_ranges(start_time_range, end_time_range):
+            create_path(os.path.join(temp_dir, str(year)))
+            if full_dump:
+                query, args = self.get_listens_query_for_dump(int(start_time.strftime('%s')),
+                                                              int(end_time.strftime('%s')))
+            else:
+                query, args = self.get_incremental_listens_query(start_time, end_time)
+            months.append((year, month))
+            filenames.append(os.path.join(temp_dir, str(year), "%d.listens" % month))
+            queries.append(query)
+            query_args.append(args)
+
+        t0 = time.monotonic()
+        listen_count = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_dump_worker,
+                                 initargs=(self.timescale_connect_str, user_id_map)) as executor:
+            # Months are submitted in a window of about as many months as there are workers and the
+            # results are consumed in submission order. A new month is submitted only after an earlier
+            # one has been added to the archive and deleted, so the finished month files waiting in
+            # temp_dir are bounded by the window instead of growing to the size of the whole dump.
+            pending = deque()
+            next_month = 0
+            while pending or next_month < len(months):
+                while next_month < len(months) and len(pending) < workers + 1:
+                    future = executor.submit(_dump_listens_for_month, filenames[next_month],
+                                             queries[next_month], query_args[next_month])
+                    pending.append((months[next_month], future))
+                    next_month += 1
+
+                (year, month), future = pending.popleft()
+                filename, rows_added, duration = future.result()
+                if filename is None:
+                    continue
+                tar_file.add(filename, arcname=os.path.join(archive_name, 'listens', str(year), "%d.listens" % month))
+                os.unlink(filename)
+
+                listen_count += rows_added
+                self.log.info("%d listens dumped for %d-%02d in %.2fs (%.2f listens/s)", rows_added, year, month,
+                              duration, rows_added / duration if duration else 0)
+
+        total_time = time.monotonic() - t0
+        self.log.info("%d listens dumped using %d workers in %.2fs at %.2f listens/s", listen_count, workers,
+                      total_time, listen_count / total_time if total_time else 0)
 
     def dump_listens(self, location, dump_id, start_time=datetime.utcfromtimestamp(0), end_time=None,
-                     threads=DUMP_DEFAULT_THREAD_COUNT):
+                     threads=DUMP_DEFAULT_THREAD_COUNT, listen_workers=DUMP_DEFAULT_LISTEN_WORKER_COUNT):
         """ Dumps all listens in the ListenStore into a .tar.xz archive.
 
         Files are created with UUIDs as names. Each file can contain listens for a number of users.
@@ -240,6 +390,8 @@ class DumpListenStore:
             start_time and end_time (datetime): the time range for which listens should be dumped
                 start_time defaults to utc 0 (meaning a full dump) and end_time defaults to the current time
             threads (int): the number of threads to use for compression
+            listen_workers (int): the number of worker processes to use for exporting listens, if more than 1
+                months are exported in parallel
 
         Returns:
             the path to the dump archive
@@ -273,8 +425,14 @@ class DumpListenStore:
                     archive_name, start_time, end_time, temp_dir, tar, full_dump)
 
                 listens_path = os.path.join(temp_dir, 'listens')
-                self.write_listens(listens_path, tar, archive_name,
-                                   start_time, end_time, full_dump)
+                t0 = time.monotonic()
+                if listen_workers > 1:
+                    self.write_listens_parallel(listens_path, tar, archive_name,
+                                                start_time, end_time, full_dump, listen_workers)
+                else:
+                    self.write_listens(listens_path, tar, archive_name,
+                                       start_time, end_time, full_dump)
+                self.log.info('Listens written to archive in %.2fs', time.monotonic() - t0)
 
                 # remove the temporary directory
                 shutil.rmtree(temp_dir)
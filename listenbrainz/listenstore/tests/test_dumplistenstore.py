@@ -5,6 +5,8 @@ import tarfile
 import tempfile
 from datetime import datetime
 
+import orjson
+
 from psycopg2.extras import execute_values
 
 import listenbrainz.db.user as db_user
@@ -191,6 +193,55 @@ class TestDumpListenStore(DatabaseTestCase, TimescaleTestCase):
         self.assertEqual(listens[4].ts_since_epoch, 1400000000)
         shutil.rmtree(temp_dir)
 
+    def _read_listen_files(self, archive_path):
+        """ Returns a dict of member name -> contents for the listen files in the archive """
+        listen_files = {}
+        with tarfile.open(archive_path, mode='r|xz') as tar:
+            for member in tar:
+                if member.isfile() and member.name.endswith('.listens'):
+                    # strip the archive name, it contains the dump id
+                    name = member.name.split(os.sep, 1)[1]
+                    listen_files[name] = tar.extractfile(member).read()
+        return listen_files
+
+    def test_dump_listens_parallel(self):
+        base = 1500000000
+        # generate listens spread across 3 months
+        for month in range(3):
+            listens = generate_data(self.testuser_id, self.testuser_name, base + month * 2678400, 5)
+            self.logstore.insert(listens)
+
+        temp_dir = tempfile.mkdtemp()
+        serial_dump = self.dumpstore.dump_listens(
+            location=tempfile.mkdtemp(dir=temp_dir),
+            dump_id=1,
+            end_time=datetime.utcfromtimestamp(base + 3 * 2678400),
+        )
+        parallel_dump = self.dumpstore.dump_listens(
+            location=tempfile.mkdtemp(dir=temp_dir),
+            dump_id=1,
+            end_time=datetime.utcfromtimestamp(base + 3 * 2678400),
+            listen_workers=2
+        )
+
+        serial_files = self._read_listen_files(serial_dump)
+        parallel_files = self._read_listen_files(parallel_dump)
+        self.assertEqual(list(serial_files.keys()), list(parallel_files.keys()))
+        self.assertEqual(len(serial_files), 3)
+        for name, content in serial_files.items():
+            self.assertEqual(
+                [orjson.loads(line) for line in content.splitlines()],
+                [orjson.loads(line) for line in parallel_files[name].splitlines()]
+            )
+
+        self.reset_timescale_db()
+        self.logstore.import_listens_dump(parallel_dump)
+        recalculate_all_user_data()
+
+        listens, min_ts, max_ts = self.logstore.fetch_listens(user=self.testuser, to_ts=base + 3 * 2678400)
+        self.assertEqual(len(listens), 15)
+        shutil.rmtree(temp_dir)
+
     # test test_import_dump_many_users is gone -- why are we testing user dump/restore here??
 
     def create_test_dump(self, archive_name, archive_path, schema_version=None):
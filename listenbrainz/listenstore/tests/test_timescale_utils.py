@@ -10,7 +10,7 @@ from listenbrainz.db.testing import DatabaseTestCase, TimescaleTestCase
 from listenbrainz.listenstore import TimescaleListenStore
 from listenbrainz.listenstore.tests.util import create_test_data_for_timescalelistenstore
 from listenbrainz.listenstore.timescale_utils import recalculate_all_user_data, update_user_listen_data, \
-    delete_listens
+    delete_listens, get_pending_deletes_lag
 from listenbrainz.webserver import create_app
 
 
@@ -86,3 +86,39 @@ class TestTimescaleUtils(DatabaseTestCase, TimescaleTestCase):
         self.assertEqual(metadata_2["min_listened_at"], 1400000000)
         self.assertEqual(metadata_2["max_listened_at"], 1400000200)
         self.assertEqual(metadata_2["count"], 4)
+
+    def test_delete_listens_in_batches(self):
+        user_1 = db_user.get_or_create(1, "user_1")
+        user_2 = db_user.get_or_create(2, "user_2")
+        recalculate_all_user_data()
+        self._create_test_data(user_1)
+        self._create_test_data(user_2)
+
+        self.logstore.delete_listen(1400000000, user_1["id"], "4269ddbc-9241-46da-935d-4fa9e0f7f371")
+        # deleting the same listen twice only deletes it once
+        self.logstore.delete_listen(1400000000, user_1["id"], "4269ddbc-9241-46da-935d-4fa9e0f7f371")
+        self.logstore.delete_listen(1400000050, user_1["id"], "4269ddbc-9241-46da-935d-4fa9e0f7f371")
+        self.logstore.delete_listen(1400000200, user_2["id"], "4269ddbc-9241-46da-935d-4fa9e0f7f371")
+        # a listen which does not exist
+        self.logstore.delete_listen(1400000300, user_2["id"], "4269ddbc-9241-46da-935d-4fa9e0f7f371")
+
+        pending, lag = get_pending_deletes_lag()
+        self.assertEqual(pending, 5)
+        self.assertGreaterEqual(lag, 0)
+
+        stats = delete_listens(batch_size=2)
+        self.assertEqual(stats["processed"], 5)
+        self.assertEqual(stats["deleted"], 3)
+        self.assertEqual(get_pending_deletes_lag(), (0, 0))
+
+        metadata_1 = self._get_count_and_timestamp(user_1)
+        self.assertEqual(metadata_1["min_listened_at"], 1400000100)
+        self.assertEqual(metadata_1["max_listened_at"], 1400000200)
+        self.assertEqual(metadata_1["count"], 3)
+
+        metadata_2 = self._get_count_and_timestamp(user_2)
+        self.assertEqual(metadata_2["min_listened_at"], 1400000000)
+        self.assertEqual(metadata_2["max_listened_at"], 1400000150)
+        self.assertEqual(metadata_2["count"], 4)
+
+        self.assertEqual(delete_listens()["processed"], 0)
@@ -2,6 +2,7 @@ import logging
 import random
 from time import time
 
+import orjson
 import sqlalchemy
 from brainzutils import cache
 from sqlalchemy import text
@@ -9,7 +10,7 @@ from sqlalchemy import text
 import listenbrainz.db.user as db_user
 from listenbrainz.db import timescale as ts, timescale
 from listenbrainz.db.testing import DatabaseTestCase, TimescaleTestCase
-from listenbrainz.listenstore.tests.util import create_test_data_for_timescalelistenstore
+from listenbrainz.listenstore.tests.util import create_test_data_for_timescalelistenstore, generate_data
 from listenbrainz.listenstore.timescale_listenstore import REDIS_USER_LISTEN_COUNT, \
     TimescaleListenStore, REDIS_TOTAL_LISTEN_COUNT
 from listenbrainz.listenstore.timescale_utils import delete_listens_and_update_user_listen_data,\
@@ -46,7 +47,7 @@ class TestTimescaleListenStore(DatabaseTestCase, TimescaleTestCase):
 
         query = """
             INSERT INTO mapping.mb_metadata_cache
-               (recording_mbid, artist_mbids, release_mbid, recording_data, artist_data, tag_data, release_data, dirty)
+               (recording_mbid, artist_mbids, release_mbid, recording_data, artist_data, tag_data, release_data, dirty, artist_credit_names, artist_credit_join_phrases)
                 VALUES ('2f3d422f-8890-41a1-9762-fbe16f107c31'
                       , '{8f6bd1e4-fbe1-4f50-aa9b-94c450ec0f11}'::UUID[]
                       , '76df3287-6cda-33eb-8e9a-044b5e15ffdd'
@@ -55,6 +56,8 @@ class TestTimescaleListenStore(DatabaseTestCase, TimescaleTestCase):
                       , '{"artist": [], "recording": [], "release_group": []}'
                       , '{"mbid": "76df3287-6cda-33eb-8e9a-044b5e15ffdd", "name": "Dummy"}'
                       , 'f'
+                      , '{"Portishead"}'
+                      , '{""}'
                        )
         """
 
@@ -152,6 +155,16 @@ class TestTimescaleListenStore(DatabaseTestCase, TimescaleTestCase):
         self.assertEqual(listens[0].data["mbid_mapping"]["release_mbid"], '76df3287-6cda-33eb-8e9a-044b5e15ffdd')
         self.assertEqual(listens[0].data["mbid_mapping"]["recording_mbid"], '2f3d422f-8890-41a1-9762-fbe16f107c31')
 
+    def test_iter_listens_for_export(self):
+        count = self._create_test_data(self.testuser_name, self.testuser_id)
+        self._insert_mapping_metadata("c7a41965-9f1e-456c-8b1d-27c0f0dde280")
+        listens, _, _ = self.logstore.fetch_listens(user=self.testuser, to_ts=1400000300)
+
+        # a batch size smaller than the number of listens to fetch multiple batches from the cursor
+        exported = list(self.logstore.iter_listens_for_export(self.testuser, batch_size=2))
+        self.assertEqual(len(exported), count)
+        self.assertEqual([orjson.loads(listen) for listen in exported], [listen.to_api() for listen in listens])
+
     def test_get_listen_count_for_user(self):
         uid = random.randint(2000, 1 << 31)
         testuser = db_user.get_or_create(uid, "user_%d" % uid)
@@ -320,3 +333,32 @@ class TestTimescaleListenStore(DatabaseTestCase, TimescaleTestCase):
         self.assertEqual(listens[0].ts_since_epoch, 1400000500)
         self.assertEqual(min_ts, 1400000000)
         self.assertEqual(max_ts, 1400000500)
+
+    def test_get_listen_counts_by_period(self):
+        other_user = db_user.get_or_create(2, "other")
+        jan_4_2021 = 1609718400  # a monday
+        feb_10_2021 = 1612915200
+        self.logstore.insert(generate_data(self.testuser_id, self.testuser_name, jan_4_2021 + 3600, 3))
+        self.logstore.insert(generate_data(self.testuser_id, self.testuser_name, jan_4_2021 + 86400 + 7200, 2))
+        self.logstore.insert(generate_data(self.testuser_id, self.testuser_name, feb_10_2021, 1))
+        self.logstore.insert(generate_data(other_user["id"], other_user["musicbrainz_id"], jan_4_2021, 5))
+
+        counts = self.logstore.get_listen_counts_by_period(self.testuser_id, jan_4_2021 + 60, jan_4_2021 + 3 * 86400)
+        self.assertEqual(counts, [
+            {"from_ts": jan_4_2021, "to_ts": jan_4_2021 + 86400, "listen_count": 3},
+            {"from_ts": jan_4_2021 + 86400, "to_ts": jan_4_2021 + 2 * 86400, "listen_count": 2},
+            {"from_ts": jan_4_2021 + 2 * 86400, "to_ts": jan_4_2021 + 3 * 86400, "listen_count": 0},
+        ])
+
+        counts = self.logstore.get_listen_counts_by_period(self.testuser_id, jan_4_2021, feb_10_2021 + 1, "month")
+        self.assertEqual(counts, [
+            {"from_ts": 1609459200, "to_ts": 1612137600, "listen_count": 5},
+            {"from_ts": 1612137600, "to_ts": 1614556800, "listen_count": 1},
+        ])
+
+        counts = self.logstore.get_listen_counts_by_period(self.testuser_id, jan_4_2021, jan_4_2021 + 86400, "week")
+        self.assertEqual(counts, [{"from_ts": jan_4_2021, "to_ts": jan_4_2021 + 7 * 86400, "listen_count": 5}])
+
+        self.assertEqual(self.logstore.get_listen_counts_by_period(self.testuser_id, feb_10_2021, jan_4_2021), [])
+        with self.assertRaises(ValueError):
+            self.logstore.get_listen_counts_by_period(self.testuser_id, jan_4_2021, feb_10_2021, "hour")
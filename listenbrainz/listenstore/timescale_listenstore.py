@@ -1,7 +1,7 @@
 import subprocess
 import tarfile
 import time
-from typing import Dict, Tuple, Optional
+from typing import Dict, Tuple, Optional, List, Iterator
 
 import psycopg2
 import psycopg2.sql
@@ -14,7 +14,7 @@ from sqlalchemy import text
 
 from listenbrainz.db import timescale, DUMP_DEFAULT_THREAD_COUNT
 from listenbrainz.db.dump import SchemaMismatchException
-from listenbrainz.listen import Listen
+from listenbrainz.listen import Listen, ListenRow
 from listenbrainz.listenstore import LISTENS_DUMP_SCHEMA_VERSION, LISTEN_MINIMUM_DATE
 from listenbrainz.listenstore import ORDER_ASC, ORDER_TEXT, ORDER_DESC, DEFAULT_LISTENS_PER_FETCH
 
@@ -39,6 +39,63 @@ LISTEN_COUNT_BUCKET_WIDTH = 2592000
 
 MAX_FUTURE_SECONDS = 600  # 10 mins in future - max fwd clock skew
 
+# The periods listen counts can be grouped by in get_listen_counts_by_period, in postgres date_trunc units
+LISTEN_COUNT_PERIODS = ("day", "week", "month", "year")
+
+
+# the listens along with their mbid mapping and metadata, the conditions placeholder is filled in with the
+# conditions to select the listens
+LISTENS_WITH_MAPPING_QUERY = """
+                   WITH selected_listens AS (
+                        SELECT l.listened_at
+                             , l.track_name
+                             , l.user_id
+                             , l.created
+                             , l.data
+                             -- prefer to use user specified mapping, then mbid mapper's mapping, finally other user's specified mappings
+                             , COALESCE(user_mm.recording_mbid, mm.recording_mbid, other_mm.recording_mbid) AS recording_mbid
+                          FROM listen l
+                     LEFT JOIN mbid_mapping mm
+                            ON (data->'track_metadata'->'additional_info'->>'recording_msid')::uuid = mm.recording_msid
+                     LEFT JOIN mbid_manual_mapping user_mm
+                            ON (data->'track_metadata'->'additional_info'->>'recording_msid')::uuid = user_mm.recording_msid
+                           AND user_mm.user_id = l.user_id 
+                     LEFT JOIN mbid_manual_mapping_top other_mm
+                            ON (data->'track_metadata'->'additional_info'->>'recording_msid')::uuid = other_mm.recording_msid
+                   )
+                   SELECT listened_at
+                        , track_name
+                        , user_id
+                        , created
+                        , data
+                        , sl.recording_mbid
+                        , mbc.release_mbid
+                        , mbc.artist_mbids::TEXT[]
+                        , (mbc.release_data->>'caa_id')::bigint AS caa_id
+                        , mbc.release_data->>'caa_release_mbid' AS caa_release_mbid
+                        , array_agg(artist->>'name' ORDER BY position) AS ac_names
+                        , array_agg(artist->>'join_phrase' ORDER BY position) AS ac_join_phrases
+                     FROM selected_listens sl
+                LEFT JOIN mapping.mb_metadata_cache mbc
+                       ON sl.recording_mbid = mbc.recording_mbid
+        LEFT JOIN LATERAL jsonb_array_elements(artist_data->'artists') WITH ORDINALITY artists(artist, position)
+                       ON TRUE
+                    WHERE {conditions}
+                 GROUP BY listened_at
+                        , track_name
+                        , user_id
+                        , created
+                        , data
+                        , sl.recording_mbid
+                        , release_mbid
+                        , artist_mbids
+                        , artist_data->>'name'
+                        , recording_data->>'name'
+                        , release_data->>'name'
+                        , release_data->>'caa_id'
+                        , release_data->>'caa_release_mbid'
+"""
+
 
 class TimescaleListenStore:
     '''
@@ -100,6 +157,61 @@ class TimescaleListenStore:
                 return 0, 0
             return row.min_ts, row.max_ts
 
+    def get_listen_counts_by_period(self, user_id: int, from_ts: int, to_ts: int, period: str = "day") -> List[Dict]:
+        """ Get the number of listens of a user in each day, week, month or year in the given time range. The
+         counts are read from the listen_count_day continuous aggregate so that the user's listens are not scanned.
+
+         Periods are in UTC and weeks start on monday. All periods overlapping [from_ts, to_ts) are returned in
+         chronological order, including the ones without listens. The counts are always for whole periods, even if
+         from_ts or to_ts fall inside one.
+
+        Args:
+            user_id: the user to get listen counts for
+            from_ts: the start of the time range (inclusive)
+            to_ts: the end of the time range (exclusive)
+            period: one of LISTEN_COUNT_PERIODS
+
+        Returns:
+            a list of dicts with the from_ts (inclusive), to_ts (exclusive) and listen_count of each period
+        """
+        if period not in LISTEN_COUNT_PERIODS:
+            raise ValueError(f"period should be one of {LISTEN_COUNT_PERIODS}, got {period}")
+        if from_ts >= to_ts:
+            return []
+
+        query = """
+            WITH periods AS (
+                SELECT generate_series(
+                            date_trunc(:period, to_timestamp(:from_ts) AT TIME ZONE 'UTC')
+                          , to_timestamp(:to_ts - 1) AT TIME ZONE 'UTC'
+                          , CAST('1 ' || :period AS INTERVAL)
+                       ) AS period_start
+            ), counts AS (
+                SELECT date_trunc(:period, to_timestamp(day) AT TIME ZONE 'UTC') AS period_start
+                     , sum(count) AS listen_count
+                  FROM listen_count_day
+                 WHERE user_id = :user_id
+                   AND day >= (SELECT extract(epoch FROM min(period_start)) FROM periods)
+                   AND day < (SELECT extract(epoch FROM max(period_start) + CAST('1 ' || :period AS INTERVAL)) FROM periods)
+              GROUP BY 1
+            )
+                SELECT extract(epoch FROM period_start)::BIGINT AS from_ts
+                     , extract(epoch FROM period_start + CAST('1 ' || :period AS INTERVAL))::BIGINT AS to_ts
+                     , COALESCE(listen_count, 0)::BIGINT AS listen_count
+                  FROM periods
+             LEFT JOIN counts
+                 USING (period_start)
+              ORDER BY period_start
+        """
+        with timescale.engine.connect() as connection:
+            result = connection.execute(text(query), {
+                "user_id": user_id,
+                "from_ts": from_ts,
+                "to_ts": to_ts,
+                "period": period
+            })
+            return [dict(row) for row in result.mappings()]
+
     def get_total_listen_count(self):
         """ Returns the total number of listens stored in the ListenStore.
             First checks the brainzutils cache for the value, if not present there
@@ -127,6 +239,8 @@ class TimescaleListenStore:
         """
             Insert a batch of listens. Returns a list of (listened_at, track_name, user_name, user_id) that indicates
             which rows were inserted into the DB. If the row is not listed in the return values, it was a duplicate.
+
+            The listens can be Listen or ListenRow objects.
         """
 
         submit = []
@@ -201,58 +315,9 @@ class TimescaleListenStore:
             to_ts = max_user_ts + 1
 
         window_size = DEFAULT_FETCH_WINDOW
-        query = """
-                   WITH selected_listens AS (
-                        SELECT l.listened_at
-                             , l.track_name
-                             , l.user_id
-                             , l.created
-                             , l.data
-                             -- prefer to use user specified mapping, then mbid mapper's mapping, finally other user's specified mappings
-                             , COALESCE(user_mm.recording_mbid, mm.recording_mbid, other_mm.recording_mbid) AS recording_mbid
-                          FROM listen l
-                     LEFT JOIN mbid_mapping mm
-                            ON (data->'track_metadata'->'additional_info'->>'recording_msid')::uuid = mm.recording_msid
-                     LEFT JOIN mbid_manual_mapping user_mm
-                            ON (data->'track_metadata'->'additional_info'->>'recording_msid')::uuid = user_mm.recording_msid
-                           AND user_mm.user_id = l.user_id 
-                     LEFT JOIN mbid_manual_mapping_top other_mm
-                            ON (data->'track_metadata'->'additional_info'->>'recording_msid')::uuid = other_mm.recording_msid
-                   )
-                   SELECT listened_at
-                        , track_name
-                        , user_id
-                        , created
-                        , data
-                        , sl.recording_mbid
-                        , mbc.release_mbid
-                        , mbc.artist_mbids::TEXT[]
-                        , (mbc.release_data->>'caa_id')::bigint AS caa_id
-                        , mbc.release_data->>'caa_release_mbid' AS caa_release_mbid
-                        , array_agg(artist->>'name' ORDER BY position) AS ac_names
-                        , array_agg(artist->>'join_phrase' ORDER BY position) AS ac_join_phrases
-                     FROM selected_listens sl
-                LEFT JOIN mapping.mb_metadata_cache mbc
-                       ON sl.recording_mbid = mbc.recording_mbid
-        LEFT JOIN LATERAL jsonb_array_elements(artist_data->'artists') WITH ORDINALITY artists(artist, position)
-                       ON TRUE
-                    WHERE user_id = :user_id
-                      AND listened_at > :from_ts
-                      AND listened_at < :to_ts
-                 GROUP BY listened_at
-                        , track_name
-                        , user_id
-                        , created
-                        , data
-                        , sl.recording_mbid
-                        , release_mbid
-                        , artist_mbids
-                        , artist_data->>'name'
-                        , recording_data->>'name'
-                        , release_data->>'name'
-                        , release_data->>'caa_id'
-                        , release_data->>'caa_release_mbid'
-                 ORDER BY listened_at """ + ORDER_TEXT[order] + " LIMIT :limit"
+        query = LISTENS_WITH_MAPPING_QUERY.format(
+            conditions="user_id = :user_id AND listened_at > :from_ts AND listened_at < :to_ts"
+        ) + " ORDER BY listened_at " + ORDER_TEXT[order] + " LIMIT :limit"
 
         if from_ts and to_ts:
             to_dynamic = False
@@ -343,6 +408,45 @@ class TimescaleListenStore:
 
         return listens, min_user_ts, max_user_ts
 
+    def iter_listens_for_export(self, user: Dict, batch_size: int = DEFAULT_LISTENS_PER_FETCH) -> Iterator[bytes]:
+        """ Iterate over all listens of the user in descending order of listened_at, for exporting them.
+
+            Unlike fetch_listens, all listens are read with one server side cursor in batches of batch_size
+            rows instead of one query per page. Each listen is yielded already serialized to json in the same
+            format as Listen.to_api, without creating Listen objects.
+
+            user: the user whose listens are exported, a dict with at least the id and musicbrainz_id keys
+            batch_size: the number of rows fetched from the cursor at a time
+        """
+        query = LISTENS_WITH_MAPPING_QUERY.format(conditions="user_id = :user_id") + " ORDER BY listened_at DESC"
+        t0 = time.monotonic()
+        count = 0
+        with timescale.engine.connect() as connection:
+            result = connection.execution_options(stream_results=True)\
+                .execute(sqlalchemy.text(query), {"user_id": user["id"]})
+            while True:
+                rows = result.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield orjson.dumps(Listen.timescale_to_api(
+                        listened_at=row.listened_at,
+                        track_name=row.track_name,
+                        created=row.created,
+                        data=row.data,
+                        recording_mbid=row.recording_mbid,
+                        release_mbid=row.release_mbid,
+                        artist_mbids=row.artist_mbids,
+                        ac_names=row.ac_names,
+                        ac_join_phrases=row.ac_join_phrases,
+                        user_name=user["musicbrainz_id"],
+                        caa_id=row.caa_id,
+                        caa_release_mbid=row.caa_release_mbid
+                    ))
+                count += len(rows)
+
+        self.log.info("export listens %s: %d listens in %.2fs" % (user["musicbrainz_id"], count, time.monotonic() - t0))
+
     def fetch_recent_listens_for_users(self, users, min_ts: int = None, max_ts: int = None, per_user_limit=2, limit=10):
         """ Fetch recent listens for a list of users, given a limit which applies per user. If you
             have a limit of 3 and 3 users you should get 9 listens if they are available.
@@ -493,7 +597,7 @@ class TimescaleListenStore:
                             if not line:
                                 break
 
-                            listen = Listen.from_json(orjson.loads(line))
+                            listen = ListenRow.from_json(orjson.loads(line))
                             listens.append(listen)
 
                             if len(listens) > DUMP_CHUNK_SIZE:
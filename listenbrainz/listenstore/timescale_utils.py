@@ -1,5 +1,6 @@
 import logging
 import subprocess
+import time
 from datetime import datetime
 
 import psycopg2
@@ -14,206 +15,182 @@ logger = logging.getLogger(__name__)
 
 SECONDS_IN_A_YEAR = 31536000
 
+# Number of listen_delete_metadata rows processed in one transaction by delete_listens
+DELETE_BATCH_SIZE = 10000
 
-def delete_listens():
-    """ Delete listens and update counts, listen min/max timestamps """
+
+def get_pending_deletes_lag():
+    """ Returns the number of listen deletes waiting to be processed and the age of the oldest one in seconds,
+     or 0 if there are no pending deletes """
+    query = """
+        SELECT count(*) AS pending
+             , COALESCE(extract(epoch FROM NOW() - min(created)), 0) AS lag
+          FROM listen_delete_metadata
+    """
+    with timescale.engine.connect() as connection:
+        row = connection.execute(text(query)).fetchone()
+        return row.pending, float(row.lag)
+
+
+def delete_listens(batch_size=DELETE_BATCH_SIZE):
+    """ Delete listens queued in listen_delete_metadata and update counts, listen min/max timestamps.
+
+    The queue is processed in batches of `batch_size` rows, each in its own transaction, so that the locks and
+    the WAL of a run stay bounded even if a lot of deletes are pending.
+
+    Returns:
+        a dict with the number of queue rows processed, listens deleted, the time taken in seconds and the rows
+        processed per second.
+    """
     # Implementation Notes:
     #
-    # While working on this, I encountered the following issues. These notes also explain some peculiarities of the SQL
-    # queries that follow.
-    #
     # 1) Delete Mismatch
     #
-    # The listen_delete_metadata table holds the rows to be deleted from listen. We fetch the rows from it and delete
-    # corresponding listens from listen table. After that, we update counts and timestamps in listen_user_metadata table
-    # as necessary. Between the time rows are deleted from listen table and the time we get to clear up the
-    # listen_delete_metadata table, new rows may have been inserted in the latter. So, we would have deleted rows from
-    # listen_delete_metadata table without deleting the actual listens.
-    #
-    # This issue exists because our transaction isolation level is READ COMMITTED. This issue can be prevented by using
-    # the REPEATABLE READ isolation level but that comes with its own issues. To alleviate this issue, the id
-    # column has been added to the listen_delete_metadata table. Before the start of the transaction, we record the
-    # maximum id in the table. This id is used to select the rows from listen_delete_metadata table and the same rows
-    # are then later deleted.
+    # New rows may be inserted in listen_delete_metadata while we are processing it, our transaction isolation level
+    # is READ COMMITTED. So the maximum id in the table is recorded before starting and only rows up to that id are
+    # processed. The rows of a batch are selected by an id range, the same range is then used to delete them.
     #
     # 2) "Fake/Double" Delete
     #
-    # The DELETE listen endpoint does not verify whether a listen already exists in the listen table. It also does not
-    # check whether that row for that delete already exists in listen_delete_metadata table. This can actually be a
-    # quite common situation, for example: the user clicking delete for the same listen twice. If we count the number of
-    # deleted listens to subtract using listen_delete_metadata table, the count may become inaccurate.
+    # The DELETE listen endpoint does not verify whether a listen exists in the listen table or whether a delete for
+    # it has already been queued, for example when the user clicks delete twice. So the deleted listens are counted
+    # from the RETURNING clause of the DELETE FROM listen statement instead of from the listen_delete_metadata rows.
     #
-    # Therefore, we use the RETURNING clause with the DELETE FROM listen statement to return the user_id and created
-    # of the actual deletes and then calculate the deleted listen count from it and subtract it from existing count to
-    # get the updated count.
+    # 3) Counts and timestamps
     #
-    # However, PG's CTEs have a limitation that they unrelated WITH'ed queries may be executed in any order and if there
-    # are multiple updates to a row in a CTE, only 1 query's update will be visible afterwards. So the queries to update
-    # timestamps cannot be put in the WITH of update counts query. Further, this means that we cannot utilise the
-    # RETURNING clause to return listened_at for these queries and need to read the listen_delete_metadata table.
-    # (**There is an alternative if needed: create a temporary table out of the RETURNING clause data.**)
-    # But but wait... For updating min/max listened_at timestamp, we scan the listen table so even if there are double
-    # entries or fake entries for delete, it doesn't matter. The new min/max timestamps are going to come from the
-    # listen table anyway.
+    # The insert query updates listen_user_metadata in the same transaction as the listens, so every deleted
+    # listen is accounted for in the count and the count can be adjusted arithmetically. The min/max listened_at
+    # only change if the listen at the stored boundary is deleted: the deleted listens are compared to the stored
+    # values in the same statement that deletes them, and only for those users the new boundary is looked up.
     #
-    # 3) Interaction with regular metadata update cron job
-    #
-    # A periodic cron job run updates the metadata in the listen_user_metadata table. Specifically, the count,
-    # min_listened_at and max_listened_at values for a user have been calculated only on the basis of listens created
-    # prior to the created value of that user's listen_user_metadata row. But many users will have listens created
-    # since the last cron job run, some of these may end up in deletes as well.
-    #
-    # Listens which have a created value later than the created value in the listen_user_metadata table haven't yet
-    # been counted in the listen_user_metadata table. So when deleted the count of these listens should not be
-    # subtracted from listen_user_metadata. The FILTER clause with count(*) is responsible for that.
-    #
-    # Similarly, a listen with listened_at greater than max_listened_at can be created later than the created value
-    # in the listen_user_metadata table. If this listen is deleted and the listen with max_listened_at is also deleted,
-    # max(listened_at) of deleted listens != max_listened_at of listened_user_metadata. So, we will have missed to
-    # update listen timestamps in this case. To avoid this, we need to check max_listened_at is in the list of
-    # listened_at of delete listens. The same situation can happen with min_listened_at.
-    #
-    # 4) Redundant work in updating min/max listened_at
-    #
-    # To update min/max listened_at fields, it doesn't really matter whether the listens were created prior or after
-    # the created value in the listen_user_metadata table. It is a matter of choosing the best performance
-    # characteristics. When updating the these fields we use the existing min/max listened_at values to reduce the
-    # search space.
-    #
-    # Currently, we include the created clause as well here but I wonder if it is actually slower that way because
-    # created is not included in the index on listened_at and user_id so the row needs to fetched from the table
-    # for the checking the created clause. If we keep this check, we tally the min/max for listens till the created
-    # value and the remaining listens with newer created values are handled by the regular update script.
-    #
-    # If it is determined that using created here is actually slower and we remove that clause: we'll be tallying
-    # listens using just listened_at and user_id here so the newer created listens will be checked for timestamp as
-    # well here. During the regular update run, we won't know which user's max_listened_at/min_listened_at already has
-    # been updated and hence, will be doing redundant work. Another question is even if we did know the exact rows,
-    # could we execute the update query partially.
-    #
-    # TODO: Check effect of using created.
-
-    # select the maximum id in the table till now, we are only to process
-    # deletes with row id earlier than this.
+    # PG's data modifying CTEs all see the snapshot from before the statement, so the new boundary cannot be looked
+    # up in the statement which deletes the listens, it would find the deleted listen again. The lookup is a
+    # separate statement for the users returned by the first one. It starts at the old boundary in the
+    # (listened_at, user_id) index and stops at the first remaining listen of the user (ORDER BY ... LIMIT 1), so
+    # it is cheap unless the user has no listens around the old boundary.
     select_max_id = "SELECT max(id) AS max_id FROM listen_delete_metadata"
 
-    # count deleted listens, checked created and update listen counts
+    select_batch_max_id = """
+        SELECT max(id) AS batch_max_id
+          FROM (
+                SELECT id
+                  FROM listen_delete_metadata
+                 WHERE id > :last_id
+                   AND id <= :max_id
+              ORDER BY id
+                 LIMIT :batch_size
+               ) batch
+    """
+
+    # delete the listens of the batch, subtract them from the counts and return the users for whom the listen at
+    # min_listened_at or max_listened_at was deleted
     delete_listens_and_update_listen_counts = """
         WITH deleted_listens AS (
             DELETE FROM listen l
              USING listen_delete_metadata ldm
-             WHERE ldm.id <= :max_id
+             WHERE ldm.id > :last_id
+               AND ldm.id <= :batch_max_id
                AND l.user_id = ldm.user_id
                AND l.listened_at = ldm.listened_at
                AND l.data -> 'track_metadata' -> 'additional_info' ->> 'recording_msid' = ldm.recording_msid::text
-         RETURNING l.user_id, l.created
+         RETURNING l.user_id, l.listened_at
         ), update_counts AS (
             SELECT user_id
                  , count(*) AS deleted_count
+                 , bool_or(dl.listened_at = lm.min_listened_at) AS min_deleted
+                 , bool_or(dl.listened_at = lm.max_listened_at) AS max_deleted
               FROM deleted_listens dl
               JOIN listen_user_metadata lm
              USING (user_id)
           GROUP BY user_id
-        ) 
+        )
             UPDATE listen_user_metadata lm
                SET count = count - deleted_count
               FROM update_counts uc
              WHERE lm.user_id = uc.user_id
+         RETURNING lm.user_id, uc.deleted_count, uc.min_deleted, uc.max_deleted
     """
 
-    # check for which users the listen of minimum listened_at was deleted, for those users
-    # calculate new minimum listened_at
+    # new minimum will be greater than the last one
     update_listen_min_ts = """
-        WITH update_ts AS (
-            SELECT user_id, min_listened_at, lm.created
-              FROM listen_delete_metadata dl
-              JOIN listen_user_metadata lm
-             USING (user_id)
-             WHERE dl.id <= :max_id
-          GROUP BY user_id, min_listened_at, lm.created
-            -- check if min_listened_at is in list of listened_at of deleted listens,
-            -- cannot use = min(dl.listened_at). see note 3
-            HAVING min_listened_at = ANY(array_agg(dl.listened_at))
-        ), calculate_new_ts AS (
-            SELECT user_id
-                 , new_ts.min_listened_ts AS new_listened_at
-              FROM update_ts u
-              -- for each user calculate the new minimum timestamp
-              JOIN LATERAL (
-                    SELECT min(listened_at) AS min_listened_ts
+        UPDATE listen_user_metadata lm
+           SET min_listened_at = (
+                    SELECT listened_at
                       FROM listen l
-                        -- new minimum will be greater than the last one
-                     WHERE l.listened_at >= u.min_listened_at
-                       AND l.user_id = u.user_id
-                       AND l.created <= u.created
-                   ) AS new_ts
-                ON TRUE
-        )
-            UPDATE listen_user_metadata lm
-               SET min_listened_at = new_listened_at
-              FROM calculate_new_ts mt
-             WHERE lm.user_id = mt.user_id
+                     WHERE l.user_id = lm.user_id
+                       AND l.listened_at >= lm.min_listened_at
+                  ORDER BY listened_at
+                     LIMIT 1
+               )
+         WHERE lm.user_id = ANY(:user_ids)
     """
 
-    # check for which users the listen of maximum listened_at was deleted, for those users
-    # calculate new maximum listened_at
+    # new maximum will be lesser than the last one
     update_listen_max_ts = """
-        WITH update_ts AS (
-            SELECT user_id, max_listened_at, lm.created
-              FROM listen_delete_metadata dl
-              JOIN listen_user_metadata lm
-             USING (user_id)
-             WHERE dl.id <= :max_id
-          GROUP BY user_id, max_listened_at, lm.created
-            -- check if max_listened_at is in list of listened_at of deleted listens,
-            -- cannot use = max(dl.listened_at). see note 3
-            HAVING max_listened_at = ANY(array_agg(dl.listened_at))
-        ), calculate_new_ts AS (
-            SELECT user_id
-                 , new_ts.max_listened_ts AS new_listened_at
-              FROM update_ts u
-                -- for each user calculate the new maximum timestamp
-              JOIN LATERAL (
-                    SELECT max(listened_at) AS max_listened_ts
+        UPDATE listen_user_metadata lm
+           SET max_listened_at = (
+                    SELECT listened_at
                       FROM listen l
-                        -- new maximum will be lesser than the last one
-                     WHERE l.listened_at <= u.max_listened_at
-                       AND l.user_id = u.user_id
-                       AND l.created <= u.created
-                   ) AS new_ts
-                ON TRUE
-        )
-            UPDATE listen_user_metadata lm
-               SET max_listened_at = new_listened_at
-              FROM calculate_new_ts mt
-             WHERE lm.user_id = mt.user_id
+                     WHERE l.user_id = lm.user_id
+                       AND l.listened_at <= lm.max_listened_at
+                  ORDER BY listened_at DESC
+                     LIMIT 1
+               )
+         WHERE lm.user_id = ANY(:user_ids)
     """
-    delete_user_metadata = "DELETE FROM listen_delete_metadata WHERE id <= :max_id"
-
-    with timescale.engine.begin() as connection:
-        result = connection.execute(text(select_max_id))
-        row = result.fetchone()
-
-        if not row:
-            logger.info("No pending deletes")
-            return
-
-        max_id = row.max_id
-        logger.info("Found max id in listen_delete_metadata table: %s", max_id)
-
-        logger.info("Deleting Listens and updating affected listens counts")
-        connection.execute(text(delete_listens_and_update_listen_counts), {"max_id": max_id})
-
-        logger.info("Update minimum listen timestamp affected by deleted listens")
-        connection.execute(text(update_listen_min_ts), {"max_id": max_id})
-
-        logger.info("Update maximum listen timestamp affected by deleted listens")
-        connection.execute(text(update_listen_max_ts), {"max_id": max_id})
-
-        logger.info("Clean up listen delete metadata table")
-        connection.execute(text(delete_user_metadata), {"max_id": max_id})
 
-        logger.info("Completed deleting listens and updating affected metadata")
+    delete_user_metadata = "DELETE FROM listen_delete_metadata WHERE id > :last_id AND id <= :batch_max_id"
+
+    pending, lag = get_pending_deletes_lag()
+    with timescale.engine.connect() as connection:
+        max_id = connection.execute(text(select_max_id)).fetchone().max_id
+
+    stats = {"processed": 0, "deleted": 0, "seconds": 0.0, "rows_per_second": 0.0}
+    if max_id is None:
+        logger.info("No pending deletes")
+        return stats
+
+    logger.info("Found %d pending deletes up to id %s, oldest queued %.0f seconds ago", pending, max_id, lag)
+
+    t0 = time.monotonic()
+    last_id = 0
+    while True:
+        with timescale.engine.begin() as connection:
+            batch_max_id = connection.execute(text(select_batch_max_id), {
+                "last_id": last_id,
+                "max_id": max_id,
+                "batch_size": batch_size
+            }).fetchone().batch_max_id
+            if batch_max_id is None:
+                break
+
+            params = {"last_id": last_id, "batch_max_id": batch_max_id}
+            users = connection.execute(text(delete_listens_and_update_listen_counts), params).fetchall()
+
+            min_ts_users = [user.user_id for user in users if user.min_deleted]
+            if min_ts_users:
+                connection.execute(text(update_listen_min_ts), {"user_ids": min_ts_users})
+
+            max_ts_users = [user.user_id for user in users if user.max_deleted]
+            if max_ts_users:
+                connection.execute(text(update_listen_max_ts), {"user_ids": max_ts_users})
+
+            processed = connection.execute(text(delete_user_metadata), params).rowcount
+
+        last_id = batch_max_id
+        stats["processed"] += processed
+        stats["deleted"] += sum(user.deleted_count for user in users)
+        duration = time.monotonic() - t0
+        logger.info("Processed %d deletes (%d listens deleted) in %.2f seconds, %.0f rows/s", stats["processed"],
+                    stats["deleted"], duration, stats["processed"] / duration if duration else 0)
+
+    stats["seconds"] = time.monotonic() - t0
+    stats["rows_per_second"] = stats["processed"] / stats["seconds"] if stats["seconds"] else 0.0
+
+    pending, lag = get_pending_deletes_lag()
+    logger.info("Completed deleting listens and updating affected metadata, %d deletes queued meanwhile,"
+                " oldest queued %.0f seconds ago", pending, lag)
+    return stats
 
 
 def update_user_listen_data():
@@ -6,7 +6,7 @@ import json
 from brainzutils.mail import send_mail
 from flask import current_app, render_template
 from pydantic import ValidationError
-from requests import HTTPError
+from requests import HTTPError, RequestException
 from sentry_sdk import start_transaction
 
 import listenbrainz.db.missing_musicbrainz_data as db_missing_musicbrainz_data
@@ -15,7 +15,7 @@ import listenbrainz.db.stats as db_stats
 import listenbrainz.db.user as db_user
 from data.model.user_cf_recommendations_recording_message import UserRecommendationsJson
 from data.model.user_missing_musicbrainz_data import UserMissingMusicBrainzDataJson
-from listenbrainz.db import year_in_music, couchdb
+from listenbrainz.db import year_in_music, couchdb, artist_map as db_artist_map
 from listenbrainz.db.fresh_releases import insert_fresh_releases
 from listenbrainz.db import similarity
 from listenbrainz.db.similar_users import import_user_similarities
@@ -78,6 +78,25 @@ def _handle_stats(message, stats_type):
 def handle_user_entity(message):
     """ Take entity stats for a user and save it in the database. """
     _handle_stats(message, message["entity"])
+    if message["entity"] == "artists":
+        _handle_artist_map(message)
+
+
+def _handle_artist_map(message):
+    """ Calculate the artist maps of the users in the artist stats message and save them in the database, so that
+    the api does not need to calculate them on request. """
+    match = couchdb.DATABASE_NAME_PATTERN.match(message["database"])
+    if not match:
+        return
+    database = "artistmap_" + match[2] + "_" + match[3]
+    try:
+        with start_transaction(op="insert", name=f'insert artistmap - {message["stats_range"]} stats'):
+            artist_maps = db_artist_map.compute_artist_maps(message["data"])
+            db_stats.insert(database, message["from_ts"], message["to_ts"], artist_maps)
+    except HTTPError as e:
+        current_app.logger.error(f"{e}. Response: %s", e.response.text, exc_info=True)
+    except RequestException as e:
+        current_app.logger.error(f"Could not calculate artist maps: {e}", exc_info=True)
 
 
 def handle_user_listening_activity(message):
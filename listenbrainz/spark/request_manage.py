@@ -92,11 +92,19 @@ def send_request_to_spark_cluster(query, **params):
 @click.option("--range", 'range_', type=click.Choice(ALLOWED_STATISTICS_RANGE),
               help="Time range of statistics to calculate", required=True)
 @click.option("--entity", type=click.Choice(['artists', 'releases', 'recordings']),
-              help="Entity for which statistics should be calculated")
+              help="Entity for which statistics should be calculated, all entities are calculated together if omitted")
 @click.option("--database", type=str, help="Name of the couchdb database to store data in")
 def request_user_stats(type_, range_, entity, database):
     """ Send a user stats request to the spark cluster
     """
+    if type_ == "entity" and not entity:
+        if database:
+            raise click.UsageError("--database can only be used with --entity")
+        # calculate the stats of all entities from a single read of the listens of the range
+        today = date.today().strftime("%Y%m%d")
+        send_request_to_spark_cluster("stats.user.all_entities", stats_range=range_, database_suffix=today)
+        return
+
     params = {
         "stats_range": range_
     }
@@ -234,6 +242,13 @@ def request_import_new_incremental_dump(id_: int):
         send_request_to_spark_cluster('import.dump.incremental_newest')
 
 
+@cli.command(name="request_compact_listens")
+def request_compact_listens():
+    """ Send the cluster a request to compact the listens imported from the full and incremental dumps
+    """
+    send_request_to_spark_cluster('import.dump.compact_listens')
+
+
 @cli.command(name="request_dataframes")
 @click.option("--days", type=int, default=180, help="Request model to be trained on data of given number of days")
 @click.option("--job-type", default="recommendation_recording", help="The type of dataframes to request. 'recommendation_recording' or 'similar_users' are allowed.")
@@ -449,19 +464,10 @@ def request_yim_artist_map(year: int):
               default=date.today().year)
 @click.pass_context
 def request_year_in_music(ctx, year: int):
-    """ Send the cluster a request to generate all year in music statistics. """
+    """ Send the cluster a request to generate all year in music statistics. All statistics are calculated
+     in one request so that the listens of the year are read only once. """
     ctx.invoke(request_import_pg_tables)
-    ctx.invoke(request_yim_new_release_stats, year=year)
-    ctx.invoke(request_yim_day_of_week, year=year)
-    ctx.invoke(request_yim_most_listened_year, year=year)
-    ctx.invoke(request_yim_top_stats, year=year)
-    ctx.invoke(request_yim_listens_per_day, year=year)
-    ctx.invoke(request_yim_listen_count, year=year)
-    ctx.invoke(request_yim_similar_users, year=year)
-    ctx.invoke(request_yim_new_artists_discovered, year=year)
-    ctx.invoke(request_yim_listening_time, year=year)
-    ctx.invoke(request_yim_artist_map, year=year)
-    ctx.invoke(request_yim_playlists, year=year)
+    send_request_to_spark_cluster("year_in_music.all_reports", year=year)
 
 
 # Some useful commands to keep our crontabs manageable. These commands do not add new functionality
@@ -472,8 +478,7 @@ def request_year_in_music(ctx, year: int):
 def cron_request_all_stats(ctx):
     ctx.invoke(request_import_pg_tables)
     for stats_range in ALLOWED_STATISTICS_RANGE:
-        for entity in ["artists", "releases", "recordings"]:
-            ctx.invoke(request_user_stats, type_="entity", range_=stats_range, entity=entity)
+        ctx.invoke(request_user_stats, type_="entity", range_=stats_range)
 
         for stat in ["listening_activity", "daily_activity"]:
             ctx.invoke(request_user_stats, type_=stat, range_=stats_range)
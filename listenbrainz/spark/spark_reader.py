@@ -52,6 +52,7 @@ response_handler_map = {
     'fresh_releases': handle_fresh_releases,
     'import_full_dump': handle_dump_imported,
     'import_incremental_dump': handle_dump_imported,
+    'compact_listens': handle_dump_imported,
     'cf_recommendations_recording_dataframes': handle_dataframes,
     'cf_recommendations_recording_model': handle_model,
     'cf_recommendations_recording_candidate_sets': handle_candidate_sets,
@@ -5,6 +5,7 @@ from unittest.mock import call
 from flask import current_app
 
 from data.model.common_stat import StatRange, StatRecordList, StatApi
+from data.model.user_artist_map import UserArtistMapRecord
 from data.model.user_artist_stat import ArtistRecord
 from data.model.user_cf_recommendations_recording_message import (UserRecommendationsJson,
                                                                   UserRecommendationsRecord)
@@ -122,6 +123,63 @@ class HandlersTestCase(DatabaseTestCase):
         )
         self.assertEqual(received, expected)
 
+    @mock.patch('listenbrainz.db.artist_map.get_artist_country_codes')
+    def test_handle_user_entity_artist_map(self, mock_country_codes):
+        mock_country_codes.return_value = {
+            'cc197bad-dc9c-440d-a5b5-d52ba2e14234': {
+                'artist_mbid': 'cc197bad-dc9c-440d-a5b5-d52ba2e14234',
+                'artist_name': 'Coldplay',
+                'country_code': 'GB'
+            }
+        }
+        data = {
+            'type': 'user_entity',
+            'entity': 'artists',
+            'stats_range': 'all_time',
+            'from_ts': 1,
+            'to_ts': 10,
+            'data': [
+                {
+                    'user_id': self.user1['id'],
+                    'data': [{
+                        'artist_name': 'Coldplay',
+                        'artist_mbid': 'cc197bad-dc9c-440d-a5b5-d52ba2e14234',
+                        'listen_count': 321,
+                    }],
+                    'count': 1,
+                },
+                {
+                    'user_id': self.user2['id'],
+                    'data': [{
+                        'artist_name': 'Selena Gomez',
+                        'listen_count': 100,
+                    }],
+                    'count': 1,
+                }
+            ],
+            'database': 'artists_all_time_20220718'
+        }
+        handle_couchdb_data_start({"database": "artists_all_time_20220718"})
+        handle_user_entity(data)
+
+        mock_country_codes.assert_called_once()
+        received = db_stats.get(self.user1['id'], 'artistmap', 'all_time', UserArtistMapRecord)
+        self.assertEqual(received.from_ts, 1)
+        self.assertEqual(received.to_ts, 10)
+        self.assertEqual([x.dict() for x in received.data.__root__], [{
+            'country': 'GBR',
+            'artist_count': 1,
+            'listen_count': 321,
+            'artists': [{
+                'artist_mbid': 'cc197bad-dc9c-440d-a5b5-d52ba2e14234',
+                'artist_name': 'Coldplay',
+                'listen_count': 321
+            }]
+        }])
+
+        received = db_stats.get(self.user2['id'], 'artistmap', 'all_time', UserArtistMapRecord)
+        self.assertEqual(received.data.__root__, [])
+
     def test_handle_user_listening_activity(self):
         data = {
             'type': 'listening_activity',
@@ -1,7 +1,11 @@
 #!/usr/bin/python3
+import threading
 import time
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
 
+import requests
 import spotipy
 from brainzutils import metrics
 from brainzutils.mail import send_mail
@@ -25,6 +29,67 @@ METRIC_UPDATE_INTERVAL = 60  # seconds
 _listens_imported_since_last_update = 0  # number of listens imported since last metric update was submitted
 _metric_submission_time = time.monotonic() + METRIC_UPDATE_INTERVAL
 
+DEFAULT_SPOTIFY_API_URL = "https://api.spotify.com/v1/"
+
+#: The default number of users whose listens are imported concurrently, 1 processes users serially
+DEFAULT_SPOTIFY_IMPORTER_CONCURRENCY = 1
+
+#: The minimum time in seconds between two requests made with the same access token
+MIN_REQUEST_INTERVAL_PER_TOKEN = 0.5
+
+
+class SpotifyRateLimiter:
+    """ Rate limiter shared by the threads of the concurrent importer.
+
+    Requests made with the same access token are spaced at least min_interval seconds apart. When
+    Spotify responds with a 429, the Retry-After delay applies to the whole application and not just
+    to the token which received it, so all threads wait until it is over before making new requests.
+    """
+
+    def __init__(self, min_interval: float = MIN_REQUEST_INTERVAL_PER_TOKEN):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_request_time = {}
+        self._resume_time = 0.0
+
+    def wait(self, token: str):
+        """ Block until a request can be made with the given token. """
+        with self._lock:
+            now = time.monotonic()
+            request_time = max(now, self._resume_time, self._next_request_time.get(token, 0.0))
+            self._next_request_time[token] = request_time + self.min_interval
+        if request_time > now:
+            time.sleep(request_time - now)
+
+    def backoff(self, seconds: float):
+        """ Pause requests made through this limiter for the given number of seconds. """
+        with self._lock:
+            self._resume_time = max(self._resume_time, time.monotonic() + seconds)
+
+    def forget(self, token: str):
+        """ Drop the state for a token, called once a user has been processed. """
+        with self._lock:
+            self._next_request_time.pop(token, None)
+
+
+_thread_local = threading.local()
+
+
+def _get_spotipy_client(access_token: str, rate_limiter: Optional[SpotifyRateLimiter]):
+    """ Create a spotipy client for the token. If a rate limiter is used, retries are handled by us
+    instead of by the spotipy session so that rate limits are reported back to the limiter. """
+    if rate_limiter is None:
+        client = spotipy.Spotify(auth=access_token)
+    else:
+        # a plain session does not retry, so 429 responses raise SpotifyException with the headers
+        session = getattr(_thread_local, "session", None)
+        if session is None:
+            session = _thread_local.session = requests.Session()
+        client = spotipy.Spotify(auth=access_token, requests_session=session)
+    client.prefix = current_app.config.get("SPOTIFY_API_URL", DEFAULT_SPOTIFY_API_URL)
+    return client
+
+
 def notify_error(musicbrainz_id: str, error: str):
     """ Notifies specified user via email about error during Spotify import.
 
@@ -127,12 +192,13 @@ def _convert_spotify_play_to_listen(play, listen_type):
     return listen
 
 
-def make_api_request(user: dict, endpoint: str, **kwargs):
+def make_api_request(user: dict, endpoint: str, rate_limiter: Optional[SpotifyRateLimiter] = None, **kwargs):
     """ Make an request to the Spotify API for particular user at specified endpoint with args.
 
     Args:
         user: the user whose plays are to be imported.
         endpoint: the name of Spotipy function which makes request to the required API endpoint
+        rate_limiter: the rate limiter shared by all threads, if importing concurrently
 
     Returns:
         the response from the spotify API
@@ -147,7 +213,9 @@ def make_api_request(user: dict, endpoint: str, **kwargs):
 
     while retries > 0:
         try:
-            spotipy_client = spotipy.Spotify(auth=user['access_token'])
+            if rate_limiter is not None:
+                rate_limiter.wait(user['access_token'])
+            spotipy_client = _get_spotipy_client(user['access_token'], rate_limiter)
             spotipy_call = getattr(spotipy_client, endpoint)
             recently_played = spotipy_call(**kwargs)
             break
@@ -165,7 +233,10 @@ def make_api_request(user: dict, endpoint: str, **kwargs):
                 except ValueError:
                     time_to_sleep = delay
                 current_app.logger.warn('Encountered a rate limit, sleeping %d seconds and trying again...', time_to_sleep)
-                time.sleep(time_to_sleep)
+                if rate_limiter is not None:
+                    rate_limiter.backoff(time_to_sleep)
+                else:
+                    time.sleep(time_to_sleep)
                 delay += 1
                 if retries == 0:
                     raise ExternalServiceError('Encountered a rate limit.')
@@ -204,20 +275,21 @@ def make_api_request(user: dict, endpoint: str, **kwargs):
     return recently_played
 
 
-def get_user_recently_played(user):
+def get_user_recently_played(user, rate_limiter: Optional[SpotifyRateLimiter] = None):
     """ Get tracks from the current user’s recently played tracks.
     """
     latest_listened_at_ts = 0
     if user['latest_listened_at']:
         latest_listened_at_ts = int(user['latest_listened_at'].timestamp() * 1000)  # latest listen UNIX ts in ms
 
-    return make_api_request(user, 'current_user_recently_played', limit=50, after=latest_listened_at_ts)
+    return make_api_request(user, 'current_user_recently_played', rate_limiter=rate_limiter,
+                            limit=50, after=latest_listened_at_ts)
 
 
-def get_user_currently_playing(user):
+def get_user_currently_playing(user, rate_limiter: Optional[SpotifyRateLimiter] = None):
     """ Get the user's currently playing track.
     """
-    return make_api_request(user, 'current_user_playing_track')
+    return make_api_request(user, 'current_user_playing_track', rate_limiter=rate_limiter)
 
 
 def submit_listens_to_listenbrainz(user: Dict, listens: List, listen_type=LISTEN_TYPE_IMPORT):
@@ -272,12 +344,13 @@ def parse_and_validate_spotify_plays(plays, listen_type):
     return listens, latest_listen_ts
 
 
-def process_one_user(user: dict, service: SpotifyService) -> int:
+def process_one_user(user: dict, service: SpotifyService, rate_limiter: Optional[SpotifyRateLimiter] = None) -> int:
     """ Get recently played songs for this user and submit them to ListenBrainz.
 
     Args:
         user (spotify.Spotify): the user whose plays are to be imported.
         service (listenbrainz.domain.spotify.SpotifyService): service to process users
+        rate_limiter: the rate limiter shared by all threads, if importing concurrently
 
     Raises:
         spotify.SpotifyAPIError: if we encounter errors from the Spotify API.
@@ -299,7 +372,7 @@ def process_one_user(user: dict, service: SpotifyService) -> int:
         # Spotify will set the item field to null which becomes None after
         # parsing the JSON. Due to these reasons, we cannot simplify the
         # checks below.
-        currently_playing = get_user_currently_playing(user)
+        currently_playing = get_user_currently_playing(user, rate_limiter)
         if currently_playing is not None:
             currently_playing_item = currently_playing.get('item', None)
             if currently_playing_item is not None:
@@ -311,7 +384,7 @@ def process_one_user(user: dict, service: SpotifyService) -> int:
                 if listens:
                     submit_listens_to_listenbrainz(user, listens, listen_type=LISTEN_TYPE_PLAYING_NOW)
 
-        recently_played = get_user_recently_played(user)
+        recently_played = get_user_recently_played(user, rate_limiter)
         if recently_played is not None and 'items' in recently_played:
             listens, latest_listened_at = parse_and_validate_spotify_plays(recently_played['items'], LISTEN_TYPE_IMPORT)
             current_app.logger.debug('Received %d tracks for %s', len(listens), str(user))
@@ -356,6 +429,56 @@ def process_one_user(user: dict, service: SpotifyService) -> int:
         raise ExternalServiceError("Could not refresh user token from spotify")
 
 
+def _process_user_or_log_error(user: dict, service: SpotifyService, rate_limiter=None) -> Optional[int]:
+    """ Process the user and return the number of listens imported, or None if an error occurred """
+    try:
+        return process_one_user(user, service, rate_limiter)
+    except Exception:
+        current_app.logger.critical('spotify_reader could not import listens for user %s:',
+                                    user['musicbrainz_id'], exc_info=True)
+        return None
+
+
+def _process_users(users: List[dict], service: SpotifyService, concurrency: int):
+    """ Import listens for the given users, using up to concurrency threads.
+
+    Yields:
+        (user, number of listens imported or None if the import failed) as users are processed
+    """
+    if concurrency <= 1:
+        for user in users:
+            yield user, _process_user_or_log_error(user, service)
+        return
+
+    app = current_app._get_current_object()
+    rate_limiter = SpotifyRateLimiter()
+
+    def process(user):
+        with app.app_context():
+            try:
+                return _process_user_or_log_error(user, service, rate_limiter)
+            finally:
+                rate_limiter.forget(user['access_token'])
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(process, user): user for user in users}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def submit_last_poll_age_metrics(users: List[dict]):
+    """ Submit the time since the listens of the users were last imported, to check whether
+    the importer is keeping up with the number of users. """
+    now = datetime.now(timezone.utc)
+    ages = sorted((now - u['last_updated']).total_seconds() for u in users if u['last_updated'] is not None)
+    if not ages:
+        return
+    metrics.set("spotify_reader",
+                max_last_poll_age=ages[-1],
+                median_last_poll_age=ages[len(ages) // 2],
+                never_polled_users=len(users) - len(ages))
+
+
 def process_all_spotify_users():
     """ Get a batch of users to be processed and import their Spotify plays.
 
@@ -378,15 +501,16 @@ def process_all_spotify_users():
         return 0, 0
 
     current_app.logger.info('Process %d users...' % len(users))
+    submit_last_poll_age_metrics(users)
+
+    concurrency = current_app.config.get('SPOTIFY_IMPORTER_CONCURRENCY', DEFAULT_SPOTIFY_IMPORTER_CONCURRENCY)
     success = 0
     failure = 0
-    for u in users:
-        try:
-            _listens_imported_since_last_update += process_one_user(u, service)
+    for _, imported in _process_users(users, service, concurrency):
+        if imported is not None:
+            _listens_imported_since_last_update += imported
             success += 1
-        except Exception:
-            current_app.logger.critical('spotify_reader could not import listens for user %s:',
-                                        u['musicbrainz_id'], exc_info=True)
+        else:
             failure += 1
 
         if time.monotonic() > _metric_submission_time:
@@ -1,6 +1,9 @@
 import os
 import json
+import threading
 import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 import listenbrainz.webserver
 from datetime import datetime
@@ -17,6 +20,68 @@ from listenbrainz.db.testing import DatabaseTestCase
 from listenbrainz.db import external_service_oauth as db_oauth
 
 
+class SpotifyAPIStub(BaseHTTPRequestHandler):
+    """ Serves the spotify endpoints used by the reader, rate limiting the first request for recently played
+    tracks of every token. """
+
+    play = None
+    lock = threading.Lock()
+    rate_limited_tokens = set()
+    requests = []
+
+    def do_GET(self):
+        token = self.headers['Authorization'].split()[-1]
+        with self.lock:
+            self.requests.append((time.monotonic(), token, self.path))
+        if self.path.startswith('/me/player/currently-playing'):
+            self.send_response(204)
+            self.end_headers()
+        elif self.path.startswith('/me/player/recently-played'):
+            with self.lock:
+                rate_limited = token in self.rate_limited_tokens
+                self.rate_limited_tokens.add(token)
+            if not rate_limited:
+                self._send_json(429, {'error': {'status': 429, 'message': 'API rate limit exceeded'}},
+                                {'Retry-After': '1'})
+            else:
+                self._send_json(200, {'items': [self.play]})
+        else:
+            self._send_json(404, {'error': {'status': 404, 'message': 'Not found'}})
+
+    def _send_json(self, status, data, headers=None):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SpotifyRateLimiterTestCase(unittest.TestCase):
+
+    def test_min_interval_per_token(self):
+        limiter = spotify_read_listens.SpotifyRateLimiter(min_interval=0.2)
+        t0 = time.monotonic()
+        limiter.wait('a')
+        limiter.wait('b')
+        self.assertLess(time.monotonic() - t0, 0.2)
+        limiter.wait('a')
+        self.assertGreaterEqual(time.monotonic() - t0, 0.2)
+
+    def test_backoff_applies_to_all_tokens(self):
+        limiter = spotify_read_listens.SpotifyRateLimiter(min_interval=0)
+        limiter.backoff(0.3)
+        t0 = time.monotonic()
+        limiter.wait('a')
+        limiter.wait('b')
+        self.assertGreaterEqual(time.monotonic() - t0, 0.25)
+
+
 class ConvertListensTestCase(DatabaseTestCase):
 
     def setUp(self):
@@ -157,3 +222,53 @@ class ConvertListensTestCase(DatabaseTestCase):
         )
         with self.assertRaises(ExternalServiceInvalidGrantError):
             spotify_read_listens.process_one_user(expired_token_spotify_user, SpotifyService())
+
+    @patch('listenbrainz.spotify_updater.spotify_read_listens.metrics')
+    @patch('listenbrainz.spotify_updater.spotify_read_listens.submit_listens_to_listenbrainz')
+    def test_process_users_concurrently(self, mock_submit, mock_metrics):
+        user_ids = [self.user['id']]
+        for i in range(2, 5):
+            user = db_user.get_or_create(i, 'concurrent_user_%d' % i)
+            user_ids.append(user['id'])
+            db_oauth.save_token(user_id=user['id'], service=ExternalServiceType.SPOTIFY,
+                                access_token='token%d' % i, refresh_token='refresh',
+                                token_expires_ts=int(time.time()) + 1000, record_listens=True,
+                                scopes=['user-read-recently-played'])
+
+        with open(os.path.join(self.DATA_DIR, 'spotify_play_two_artists.json')) as f:
+            SpotifyAPIStub.play = json.load(f)
+        SpotifyAPIStub.rate_limited_tokens = set()
+        SpotifyAPIStub.requests = []
+        server = ThreadingHTTPServer(('localhost', 0), SpotifyAPIStub)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        app = listenbrainz.webserver.create_app()
+        app.config['SPOTIFY_API_URL'] = 'http://localhost:%d/' % server.server_address[1]
+        app.config['SPOTIFY_IMPORTER_CONCURRENCY'] = 4
+        try:
+            with app.app_context():
+                t0 = time.monotonic()
+                spotify_read_listens.process_all_spotify_users()
+                duration = time.monotonic() - t0
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(mock_submit.call_count, 4)
+        # currently playing, rate limited recently played and the retry for each of the 4 users
+        self.assertEqual(len(SpotifyAPIStub.requests), 12)
+        # the users were processed concurrently so the rate limit was only waited out once or twice,
+        # a serial importer would wait 4 times
+        self.assertLess(duration, 4)
+
+        # requests resumed for all tokens only after the Retry-After delay of the first rate limit
+        recently_played = sorted((t, token) for t, token, path in SpotifyAPIStub.requests if 'recently-played' in path)
+        first_rate_limit = recently_played[0][0]
+        seen_tokens = set()
+        for t, token in recently_played:
+            if token in seen_tokens:
+                self.assertGreaterEqual(t - first_rate_limit, 0.9)
+            seen_tokens.add(token)
+
+        for user_id in user_ids:
+            self.assertIsNotNone(SpotifyService().get_user(user_id)['latest_listened_at'])
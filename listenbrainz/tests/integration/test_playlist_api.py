@@ -1088,7 +1088,7 @@ class PlaylistAPITestCase(IntegrationTestCase):
         self.assert403(response)
 
     @requests_mock.Mocker()
-    @mock.patch("listenbrainz.webserver.views.playlist_api.export_to_spotify")
+    @mock.patch("listenbrainz.troi.export.export_to_spotify")
     def test_playlist_export(self, mock_requests, mock_troi_bot):
         """ Test various error cases related to exporting a playlist to spotify """
         mock_requests.post(OAUTH_TOKEN_URL, status_code=200, json={
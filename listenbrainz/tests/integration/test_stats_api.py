@@ -31,6 +31,14 @@ class MockDate(datetime):
         return cls.fromtimestamp(0)
 
 
+class MockDateJune2005(datetime):
+    """ Mock class for datetime which returns 15 June 2005 """
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2005, 6, 15, tzinfo=tz)
+
+
 class StatsAPITestCase(IntegrationTestCase):
 
     @classmethod
@@ -334,6 +342,36 @@ class StatsAPITestCase(IntegrationTestCase):
                                            query_string={'range': range_})
                 self.assertListeningActivityEqual(payload, response)
 
+    @patch("listenbrainz.webserver.views.stats_api.datetime", MockDateJune2005)
+    def test_listening_activity_from_listen_counts(self):
+        """ Test that listening activity is counted from the daily listen counts if the stats are missing """
+        endpoint = self.non_entity_endpoints["listening_activity"]["endpoint"]
+        counts = [
+            {"from_ts": 1041379200, "to_ts": 1072915200, "listen_count": 0},
+            {"from_ts": 1072915200, "to_ts": 1104537600, "listen_count": 3},
+            {"from_ts": 1104537600, "to_ts": 1136073600, "listen_count": 5},
+        ]
+        with patch("listenbrainz.webserver.timescale_connection._ts.get_listen_counts_by_period",
+                   return_value=counts) as mock_counts:
+            response = self.client.get(url_for(endpoint, user_name=self.another_user['musicbrainz_id']),
+                                       query_string={'range': 'all_time'})
+        self.assert200(response)
+        mock_counts.assert_called_once_with(self.another_user["id"], 1009843200, 1118880000, "year")
+        payload = response.json["payload"]
+        self.assertEqual(payload["user_id"], self.another_user["musicbrainz_id"])
+        self.assertEqual(payload["range"], "all_time")
+        self.assertListEqual(payload["listening_activity"], [
+            {"from_ts": 1072915200, "to_ts": 1104537599, "time_range": "2004", "listen_count": 3},
+            {"from_ts": 1104537600, "to_ts": 1136073599, "time_range": "2005", "listen_count": 5},
+        ])
+
+        counts = [{"from_ts": 1041379200, "to_ts": 1072915200, "listen_count": 0}]
+        with patch("listenbrainz.webserver.timescale_connection._ts.get_listen_counts_by_period",
+                   return_value=counts):
+            response = self.client.get(url_for(endpoint, user_name=self.another_user['musicbrainz_id']),
+                                       query_string={'range': 'all_time'})
+        self.assertEqual(response.status_code, 204)
+
     def test_daily_activity_stat(self):
         endpoint = self.non_entity_endpoints["daily_activity"]["endpoint"]
         with self.subTest(f"test valid response is received for daily_activity stats"):
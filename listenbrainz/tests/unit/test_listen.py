@@ -1,5 +1,5 @@
 import unittest
-from listenbrainz.listen import Listen
+from listenbrainz.listen import Listen, ListenRow, NowPlayingListen
 from datetime import datetime
 import time
 import uuid
@@ -117,3 +117,85 @@ class ListenTestCase(unittest.TestCase):
         listen = Listen.from_json(json_row)
 
         self.assertEqual(listen.timestamp, json_row['listened_at'])
+
+    def test_slots(self):
+        listen = Listen(user_id=1, user_name='iliekcomputers', timestamp=1525557084)
+        self.assertFalse(hasattr(listen, '__dict__'))
+        self.assertEqual(listen.timestamp, datetime.utcfromtimestamp(1525557084))
+        self.assertIn('iliekcomputers', repr(listen))
+
+    def _get_dump_listen(self):
+        return {
+            'user_id': 1,
+            'user_name': 'iliekcomputers',
+            'timestamp': 1525557084,
+            'recording_msid': 'db9a7483-a8f4-4a2c-99af-c8ab58850200',
+            'track_metadata': {
+                'artist_name': 'Majid Jordan',
+                'release_name': 'Majid Jordan',
+                'track_name': 'Every Step Every Way',
+                'additional_info': {
+                    'artist_mbids': ['abaa7001-0d80-4e58-be5d-d2d246fd9d87'],
+                    'we_dict_now': {'hello': 'afb'},
+                }
+            }
+        }
+
+    def test_listen_row_from_json(self):
+        """ ListenRow must produce the same timescale rows as Listen """
+        listen = Listen.from_json(self._get_dump_listen())
+        row = ListenRow.from_json(self._get_dump_listen())
+
+        self.assertEqual(row.listened_at, 1525557084)
+        self.assertEqual(row.track_name, 'Every Step Every Way')
+        self.assertEqual(row.track_metadata['additional_info']['we_dict_now.hello'], 'afb')
+
+        listen_ts_row = listen.to_timescale()
+        row_ts_row = row.to_timescale()
+        self.assertEqual(row_ts_row[:4], listen_ts_row[:4])
+        self.assertEqual(orjson.loads(row_ts_row[4]), orjson.loads(listen_ts_row[4]))
+
+    def test_listen_row_from_timescale(self):
+        """ ListenRow must produce the same json as Listen """
+        listened_at, track_name, user_name, user_id, data = Listen.from_json(self._get_dump_listen()).to_timescale()
+
+        listen = Listen.from_timescale(listened_at, track_name, user_id, None, orjson.loads(data), user_name=user_name)
+        row = ListenRow.from_timescale(listened_at, track_name, user_id, orjson.loads(data), user_name=user_name)
+        self.assertEqual(row.recording_msid, 'db9a7483-a8f4-4a2c-99af-c8ab58850200')
+        self.assertEqual(orjson.loads(row.to_json()), orjson.loads(orjson.dumps(listen.to_json())))
+
+    def test_json_to_api(self):
+        """ The api json must be the same as the one created from a Listen """
+        listen = Listen.from_json(self._get_dump_listen())
+        self.assertEqual(Listen.json_to_api(self._get_dump_listen()), listen.to_api())
+
+        data = self._get_dump_listen()
+        playing_now = NowPlayingListen(user_id=data["user_id"], user_name=data["user_name"], data=data["track_metadata"])
+        self.assertEqual(NowPlayingListen.json_to_api(self._get_dump_listen()), playing_now.to_api())
+
+    def test_timescale_to_api(self):
+        """ The api json must be the same as the one created from a Listen fetched from timescale """
+        listened_at, track_name, user_name, user_id, data = Listen.from_json(self._get_dump_listen()).to_timescale()
+        mapping = {
+            "recording_mbid": uuid.UUID("2f3d422f-8890-41a1-9762-fbe16f107c31"),
+            "release_mbid": uuid.UUID("76df3287-6cda-33eb-8e9a-044b5e15ffdd"),
+            "artist_mbids": ["8f6bd1e4-fbe1-4f50-aa9b-94c450ec0f11"],
+            "ac_names": ["Portishead"],
+            "ac_join_phrases": [""],
+            "caa_id": 1234,
+            "caa_release_mbid": "76df3287-6cda-33eb-8e9a-044b5e15ffdd",
+        }
+        created = datetime.utcfromtimestamp(1525557084)
+
+        listen = Listen.from_timescale(listened_at, track_name, user_id, created, orjson.loads(data),
+                                       user_name=user_name, **mapping)
+        api_json = Listen.timescale_to_api(listened_at, track_name, created, orjson.loads(data),
+                                           user_name=user_name, **mapping)
+        self.assertEqual(api_json, listen.to_api())
+        self.assertEqual(api_json["track_metadata"]["mbid_mapping"]["recording_mbid"],
+                         "2f3d422f-8890-41a1-9762-fbe16f107c31")
+
+        listen = Listen.from_timescale(listened_at, track_name, user_id, None, orjson.loads(data), user_name=user_name)
+        api_json = Listen.timescale_to_api(listened_at, track_name, None, orjson.loads(data), user_name=user_name)
+        self.assertEqual(api_json, listen.to_api())
+        self.assertNotIn("mbid_mapping", api_json["track_metadata"])
@@ -163,7 +163,9 @@ class TimescaleWriterSubscriber(ConsumerProducerMixin):
             exchange=self.unique_exchange,
             routing_key="",
             body=orjson.dumps([listen.to_json() for listen in unique]).decode("utf-8"),
-            delivery_mode=PERSISTENT_DELIVERY_MODE
+            delivery_mode=PERSISTENT_DELIVERY_MODE,
+            # used by the websockets to measure the time listens spend in the queue
+            headers={"published_at": time.time()}
         )
 
         if monotonic() > self.metric_submission_time:
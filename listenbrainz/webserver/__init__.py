@@ -9,8 +9,6 @@ from brainzutils.flask import CustomFlask
 from flask import request, url_for, redirect
 from flask_login import current_user
 
-from listenbrainz.webserver.utils import get_global_props
-
 API_PREFIX = '/1'
 
 # Check to see if we're running under a docker deployment. If so, don't second guess
@@ -139,6 +137,10 @@ def create_app(debug=None):
     def after_request_callbacks(response):
         return inject_x_rate_headers(response)
 
+    # Optional per request metrics, served on /metrics
+    from listenbrainz.webserver.instrumentation import init_instrumentation
+    init_instrumentation(app)
+
     # Template utilities
     app.jinja_env.add_extension('jinja2.ext.do')
     from listenbrainz.webserver import utils
@@ -162,32 +164,7 @@ def create_web_app(debug=None):
     ))
 
     _register_blueprints(app)
-
-    # Admin views
-    from listenbrainz import model
-    model.db.init_app(app)
-
-    from flask_admin import Admin
-    from listenbrainz.webserver.admin.views import HomeView
-    admin = Admin(app, index_view=HomeView(name='Home'), template_mode='bootstrap3')
-    from listenbrainz.model import ExternalService as ExternalServiceModel
-    from listenbrainz.model import User as UserModel
-    from listenbrainz.model import ListensImporter as ListensImporterModel
-    from listenbrainz.model import ReportedUsers as ReportedUsersModel
-    from listenbrainz.model import Playlist as PlaylistModel
-    from listenbrainz.model import PlaylistRecording as PlaylistRecordingModel
-    from listenbrainz.model.external_service_oauth import ExternalServiceAdminView
-    from listenbrainz.model.user import UserAdminView
-    from listenbrainz.model.listens_import import ListensImporterAdminView
-    from listenbrainz.model.reported_users import ReportedUserAdminView
-    from listenbrainz.model.playlist import PlaylistAdminView
-    from listenbrainz.model.playlist_recording import PlaylistRecordingAdminView
-    admin.add_view(UserAdminView(UserModel, model.db.session, endpoint='user_model'))
-    admin.add_view(ExternalServiceAdminView(ExternalServiceModel, model.db.session, endpoint='external_service_model'))
-    admin.add_view(ListensImporterAdminView(ListensImporterModel, model.db.session, endpoint='listens_importer_model'))
-    admin.add_view(ReportedUserAdminView(ReportedUsersModel, model.db.session, endpoint='reported_users_model'))
-    admin.add_view(PlaylistAdminView(PlaylistModel, model.db.session, endpoint='playlist_model'))
-    admin.add_view(PlaylistRecordingAdminView(PlaylistRecordingModel, model.db.session, endpoint='playlist_recording_model'))
+    _init_admin(app)
 
     @app.before_request
     def before_request_gdpr_check():
@@ -207,6 +184,22 @@ def create_web_app(debug=None):
     return app
 
 
+def create_api_app(debug=None):
+    """ Generate a Flask app for LB which only serves the API endpoints under API_PREFIX.
+
+    The view modules of the website, the static files manifest and the admin views are not
+    loaded, so that API workers which are deployed separately start faster.
+    """
+    app = create_app(debug=debug)
+    _register_api_blueprints(app)
+
+    # add a value into the config dict of the app to note that this is the
+    # app for the api. This is later used in error handling.
+    app.config['IS_API_APP'] = True
+    app.logger.info("Flask api application created!")
+    return app
+
+
 def create_api_compat_app(debug=None):
     """ Creates application for the AudioScrobbler API.
 
@@ -249,9 +242,38 @@ def create_app_rtfd():
     return app
 
 
+def _init_admin(app):
+    from listenbrainz import model
+    model.db.init_app(app)
+
+    from flask_admin import Admin
+    from listenbrainz.webserver.admin.views import HomeView
+    admin = Admin(app, index_view=HomeView(name='Home'), template_mode='bootstrap3')
+    from listenbrainz.model import ExternalService as ExternalServiceModel
+    from listenbrainz.model import User as UserModel
+    from listenbrainz.model import ListensImporter as ListensImporterModel
+    from listenbrainz.model import ReportedUsers as ReportedUsersModel
+    from listenbrainz.model import Playlist as PlaylistModel
+    from listenbrainz.model import PlaylistRecording as PlaylistRecordingModel
+    from listenbrainz.model.external_service_oauth import ExternalServiceAdminView
+    from listenbrainz.model.user import UserAdminView
+    from listenbrainz.model.listens_import import ListensImporterAdminView
+    from listenbrainz.model.reported_users import ReportedUserAdminView
+    from listenbrainz.model.playlist import PlaylistAdminView
+    from listenbrainz.model.playlist_recording import PlaylistRecordingAdminView
+    admin.add_view(UserAdminView(UserModel, model.db.session, endpoint='user_model'))
+    admin.add_view(ExternalServiceAdminView(ExternalServiceModel, model.db.session, endpoint='external_service_model'))
+    admin.add_view(ListensImporterAdminView(ListensImporterModel, model.db.session, endpoint='listens_importer_model'))
+    admin.add_view(ReportedUserAdminView(ReportedUsersModel, model.db.session, endpoint='reported_users_model'))
+    admin.add_view(PlaylistAdminView(PlaylistModel, model.db.session, endpoint='playlist_model'))
+    admin.add_view(PlaylistRecordingAdminView(PlaylistRecordingModel, model.db.session, endpoint='playlist_recording_model'))
+
+
 def _register_blueprint_with_context(app, blueprint, **kwargs):
     """Add some global props to a blueprint context and then register it with the app.
     This should only be used for blueprints which render html."""
+    from listenbrainz.webserver.utils import get_global_props
+
     @blueprint.context_processor
     def inject_context_processor():
         return {"global_props": get_global_props()}
@@ -260,6 +282,11 @@ def _register_blueprint_with_context(app, blueprint, **kwargs):
 
 
 def _register_blueprints(app):
+    _register_html_blueprints(app)
+    _register_api_blueprints(app)
+
+
+def _register_html_blueprints(app):
     from listenbrainz.webserver.views.index import index_bp
     _register_blueprint_with_context(app, index_bp)
 
@@ -293,6 +320,11 @@ def _register_blueprints(app):
     from listenbrainz.webserver.views.explore import explore_bp
     _register_blueprint_with_context(app, explore_bp, url_prefix='/explore')
 
+    from listenbrainz.webserver.views.art import art_bp
+    _register_blueprint_with_context(app, art_bp, url_prefix='/art')
+
+
+def _register_api_blueprints(app):
     from listenbrainz.webserver.views.api import api_bp
     app.register_blueprint(api_bp, url_prefix=API_PREFIX)
 
@@ -341,8 +373,5 @@ def _register_blueprints(app):
     from listenbrainz.webserver.views.explore_api import explore_api_bp
     app.register_blueprint(explore_api_bp, url_prefix=API_PREFIX+'/explore')
 
-    from listenbrainz.webserver.views.art import art_bp
-    _register_blueprint_with_context(app, art_bp, url_prefix='/art')
-
     from listenbrainz.webserver.views.art_api import art_api_bp
-    _register_blueprint_with_context(app, art_api_bp, url_prefix=API_PREFIX+'/art')
+    app.register_blueprint(art_api_bp, url_prefix=API_PREFIX+'/art')
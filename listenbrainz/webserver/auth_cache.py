@@ -0,0 +1,175 @@
+""" A two level cache for users looked up by their auth token.
+
+Authenticated API requests (submit-listens, playing-now etc.) have to look up the user for the token in
+the Authorization header. Tokens change very rarely so instead of querying postgres for every request we
+keep the user in a small in-process LRU and in redis. The redis entries are removed explicitly when a
+token is regenerated, the user is modified or deleted, or the emails of users are updated in bulk. The
+in-process entries cannot be invalidated across workers so they are only kept for a few seconds.
+
+Invalidating a token also increments a generation counter of the token in redis. A user read from the database
+is removed from redis again if the counter changed while it was read, so that a concurrent invalidation cannot
+be undone by caching the user as it was before the change.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List
+
+from brainzutils import cache, metrics
+
+import listenbrainz.db.user as db_user
+
+AUTH_CACHE_KEY_PREFIX = "auth_token."
+AUTH_CACHE_GENERATION_SUFFIX = ".generation"
+
+#: Time in seconds for which users are cached in redis
+AUTH_CACHE_REDIS_EXPIRY = 5 * 60
+
+#: Time in seconds for which users are cached in the process
+AUTH_CACHE_LOCAL_EXPIRY = 10
+
+#: Maximum number of users to keep in the in-process cache
+AUTH_CACHE_LOCAL_SIZE = 5000
+
+#: Maximum number of tokens invalidated at once by invalidate_tokens
+AUTH_CACHE_INVALIDATE_BATCH_SIZE = 1000
+
+#: Number of lookups after which the hit/miss counters of the process are flushed to metrics
+AUTH_CACHE_METRICS_FLUSH_INTERVAL = 1000
+
+_local_cache = OrderedDict()
+_lock = threading.Lock()
+_stats = {"local_hits": 0, "redis_hits": 0, "db_queries": 0}
+
+
+def _get_cache_key(token: str, fetch_email: bool) -> str:
+    """ Hash the token so that raw tokens are never used as keys in redis. """
+    key = AUTH_CACHE_KEY_PREFIX + hashlib.sha256(token.encode("utf-8")).hexdigest()
+    if fetch_email:
+        key += ".email"
+    return key
+
+
+def _get_generation_key(token: str) -> str:
+    return cache._prep_key(_get_cache_key(token, False) + AUTH_CACHE_GENERATION_SUFFIX)
+
+
+def _record(stat: str):
+    """ Update the lookup counters and periodically send them to the metrics store. """
+    with _lock:
+        _stats[stat] += 1
+        if sum(_stats.values()) < AUTH_CACHE_METRICS_FLUSH_INTERVAL:
+            return
+        counts = dict(_stats)
+        for key in _stats:
+            _stats[key] = 0
+
+    for key, value in counts.items():
+        if value:
+            metrics.increment("auth_cache_" + key, value)
+
+
+def _get_local(key):
+    with _lock:
+        entry = _local_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del _local_cache[key]
+            return None
+        _local_cache.move_to_end(key)
+        return user
+
+
+def _set_local(key, user):
+    with _lock:
+        _local_cache[key] = (time.monotonic() + AUTH_CACHE_LOCAL_EXPIRY, user)
+        _local_cache.move_to_end(key)
+        while len(_local_cache) > AUTH_CACHE_LOCAL_SIZE:
+            _local_cache.popitem(last=False)
+
+
+def get_user_by_token(token: str, *, fetch_email: bool = False):
+    """ Get the user with the specified authentication token, first looking in the in-process cache,
+    then in redis and finally in the database.
+
+    Args:
+        token: Authentication token associated with user's account.
+        fetch_email: whether to return email in response
+
+    Returns:
+        the user as a dict (see db.user.get_by_token), or None if no user has the token.
+    """
+    key = _get_cache_key(token, fetch_email)
+
+    user = _get_local(key)
+    if user is not None:
+        _record("local_hits")
+        return user
+
+    user = cache.get(key)
+    if user is not None:
+        _record("redis_hits")
+        _set_local(key, user)
+        return user
+
+    _record("db_queries")
+    generation_key = _get_generation_key(token)
+    generation = cache._r.get(generation_key)
+    user = db_user.get_by_token(token, fetch_email=fetch_email)
+    if user is None:
+        # do not cache misses, invalid tokens are rare and this keeps new tokens usable immediately
+        return None
+
+    user = dict(user)
+    cache.set(key, user, expirein=AUTH_CACHE_REDIS_EXPIRY)
+    if cache._r.get(generation_key) != generation:
+        # the token was invalidated while the user was read, the user read may be stale so remove it
+        # from the cache again and read it once more without caching it
+        cache.delete(key)
+        user = db_user.get_by_token(token, fetch_email=fetch_email)
+        return dict(user) if user is not None else None
+
+    _set_local(key, user)
+    return user
+
+
+def _invalidate(tokens: List[str]):
+    keys = []
+    pipeline = cache._r.pipeline()
+    for token in tokens:
+        keys.append(_get_cache_key(token, False))
+        keys.append(_get_cache_key(token, True))
+        generation_key = _get_generation_key(token)
+        pipeline.incr(generation_key)
+        pipeline.expire(generation_key, AUTH_CACHE_REDIS_EXPIRY)
+    # the generations are incremented before the users are deleted so that a user read before the
+    # deletion is never cached after it
+    pipeline.execute()
+    with _lock:
+        for key in keys:
+            _local_cache.pop(key, None)
+    cache.delete_many(keys)
+
+
+def invalidate_token(token: str):
+    """ Remove the user cached for the given token. Must be called after the token of a user is changed,
+    the user is deleted or the details of the user used by the api (username, email, gdpr agreement, last
+    login) are modified. Other changes to the user show up after at most AUTH_CACHE_REDIS_EXPIRY seconds.
+    """
+    _invalidate([token])
+
+
+def invalidate_tokens(tokens: Iterable[str]):
+    """ Remove the users cached for the given tokens, for bulk updates of many users. """
+    tokens = list(tokens)
+    for i in range(0, len(tokens), AUTH_CACHE_INVALIDATE_BATCH_SIZE):
+        _invalidate(tokens[i:i + AUTH_CACHE_INVALIDATE_BATCH_SIZE])
+
+
+def get_stats():
+    """ Returns the lookup counters of this process which have not been flushed to metrics yet. """
+    with _lock:
+        return dict(_stats)
@@ -141,7 +141,8 @@ def init_error_handlers(app):
                 A Response which will be a json error if request was made to the LB api and an html page
                 otherwise
         """
-        if current_app.config.get('IS_API_COMPAT_APP') or request.path.startswith(API_PREFIX):
+        if current_app.config.get('IS_API_COMPAT_APP') or current_app.config.get('IS_API_APP') \
+                or request.path.startswith(API_PREFIX):
             response = jsonify({'code': code, 'error': error.description})
             response.headers["Access-Control-Allow-Origin"] = "*"
             return response, code
@@ -180,7 +181,7 @@ def init_error_handlers(app):
         # We specifically return json in the case that the request was within our API path
         original = getattr(error, "original_exception", None)
 
-        if request.path.startswith(API_PREFIX):
+        if current_app.config.get('IS_API_APP') or request.path.startswith(API_PREFIX):
             error = APIError("An unknown error occured.", 500)
             return jsonify(error.to_dict()), error.status_code
         else:
@@ -0,0 +1,336 @@
+""" Optional per request instrumentation of the webserver.
+
+When INSTRUMENTATION_ENABLED is set, the latency of each request is recorded in a histogram per endpoint, and
+the time spent in and the number of calls to the databases, redis, couchdb, other http services and rabbitmq
+while handling the request are attributed to its endpoint. The sqlalchemy engines of the app, the redis client
+of the cache and the functions of the couchdb module are instrumented. Other http requests are timed by wrapping
+requests.Session.send, which the module level requests functions use too. The metrics are served in the
+Prometheus text format on /metrics to requests bearing INSTRUMENTATION_METRICS_TOKEN, /metrics is not served if
+no token is configured.
+
+The metrics are kept in the memory of each worker process, so /metrics reports the requests handled by the
+process serving it. When instrumentation is disabled none of the hooks are installed.
+"""
+import functools
+import hmac
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Tuple
+
+import requests
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from werkzeug.exceptions import NotFound
+
+#: Upper bounds in seconds of the buckets of the request and backend time histograms
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+#: The functions of the couchdb module which make requests to couchdb
+COUCHDB_FUNCTIONS = (
+    "create_database", "list_databases", "delete_database", "fetch_data", "insert_data", "delete_data",
+    "check_database_lock", "lock_database", "unlock_database",
+)
+
+_enabled = False
+_requests_instrumented = False
+_metrics_token = None
+# the backend name of each instrumented sqlalchemy engine
+_engine_backends = weakref.WeakKeyDictionary()
+# the instrumented redis clients
+_redis_clients = weakref.WeakSet()
+# whether the current thread is in a call to the couchdb module
+_couchdb_calls = threading.local()
+
+
+def _format_labels(label_names: Iterable[str], label_values: Iterable[str]) -> str:
+    labels = ",".join(
+        '%s="%s"' % (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in zip(label_names, label_values)
+    )
+    return "{" + labels + "}" if labels else ""
+
+
+class Counter:
+    """ A counter with labels """
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values: tuple, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def collect(self) -> List[str]:
+        lines = ["# HELP %s %s" % (self.name, self.documentation), "# TYPE %s counter" % self.name]
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in sorted(values):
+            lines.append("%s%s %s" % (self.name, _format_labels(self.label_names, label_values), repr(float(value))))
+        return lines
+
+
+class Histogram:
+    """ A histogram with labels and the given bucket upper bounds """
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...],
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        # for each set of label values: the number of observations in each bucket, the sum and the count
+        self._values: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values: tuple, value: float):
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def collect(self) -> List[str]:
+        lines = ["# HELP %s %s" % (self.name, self.documentation), "# TYPE %s histogram" % self.name]
+        with self._lock:
+            values = [(label_values, list(counts), total, count)
+                      for label_values, (counts, total, count) in self._values.items()]
+        for label_values, counts, total, count in sorted(values):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names + ("le",), label_values + (repr(bound),))
+                lines.append("%s_bucket%s %d" % (self.name, labels, cumulative))
+            labels = _format_labels(self.label_names + ("le",), label_values + ("+Inf",))
+            lines.append("%s_bucket%s %d" % (self.name, labels, count))
+            labels = _format_labels(self.label_names, label_values)
+            lines.append("%s_sum%s %s" % (self.name, labels, repr(total)))
+            lines.append("%s_count%s %d" % (self.name, labels, count))
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    "listenbrainz_http_request_duration_seconds",
+    "Time taken to handle requests, by endpoint",
+    ("method", "endpoint", "status"),
+)
+BACKEND_DURATION = Histogram(
+    "listenbrainz_backend_duration_seconds",
+    "Time spent in a backend service per request, by endpoint",
+    ("endpoint", "backend"),
+)
+BACKEND_CALLS = Counter(
+    "listenbrainz_backend_calls_total",
+    "Number of calls to a backend service, by endpoint",
+    ("endpoint", "backend"),
+)
+
+METRICS = [REQUEST_DURATION, BACKEND_DURATION, BACKEND_CALLS]
+
+
+def record_backend_call(backend: str, duration: float):
+    """ Attribute a call to the backend which took duration seconds to the current request """
+    if not has_request_context():
+        return
+    timings = g.get("_backend_timings")
+    if timings is None:
+        return
+    entry = timings.get(backend)
+    if entry is None:
+        timings[backend] = [duration, 1]
+    else:
+        entry[0] += duration
+        entry[1] += 1
+
+
+@contextmanager
+def timed(backend: str):
+    """ Attribute the time taken by the block to the backend in the current request """
+    if not _enabled:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_backend_call(backend, time.perf_counter() - t0)
+
+
+def _before_request():
+    g._backend_timings = {}
+    g._request_start = time.perf_counter()
+
+
+def _record_request(status: int):
+    start = g.pop("_request_start", None)
+    timings = g.pop("_backend_timings", None)
+    if start is None:
+        return
+    endpoint = request.endpoint or "none"
+    REQUEST_DURATION.observe((request.method, endpoint, str(status)), time.perf_counter() - start)
+    for backend, (duration, calls) in timings.items():
+        BACKEND_DURATION.observe((endpoint, backend), duration)
+        BACKEND_CALLS.inc((endpoint, backend), calls)
+
+
+def _after_request(response):
+    _record_request(response.status_code)
+    return response
+
+
+def _teardown_request(exc):
+    # only requests which raised an exception past the error handlers have not been recorded yet
+    _record_request(500)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record_backend_call(_engine_backends[conn.engine], time.perf_counter() - conn.info["_query_start"].pop())
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    starts = connection.info.get("_query_start") if connection is not None else None
+    if starts:
+        record_backend_call(_engine_backends[exception_context.engine], time.perf_counter() - starts.pop())
+
+
+def _instrument_engine(engine, backend: str):
+    """ Time the queries executed with the sqlalchemy engine """
+    if engine is None or engine in _engine_backends:
+        return
+    _engine_backends[engine] = backend
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def _timed_call(backend: str, fn):
+    """ Returns a wrapper of fn which attributes the time taken by each call to the backend """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            record_backend_call(backend, time.perf_counter() - t0)
+    return wrapper
+
+
+def _instrument_redis(client):
+    """ Time the commands sent with the redis client, a pipeline is counted as one call """
+    if client is None or client in _redis_clients:
+        return
+    _redis_clients.add(client)
+    pipeline = client.pipeline
+
+    def instrumented_pipeline(*args, **kwargs):
+        redis_pipeline = pipeline(*args, **kwargs)
+        redis_pipeline.execute = _timed_call("redis", redis_pipeline.execute)
+        return redis_pipeline
+
+    # the methods are replaced on the client only, other redis clients in the process are not affected
+    client.execute_command = _timed_call("redis", client.execute_command)
+    client.pipeline = instrumented_pipeline
+
+
+def _instrument_couchdb(couchdb):
+    """ Time the calls to the functions of the couchdb module. The functions call each other, only the
+    outermost call is counted. """
+    for name in COUCHDB_FUNCTIONS:
+        fn = getattr(couchdb, name)
+        if getattr(fn, "_instrumented", False):
+            continue
+
+        def instrumented(*args, _fn=fn, **kwargs):
+            if getattr(_couchdb_calls, "active", False):
+                return _fn(*args, **kwargs)
+            _couchdb_calls.active = True
+            t0 = time.perf_counter()
+            try:
+                return _fn(*args, **kwargs)
+            finally:
+                _couchdb_calls.active = False
+                record_backend_call("couchdb", time.perf_counter() - t0)
+
+        functools.update_wrapper(instrumented, fn)
+        instrumented._instrumented = True
+        setattr(couchdb, name, instrumented)
+
+
+def _instrument_requests():
+    """ Time the http requests made with requests. Requests made by the couchdb module are already counted
+    as couchdb calls and are skipped here. Outside of the requests of an instrumented app nothing is recorded. """
+    global _requests_instrumented
+    if _requests_instrumented:
+        return
+    _requests_instrumented = True
+    send = requests.Session.send
+
+    def instrumented_send(self, prepared_request, **kwargs):
+        if getattr(_couchdb_calls, "active", False):
+            return send(self, prepared_request, **kwargs)
+        t0 = time.perf_counter()
+        try:
+            return send(self, prepared_request, **kwargs)
+        finally:
+            record_backend_call("http", time.perf_counter() - t0)
+
+    requests.Session.send = instrumented_send
+
+
+def generate_metrics() -> str:
+    """ Returns all metrics in the Prometheus text format """
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view():
+    # the metrics are only served to the prometheus scraper, the endpoint is hidden from everyone else
+    token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    if not hmac.compare_digest(token.encode("utf-8"), _metrics_token.encode("utf-8")):
+        raise NotFound()
+    return Response(generate_metrics(), content_type=METRICS_CONTENT_TYPE)
+
+
+def init_instrumentation(app):
+    """ Install the request hooks and the /metrics endpoint on the app and the hooks timing the backends
+    if INSTRUMENTATION_ENABLED is set. Must be called after the database connections are initialized. """
+    global _enabled, _metrics_token
+    if not app.config.get("INSTRUMENTATION_ENABLED", False):
+        return
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    _metrics_token = app.config.get("INSTRUMENTATION_METRICS_TOKEN")
+    if _metrics_token:
+        app.add_url_rule("/metrics", "instrumentation_metrics", metrics_view)
+
+    from brainzutils import cache, musicbrainz_db
+    from listenbrainz import db
+    from listenbrainz.db import couchdb, timescale
+    _instrument_engine(db.engine, "postgres")
+    _instrument_engine(timescale.engine, "timescale")
+    _instrument_engine(musicbrainz_db.engine, "musicbrainz")
+    _instrument_redis(cache._r)
+    _instrument_couchdb(couchdb)
+    _instrument_requests()
+    _enabled = True
@@ -4,11 +4,13 @@ from brainzutils.musicbrainz_db.editor import fetch_multiple_editors
 from flask import current_app
 
 from listenbrainz import db as lb_db
+from listenbrainz.webserver import auth_cache
 
 
 def copy_emails():
     current_app.logger.info("Beginning to update emails for users...")
     connection = lb_db.engine.raw_connection()
+    changed_tokens = []
     try:
         with connection.cursor() as cursor:
             cursor.execute('''SELECT musicbrainz_row_id FROM "user"''')
@@ -23,10 +25,15 @@ def copy_emails():
                 FROM (VALUES %s)
                 AS editor_email_temp(id, email)
                 WHERE editor_email_temp.id = "user".musicbrainz_row_id
+                  AND "user".email IS DISTINCT FROM editor_email_temp.email
+            RETURNING "user".auth_token
             """
-            execute_values(cursor, query, emails, template=None)
-            current_app.logger.info("Updated emails of ListenBrainz users.")
+            rows = execute_values(cursor, query, emails, template=None, fetch=True)
+            changed_tokens = [row[0] for row in rows]
+            current_app.logger.info("Updated emails of %d ListenBrainz users.", len(changed_tokens))
         connection.commit()
+        # the users cached with their old emails are removed only after the new ones are visible
+        auth_cache.invalidate_tokens(changed_tokens)
     except psycopg2.errors.OperationalError:
         current_app.logger.error("Error while updating emails of ListenBrainz users", exc_info=True)
         connection.rollback()
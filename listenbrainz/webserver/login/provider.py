@@ -7,6 +7,7 @@ from listenbrainz.webserver.login import User
 from listenbrainz.webserver.utils import generate_string
 from listenbrainz.webserver.timescale_connection import _ts as ts
 import listenbrainz.db.user as db_user
+from listenbrainz.webserver import auth_cache
 import orjson
 
 _musicbrainz = None
@@ -78,6 +79,7 @@ def get_user():
         user["email"] = user_email
         # every time a user logs in, update the email in LB.
         db_user.update_user_details(user["id"], musicbrainz_id, user_email)
+        auth_cache.invalidate_token(user["auth_token"])
 
     return user
 
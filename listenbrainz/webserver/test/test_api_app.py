@@ -0,0 +1,54 @@
+import unittest
+
+import flask
+
+from listenbrainz.benchmarks.utils import get_import_times
+from listenbrainz.webserver import API_PREFIX, create_api_app
+from listenbrainz.webserver.testing import ServerTestCase
+
+# modules which are only needed by the website, the admin views or a few endpoints and should
+# not be imported when the api endpoints are set up
+API_APP_EXCLUDED_MODULES = [
+    "flask_admin",
+    "pandas",
+    "rapidfuzz",
+    "spotipy",
+    "troi",
+    "typesense",
+    "listenbrainz.webserver.static_manager",
+    "listenbrainz.webserver.views.index",
+    "listenbrainz.webserver.views.user",
+    "listenbrainz.webserver.views.views_utils",
+]
+
+
+class APIAppTestCase(ServerTestCase):
+
+    @classmethod
+    def create_app(cls):
+        app = create_api_app(debug=False)
+        app.config['TESTING'] = True
+        return app
+
+    def test_only_api_routes(self):
+        for rule in flask.current_app.url_map.iter_rules():
+            if rule.endpoint != 'static' and not rule.rule.startswith(API_PREFIX):
+                self.fail(f"Rule isn't an api endpoint: {rule.rule} ({rule.endpoint})")
+
+    def test_not_found_returns_json(self):
+        r = self.client.get('/user/iliekcomputers/')
+        self.assert404(r)
+        self.assertEqual(r.json['code'], 404)
+
+
+class APIImportTimeTestCase(unittest.TestCase):
+
+    def test_api_blueprints_skip_heavy_imports(self):
+        import_times = get_import_times(
+            "from flask import Flask\n"
+            "from listenbrainz.webserver import _register_api_blueprints\n"
+            "_register_api_blueprints(Flask(__name__))\n"
+        )
+        self.assertIn("listenbrainz.webserver.views.api", import_times)
+        for module in API_APP_EXCLUDED_MODULES:
+            self.assertNotIn(module, import_times)
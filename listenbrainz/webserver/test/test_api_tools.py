@@ -0,0 +1,79 @@
+import unittest
+
+import orjson
+
+from listenbrainz.benchmarks.validate_listen import load_corpus, compare_validators
+from listenbrainz.webserver.errors import APIBadRequest, ListenValidationError
+from listenbrainz.webserver.views.api_tools import validate_listen, LISTEN_TYPE_IMPORT, LISTEN_TYPE_PLAYING_NOW
+
+
+class ValidateListenTestCase(unittest.TestCase):
+
+    def _listen(self, **additional_info):
+        return {
+            "listened_at": 1486449409,
+            "track_metadata": {
+                "artist_name": " Kanye West ",
+                "track_name": "Fade",
+                "additional_info": additional_info
+            }
+        }
+
+    def test_same_results_as_multi_pass_on_test_data(self):
+        corpus = load_corpus()
+        self.assertGreater(len(corpus), 0)
+        self.assertEqual(compare_validators(corpus), [])
+
+    def test_same_results_as_multi_pass_on_edge_cases(self):
+        listens = [
+            self._listen(recording_mbid="{8294645a-f996-44b6-9060-7f189b9f59f3}"),
+            self._listen(recording_mbid="urn:uuid:8294645a-f996-44b6-9060-7f189b9f59f3"),
+            self._listen(recording_mbid="8294645AF99644B690607F189B9F59F3"),
+            self._listen(recording_mbid="8294645a-f996-44b6-9060-7f189b9f59f"),
+            self._listen(recording_mbid=12),
+            self._listen(release_mbid=""),
+            self._listen(artist_mbids=["8294645a-f996-44b6-9060-7f189b9f59f3", None, ""]),
+            self._listen(artist_mbids=["8294645a-f996-44b6-9060-7f189b9f59f3", "not an mbid"]),
+            self._listen(work_mbids=[]),
+            self._listen(duration="100"),
+            self._listen(duration=100, duration_ms=100000),
+            self._listen(tags=["a" * 100]),
+            self._listen(nested={"value": "null \u0000 inside"}),
+            self._listen(values=["null \u0000 inside a list"]),
+            self._listen(text="backslash \\u0000 is not a null"),
+        ]
+        corpus = [(orjson.dumps(listen), LISTEN_TYPE_IMPORT) for listen in listens]
+        self.assertEqual(compare_validators(corpus), [])
+
+    def test_validate_listen_mutates(self):
+        listen = validate_listen(self._listen(
+            release_mbid="",
+            artist_mbids=["8294645a-f996-44b6-9060-7f189b9f59f3", None],
+            duration="100"
+        ), LISTEN_TYPE_IMPORT)
+        self.assertEqual(listen["track_metadata"]["artist_name"], "Kanye West")
+        self.assertNotIn("release_mbid", listen["track_metadata"]["additional_info"])
+        self.assertEqual(listen["track_metadata"]["additional_info"]["artist_mbids"],
+                         ["8294645a-f996-44b6-9060-7f189b9f59f3"])
+        self.assertEqual(listen["track_metadata"]["additional_info"]["duration"], 100)
+
+    def test_validate_listen_errors(self):
+        with self.assertRaises(ListenValidationError) as err:
+            validate_listen(self._listen(recording_mbid="invalid"), LISTEN_TYPE_IMPORT)
+        self.assertEqual(err.exception.message, "recording_mbid MBID format invalid.")
+
+        with self.assertRaises(APIBadRequest) as err:
+            validate_listen(self._listen(nested={"value": "null \u0000 inside"}), LISTEN_TYPE_IMPORT)
+        self.assertEqual(err.exception.message, "null \u0000 inside contains a unicode null")
+
+        with self.assertRaises(ListenValidationError) as err:
+            validate_listen(self._listen(), LISTEN_TYPE_PLAYING_NOW)
+        self.assertEqual(err.exception.message, "JSON document must not contain listened_at while submitting"
+                                                " playing_now.")
+
+    def test_validate_listen_large_integer(self):
+        """ orjson cannot serialize integers larger than 64 bits, the full null check must be used then """
+        listen = validate_listen(self._listen(number=2 ** 70), LISTEN_TYPE_IMPORT)
+        self.assertEqual(listen["track_metadata"]["additional_info"]["number"], 2 ** 70)
+        with self.assertRaises(APIBadRequest):
+            validate_listen(self._listen(number=2 ** 70, value="\u0000"), LISTEN_TYPE_IMPORT)
@@ -0,0 +1,89 @@
+from unittest.mock import patch
+
+from brainzutils import cache
+
+import listenbrainz.db.user as db_user
+from listenbrainz.tests.integration import IntegrationTestCase
+from listenbrainz.webserver import auth_cache
+
+
+class AuthCacheTestCase(IntegrationTestCase):
+
+    def setUp(self):
+        super(AuthCacheTestCase, self).setUp()
+        cache._r.flushdb()
+        auth_cache._local_cache.clear()
+        self.user = db_user.get_or_create(1, "iliekcomputers")
+
+    def test_get_user_by_token(self):
+        with patch("listenbrainz.webserver.auth_cache.db_user.get_by_token", wraps=db_user.get_by_token) as mock:
+            user = auth_cache.get_user_by_token(self.user["auth_token"])
+            self.assertEqual(user["id"], self.user["id"])
+            self.assertEqual(user["musicbrainz_id"], "iliekcomputers")
+            self.assertEqual(mock.call_count, 1)
+
+            # second lookup is served from the in-process cache
+            auth_cache.get_user_by_token(self.user["auth_token"])
+            self.assertEqual(mock.call_count, 1)
+
+            # once the in-process entry is gone, redis is used
+            auth_cache._local_cache.clear()
+            user = auth_cache.get_user_by_token(self.user["auth_token"])
+            self.assertEqual(user["id"], self.user["id"])
+            self.assertEqual(mock.call_count, 1)
+
+        stats = auth_cache.get_stats()
+        self.assertGreaterEqual(stats["local_hits"], 1)
+        self.assertGreaterEqual(stats["redis_hits"], 1)
+
+    def test_get_user_by_token_fetch_email(self):
+        db_user.update_user_details(self.user["id"], self.user["musicbrainz_id"], "iliekcomputers@example.com")
+        user = auth_cache.get_user_by_token(self.user["auth_token"])
+        self.assertNotIn("email", user)
+        user = auth_cache.get_user_by_token(self.user["auth_token"], fetch_email=True)
+        self.assertEqual(user["email"], "iliekcomputers@example.com")
+
+    def test_invalid_token(self):
+        self.assertIsNone(auth_cache.get_user_by_token("not-a-token"))
+
+    def test_invalidate_token(self):
+        old_token = self.user["auth_token"]
+        self.assertIsNotNone(auth_cache.get_user_by_token(old_token))
+
+        db_user.update_token(self.user["id"])
+        auth_cache.invalidate_token(old_token)
+        self.assertIsNone(auth_cache.get_user_by_token(old_token))
+
+        new_token = db_user.get(self.user["id"])["auth_token"]
+        self.assertEqual(auth_cache.get_user_by_token(new_token)["id"], self.user["id"])
+
+    def test_invalidate_token_while_reading_user(self):
+        token = self.user["auth_token"]
+        get_by_token = db_user.get_by_token
+
+        def get_by_token_with_concurrent_update(*args, **kwargs):
+            # the token is regenerated after the user is read from the database and before it is cached
+            user = get_by_token(*args, **kwargs)
+            if user is not None:
+                db_user.update_token(self.user["id"])
+                auth_cache.invalidate_token(token)
+            return user
+
+        with patch("listenbrainz.webserver.auth_cache.db_user.get_by_token",
+                   side_effect=get_by_token_with_concurrent_update):
+            self.assertIsNone(auth_cache.get_user_by_token(token))
+        # the stale user is not cached, so the old token does not authenticate anymore
+        self.assertIsNone(cache.get(auth_cache._get_cache_key(token, False)))
+        self.assertIsNone(auth_cache.get_user_by_token(token))
+
+    def test_invalidate_tokens(self):
+        other_user = db_user.get_or_create(2, "rob")
+        tokens = [self.user["auth_token"], other_user["auth_token"]]
+        for token in tokens:
+            auth_cache.get_user_by_token(token, fetch_email=True)
+
+        with patch("listenbrainz.webserver.auth_cache.db_user.get_by_token", wraps=db_user.get_by_token) as mock:
+            auth_cache.invalidate_tokens(tokens)
+            for token in tokens:
+                auth_cache.get_user_by_token(token, fetch_email=True)
+            self.assertEqual(mock.call_count, 2)
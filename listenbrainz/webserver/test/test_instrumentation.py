@@ -0,0 +1,137 @@
+import types
+import unittest
+
+import requests
+import requests_mock
+from flask import Flask, jsonify
+from redis import Redis
+
+from listenbrainz.webserver import instrumentation
+
+
+class FakeRedis:
+
+    def execute_command(self, *args, **options):
+        return "OK"
+
+    def pipeline(self):
+        return types.SimpleNamespace(execute=lambda: ["OK", "OK"])
+
+
+def create_fake_couchdb():
+    couchdb = types.SimpleNamespace(**{name: lambda *args: None for name in instrumentation.COUCHDB_FUNCTIONS})
+    # like the couchdb module, fetching data lists the databases first
+    couchdb.fetch_data = lambda prefix, user_id: couchdb.list_databases(prefix)
+    return couchdb
+
+
+class InstrumentationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        for metric in instrumentation.METRICS:
+            metric._values.clear()
+
+    def create_app(self, enabled=True, token="metrics-token"):
+        app = Flask(__name__)
+        app.config["INSTRUMENTATION_ENABLED"] = enabled
+        app.config["INSTRUMENTATION_METRICS_TOKEN"] = token
+
+        @app.route("/backends")
+        def backends():
+            instrumentation.record_backend_call("postgres", 0.02)
+            instrumentation.record_backend_call("postgres", 0.03)
+            with instrumentation.timed("rabbitmq"):
+                pass
+            return jsonify({"status": "ok"})
+
+        instrumentation.init_instrumentation(app)
+        return app
+
+    def test_histogram(self):
+        histogram = instrumentation.Histogram("test_seconds", "Test histogram", ("endpoint",), buckets=(0.1, 1.0))
+        histogram.observe(("index",), 0.05)
+        histogram.observe(("index",), 0.5)
+        histogram.observe(("index",), 5)
+        self.assertListEqual(histogram.collect(), [
+            "# HELP test_seconds Test histogram",
+            "# TYPE test_seconds histogram",
+            'test_seconds_bucket{endpoint="index",le="0.1"} 1',
+            'test_seconds_bucket{endpoint="index",le="1.0"} 2',
+            'test_seconds_bucket{endpoint="index",le="+Inf"} 3',
+            'test_seconds_sum{endpoint="index"} 5.55',
+            'test_seconds_count{endpoint="index"} 3',
+        ])
+
+    def test_counter_escapes_labels(self):
+        counter = instrumentation.Counter("test_total", "Test counter", ("endpoint",))
+        counter.inc(('say "hi"\\',), 2)
+        self.assertEqual(counter.collect()[2], 'test_total{endpoint="say \\"hi\\"\\\\"} 2.0')
+
+    def test_request_metrics(self):
+        client = self.create_app().test_client()
+        self.assertEqual(client.get("/backends").status_code, 200)
+        self.assertEqual(client.get("/not-found").status_code, 404)
+
+        response = client.get("/metrics", headers={"Authorization": "Bearer metrics-token"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content_type, instrumentation.METRICS_CONTENT_TYPE)
+        metrics = response.data.decode("utf-8")
+        self.assertIn('listenbrainz_http_request_duration_seconds_count{method="GET",endpoint="backends",status="200"} 1', metrics)
+        self.assertIn('listenbrainz_http_request_duration_seconds_count{method="GET",endpoint="none",status="404"} 1', metrics)
+        self.assertIn('listenbrainz_backend_calls_total{endpoint="backends",backend="postgres"} 2.0', metrics)
+        self.assertIn('listenbrainz_backend_calls_total{endpoint="backends",backend="rabbitmq"} 1.0', metrics)
+        self.assertIn('listenbrainz_backend_duration_seconds_bucket{endpoint="backends",backend="postgres",le="0.05"} 1', metrics)
+
+    def test_metrics_require_token(self):
+        client = self.create_app().test_client()
+        self.assertEqual(client.get("/metrics").status_code, 404)
+        response = client.get("/metrics", headers={"Authorization": "Bearer wrong-token"})
+        self.assertEqual(response.status_code, 404)
+
+        # without a token, the metrics are not served at all
+        client = self.create_app(token=None).test_client()
+        self.assertEqual(client.get("/metrics").status_code, 404)
+
+    def test_backend_clients(self):
+        redis_client, other_redis_client = FakeRedis(), FakeRedis()
+        couchdb = create_fake_couchdb()
+        # requests_mock.Mocker replaces Session.send, mount an adapter instead to keep the instrumented send
+        http_session = requests.Session()
+        adapter = requests_mock.Adapter()
+        adapter.register_uri("GET", "mock://example.org/", text="ok")
+        http_session.mount("mock://", adapter)
+        execute_command = Redis.execute_command
+        instrumentation._instrument_redis(redis_client)
+        instrumentation._instrument_redis(redis_client)
+        instrumentation._instrument_couchdb(couchdb)
+        instrumentation._instrument_couchdb(couchdb)
+
+        app = Flask(__name__)
+
+        @app.route("/clients")
+        def clients():
+            redis_client.execute_command("GET", "key")
+            redis_client.pipeline().execute()
+            other_redis_client.execute_command("GET", "key")
+            couchdb.fetch_data("artists_all_time", 1)
+            http_session.get("mock://example.org/")
+            return jsonify({"status": "ok"})
+
+        app.config["INSTRUMENTATION_ENABLED"] = True
+        instrumentation.init_instrumentation(app)
+        self.assertEqual(app.test_client().get("/clients").status_code, 200)
+
+        # only the calls made with the instrumented clients are counted, nested couchdb calls once
+        self.assertEqual(instrumentation.BACKEND_CALLS._values[("clients", "redis")], 2)
+        self.assertEqual(instrumentation.BACKEND_CALLS._values[("clients", "couchdb")], 1)
+        self.assertEqual(instrumentation.BACKEND_CALLS._values[("clients", "http")], 1)
+        # the redis classes are not patched
+        self.assertIs(Redis.execute_command, execute_command)
+
+    def test_disabled(self):
+        app = self.create_app(enabled=False)
+        client = app.test_client()
+        self.assertEqual(client.get("/backends").status_code, 200)
+        self.assertEqual(client.get("/metrics").status_code, 404)
+        self.assertDictEqual(instrumentation.REQUEST_DURATION._values, {})
+        self.assertDictEqual(instrumentation.BACKEND_CALLS._values, {})
@@ -5,9 +5,6 @@ import orjson
 from flask import current_app, request
 from flask_login import current_user
 
-from listenbrainz.webserver.views.views_utils import get_current_spotify_user, get_current_youtube_user, \
-    get_current_critiquebrainz_user
-
 
 REJECT_LISTENS_WITHOUT_EMAIL_ERROR = \
     'The listens were rejected because the user does not has not provided an email. ' \
@@ -51,6 +48,10 @@ def get_global_props():
      - sentry dsn
      - API url for frontned to connect to.
     """
+    # imported here because the external service modules are only needed to render html pages
+    from listenbrainz.webserver.views.views_utils import get_current_spotify_user, get_current_youtube_user, \
+        get_current_critiquebrainz_user
+
     current_user_data = {}
     if current_user.is_authenticated:
         current_user_data = {
@@ -1,3 +1,4 @@
+import re
 from typing import Dict, Tuple
 from urllib.parse import urlparse
 
@@ -7,11 +8,10 @@ from kombu.entity import PERSISTENT_DELIVERY_MODE
 
 import listenbrainz.webserver.rabbitmq_connection as rabbitmq_connection
 import listenbrainz.webserver.redis_connection as redis_connection
-import listenbrainz.db.user as db_user
+from listenbrainz.webserver import auth_cache, instrumentation
 import time
 import orjson
 import uuid
-import sentry_sdk
 
 from flask import current_app, request
 
@@ -51,6 +51,15 @@ MAX_DURATION_MS_LIMIT = MAX_DURATION_LIMIT * 1000
 
 MAX_ITEMS_PER_MESSYBRAINZ_LOOKUP = 10
 
+#: Keys in additional_info which should contain a single MBID
+SINGLE_MBID_KEYS = ('release_mbid', 'recording_mbid', 'release_group_mbid', 'track_mbid')
+
+#: Keys in additional_info which should contain a list of MBIDs
+MULTIPLE_MBID_KEYS = ('artist_mbids', 'work_mbids')
+
+# Matches the usual textual forms of an uuid, anything accepted by this is also accepted by uuid.UUID
+_UUID_RE = re.compile(r"[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}")
+
 
 # Define the values for types of listens
 LISTEN_TYPE_SINGLE = 1
@@ -140,7 +149,10 @@ def validate_listen(listen: Dict, listen_type) -> Dict:
     """Make sure that required keys are present, filled out and not too large.
     Also, check all keys for absence of unicode null which cannot be
     inserted into Postgres. The function may also mutate listens
-    in place if needed."""
+    in place if needed.
+
+    Each field of the listen is visited only once. The unicode null check is done on a single orjson serialization of the listen, the
+    recursive check is only used to report the error if a null is found."""
 
     if listen is None:
         raise ListenValidationError("Listen is empty and cannot be validated.")
@@ -156,11 +168,6 @@ def validate_listen(listen: Dict, listen_type) -> Dict:
             raise ListenValidationError("JSON document may only contain listened_at and "
                                         "track_metadata top level keys", listen)
 
-        # check that listened_at value is greater than last.fm founding year.
-        if listen['listened_at'] < LISTEN_MINIMUM_TS:
-            raise ListenValidationError("Value for key listened_at is too low. listened_at timestamp "
-                                        "should be greater than 1033410600 (2002-10-01 00:00:00 UTC).", listen)
-
     elif listen_type == LISTEN_TYPE_PLAYING_NOW:
         if "listened_at" in listen:
             raise ListenValidationError("JSON document must not contain listened_at while submitting"
@@ -174,18 +181,29 @@ def validate_listen(listen: Dict, listen_type) -> Dict:
             raise ListenValidationError("JSON document may only contain track_metadata as top level"
                                         " key when submitting playing_now.", listen)
 
-    if listen["track_metadata"] is None:
+    track_metadata = listen["track_metadata"]
+    if track_metadata is None:
         raise ListenValidationError("JSON document may not have track_metadata with null value.", listen)
 
     # Basic metadata
-    validate_basic_metadata(listen, "track_name")
-    validate_basic_metadata(listen, "artist_name")
-    validate_basic_metadata(listen, "release_name", required=False)
+    for key, required in (("track_name", True), ("artist_name", True), ("release_name", False)):
+        if key in track_metadata:
+            value = track_metadata[key]
+            if not isinstance(value, str):
+                raise ListenValidationError(f"track_metadata.{key} must be a single string.", listen)
+            value = value.strip()
+            track_metadata[key] = value
+            if not value:
+                raise ListenValidationError(f"field track_metadata.{key} is empty.", listen)
+        elif required:
+            raise ListenValidationError(f"JSON document does not contain required field track_metadata.{key}.", listen)
+
+    if 'additional_info' in track_metadata:
+        additional_info = track_metadata['additional_info']
 
-    if 'additional_info' in listen['track_metadata']:
         # Tags
-        if 'tags' in listen['track_metadata']['additional_info']:
-            tags = listen['track_metadata']['additional_info']['tags']
+        if 'tags' in additional_info:
+            tags = additional_info['tags']
             if len(tags) > MAX_TAGS_PER_LISTEN:
                 raise ListenValidationError("JSON document may not contain more than %d items in "
                                             "track_metadata.additional_info.tags." % MAX_TAGS_PER_LISTEN, listen)
@@ -195,39 +213,53 @@ def validate_listen(listen: Dict, listen_type) -> Dict:
                                                 "longer than %d characters." % MAX_TAG_SIZE, listen)
 
         # if both duration and duration_ms are given and valid, an error will be raised.
-        if 'duration' in listen['track_metadata']['additional_info'] and 'duration_ms' in listen['track_metadata']['additional_info']:
+        if 'duration' in additional_info and 'duration_ms' in additional_info:
             raise ListenValidationError("JSON document should not contain both duration and duration_ms.", listen)
-        # check duration validity
         validate_duration_field(listen, "duration", MAX_DURATION_LIMIT)
         validate_duration_field(listen, "duration_ms", MAX_DURATION_MS_LIMIT)
 
-        # MBIDs, both of the mbid validation methods mutate the listen payload if needed.
-        single_mbid_keys = ['release_mbid', 'recording_mbid', 'release_group_mbid', 'track_mbid']
-        for key in single_mbid_keys:
-            validate_single_mbid_field(listen, key)
-        multiple_mbid_keys = ['artist_mbids', 'work_mbids']
-        for key in multiple_mbid_keys:
-            validate_multiple_mbids_field(listen, key)
-
-    # monitor performance of unicode null check because it might be a potential bottleneck
-    with sentry_sdk.start_span(op="null check", description="check for unicode null in submitted listen json"):
-        # If unicode null is present in the listen, postgres will raise an
-        # error while trying to insert it. hence, reject such listens.
+        # MBIDs, drop empty values and validate the remaining ones
+        for key in SINGLE_MBID_KEYS:
+            if key in additional_info:
+                mbid = additional_info[key]
+                if not mbid:
+                    del additional_info[key]
+                elif not _is_valid_mbid(mbid):
+                    raise ListenValidationError("%s MBID format invalid." % (key,), listen)
+        for key in MULTIPLE_MBID_KEYS:
+            if key in additional_info:
+                mbids = additional_info[key]
+                if not mbids:
+                    del additional_info[key]
+                    continue
+                mbids = [x for x in mbids if x]
+                for mbid in mbids:
+                    if not _is_valid_mbid(mbid):
+                        raise ListenValidationError("%s MBID format invalid." % (key,), listen)
+                additional_info[key] = mbids
+
+    # If unicode null is present in the listen, postgres will raise an
+    # error while trying to insert it. hence, reject such listens.
+    if _may_have_unicode_null(listen):
         check_for_unicode_null_recursively(listen)
 
     return listen
 
 
-def validate_basic_metadata(listen, key, required=True):
-    if key in listen["track_metadata"]:
-        if not isinstance(listen["track_metadata"][key], str):
-            raise ListenValidationError(f"track_metadata.{key} must be a single string.", listen)
+def _is_valid_mbid(mbid) -> bool:
+    """ Same as is_valid_uuid, with a fast path for the common textual forms of uuids """
+    if isinstance(mbid, str) and _UUID_RE.fullmatch(mbid) is not None:
+        return True
+    return is_valid_uuid(mbid)
 
-        listen['track_metadata'][key] = listen['track_metadata'][key].strip()
-        if len(listen['track_metadata'][key]) == 0:
-            raise ListenValidationError(f"field track_metadata.{key} is empty.", listen)
-    elif required:
-        raise ListenValidationError(f"JSON document does not contain required field track_metadata.{key}.", listen)
+
+def _may_have_unicode_null(listen: Dict) -> bool:
+    """ Returns False if the listen definitely does not contain a unicode null anywhere. """
+    try:
+        return b"\\u0000" in orjson.dumps(listen)
+    except (orjson.JSONEncodeError, TypeError):
+        # for example, integers too large for orjson. fallback to the full check.
+        return True
 
 
 def is_valid_uuid(u):
@@ -280,55 +312,6 @@ def validate_duration_field(listen, key, max_value):
             raise ListenValidationError(f"Value for {key} is invalid, should be a positive integer.", listen)
 
 
-def validate_single_mbid_field(listen, key):
-    """ Verify that mbid if present in the listen with given key is valid.
-    A ValidationError is raised for invalid values of mbids.
-
-    NOTE: If the mbid at the key is None or "", the key is dropped without
-     raising an error.
-
-    Args:
-        listen: listen data
-        key: the key whose mbid is to be validated
-    """
-    if key in listen['track_metadata']['additional_info']:
-        mbid = listen['track_metadata']['additional_info'][key]
-        if not mbid:  # the mbid field is None or "", hence drop the field and return
-            del listen['track_metadata']['additional_info'][key]
-            return
-
-        if not is_valid_uuid(mbid):  # if the mbid is invalid raise an error
-            raise ListenValidationError("%s MBID format invalid." % (key,), listen)
-
-
-def validate_multiple_mbids_field(listen, key):
-    """ Verify that all the mbids in the list if present in the listen with
-    given key are valid. An ValidationError error is raised for if any mbid is
-    invalid.
-
-    NOTE: If an mbid in the list is None or "", it is dropped from the list
-    without an error. If the key is an empty list or None, it is dropped
-    without raising an error.
-
-    Args:
-        listen: listen data
-        key: the key whose mbids is to be validated
-    """
-    if key in listen['track_metadata']['additional_info']:
-        mbids = listen['track_metadata']['additional_info'][key]
-        if not mbids:  # empty list or None, drop the field and return
-            del listen['track_metadata']['additional_info'][key]
-            return
-
-        mbids = [x for x in mbids if x]  # drop None and "" from list of mbids if any
-
-        for mbid in mbids:
-            if not is_valid_uuid(mbid):   # if the mbid is invalid raise an error
-                raise ListenValidationError("%s MBID format invalid." % (key,), listen)
-
-        listen['track_metadata']['additional_info'][key] = mbids  # set the filtered in the listen payload
-
-
 def validate_listened_at(listen):
     """ Raises an error if the listened_at timestamp is invalid. The timestamp is invalid
     if it is lower than the minimum acceptable timestamp or if its in future beyond
@@ -364,7 +347,8 @@ def publish_data_to_queue(data, exchange):
         exchange: the name of the exchange
     """
     try:
-        with rabbitmq_connection.rabbitmq.acquire(block=True, timeout=60) as producer:
+        with instrumentation.timed("rabbitmq"), \
+                rabbitmq_connection.rabbitmq.acquire(block=True, timeout=60) as producer:
             producer.publish(
                 exchange=exchange,
                 routing_key='',
@@ -372,7 +356,9 @@ def publish_data_to_queue(data, exchange):
                 delivery_mode=PERSISTENT_DELIVERY_MODE,
                 retry=True,
                 retry_policy={"max_retries": 5},
-                declare=[exchange]
+                declare=[exchange],
+                # used by the consumers, e.g. the websockets, to measure the time messages spend in the queue
+                headers={"published_at": time.time()}
             )
     except Exception:
         current_app.logger.error("Cannot publish to rabbitmq channel:", exc_info=True)
@@ -446,7 +432,8 @@ def validate_auth_header(*, optional: bool = False, fetch_email: bool = False):
     """ Examine the current request headers for an Authorization: Token <uuid>
         header that identifies a LB user and then load the corresponding user
         object from the database and return it, if succesful. Otherwise raise
-        APIUnauthorized() exception.
+        APIUnauthorized() exception. Users are looked up through the auth cache, so
+        that the submission endpoints do not query the database on every request.
 
     Args:
         optional: If the optional flag is given, do not raise an exception
@@ -464,7 +451,7 @@ def validate_auth_header(*, optional: bool = False, fetch_email: bool = False):
     except IndexError:
         raise APIUnauthorized("Provided Authorization header is invalid.")
 
-    user = db_user.get_by_token(auth_token, fetch_email=fetch_email)
+    user = auth_cache.get_user_by_token(auth_token, fetch_email=fetch_email)
     if user is None:
         raise APIUnauthorized("Invalid authorization token.")
 
@@ -17,7 +17,7 @@ from werkzeug.exceptions import Unauthorized, NotFound
 import listenbrainz.db.user as db_user
 from listenbrainz.db.exceptions import DatabaseException
 from listenbrainz.webserver.decorators import web_listenstore_needed
-from listenbrainz.webserver import flash
+from listenbrainz.webserver import auth_cache, flash
 from listenbrainz.webserver.timescale_connection import _ts
 from listenbrainz.webserver.redis_connection import _redis
 from listenbrainz.webserver.views.user import delete_user
@@ -185,6 +185,7 @@ def gdpr_notice():
         if request.form.get('gdpr-options') == 'agree':
             try:
                 db_user.agree_to_gdpr(current_user.musicbrainz_id)
+                auth_cache.invalidate_token(current_user.auth_token)
             except DatabaseException as e:
                 flash.error('Could not store agreement to GDPR terms')
             next = request.form.get('next')
@@ -2,7 +2,7 @@ from flask import Blueprint, request, redirect, render_template, url_for, sessio
 from flask_login import login_user, logout_user, login_required
 from listenbrainz.webserver.decorators import web_listenstore_needed, web_musicbrainz_needed
 from listenbrainz.webserver.login import login_forbidden, provider, User
-from listenbrainz.webserver import flash
+from listenbrainz.webserver import auth_cache, flash
 import listenbrainz.db.user as db_user
 import datetime
 
@@ -48,6 +48,7 @@ def musicbrainz_post():
                 flash.warning(no_email_warning + 'to submit listens. ' + blog_link)
 
             db_user.update_last_login(user["musicbrainz_id"])
+            auth_cache.invalidate_token(user["auth_token"])
             login_user(User.from_dbrow(user),
                        remember=True,
                        duration=datetime.timedelta(current_app.config['SESSION_REMEMBER_ME_DURATION']))
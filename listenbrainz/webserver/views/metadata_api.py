@@ -5,7 +5,6 @@ from listenbrainz.db.mbid_manual_mapping import create_mbid_manual_mapping, get_
 from listenbrainz.db.metadata import get_metadata_for_recording
 from listenbrainz.db.model.mbid_manual_mapping import MbidManualMapping
 from listenbrainz.labs_api.labs.api.artist_credit_recording_lookup import ArtistCreditRecordingLookupQuery
-from listenbrainz.mbid_mapping_writer.mbid_mapper_metadata_api import MBIDMapperMetadataAPI
 from listenbrainz.webserver.decorators import crossdomain
 from listenbrainz.webserver.errors import APIBadRequest
 from listenbrainz.webserver.utils import parse_boolean_arg
@@ -147,6 +146,9 @@ def get_mbid_mapping():
     if exact_results:
         return process_results(exact_results[0], metadata, incs)
 
+    # imported here because the fuzzy matching libraries it uses slow down app startup
+    from listenbrainz.mbid_mapping_writer.mbid_mapper_metadata_api import MBIDMapperMetadataAPI
+
     q = MBIDMapperMetadataAPI(timeout=10, remove_stop_words=True, debug=False)
     fuzzy_result = q.search(artist_name, recording_name)
     if fuzzy_result:
@@ -8,9 +8,7 @@ from psycopg2.extras import DictCursor
 
 import listenbrainz.db.playlist as db_playlist
 import listenbrainz.db.user as db_user
-from listenbrainz.domain.spotify import SpotifyService, SPOTIFY_PLAYLIST_PERMISSIONS
 from listenbrainz.db.recording import load_recordings_from_mbids_with_redirects
-from listenbrainz.troi.export import export_to_spotify
 
 from listenbrainz.webserver.utils import parse_boolean_arg
 from listenbrainz.webserver.decorators import crossdomain, api_listenstore_needed
@@ -201,11 +199,9 @@ def fetch_playlist_recording_metadata(playlist: Playlist):
         return
 
     try:
-        with psycopg2.connect(current_app.config["MB_DATABASE_URI"]) as mb_conn, \
-            psycopg2.connect(current_app.config["SQLALCHEMY_TIMESCALE_URI"]) as ts_conn, \
-            mb_conn.cursor(cursor_factory=DictCursor) as mb_curs, \
+        with psycopg2.connect(current_app.config["SQLALCHEMY_TIMESCALE_URI"]) as ts_conn, \
             ts_conn.cursor(cursor_factory=DictCursor) as ts_curs:
-                rows = load_recordings_from_mbids_with_redirects(mb_curs, ts_curs, mbids)
+                rows = load_recordings_from_mbids_with_redirects(ts_curs, mbids)
     except Exception:
         current_app.logger.error("Error while fetching metadata for a playlist: ", exc_info=True)
         raise APIInternalServerError("Failed to fetch metadata for a playlist. Please try again.")
@@ -715,6 +711,10 @@ def export_playlist(playlist_mbid, service):
     if service != "spotify":
         raise APIBadRequest(f"Service {service} is not supported. We currently only support 'spotify'.")
 
+    # spotipy and troi are only needed to export playlists, importing them at the top slows down app startup
+    from listenbrainz.domain.spotify import SpotifyService, SPOTIFY_PLAYLIST_PERMISSIONS
+    from listenbrainz.troi.export import export_to_spotify
+
     spotify_service = SpotifyService()
     token = spotify_service.get_user(user["id"], refresh=True)
     if not token:
@@ -1,5 +1,4 @@
 from datetime import datetime
-from time import time
 
 import orjson
 from flask import Blueprint, Response, render_template, request, url_for, \
@@ -17,7 +16,7 @@ from listenbrainz.db.exceptions import DatabaseException
 from listenbrainz.domain.critiquebrainz import CritiqueBrainzService, CRITIQUEBRAINZ_SCOPES
 from listenbrainz.domain.external_service import ExternalService, ExternalServiceInvalidGrantError
 from listenbrainz.domain.spotify import SpotifyService, SPOTIFY_LISTEN_PERMISSIONS, SPOTIFY_IMPORT_PERMISSIONS
-from listenbrainz.webserver import flash
+from listenbrainz.webserver import flash, auth_cache
 from listenbrainz.webserver import timescale_connection
 from listenbrainz.webserver.decorators import web_listenstore_needed
 from listenbrainz.webserver.errors import APIServiceUnavailable, APINotFound
@@ -37,6 +36,7 @@ def reset_token():
     if form.validate_on_submit():
         try:
             db_user.update_token(current_user.id)
+            auth_cache.invalidate_token(current_user.auth_token)
             flash.info("Access token reset")
         except DatabaseException:
             flash.error("Something went wrong! Unable to reset token right now.")
@@ -150,41 +150,14 @@ def import_data():
     )
 
 
-def fetch_listens(musicbrainz_id, to_ts):
-    """
-    Fetch all listens for the user from listenstore by making repeated queries
-    to listenstore until we get all the data. Returns a generator that streams
-    the results.
-    """
-    while True:
-        batch, _, _ = timescale_connection._ts.fetch_listens(current_user.to_dict(), to_ts=to_ts, limit=EXPORT_FETCH_COUNT)
-        if not batch:
-            break
-        yield from batch
-        to_ts = batch[-1].ts_since_epoch  # new to_ts will be the the timestamp of the last listen fetched
-
-
-def fetch_feedback(user_id):
-    """
-    Fetch feedback by making repeated queries to DB until we get all the data.
-    Returns a generator that streams the results.
-    """
-    batch = []
-    offset = 0
-    while True:
-        batch = db_feedback.get_feedback_for_user(user_id=current_user.id, limit=EXPORT_FETCH_COUNT, offset=offset)
-        if not batch:
-            break
-        yield from batch
-        offset += len(batch)
-
-
 def stream_json_array(elements):
-    """ Return a generator of string fragments of the elements encoded as array. """
+    """ Return a generator of bytes fragments of the already json encoded elements encoded as array. """
+    yield b'['
     for i, element in enumerate(elements):
-        yield '[' if i == 0 else ','
-        yield orjson.dumps(element).decode("utf-8")
-    yield ']'
+        if i != 0:
+            yield b','
+        yield element
+    yield b']'
 
 
 @profile_bp.route("/export/", methods=["GET", "POST"])
@@ -198,9 +171,8 @@ def export_data():
         # Build a generator that streams the json response. We never load all
         # listens into memory at once, and we can start serving the response
         # immediately.
-        to_ts = int(time())
-        listens = fetch_listens(current_user.musicbrainz_id, to_ts)
-        output = stream_json_array(listen.to_api() for listen in listens)
+        listens = timescale_connection._ts.iter_listens_for_export(current_user.to_dict(), EXPORT_FETCH_COUNT)
+        output = stream_json_array(listens)
 
         response = Response(stream_with_context(output))
         response.headers["Content-Disposition"] = "attachment; filename=" + filename
@@ -220,8 +192,8 @@ def export_feedback():
     # Build a generator that streams the json response. We never load all
     # feedback into memory at once, and we can start serving the response
     # immediately.
-    feedback = fetch_feedback(current_user.id)
-    output = stream_json_array(fb.to_api() for fb in feedback)
+    feedback = db_feedback.iter_feedback_for_export(current_user.id, current_user.musicbrainz_id, EXPORT_FETCH_COUNT)
+    output = stream_json_array(feedback)
 
     response = Response(stream_with_context(output))
     response.headers["Content-Disposition"] = "attachment; filename=" + filename
@@ -101,7 +101,7 @@ def follow_user(user_name: str):
     if user["musicbrainz_id"] == current_user["musicbrainz_id"]:
         raise APIBadRequest("Whoops, cannot follow yourself.")
 
-    if db_user_relationship.is_following_user(current_user["id"], user["id"]):
+    if db_user_relationship.is_following(current_user["id"], user["id"]):
         raise APIBadRequest("%s is already following user %s" % (current_user["musicbrainz_id"], user["musicbrainz_id"]))
 
     try:
@@ -1,23 +1,24 @@
 import calendar
-from collections import defaultdict
-from datetime import datetime
-from typing import Dict, List, Tuple, Iterable
+from datetime import datetime, date, time, timezone
+from typing import Dict, List, Optional, Tuple
+
+from dateutil.relativedelta import relativedelta, MO
 
 from requests import HTTPError
 
 import listenbrainz.db.stats as db_stats
 import listenbrainz.db.user as db_user
-import pycountry
 import requests
 
 from data.model.common_stat import StatApi, StatisticsRange, StatRecordList
-from data.model.user_artist_map import UserArtistMapRecord, UserArtistMapArtist
+from data.model.user_artist_map import UserArtistMapRecord
 from flask import Blueprint, current_app, jsonify, request
 
 from data.model.user_daily_activity import DailyActivityRecord
 from data.model.user_entity import EntityRecord
 from data.model.user_listening_activity import ListeningActivityRecord
-from listenbrainz.db import year_in_music as db_year_in_music
+from listenbrainz.db import year_in_music as db_year_in_music, artist_map as db_artist_map
+from listenbrainz.webserver import timescale_connection
 from listenbrainz.webserver.decorators import crossdomain
 from listenbrainz.webserver.errors import (APIBadRequest,
                                            APIInternalServerError,
@@ -30,6 +31,22 @@ from listenbrainz.webserver.views.api_tools import (DEFAULT_ITEMS_PER_GET,
 
 stats_api_bp = Blueprint('stats_api_v1', __name__)
 
+#: The year from which all time listening activity is counted, same as LAST_FM_FOUNDING_YEAR in spark
+LAST_FM_FOUNDING_YEAR = 2002
+
+#: The period of each entry of the listening activity of a stats range and the format of its time_range
+LISTENING_ACTIVITY_PERIODS = {
+    "week": ("day", "%A %d %B %Y"),
+    "this_week": ("day", "%A %d %B %Y"),
+    "month": ("day", "%d %B %Y"),
+    "this_month": ("day", "%d %B %Y"),
+    "quarter": ("day", "%d %B %Y"),
+    "half_yearly": ("month", "%B %Y"),
+    "year": ("month", "%B %Y"),
+    "this_year": ("month", "%B %Y"),
+    "all_time": ("year", "%Y"),
+}
+
 
 @stats_api_bp.route("/user/<user_name>/artists")
 @crossdomain
@@ -304,12 +321,14 @@ def get_listening_activity(user_name: str):
           is calculated for the current as well as the past week.
         - For ``all_time`` listening activity statistics we only return the years which have more than
           zero listens.
+        - If the statistics for the user haven't been calculated yet, the listening activity is counted
+          from the user's listens stored in the listenstore instead.
 
     :param range: Optional, time interval for which statistics should be returned, possible values are
         :data:`~data.model.common_stat.ALLOWED_STATISTICS_RANGE`, defaults to ``all_time``
     :type range: ``str``
     :statuscode 200: Successful query, you have data!
-    :statuscode 204: Statistics for the user haven't been calculated, empty response will be returned
+    :statuscode 204: The user has no listens in the time range, empty response will be returned
     :statuscode 400: Bad request, check ``response['error']`` for more details
     :statuscode 404: User not found
     :resheader Content-Type: *application/json*
@@ -319,7 +338,12 @@ def get_listening_activity(user_name: str):
 
     stats = db_stats.get(user["id"], "listening_activity", stats_range, ListeningActivityRecord)
     if stats is None:
-        raise APINoContent('')
+        # statistics not calculated by spark yet, for example of new users, count from the daily listen counts
+        payload = _get_listening_activity_from_listen_counts(user["id"], stats_range)
+        if payload is None:
+            raise APINoContent('')
+        payload["user_id"] = user_name
+        return jsonify({"payload": payload})
 
     listening_activity = [x.dict() for x in stats.data.__root__]
     return jsonify({"payload": {
@@ -854,40 +878,48 @@ def _get_artist_map_stats(user_id, stats_range):
         raise APIBadRequest("Invalid value of force_recalculate: {}".format(recalculate_param))
     force_recalculate = recalculate_param.lower() == 'true'
 
-    stats = None
-    if not force_recalculate:
-        stats = db_stats.get(user_id, "artistmap", stats_range, UserArtistMapRecord)
+    if force_recalculate:
+        return _calculate_artist_map_stats(user_id, stats_range)
 
-    if stats is None:
-        artist_stats = db_stats.get(user_id, "artists", stats_range, EntityRecord)
-        if artist_stats is None:
-            raise APINoContent('')
+    def fetch():
+        return db_stats.get(user_id, "artistmap", stats_range, UserArtistMapRecord)
 
-        # Calculate the data
-        artist_mbid_counts = defaultdict(int)
-        for artist in artist_stats.data.__root__:
-            if artist.artist_mbid:
-                artist_mbid_counts[artist.artist_mbid] += artist.listen_count
-
-        country_code_data = _get_country_wise_counts(artist_mbid_counts)
-
-        try:
-            db_stats.insert_artist_map(user_id, stats_range, artist_stats.from_ts, artist_stats.to_ts, country_code_data)
-        except HTTPError as e:
-            current_app.logger.error(f"{e}. Response: %s", e.response.json(), exc_info=True)
-
-        stats = StatApi[UserArtistMapRecord](
-            user_id=user_id,
-            from_ts=artist_stats.from_ts,
-            to_ts=artist_stats.to_ts,
-            stats_range=stats_range,
-            data=StatRecordList[UserArtistMapRecord](__root__=country_code_data),
-            last_updated=int(datetime.now().timestamp())
+    # artist maps are usually calculated when artist stats are imported, only calculate the missing ones here.
+    # concurrent requests for the same artist map wait for the first one instead of calculating it again.
+    stats = fetch()
+    if stats is None:
+        stats = db_artist_map.coalesce(
+            f"{user_id}.{stats_range}",
+            fetch,
+            lambda: _calculate_artist_map_stats(user_id, stats_range)
         )
-
     return stats
 
 
+def _calculate_artist_map_stats(user_id, stats_range):
+    """ Calculate the artist map from the user's artist stats and store it """
+    artist_stats = db_stats.get(user_id, "artists", stats_range, EntityRecord)
+    if artist_stats is None:
+        raise APINoContent('')
+
+    artist_mbid_counts = db_artist_map.get_artist_mbid_counts(x.dict() for x in artist_stats.data.__root__)
+    country_code_data = _get_country_wise_counts(artist_mbid_counts)
+
+    try:
+        db_stats.insert_artist_map(user_id, stats_range, artist_stats.from_ts, artist_stats.to_ts, country_code_data)
+    except HTTPError as e:
+        current_app.logger.error(f"{e}. Response: %s", e.response.json(), exc_info=True)
+
+    return StatApi[UserArtistMapRecord](
+        user_id=user_id,
+        from_ts=artist_stats.from_ts,
+        to_ts=artist_stats.to_ts,
+        stats_range=stats_range,
+        data=StatRecordList[UserArtistMapRecord](__root__=country_code_data),
+        last_updated=int(datetime.now().timestamp())
+    )
+
+
 @stats_api_bp.route("/user/<user_name>/year-in-music")
 @stats_api_bp.route("/user/<user_name>/year-in-music/<int:year>")
 def year_in_music(user_name: str, year: int = 2022):
@@ -929,6 +961,76 @@ def _process_user_entity(stats: StatApi[EntityRecord], offset: int, count: int)
     return entity_list, total_entity_count
 
 
+def _get_listening_activity_bounds(stats_range: str, today: date) -> Tuple[datetime, datetime]:
+    """ Returns the start and the end of the time range of the listening activity of the given stats range,
+    the same ranges as the ones of the listening activity calculated in spark. """
+    if stats_range == "all_time":
+        return datetime(LAST_FM_FOUNDING_YEAR, 1, 1), datetime.combine(today + relativedelta(days=+1), time.min)
+
+    if stats_range.startswith("this"):
+        if stats_range == "this_month":
+            from_offset = relativedelta(months=-2) if today.day == 1 else relativedelta(months=-1, day=1)
+        elif stats_range == "this_week":
+            from_offset = relativedelta(weeks=-1, days=-1, weekday=MO(-1))
+        elif today.day == 1 and today.month == 1:
+            from_offset = relativedelta(years=-2)
+        else:
+            from_offset = relativedelta(years=-1, month=1, day=1)
+        return datetime.combine(today + from_offset, time.min), datetime.combine(today, time.min)
+
+    from_offset, to_offset = {
+        "week": (relativedelta(weeks=-2, weekday=MO(-1)), relativedelta(weeks=+2)),
+        "month": (relativedelta(months=-2, day=1), relativedelta(months=+2)),
+        "quarter": (_get_two_quarters_ago_offset(today), relativedelta(months=+6)),
+        "half_yearly": (relativedelta(years=-1, month=1 if today.month <= 6 else 7, day=1), relativedelta(months=+12)),
+        "year": (relativedelta(years=-2, month=1, day=1), relativedelta(years=+2)),
+    }[stats_range]
+    from_date = today + from_offset
+    return datetime.combine(from_date, time.min), datetime.combine(from_date + to_offset, time.min)
+
+
+def _get_two_quarters_ago_offset(today: date) -> relativedelta:
+    """ Returns the offset to the start of the quarter before the previous one """
+    if today.month <= 3:
+        return relativedelta(years=-1, month=7, day=1)
+    elif today.month <= 6:
+        return relativedelta(years=-1, month=10, day=1)
+    elif today.month <= 9:
+        return relativedelta(month=1, day=1)
+    else:
+        return relativedelta(month=4, day=1)
+
+
+def _get_listening_activity_from_listen_counts(user_id: int, stats_range: str) -> Optional[Dict]:
+    """ Calculate the listening activity of the user in the given stats range from the daily listen counts
+    in timescale instead of spark. Returns None if the user has no listens in the range. """
+    period, date_format = LISTENING_ACTIVITY_PERIODS[stats_range]
+    from_date, to_date = _get_listening_activity_bounds(stats_range, datetime.now(timezone.utc).date())
+    from_ts = int(from_date.replace(tzinfo=timezone.utc).timestamp())
+    to_ts = int(to_date.replace(tzinfo=timezone.utc).timestamp())
+
+    counts = timescale_connection._ts.get_listen_counts_by_period(user_id, from_ts, to_ts, period)
+    if not any(count["listen_count"] for count in counts):
+        return None
+    if stats_range == "all_time":
+        # like the statistics calculated in spark, only the years with listens are returned
+        counts = [count for count in counts if count["listen_count"]]
+
+    listening_activity = [{
+        "from_ts": count["from_ts"],
+        "to_ts": count["to_ts"] - 1,
+        "time_range": datetime.fromtimestamp(count["from_ts"], timezone.utc).strftime(date_format),
+        "listen_count": count["listen_count"]
+    } for count in counts]
+    return {
+        "listening_activity": listening_activity,
+        "from_ts": from_ts,
+        "to_ts": to_ts,
+        "range": stats_range,
+        "last_updated": int(datetime.now().timestamp())
+    }
+
+
 def _validate_stats_user_params(user_name) -> Tuple[Dict, str]:
     """ Validate and return the user and common stats params """
     user = db_user.get_by_mb_id(user_name)
@@ -956,62 +1058,13 @@ def _is_valid_range(stats_range: str) -> bool:
 def _get_country_wise_counts(artist_mbids: Dict[str, int]) -> List[UserArtistMapRecord]:
     """ Get country wise listen counts and artist lists from dict of given artist_mbids and listen counts
     """
-    # Get artist_origin_countries from artist_credit_ids
-    artist_country_codes = _get_country_code_from_mbids(artist_mbids.keys())
-
-    # Map country codes to appropriate MBIDs and listen counts
-    result = defaultdict(lambda: {
-        "artist_count": 0,
-        "listen_count": 0,
-        "artists": []
-    })
-    for artist_mbid, listen_count in artist_mbids.items():
-        if artist_mbid in artist_country_codes:
-            # TODO: add a test to handle the case where pycountry doesn't recognize the country
-            country_alpha_3 = pycountry.countries.get(alpha_2=artist_country_codes[artist_mbid]["country_code"])
-            if country_alpha_3 is None:
-                continue
-            result[country_alpha_3.alpha_3]["artist_count"] += 1
-            result[country_alpha_3.alpha_3]["listen_count"] += listen_count
-            result[country_alpha_3.alpha_3]["artists"].append(
-                UserArtistMapArtist(
-                    artist_mbid=artist_mbid,
-                    # we use the artist name from the country code endpoint because the
-                    # other artist name we have in stats is actually artist credit name where
-                    # this artist name is the actual artist name associated with the mbid
-                    artist_name=artist_country_codes[artist_mbid]["artist_name"],
-                    listen_count=listen_count
-                )
-            )
-
-    artist_map_data = []
-    for country, data in result.items():
-        # sort artists within each country based on descending order of listen counts
-        data["artists"].sort(key=lambda x: x.listen_count, reverse=True)
-        artist_map_data.append(UserArtistMapRecord(country=country, **data))
-    return artist_map_data
-
-
-def _get_country_code_from_mbids(artist_mbids: Iterable[str]) -> Dict[str, Dict]:
-    """ Get a list of artist_country_code corresponding to the input artist_mbids
-    """
-    request_data = [{"artist_mbid": artist_mbid} for artist_mbid in artist_mbids]
-    artist_country_code = {}
-    if len(request_data) > 0:
-        try:
-            result = requests.post(
-                f"{current_app.config['LISTENBRAINZ_LABS_API_URL']}/artist-country-code-from-artist-mbid/json",
-                json=request_data,
-                params={"count": len(request_data)}
-            )
-            # Raise error if non 200 response is received
-            result.raise_for_status()
-            data = result.json()
-            artist_country_code = {entry["artist_mbid"]: entry for entry in data}
-        except requests.RequestException as err:
-            current_app.logger.error("Error while getting artist_artist_country_code, {}".format(err), exc_info=True)
-            error_msg = ("An error occurred while calculating artist_map data, "
-                         "try setting 'force_recalculate' to 'false' to get a cached copy if available"
-                         "Payload: {}. Response: {}".format(request_data, result.text))
-            raise APIInternalServerError(error_msg)
-    return artist_country_code
+    try:
+        artist_country_codes = db_artist_map.get_artist_country_codes(artist_mbids.keys())
+    except requests.RequestException as err:
+        current_app.logger.error("Error while getting artist_artist_country_code, {}".format(err), exc_info=True)
+        error_msg = ("An error occurred while calculating artist_map data, "
+                     "try setting 'force_recalculate' to 'false' to get a cached copy if available"
+                     "Payload: {}. Response: {}".format(
+                         list(artist_mbids.keys()), err.response.text if err.response is not None else None))
+        raise APIInternalServerError(error_msg)
+    return db_artist_map.get_country_wise_counts(artist_mbids, artist_country_codes)
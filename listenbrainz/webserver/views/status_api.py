@@ -1,3 +1,4 @@
+from brainzutils import cache
 from flask import Blueprint, request, jsonify
 from listenbrainz.webserver.errors import APIBadRequest, APINotFound
 from brainzutils.ratelimit import ratelimit
@@ -6,6 +7,9 @@ import listenbrainz.db.dump as db_dump
 
 status_api_bp = Blueprint("status_api_v1", __name__)
 
+# the cached response for the latest dump is also removed when a dump is created
+LATEST_DUMP_INFO_CACHE_EXPIRY = 60 * 60  # 1 hour
+
 
 @status_api_bp.route("/get-dump-info", methods=["GET"])
 @ratelimit()
@@ -25,18 +29,24 @@ def get_dump_info():
         }
 
     :query id: Integer specifying the ID of the dump, if not provided, the endpoint returns information about the latest data dump.
+    :query type: Optional, ``full`` or ``incremental``. If no ID is provided, the endpoint returns information
+        about the latest data dump of this type.
+    :reqheader If-None-Match: The ETag of a previous response, if the dump information has not changed since
+        then the endpoint responds with status 304 and no data.
     :statuscode 200: You have data.
-    :statuscode 400: You did not provide a valid dump ID. See error message for details.
+    :statuscode 304: The dump information has not changed since the response with the ETag in If-None-Match.
+    :statuscode 400: You did not provide a valid dump ID or type. See error message for details.
     :statuscode 404: Dump with given ID does not exist.
     :resheader Content-Type: *application/json*
+    :resheader ETag: An identifier of the returned dump information.
     """
 
     dump_id = request.args.get("id")
     if dump_id is None:
-        try:
-            dump = db_dump.get_dump_entries()[0] # return the latest dump
-        except IndexError:
-            raise APINotFound("No dump entry exists.")
+        dump_type = request.args.get("type")
+        if dump_type is not None and dump_type not in db_dump.DUMP_TYPES:
+            raise APIBadRequest("The `type` parameter must be one of: %s." % ", ".join(db_dump.DUMP_TYPES))
+        dump_info = _get_latest_dump_info(dump_type)
     else:
         try:
             dump_id = int(dump_id)
@@ -45,11 +55,32 @@ def get_dump_info():
         dump = db_dump.get_dump_entry(dump_id)
         if dump is None:
             raise APINotFound("No dump exists with ID: %d" % dump_id)
+        dump_info = _get_dump_info(dump)
+
+    response = jsonify(dump_info)
+    response.set_etag("%d-%s" % (dump_info["id"], dump_info["timestamp"]))
+    return response.make_conditional(request)
+
+
+def _get_latest_dump_info(dump_type):
+    """ Get the information about the latest dump of the given type, or of any type if dump_type is None,
+    from the cache or the database. """
+    cache_key = db_dump.LATEST_DUMP_INFO_CACHE_KEY % (dump_type or "all")
+    dump_info = cache.get(cache_key)
+    if dump_info is None:
+        dump = db_dump.get_latest_dump_entry(dump_type)
+        if dump is None:
+            raise APINotFound("No dump entry exists.")
+        dump_info = _get_dump_info(dump)
+        cache.set(cache_key, dump_info, LATEST_DUMP_INFO_CACHE_EXPIRY)
+    return dump_info
+
 
-    return jsonify({
+def _get_dump_info(dump):
+    return {
         "id": dump["id"],
         "timestamp": _convert_timestamp_to_string_dump_format(dump["created"]),
-    })
+    }
 
 
 def _convert_timestamp_to_string_dump_format(timestamp):
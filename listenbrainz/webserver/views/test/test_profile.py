@@ -1,5 +1,6 @@
 import requests_mock
 
+import listenbrainz.db.feedback as db_feedback
 import listenbrainz.db.user as db_user
 import time
 import orjson
@@ -205,8 +206,8 @@ class ProfileViewsTestCase(IntegrationTestCase):
 
         self.assertEqual(response.json, {'code': 404, 'error': 'User has revoked authorization to Spotify'})
 
-    @patch('listenbrainz.listenstore.timescale_listenstore.TimescaleListenStore.fetch_listens')
-    def test_export_streaming(self, mock_fetch_listens):
+    @patch('listenbrainz.listenstore.timescale_listenstore.TimescaleListenStore.iter_listens_for_export')
+    def test_export_streaming(self, mock_iter_listens):
         self.temporary_login(self.user['login_id'])
 
         # Three example listens, with only basic data for the purpose of this test.
@@ -241,9 +242,7 @@ class ProfileViewsTestCase(IntegrationTestCase):
             ),
         ]
 
-        # We expect three calls to fetch_listens, and we return two, one, and
-        # zero listens in the batch. This tests that we fetch all batches.
-        mock_fetch_listens.side_effect = [(listens[0:2], 0, 0), (listens[2:3], 0, 0), ([], 0, 0)]
+        mock_iter_listens.return_value = (orjson.dumps(listen.to_api()) for listen in listens)
 
         r = self.client.post(url_for('profile.export_data'))
         self.assert200(r)
@@ -285,8 +284,7 @@ class ProfileViewsTestCase(IntegrationTestCase):
             },
         })
 
-    @patch('listenbrainz.db.feedback.get_feedback_for_user')
-    def test_export_feedback_streaming(self, mock_fetch_feedback):
+    def test_export_feedback_streaming(self):
         self.temporary_login(self.user['login_id'])
 
         # Three example feedback, with only basic data for the purpose of this test.
@@ -294,54 +292,45 @@ class ProfileViewsTestCase(IntegrationTestCase):
             Feedback(
                 recording_msid='6c617681-281e-4dae-af59-8e00f93c4376',
                 score=1,
-                user_id=1,
+                user_id=self.user['id'],
             ),
             Feedback(
                 recording_msid='7ad53fd7-5b40-4e13-b680-52716fb86d5f',
                 score=1,
-                user_id=1,
+                user_id=self.user['id'],
             ),
             Feedback(
-                recording_msid='7816411a-2cc6-4e43-b7a1-60ad093c2c31',
+                recording_mbid='7816411a-2cc6-4e43-b7a1-60ad093c2c31',
                 score=-1,
-                user_id=1,
+                user_id=self.user['id'],
             ),
         ]
-
-        # We expect three calls to get_feedback_for_user, and we return two, one, and
-        # zero feedback in the batch. This tests that we fetch all batches.
-        mock_fetch_feedback.side_effect = [feedback[0:2], feedback[2:3], []]
+        for fb in feedback:
+            db_feedback.insert(fb)
 
         r = self.client.post(url_for('profile.export_feedback'))
         self.assert200(r)
 
         # r.json returns None, so we decode the response manually.
         results = orjson.loads(r.data)
-
-        self.assertDictEqual(results[0], {
-            'recording_mbid': None,
-            'recording_msid': '6c617681-281e-4dae-af59-8e00f93c4376',
-            'score': 1,
-            'user_id': None,
-            'created': None,
-            'track_metadata': None,
-        })
-        self.assertDictEqual(results[1], {
-            'recording_mbid': None,
-            'recording_msid': '7ad53fd7-5b40-4e13-b680-52716fb86d5f',
-            'score': 1,
-            'user_id': None,
-            'created': None,
-            'track_metadata': None,
-        })
-        self.assertDictEqual(results[2], {
-            'recording_mbid': None,
-            'recording_msid': '7816411a-2cc6-4e43-b7a1-60ad093c2c31',
-            'score': -1,
-            'user_id': None,
-            'created': None,
-            'track_metadata': None,
-        })
+        self.assertEqual(len(results), 3)
+
+        # the feedback is exported in descending order of creation
+        for result, fb in zip(results, reversed(feedback)):
+            self.assertIsInstance(result.pop('created'), int)
+            self.assertDictEqual(result, {
+                'recording_mbid': fb.recording_mbid,
+                'recording_msid': fb.recording_msid,
+                'score': fb.score,
+                'user_id': self.user['musicbrainz_id'],
+                'track_metadata': None,
+            })
+
+    def test_export_feedback_streaming_empty(self):
+        self.temporary_login(self.user['login_id'])
+        r = self.client.post(url_for('profile.export_feedback'))
+        self.assert200(r)
+        self.assertEqual(orjson.loads(r.data), [])
 
     def test_export_feedback_streaming_not_logged_in(self):
         export_feedback_url = url_for('profile.export_feedback')
@@ -33,3 +33,42 @@ class StatusViewsTestCase(IntegrationTestCase):
     def test_dump_get_400(self):
         r = self.client.get("/1/status/get-dump-info", query_string={"id": "pqrs"})
         self.assert400(r)
+
+    def test_dump_get_type(self):
+        t0 = datetime.now()
+        full_dump_id = db_dump.add_dump_entry(int(t0.strftime("%s")), "full")
+        t1 = t0 + timedelta(seconds=1)
+        incremental_dump_id = db_dump.add_dump_entry(int(t1.strftime("%s")), "incremental")
+
+        r = self.client.get("/1/status/get-dump-info", query_string={"type": "full"})
+        self.assert200(r)
+        self.assertDictEqual(r.json, {
+            "id": full_dump_id,
+            "timestamp": t0.strftime("%Y%m%d-%H%M%S"),
+        })
+
+        r = self.client.get("/1/status/get-dump-info", query_string={"type": "incremental"})
+        self.assert200(r)
+        self.assertEqual(r.json["id"], incremental_dump_id)
+
+        r = self.client.get("/1/status/get-dump-info", query_string={"type": "partial"})
+        self.assert400(r)
+
+    def test_dump_get_not_modified(self):
+        t0 = datetime.now()
+        db_dump.add_dump_entry(int(t0.strftime("%s")), "full")
+        r = self.client.get("/1/status/get-dump-info")
+        self.assert200(r)
+        etag = r.headers["ETag"]
+
+        r = self.client.get("/1/status/get-dump-info", headers={"If-None-Match": etag})
+        self.assertEqual(r.status_code, 304)
+
+        # a new dump invalidates the cached latest dump and changes the etag
+        t1 = t0 + timedelta(seconds=1)
+        dump_id = db_dump.add_dump_entry(int(t1.strftime("%s")), "incremental")
+        db_dump.invalidate_latest_dump_info()
+        r = self.client.get("/1/status/get-dump-info", headers={"If-None-Match": etag})
+        self.assert200(r)
+        self.assertEqual(r.json["id"], dump_id)
+        self.assertNotEqual(r.headers["ETag"], etag)
@@ -142,8 +142,8 @@ class UserViewsTestCase(IntegrationTestCase):
             'permission': ['user-read-recently-played', 'streaming'],
         })
 
-    @mock.patch('listenbrainz.webserver.views.user.db_user_relationship.is_following_user')
-    def test_logged_in_user_follows_user_props(self, mock_is_following_user):
+    @mock.patch('listenbrainz.webserver.views.user.db_user_relationship.is_following')
+    def test_logged_in_user_follows_user_props(self, mock_is_following):
         response = self.client.get(url_for('user.profile', user_name=self.user.musicbrainz_id))
         self.assert200(response)
         self.assertTemplateUsed('user/profile.html')
@@ -151,7 +151,7 @@ class UserViewsTestCase(IntegrationTestCase):
         self.assertIsNone(props['logged_in_user_follows_user'])
 
         self.temporary_login(self.user.login_id)
-        mock_is_following_user.return_value = False
+        mock_is_following.return_value = False
         response = self.client.get(url_for('user.profile', user_name=self.user.musicbrainz_id))
         self.assert200(response)
         props = orjson.loads(self.get_context_variable('props'))
@@ -269,7 +269,7 @@ class UserViewsTestCase(IntegrationTestCase):
         with timescale.engine.begin() as connection:
             connection.execute(text("""
                 INSERT INTO mapping.mb_metadata_cache
-                                   (recording_mbid, artist_mbids, release_mbid, recording_data, artist_data, tag_data, release_data, dirty)
+                                   (recording_mbid, artist_mbids, release_mbid, recording_data, artist_data, tag_data, release_data, dirty, artist_credit_names, artist_credit_join_phrases)
                     VALUES ('1fe669c9-5a2b-4dcb-9e95-77480d1e732e'
                           , '{5b24fbab-c58f-4c37-a59d-ab232e2d98c4}'::UUID[]
                           , '607cc05a-e462-4f39-91b5-e9322544e0a6'
@@ -278,6 +278,8 @@ class UserViewsTestCase(IntegrationTestCase):
                           , '{"artist": [], "recording": [], "release_group": []}'
                           , '{"mbid": "607cc05a-e462-4f39-91b5-e9322544e0a6", "name": "Danny Elfman & Tim Burton 25th Anniversary Music Box", "year": 2011}'
                           , 'f'
+                          , '{"Danny Elfman"}'
+                          , '{""}'
                            );
 
                 INSERT INTO mbid_mapping (recording_msid, recording_mbid, match_type)
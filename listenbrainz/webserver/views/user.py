@@ -16,7 +16,7 @@ from listenbrainz.db.pinned_recording import get_current_pin_for_user, get_pin_c
 from listenbrainz.db.feedback import get_feedback_count_for_user, get_feedback_for_user
 from listenbrainz.db import year_in_music as db_year_in_music
 from listenbrainz.webserver.decorators import web_listenstore_needed
-from listenbrainz.webserver import timescale_connection
+from listenbrainz.webserver import timescale_connection, auth_cache
 from listenbrainz.webserver.errors import APIBadRequest
 from listenbrainz.webserver.login import User, api_login_required
 from listenbrainz.webserver import timescale_connection
@@ -333,8 +333,16 @@ def delete_user(user_id: int):
     Args:
         user_id: the LB row ID of the user
     """
+    user = db_user.get(user_id)
+    # the relationships of the user are deleted along with the user, so find the users whose
+    # cached followers or following include the user first
+    followers = db_user_relationship.get_follower_ids(user_id)
+    following = db_user_relationship.get_following_ids(user_id)
     timescale_connection._ts.delete(user_id)
     db_user.delete(user_id)
+    if user is not None:
+        auth_cache.invalidate_token(user["auth_token"])
+    db_user_relationship.invalidate_follow_cache(following_of=followers | {user_id}, followers_of=following | {user_id})
 
 
 def delete_listens_history(user_id: int):
@@ -356,7 +364,7 @@ def logged_in_user_follows_user(user):
     """
 
     if current_user.is_authenticated:
-        return db_user_relationship.is_following_user(
+        return db_user_relationship.is_following(
             current_user.id, user.id
         )
     return None
@@ -3,7 +3,6 @@ from brainzutils.ratelimit import ratelimit
 from flask import Blueprint, jsonify, request
 
 import listenbrainz.db.user_setting as db_usersetting
-from listenbrainz.troi.troi_bot import SPOTIFY_EXPORT_PREFERENCE
 from listenbrainz.webserver.decorators import crossdomain
 from listenbrainz.webserver.errors import APIInternalServerError, APIBadRequest
 from listenbrainz.webserver.views.api_tools import (
@@ -58,6 +57,9 @@ def update_troi_prefs():
     :statuscode 401: invalid authorization. See error message for details.
     :resheader Content-Type: *application/json*
     """
+    # imported here because troi_bot imports troi and spotipy which slow down app startup
+    from listenbrainz.troi.troi_bot import SPOTIFY_EXPORT_PREFERENCE
+
     user = validate_auth_header()
     try:
         data = orjson.loads(request.get_data())
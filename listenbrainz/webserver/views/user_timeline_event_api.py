@@ -457,7 +457,7 @@ def hide_user_timeline_event(user_name):
     if not result:
         raise APIBadRequest(f"{data['event_type']} event with id {row_id} not found")
 
-    if db_user_relationship.is_following_user(user['id'], result.user_id):
+    if db_user_relationship.is_following(user['id'], result.user_id):
         db_user_timeline_event.hide_user_timeline_event(user['id'], data["event_type"], data["event_id"])
         return jsonify({"status": "ok"})
     else:
@@ -1,6 +1,8 @@
-import json
 import time
+from collections import defaultdict
 
+import orjson
+from brainzutils import metrics
 from kombu.mixins import ConsumerMixin
 
 from listenbrainz.listen import Listen, NowPlayingListen
@@ -8,6 +10,11 @@ from listenbrainz.utils import get_fallback_connection_name
 
 from kombu import Connection, Exchange, Queue, Consumer
 
+# number of unacknowledged messages rabbitmq delivers to each consumer ahead of the one being processed
+PREFETCH_COUNT = 100
+
+METRIC_UPDATE_INTERVAL = 60  # seconds
+
 
 class ListensDispatcher(ConsumerMixin):
 
@@ -20,28 +27,70 @@ class ListensDispatcher(ConsumerMixin):
         # we create the other channel here. we also need to handle its cleanup later
         self.playing_now_channel = None
 
+        # if True, the listens of a user in a message are sent in one listen_batch event, otherwise one
+        # listen event is sent for each listen.
+        self.batch_listens = app.config.get("WEBSOCKETS_BATCH_LISTENS", True)
+
         self.unique_exchange = Exchange(app.config["UNIQUE_EXCHANGE"], "fanout", durable=False)
         self.playing_now_exchange = Exchange(app.config["PLAYING_NOW_EXCHANGE"], "fanout", durable=False)
         self.websockets_queue = Queue(app.config["WEBSOCKETS_QUEUE"], exchange=self.unique_exchange, durable=True)
         self.playing_now_queue = Queue(app.config["PLAYING_NOW_QUEUE"], exchange=self.playing_now_exchange,
                                        durable=True)
 
+        self.emits = 0
+        self.dispatched_listens = 0
+        self.max_lag = 0
+        self.metric_submission_time = time.monotonic() + METRIC_UPDATE_INTERVAL
+
     def send_listens(self, event_name, message):
-        listens = json.loads(message.body)
-        for data in listens:
-            if event_name == "playing_now":
-                listen = NowPlayingListen(user_id=data["user_id"], user_name=data["user_name"], data=data["track_metadata"])
-            else:
-                listen = Listen.from_json(data)
-            self.socketio.emit(event_name, json.dumps(listen.to_api()), to=listen.user_name)
+        listens = orjson.loads(message.body)
+        if event_name == "playing_now":
+            # only the latest playing now of a user is shown, so the ones before it in the message are skipped
+            latest = {data["user_name"]: data for data in listens}
+            for user_name, data in latest.items():
+                self.emit(event_name, NowPlayingListen.json_to_api(data), user_name)
+        elif self.batch_listens:
+            listens_by_user = defaultdict(list)
+            for data in listens:
+                listens_by_user[data.get("user_name", "")].append(Listen.json_to_api(data))
+            for user_name, user_listens in listens_by_user.items():
+                self.emit("listen_batch", user_listens, user_name)
+        else:
+            for data in listens:
+                self.emit(event_name, Listen.json_to_api(data), data.get("user_name", ""))
         message.ack()
+        self.update_metrics(message, len(listens))
+
+    def emit(self, event_name, payload, user_name):
+        self.socketio.emit(event_name, orjson.dumps(payload).decode("utf-8"), to=user_name)
+        self.emits += 1
+
+    def update_metrics(self, message, listen_count):
+        """ Track the number of emits and listens and the time the messages spent in the queue, and submit
+        the rates and the maximum lag periodically. """
+        self.dispatched_listens += listen_count
+        published_at = message.headers.get("published_at") if message.headers else None
+        if published_at is not None:
+            self.max_lag = max(self.max_lag, time.time() - published_at)
+
+        if time.monotonic() > self.metric_submission_time:
+            self.metric_submission_time += METRIC_UPDATE_INTERVAL
+            emits_per_second = self.emits / METRIC_UPDATE_INTERVAL
+            listens_per_second = self.dispatched_listens / METRIC_UPDATE_INTERVAL
+            self.app.logger.info("Websockets: %.1f emits/s, %.1f listens/s, max lag %.2fs",
+                                 emits_per_second, listens_per_second, self.max_lag)
+            metrics.set("websockets", emits_per_second=emits_per_second, listens_per_second=listens_per_second,
+                        max_lag=self.max_lag)
+            self.emits = 0
+            self.dispatched_listens = 0
+            self.max_lag = 0
 
     def get_consumers(self, _, channel):
         self.playing_now_channel = channel.connection.channel()
         return [
-            Consumer(channel, queues=[self.websockets_queue],
+            Consumer(channel, queues=[self.websockets_queue], prefetch_count=PREFETCH_COUNT,
                      on_message=lambda x: self.send_listens("listen", x)),
-            Consumer(self.playing_now_channel, queues=[self.playing_now_queue],
+            Consumer(self.playing_now_channel, queues=[self.playing_now_queue], prefetch_count=PREFETCH_COUNT,
                      on_message=lambda x: self.send_listens("playing_now", x))
         ]
 
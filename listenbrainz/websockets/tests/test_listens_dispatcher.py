@@ -0,0 +1,84 @@
+import unittest
+from unittest.mock import MagicMock
+
+import orjson
+from flask import Flask
+
+from listenbrainz.listen import Listen
+from listenbrainz.websockets.listens_dispatcher import ListensDispatcher
+
+
+class ListensDispatcherTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(
+            UNIQUE_EXCHANGE="unique",
+            PLAYING_NOW_EXCHANGE="playing_now",
+            WEBSOCKETS_QUEUE="follow_list",
+            PLAYING_NOW_QUEUE="playing_now",
+        )
+        self.socketio = MagicMock()
+
+    def get_listen(self, user_name, ts):
+        return {
+            "user_id": 1,
+            "user_name": user_name,
+            "timestamp": ts,
+            "recording_msid": "db9a7483-a8f4-4a2c-99af-c8ab58850200",
+            "track_metadata": {
+                "artist_name": "Majid Jordan",
+                "track_name": "Every Step Every Way",
+                "additional_info": {"listening_from": "lbtest"}
+            }
+        }
+
+    def get_message(self, listens):
+        message = MagicMock()
+        message.body = orjson.dumps(listens)
+        message.headers = {}
+        return message
+
+    def get_emits(self):
+        return [(call.args[0], orjson.loads(call.args[1]), call.kwargs["to"])
+                for call in self.socketio.emit.call_args_list]
+
+    def test_send_listens_batched(self):
+        listens = [self.get_listen("iliekcomputers", 1), self.get_listen("lucifer", 2),
+                   self.get_listen("iliekcomputers", 3)]
+        message = self.get_message(listens)
+
+        ListensDispatcher(self.app, self.socketio).send_listens("listen", message)
+
+        expected = [Listen.from_json(listen).to_api() for listen in
+                    [self.get_listen("iliekcomputers", 1), self.get_listen("lucifer", 2),
+                     self.get_listen("iliekcomputers", 3)]]
+        self.assertEqual(self.get_emits(), [
+            ("listen_batch", [expected[0], expected[2]], "iliekcomputers"),
+            ("listen_batch", [expected[1]], "lucifer"),
+        ])
+        message.ack.assert_called_once()
+
+    def test_send_listens_per_listen(self):
+        self.app.config["WEBSOCKETS_BATCH_LISTENS"] = False
+        listens = [self.get_listen("iliekcomputers", 1), self.get_listen("iliekcomputers", 3)]
+
+        ListensDispatcher(self.app, self.socketio).send_listens("listen", self.get_message(listens))
+
+        self.assertEqual(self.get_emits(), [
+            ("listen", Listen.from_json(self.get_listen("iliekcomputers", 1)).to_api(), "iliekcomputers"),
+            ("listen", Listen.from_json(self.get_listen("iliekcomputers", 3)).to_api(), "iliekcomputers"),
+        ])
+
+    def test_send_playing_now(self):
+        listens = [self.get_listen("iliekcomputers", 1), self.get_listen("iliekcomputers", 3)]
+
+        ListensDispatcher(self.app, self.socketio).send_listens("playing_now", self.get_message(listens))
+
+        # only the latest playing now of a user is sent
+        emits = self.get_emits()
+        self.assertEqual(len(emits), 1)
+        self.assertEqual(emits[0][0], "playing_now")
+        self.assertEqual(emits[0][1]["track_metadata"]["track_name"], "Every Step Every Way")
+        self.assertTrue(emits[0][1]["playing_now"])
+        self.assertEqual(emits[0][2], "iliekcomputers")
@@ -0,0 +1,82 @@
+""" Benchmark the calculation of user entity stats from the synthetic listens in listenbrainz_spark/testdata.
+
+The stats of all entities are calculated once with a separate read of the listens for each entity and once
+with get_all_entity_stats which reads the listens of the range only once. Uploading the incremental test dump
+several times makes the listens larger so that the cost of reading them is easier to see.
+
+The stats read the listens and the metadata from their usual HDFS paths, so the test data is uploaded there and
+deleted afterwards. The benchmark refuses to run if any of these paths already exists, so that it can only be run
+against an empty test HDFS and never deletes real data.
+"""
+import time
+import uuid
+
+import click
+
+import listenbrainz_spark
+from listenbrainz_spark import hdfs_connection, config
+from listenbrainz_spark.hdfs import upload_to_HDFS, delete_dir
+from listenbrainz_spark.hdfs.upload import ListenbrainzDataUploader
+from listenbrainz_spark.hdfs.utils import path_exists
+from listenbrainz_spark.path import LISTENBRAINZ_NEW_DATA_DIRECTORY, RELEASE_METADATA_CACHE_DATAFRAME, \
+    ARTIST_COUNTRY_CODE_DATAFRAME
+from listenbrainz_spark.stats.user.entity import get_entity_stats, get_all_entity_stats, ALL_ENTITIES
+from listenbrainz_spark.tests import SparkNewTestCase
+
+
+# the paths to which the test data is uploaded and which are deleted after the benchmark
+BENCHMARK_PATHS = [LISTENBRAINZ_NEW_DATA_DIRECTORY, RELEASE_METADATA_CACHE_DATAFRAME, ARTIST_COUNTRY_CODE_DATAFRAME]
+
+
+def check_paths_unused():
+    """ Raise an error if any path used by the benchmark has data, for example on a production cluster """
+    existing = [directory for directory in BENCHMARK_PATHS if path_exists(directory)]
+    if existing:
+        raise click.ClickException("Refusing to run the benchmark, it would overwrite and delete the existing %s. "
+                                   "Run it against an empty test HDFS." % ", ".join(existing))
+
+
+def upload_test_data(copies):
+    uploader = ListenbrainzDataUploader()
+    uploader.upload_new_listens_full_dump(SparkNewTestCase.create_temp_listens_tar("full-dump").name)
+    incremental_dump = SparkNewTestCase.create_temp_listens_tar("incremental-dump-1").name
+    for _ in range(copies):
+        uploader.upload_new_listens_incremental_dump(incremental_dump)
+    upload_to_HDFS(RELEASE_METADATA_CACHE_DATAFRAME, SparkNewTestCase.path_to_data_file("release_data_cache.parquet"))
+    upload_to_HDFS(ARTIST_COUNTRY_CODE_DATAFRAME, SparkNewTestCase.path_to_data_file("artist_country_code.parquet"))
+
+
+def delete_test_data():
+    for directory in BENCHMARK_PATHS:
+        if path_exists(directory):
+            delete_dir(directory, recursive=True)
+
+
+def measure(name, messages):
+    """ Consume all messages and print the time taken and the number of messages """
+    t0 = time.perf_counter()
+    count = sum(1 for _ in messages)
+    duration = time.perf_counter() - t0
+    click.echo("%-45s %9d messages in %8.3fs" % (name, count, duration))
+    return duration
+
+
+def benchmark_entity_stats(stats_range: str, copies: int, iterations: int):
+    """ Compare calculating the user stats of each entity separately with calculating them together """
+    hdfs_connection.init_hdfs(config.HDFS_HTTP_URI)
+    check_paths_unused()
+    listenbrainz_spark.init_test_session(f"benchmark-entity-stats-{uuid.uuid4()}")
+    try:
+        upload_test_data(copies)
+        click.echo("%d listens" % SparkNewTestCase.get_all_test_listens().count())
+        separate, combined = [], []
+        for _ in range(iterations):
+            separate.append(measure(
+                "separate entity stats",
+                (message for entity in ALL_ENTITIES for message in get_entity_stats(entity, stats_range))
+            ))
+            combined.append(measure("all entity stats", get_all_entity_stats(stats_range)))
+        click.echo("best: separate %.3fs, all %.3fs" % (min(separate), min(combined)))
+    finally:
+        delete_test_data()
+        listenbrainz_spark.context.stop()
@@ -2,6 +2,8 @@ import os
 import ftplib
 import hashlib
 import logging
+import threading
+import time
 from enum import Enum
 from typing import NamedTuple
 
@@ -11,6 +13,20 @@ from listenbrainz_spark.exceptions import DumpInvalidException
 
 logger = logging.getLogger(__name__)
 
+#: Number of times an interrupted download is resumed before giving up
+DOWNLOAD_MAX_RETRIES = 5
+
+#: Time in seconds to wait before resuming an interrupted download
+DOWNLOAD_RETRY_DELAY = 10
+
+#: Files smaller than this are never downloaded in segments
+SEGMENTED_DOWNLOAD_MIN_SIZE = 256 * 1024 * 1024
+
+#: Bytes after which the progress of a download is logged
+DOWNLOAD_PROGRESS_INTERVAL = 1024 * 1024 * 1024
+
+DOWNLOAD_BLOCK_SIZE = 1024 * 1024
+
 
 class DumpType(Enum):
     INCREMENTAL = 'incremental'
@@ -45,9 +61,13 @@ class ListenBrainzFTPDownloader:
     def connect(self):
         """ Connect to FTP server.
         """
+        self.connection = self._open_connection()
+
+    def _open_connection(self):
         try:
-            self.connection = ftplib.FTP(config.FTP_SERVER_URI)
-            self.connection.login()
+            connection = ftplib.FTP(config.FTP_SERVER_URI)
+            connection.login()
+            return connection
         except ftplib.error_perm:
             logger.critical("Couldn't connect to FTP Server, try again...")
             raise SystemExit
@@ -84,12 +104,156 @@ class ListenBrainzFTPDownloader:
             except ftplib.error_perm as e:
                 logger.critical("Could not download file: {}".format(str(e)))
 
-    def download_dump(self, filename, directory):
-        """ Download file with `filename` from FTP.
+    def download_file_resumable(self, src, dest, segments=1):
+        """ Download file `src` in the current directory of the FTP server to `dest`, resuming the download from the
+            end of `dest` if it already exists. Interrupted downloads are resumed with the REST command up to
+            DOWNLOAD_MAX_RETRIES times. The SHA256 checksum is calculated while downloading.
+
+            Args:
+                src (str): Name of the file on the FTP server.
+                dest (str): Path to save file locally.
+                segments (int): Number of connections to download the file with, each downloading a separate part
+                    of it. Files smaller than SEGMENTED_DOWNLOAD_MIN_SIZE are always downloaded over one connection.
+
+            Returns:
+                str: the SHA256 checksum of the downloaded file
+        """
+        cwd = self.connection.pwd()
+        self.connection.voidcmd('TYPE I')
+        size = self.connection.size(src)
+
+        if segments > 1 and size >= SEGMENTED_DOWNLOAD_MIN_SIZE:
+            return self._download_segments(cwd, src, dest, size, segments)
+
+        sha = hashlib.sha256()
+        if os.path.exists(dest) and os.path.getsize(dest) <= size:
+            logger.info(f"Resuming download of {src} from byte {os.path.getsize(dest)}")
+            self._update_sha256(sha, dest)
+        else:
+            open(dest, 'wb').close()
+
+        progress = _DownloadProgress(src, size, os.path.getsize(dest))
+        retries = 0
+        while os.path.getsize(dest) < size:
+            offset = os.path.getsize(dest)
+            try:
+                with open(dest, 'ab') as f:
+                    def callback(block):
+                        f.write(block)
+                        sha.update(block)
+                        progress.update(len(block))
+                    self.connection.retrbinary(f'RETR {src}', callback, blocksize=DOWNLOAD_BLOCK_SIZE,
+                                               rest=offset or None)
+                if os.path.getsize(dest) < size:
+                    raise EOFError("transfer completed before the end of the file")
+            except (*ftplib.all_errors, EOFError) as e:
+                retries += 1
+                if retries > DOWNLOAD_MAX_RETRIES:
+                    raise
+                logger.warning(f"Download of {src} interrupted at byte {os.path.getsize(dest)}: {e}. Resuming"
+                               f" in {DOWNLOAD_RETRY_DELAY} sec, attempt {retries} of {DOWNLOAD_MAX_RETRIES}.")
+                time.sleep(DOWNLOAD_RETRY_DELAY)
+                self._reconnect(cwd)
+
+        progress.done()
+        return sha.hexdigest()
+
+    def _reconnect(self, cwd):
+        """ Replace the connection with a new one in the given directory """
+        try:
+            self.connection.close()
+        except ftplib.all_errors:
+            pass
+        self.connect()
+        self.connection.cwd(cwd)
+        self.connection.voidcmd('TYPE I')
+
+    def _download_segment(self, cwd, src, part_path, start, end, progress):
+        """ Download the bytes [start, end) of `src` to `part_path` over a separate connection, resuming from the
+            end of `part_path` if it exists. """
+        retries = 0
+        while True:
+            offset = start + (os.path.getsize(part_path) if os.path.exists(part_path) else 0)
+            if offset >= end:
+                return
+
+            connection = None
+            try:
+                connection = self._open_connection()
+                connection.cwd(cwd)
+                connection.voidcmd('TYPE I')
+                with open(part_path, 'ab') as f, connection.transfercmd(f'RETR {src}', rest=offset) as sock:
+                    remaining = end - offset
+                    while remaining > 0:
+                        block = sock.recv(min(DOWNLOAD_BLOCK_SIZE, remaining))
+                        if not block:
+                            raise EOFError("connection closed before the end of the segment")
+                        f.write(block)
+                        remaining -= len(block)
+                        progress.update(len(block))
+                return
+            except (*ftplib.all_errors, EOFError) as e:
+                retries += 1
+                if retries > DOWNLOAD_MAX_RETRIES:
+                    raise
+                logger.warning(f"Download of {part_path} interrupted: {e}. Resuming in {DOWNLOAD_RETRY_DELAY} sec,"
+                               f" attempt {retries} of {DOWNLOAD_MAX_RETRIES}.")
+                time.sleep(DOWNLOAD_RETRY_DELAY)
+            finally:
+                # the server still sends the rest of the file after the end of the segment, closing the
+                # connection ends that transfer
+                if connection is not None:
+                    connection.close()
+
+    def _download_segments(self, cwd, src, dest, size, segments):
+        """ Download `src` over `segments` connections in parallel and join the parts into `dest`. The parts are
+            kept until they are joined, so that an interrupted download can be resumed. """
+        logger.info(f"Downloading {src} in {segments} segments")
+        segment_size = -(-size // segments)
+        parts = []
+        for i in range(segments):
+            start = i * segment_size
+            end = min(size, start + segment_size)
+            parts.append((f"{dest}.part{i}", start, end))
+
+        already_downloaded = sum(os.path.getsize(path) for path, _, _ in parts if os.path.exists(path))
+        progress = _DownloadProgress(src, size, already_downloaded)
+        errors = []
+
+        def download(part_path, start, end):
+            try:
+                self._download_segment(cwd, src, part_path, start, end, progress)
+            except Exception as e:
+                logger.error(f"Could not download {part_path}:", exc_info=True)
+                errors.append(e)
+
+        threads = [threading.Thread(target=download, args=part) for part in parts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        progress.done()
+
+        sha = hashlib.sha256()
+        with open(dest, 'wb') as f:
+            for part_path, _, _ in parts:
+                with open(part_path, 'rb') as part:
+                    for block in iter(lambda: part.read(DOWNLOAD_BLOCK_SIZE), b""):
+                        f.write(block)
+                        sha.update(block)
+                os.remove(part_path)
+        return sha.hexdigest()
+
+    def download_dump(self, filename, directory, segments=1):
+        """ Download file with `filename` from FTP. If the file has already been partly downloaded to `directory`,
+            the download is resumed. The checksum is verified while downloading.
 
             Args:
                 filename (str): File name of FTP dump.
                 directory (str): Dir to save dump locally.
+                segments (int): Number of connections to download the dump with.
 
             Returns:
                 dest_path (str): Local path where dump has been downloaded.
@@ -103,10 +267,9 @@ class ListenBrainzFTPDownloader:
         else:
             raise DumpInvalidException("SHA256 checksum for the given file missing, aborting download.")
         dest_path = os.path.join(directory, filename)
-        self.download_file_binary(filename, dest_path)
+        calculated_sha = self.download_file_resumable(filename, dest_path, segments)
 
         logger.info("Verifying dump integrity...")
-        calculated_sha = self._calc_sha256(dest_path)
         received_sha = self._read_sha_file(sha_dest_path)
 
         os.remove(sha_dest_path)
@@ -124,12 +287,15 @@ class ListenBrainzFTPDownloader:
         """ Takes in path of a file and calculates the SHA256 checksum for it
         """
         calculated_sha = hashlib.sha256()
+        self._update_sha256(calculated_sha, filepath)
+        return calculated_sha.hexdigest()
+
+    def _update_sha256(self, sha, filepath: str):
+        """ Update the given hash object with the contents of the file """
         with open(filepath, "rb") as f:
             # Read and update hash string value in blocks of 4K
             for byte_block in iter(lambda: f.read(4096), b""):
-                calculated_sha.update(byte_block)
-
-        return calculated_sha.hexdigest()
+                sha.update(byte_block)
 
     def _read_sha_file(self, filepath: str) -> str:
         """ Reads the SHA file and returns the string stripped of any whitespace and extra characters
@@ -138,3 +304,36 @@ class ListenBrainzFTPDownloader:
             sha = f.read().lstrip().split(" ", 1)[0].strip()
 
         return sha
+
+
+class _DownloadProgress:
+    """ Logs the progress and throughput of a download, can be updated from multiple threads """
+
+    def __init__(self, name, size, downloaded=0):
+        self.name = name
+        self.size = size
+        self.start_bytes = downloaded
+        self.downloaded = downloaded
+        self.next_log = downloaded + DOWNLOAD_PROGRESS_INTERVAL
+        self.t0 = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _throughput(self):
+        duration = time.monotonic() - self.t0
+        if not duration:
+            return 0.0
+        return (self.downloaded - self.start_bytes) / (1024 * 1024) / duration
+
+    def update(self, count):
+        with self.lock:
+            self.downloaded += count
+            if self.downloaded < self.next_log:
+                return
+            self.next_log += DOWNLOAD_PROGRESS_INTERVAL
+            percent = 100 * self.downloaded / self.size if self.size else 100
+            logger.info(f"Downloaded {self.downloaded / (1024 * 1024):.0f} MB of {self.name}, {percent:.1f}%,"
+                        f" {self._throughput():.1f} MB/s")
+
+    def done(self):
+        logger.info(f"Downloaded {self.name}: {(self.downloaded - self.start_bytes) / (1024 * 1024):.1f} MB in"
+                    f" {time.monotonic() - self.t0:.2f} sec, {self._throughput():.1f} MB/s")
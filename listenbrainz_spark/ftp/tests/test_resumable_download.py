@@ -0,0 +1,121 @@
+import ftplib
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from pyftpdlib.authorizers import DummyAuthorizer
+from pyftpdlib.handlers import FTPHandler
+from pyftpdlib.servers import FTPServer
+
+from listenbrainz_spark.ftp import ListenBrainzFTPDownloader
+
+FILE_SIZE = 3 * 1024 * 1024 + 123
+
+
+class ResumableDownloadTestCase(unittest.TestCase):
+    """ Downloads files from a local FTP server running in a separate thread """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.served_dir = tempfile.mkdtemp()
+        cls.content = os.urandom(FILE_SIZE)
+        cls.sha = hashlib.sha256(cls.content).hexdigest()
+        os.makedirs(os.path.join(cls.served_dir, "dumps"))
+        with open(os.path.join(cls.served_dir, "dumps", "dump.tar"), "wb") as f:
+            f.write(cls.content)
+        with open(os.path.join(cls.served_dir, "dumps", "dump.tar.sha256"), "w") as f:
+            f.write(f"{cls.sha}  dump.tar\n")
+
+        authorizer = DummyAuthorizer()
+        authorizer.add_anonymous(cls.served_dir)
+        handler = type("Handler", (FTPHandler,), {"authorizer": authorizer})
+        cls.server = FTPServer(("127.0.0.1", 0), handler)
+        cls.port = cls.server.address[1]
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever, kwargs={"timeout": 0.1})
+        cls.server_thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close_all()
+        cls.server_thread.join()
+        shutil.rmtree(cls.served_dir)
+
+    def setUp(self):
+        self.dest_dir = tempfile.mkdtemp()
+        self.dest = os.path.join(self.dest_dir, "dump.tar")
+
+        def open_connection(_):
+            connection = ftplib.FTP()
+            connection.connect("127.0.0.1", self.port)
+            connection.login()
+            return connection
+
+        patcher = patch.object(ListenBrainzFTPDownloader, "_open_connection", open_connection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.downloader = ListenBrainzFTPDownloader()
+        self.downloader.connection.cwd("dumps")
+
+    def tearDown(self):
+        self.downloader.connection.close()
+        shutil.rmtree(self.dest_dir)
+
+    def assertDownloaded(self, sha):
+        self.assertEqual(sha, self.sha)
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), self.content)
+
+    def test_download(self):
+        sha = self.downloader.download_file_resumable("dump.tar", self.dest)
+        self.assertDownloaded(sha)
+
+    def test_resume_download(self):
+        with open(self.dest, "wb") as f:
+            f.write(self.content[:1024 * 1024 + 7])
+        sha = self.downloader.download_file_resumable("dump.tar", self.dest)
+        self.assertDownloaded(sha)
+
+    def test_resume_after_interruption(self):
+        retrbinary = ftplib.FTP.retrbinary
+        calls = []
+
+        def interrupted_retrbinary(connection, cmd, callback, blocksize=8192, rest=None):
+            calls.append(rest)
+            if len(calls) > 1:
+                return retrbinary(connection, cmd, callback, blocksize, rest)
+
+            def partial_callback(block):
+                callback(block)
+                raise EOFError("connection lost")
+            return retrbinary(connection, cmd, partial_callback, blocksize, rest)
+
+        with patch.object(ftplib.FTP, "retrbinary", interrupted_retrbinary), \
+                patch("listenbrainz_spark.ftp.DOWNLOAD_RETRY_DELAY", 0):
+            sha = self.downloader.download_file_resumable("dump.tar", self.dest)
+
+        self.assertDownloaded(sha)
+        self.assertEqual(len(calls), 2)
+        self.assertIsNone(calls[0])
+        self.assertGreater(calls[1], 0)
+        self.assertEqual(self.downloader.connection.pwd(), "/dumps")
+
+    @patch("listenbrainz_spark.ftp.SEGMENTED_DOWNLOAD_MIN_SIZE", 0)
+    def test_segmented_download(self):
+        # the first segment is already partly downloaded
+        with open(self.dest + ".part0", "wb") as f:
+            f.write(self.content[:1000])
+        sha = self.downloader.download_file_resumable("dump.tar", self.dest, segments=4)
+        self.assertDownloaded(sha)
+        self.assertEqual(os.listdir(self.dest_dir), ["dump.tar"])
+
+    def test_download_dump(self):
+        dest = self.downloader.download_dump("dump.tar", self.dest_dir)
+        self.assertEqual(dest, self.dest)
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertEqual(os.listdir(self.dest_dir), ["dump.tar"])
@@ -15,6 +15,7 @@ from listenbrainz_spark.hdfs.utils import delete_dir
 from listenbrainz_spark.hdfs.utils import path_exists
 from listenbrainz_spark.hdfs.utils import upload_to_HDFS
 from listenbrainz_spark.hdfs.utils import rename
+from listenbrainz_spark.hdfs.pipelined_upload import PipelinedUploader
 from listenbrainz_spark.exceptions import SparkSessionNotInitializedException, DumpInvalidException
 
 
@@ -143,29 +144,13 @@ class ListenbrainzHDFSUploader:
             cleanup_on_failure: whether to delete local and hdfs directories
                 if error occurs during extraction
         """
-        total_files = 0
-        total_time = 0.0
+        logger.info(f"Uploading {archive} to {hdfs_dir}...")
         with tarfile.open(archive, mode='r') as tar:
-            for member in tar:
-                if member.isfile() and member.name.endswith(".parquet"):
-                    logger.info(f"Uploading {member.name}...")
-                    t0 = time.monotonic()
-
-                    try:
-                        tar.extract(member, path=local_dir)
-                    except tarfile.TarError as err:
-                        if cleanup_on_failure:
-                            if path_exists(hdfs_dir):
-                                delete_dir(hdfs_dir, recursive=True)
-                            shutil.rmtree(local_dir, ignore_errors=True)
-                        raise DumpInvalidException(f"{type(err).__name__} while extracting {member.name}, aborting import")
-
-                    hdfs_path = os.path.join(hdfs_dir, member.name)
-                    local_path = os.path.join(local_dir, member.name)
-                    upload_to_HDFS(hdfs_path, local_path)
-
-                    time_taken = time.monotonic() - t0
-                    total_files += 1
-                    total_time += time_taken
-                    logger.info(f"Done! Current file processed in {time_taken:.2f} sec")
-        logger.info(f"Done! Total files processed {total_files}. Average time taken: {total_time / total_files:.2f}")
+            try:
+                return PipelinedUploader(local_dir).run(tar, hdfs_dir, lambda member: member.name.endswith(".parquet"))
+            except DumpInvalidException:
+                if cleanup_on_failure:
+                    if path_exists(hdfs_dir):
+                        delete_dir(hdfs_dir, recursive=True)
+                    shutil.rmtree(local_dir, ignore_errors=True)
+                raise
@@ -0,0 +1,135 @@
+import logging
+import os
+import queue
+import threading
+import time
+from tarfile import TarError
+
+from listenbrainz_spark.exceptions import DumpInvalidException
+from listenbrainz_spark.hdfs.utils import upload_to_HDFS
+
+logger = logging.getLogger(__name__)
+
+#: Number of threads uploading extracted files to HDFS concurrently
+UPLOAD_WORKERS = 4
+
+#: Maximum number of extracted files waiting to be uploaded. Together with UPLOAD_WORKERS this bounds the number of
+#: extracted files on local disk at any time.
+UPLOAD_QUEUE_SIZE = 4
+
+_STOP = object()
+
+
+def _megabytes_per_second(size, duration):
+    return size / (1024 * 1024) / duration if duration else 0.0
+
+
+class PipelinedUploader:
+    """ Extract the members of a tar archive and upload them to HDFS with a pool of threads.
+
+    Tar archives can only be read sequentially so the extraction happens in the calling thread, which
+    puts every extracted file in a bounded queue. The upload workers take files from the queue, upload
+    them and remove the local copy right away. This way extraction and uploads overlap while the space
+    used on local disk stays bounded by (queue_size + workers) files.
+
+    Args:
+        local_dir: the local directory to extract files to
+        upload: the function to upload a local file, called as upload(hdfs_path, local_path). uploads
+            to HDFS by default, other filesystems can be used by passing another function.
+        workers: the number of upload threads
+        queue_size: the maximum number of extracted files waiting for upload
+    """
+
+    def __init__(self, local_dir, upload=upload_to_HDFS, workers=UPLOAD_WORKERS, queue_size=UPLOAD_QUEUE_SIZE):
+        self.local_dir = local_dir
+        self.upload = upload
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.errors = []
+        self.files = 0
+        self.bytes = 0
+
+    def _upload_worker(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+
+            name, local_path, hdfs_path, size = item
+            try:
+                # once a worker failed the import is aborted, only clean up the remaining files
+                if not self.errors:
+                    t0 = time.monotonic()
+                    self.upload(hdfs_path, local_path)
+                    duration = time.monotonic() - t0
+                    logger.info(f"Uploaded {name}: {size / (1024 * 1024):.1f} MB in {duration:.2f} sec,"
+                                f" {_megabytes_per_second(size, duration):.1f} MB/s")
+                    with self.lock:
+                        self.files += 1
+                        self.bytes += size
+            except Exception as err:
+                logger.error(f"Error while uploading {name}:", exc_info=True)
+                with self.lock:
+                    self.errors.append(err)
+            finally:
+                if os.path.exists(local_path):
+                    os.remove(local_path)
+
+    def run(self, tar, hdfs_dir, select=None) -> dict:
+        """ Extract and upload the files in the tar archive.
+
+        Args:
+            tar: the opened tar archive
+            hdfs_dir: the HDFS directory to upload the files to, the paths of files inside the archive are kept
+            select: an optional function which is passed each file member of the archive and returns whether
+                to upload it. by default all files are uploaded.
+
+        Returns:
+            a dict with the number of files and bytes uploaded, the total time taken in seconds and the
+            aggregate throughput in MB/s.
+
+        Raises:
+            DumpInvalidException: if a file could not be extracted from the archive
+            The first exception raised by an upload, if any upload failed.
+        """
+        t0 = time.monotonic()
+        threads = [threading.Thread(target=self._upload_worker) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for member in tar:
+                if self.errors:
+                    break
+                if not member.isfile() or (select is not None and not select(member)):
+                    continue
+
+                try:
+                    tar.extract(member, path=self.local_dir)
+                except TarError as err:
+                    raise DumpInvalidException(f"{type(err).__name__} while extracting {member.name}, aborting import")
+
+                local_path = os.path.join(self.local_dir, member.name)
+                hdfs_path = os.path.join(hdfs_dir, member.name)
+                # blocks while the queue is full, so that extraction does not run ahead of the uploads
+                self.queue.put((member.name, local_path, hdfs_path, member.size))
+        finally:
+            for _ in threads:
+                self.queue.put(_STOP)
+            for thread in threads:
+                thread.join()
+
+        if self.errors:
+            raise self.errors[0]
+
+        duration = time.monotonic() - t0
+        stats = {
+            "files": self.files,
+            "bytes": self.bytes,
+            "seconds": duration,
+            "mb_per_second": _megabytes_per_second(self.bytes, duration)
+        }
+        logger.info(f"Done! Uploaded {stats['files']} files, {stats['bytes'] / (1024 * 1024):.1f} MB in"
+                    f" {duration:.2f} sec, {stats['mb_per_second']:.1f} MB/s")
+        return stats
@@ -0,0 +1,90 @@
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import unittest
+
+from listenbrainz_spark.exceptions import DumpInvalidException
+from listenbrainz_spark.hdfs.pipelined_upload import PipelinedUploader
+
+
+class LocalFilesystem:
+    """ Stands in for HDFS, "uploads" copy the files to a local directory """
+
+    def __init__(self, root, local_dir):
+        self.root = root
+        self.local_dir = local_dir
+        self.lock = threading.Lock()
+        self.max_local_files = 0
+
+    def upload(self, hdfs_path, local_path):
+        with self.lock:
+            local_files = sum(len(files) for _, _, files in os.walk(self.local_dir))
+            self.max_local_files = max(self.max_local_files, local_files)
+        dest = os.path.join(self.root, hdfs_path.lstrip("/"))
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        shutil.copy(local_path, dest)
+
+
+class PipelinedUploaderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.local_dir = os.path.join(self.tmp_dir, "local")
+        self.hdfs_root = os.path.join(self.tmp_dir, "hdfs")
+        os.makedirs(self.local_dir)
+        self.archive = os.path.join(self.tmp_dir, "archive.tar")
+
+        with tarfile.open(self.archive, "w") as tar:
+            for i in range(20):
+                file_path = os.path.join(self.tmp_dir, f"{i}.parquet")
+                with open(file_path, "wb") as f:
+                    f.write(os.urandom(1024 * (i + 1)))
+                tar.add(file_path, arcname=os.path.join("dump", f"{i}.parquet"))
+            readme = os.path.join(self.tmp_dir, "README")
+            with open(readme, "w") as f:
+                f.write("not uploaded")
+            tar.add(readme, arcname="README")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def local_file_count(self):
+        return sum(len(files) for _, _, files in os.walk(self.local_dir))
+
+    def test_run(self):
+        fs = LocalFilesystem(self.hdfs_root, self.local_dir)
+        uploader = PipelinedUploader(self.local_dir, upload=fs.upload, workers=3, queue_size=2)
+        with tarfile.open(self.archive) as tar:
+            stats = uploader.run(tar, "/temp", lambda member: member.name.endswith(".parquet"))
+
+        self.assertEqual(stats["files"], 20)
+        self.assertEqual(stats["bytes"], sum(1024 * (i + 1) for i in range(20)))
+        self.assertGreaterEqual(stats["mb_per_second"], 0)
+        self.assertCountEqual(os.listdir(os.path.join(self.hdfs_root, "temp", "dump")),
+                              [f"{i}.parquet" for i in range(20)])
+        with open(os.path.join(self.hdfs_root, "temp", "dump", "3.parquet"), "rb") as f:
+            self.assertEqual(len(f.read()), 4 * 1024)
+
+        # extracted files are removed once uploaded and at most queue_size + workers + 1 are on disk at once
+        self.assertEqual(self.local_file_count(), 0)
+        self.assertLessEqual(fs.max_local_files, 6)
+
+    def test_run_upload_error(self):
+        def upload(hdfs_path, local_path):
+            raise OSError("upload failed")
+
+        uploader = PipelinedUploader(self.local_dir, upload=upload, workers=2, queue_size=2)
+        with tarfile.open(self.archive) as tar, self.assertRaisesRegex(OSError, "upload failed"):
+            uploader.run(tar, "/temp")
+        self.assertEqual(self.local_file_count(), 0)
+
+    def test_run_invalid_archive(self):
+        with open(self.archive, "r+b") as f:
+            f.truncate(20 * 1024)
+
+        fs = LocalFilesystem(self.hdfs_root, self.local_dir)
+        uploader = PipelinedUploader(self.local_dir, upload=fs.upload)
+        with tarfile.open(self.archive) as tar, self.assertRaises(DumpInvalidException):
+            uploader.run(tar, "/temp")
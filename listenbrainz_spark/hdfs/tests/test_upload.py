@@ -7,7 +7,9 @@ from datetime import datetime
 import tarfile
 
 from listenbrainz_spark import utils, path, schema
+from listenbrainz_spark.hdfs import upload
 from listenbrainz_spark.hdfs.upload import ListenbrainzDataUploader
+from listenbrainz_spark.hdfs.utils import create_dir, path_exists
 from listenbrainz_spark.path import LISTENBRAINZ_NEW_DATA_DIRECTORY
 from listenbrainz_spark.tests import SparkNewTestCase
 
@@ -62,6 +64,129 @@ class HDFSDataUploaderTestCase(SparkNewTestCase):
         # incremental-dump-1 has 9 listens and incremental-dump-2 has 8
         self.assertEqual(listens.count(), 17)
 
+    def test_compact_listens(self):
+        self.upload_test_listens()
+        listens = self.get_all_test_listens()
+        self.assertEqual(listens.count(), 85)
+
+        stats = self.uploader.compact_listens()
+        self.assertListEqual(get_listen_files_list(), [])
+        self.assertEqual(stats["partitions_rewritten"], 9)
+        self.assertEqual(utils.get_latest_listen_ts(), datetime(2021, 8, 9, 12, 22, 43))
+
+        partitions = [(year, month) for year, month, _ in utils.get_compacted_listens_partitions()]
+        self.assertListEqual(partitions, [(2020, 1), (2020, 2), (2021, 1), (2021, 3), (2021, 4),
+                                          (2021, 5), (2021, 6), (2021, 7), (2021, 8)])
+        self.assertEqual(self.get_all_test_listens().count(), 85)
+
+        # only the partitions overlapping with the range are read
+        partitions = utils.get_compacted_listens_partitions(datetime(2021, 7, 28), datetime(2021, 8, 3))
+        self.assertListEqual([(year, month) for year, month, _ in partitions], [(2021, 7), (2021, 8)])
+        self.assertEqual(get_listens_from_dump(datetime(2021, 7, 28), datetime(2021, 8, 3)).count(), 9)
+
+        # listens imported after the compaction are merged into the existing partitions
+        incremental_dump_tar = self.create_temp_listens_tar('incremental-dump-1')
+        self.uploader.upload_new_listens_incremental_dump(incremental_dump_tar.name)
+        self.assertEqual(self.get_all_test_listens().count(), 94)
+        stats = self.uploader.compact_listens()
+        self.assertEqual(stats["partitions_rewritten"], 1)
+        self.assertEqual(self.get_all_test_listens().count(), 94)
+
+    def test_compact_listens_recovers_from_failure(self):
+        self.upload_test_listens()
+        rename = upload.rename
+        moved_months = []
+
+        def fail_after_first_month(src, dest):
+            if dest.startswith(path.COMPACTED_LISTENS_SAVE_PATH):
+                if moved_months:
+                    raise Exception("compaction failed")
+                moved_months.append(dest)
+            rename(src, dest)
+
+        # the dump files have been moved away and one month replaced when the compaction fails
+        with patch("listenbrainz_spark.hdfs.upload.rename", side_effect=fail_after_first_month):
+            with self.assertRaises(Exception):
+                self.uploader.compact_listens()
+        self.assertListEqual(get_listen_files_list(), [])
+
+        # the next run finishes the interrupted compaction, no listens are lost or counted twice
+        stats = self.uploader.compact_listens()
+        self.assertEqual(stats["partitions_rewritten"], 0)
+        self.assertFalse(path_exists(path.COMPACTION_STAGING_PATH))
+        self.assertEqual(len(utils.get_compacted_listens_partitions()), 9)
+        self.assertEqual(self.get_all_test_listens().count(), 85)
+
+    def test_compact_listens_rolls_back_unfinished_staging(self):
+        self.upload_test_listens()
+        create_dir(os.path.join(upload.COMPACTION_STAGED_LISTENS_PATH, "year=2021", "month=1"))
+
+        stats = self.uploader.compact_listens()
+        self.assertEqual(stats["partitions_rewritten"], 9)
+        self.assertFalse(path_exists(path.COMPACTION_STAGING_PATH))
+        self.assertEqual(self.get_all_test_listens().count(), 85)
+
+    def test_daily_listen_counts(self):
+        def get_expected_counts():
+            listens = get_listens_from_dump(None, None)
+            return [row.asDict() for row in utils.count_listens_by_day(listens).collect()]
+
+        def get_received_counts():
+            return [row.asDict() for row in utils.get_daily_listen_counts(None, None).collect()]
+
+        self.upload_test_listens()
+        # before compaction, the counts are counted from the listens
+        self.assertCountEqual(get_received_counts(), get_expected_counts())
+
+        self.uploader.compact_listens()
+        partitions = [(year, month) for year, month, _ in utils.get_daily_listen_counts_partitions()]
+        self.assertListEqual(partitions, [(year, month) for year, month, _ in utils.get_compacted_listens_partitions()])
+        self.assertCountEqual(get_received_counts(), get_expected_counts())
+        self.assertEqual(sum(x["listen_count"] for x in get_received_counts()), 85)
+
+        # the counts of listens imported after the compaction are added to the stored counts
+        incremental_dump_tar = self.create_temp_listens_tar('incremental-dump-1')
+        self.uploader.upload_new_listens_incremental_dump(incremental_dump_tar.name)
+        self.assertCountEqual(get_received_counts(), get_expected_counts())
+        self.assertEqual(sum(x["listen_count"] for x in get_received_counts()), 94)
+
+        # only the daily counts of the rewritten month are updated
+        self.uploader.compact_listens()
+        self.assertCountEqual(get_received_counts(), get_expected_counts())
+
+        # the counts are only of the days between start and end, the first and last day are whole days
+        counts = utils.get_daily_listen_counts(datetime(2021, 7, 28, 12), datetime(2021, 8, 3, 12)).collect()
+        self.assertEqual(min(row.day for row in counts), datetime(2021, 7, 28))
+        self.assertEqual(max(row.day for row in counts), datetime(2021, 8, 3))
+
+    def test_daily_listen_counts_after_failed_compaction(self):
+        self.upload_test_listens()
+        self.uploader.compact_listens()
+        incremental_dump_tar = self.create_temp_listens_tar('incremental-dump-1')
+        self.uploader.upload_new_listens_incremental_dump(incremental_dump_tar.name)
+
+        def fail(src, dest):
+            if dest.startswith(path.COMPACTED_LISTENS_SAVE_PATH):
+                raise Exception("compaction failed")
+            upload_rename(src, dest)
+
+        upload_rename = upload.rename
+        with patch("listenbrainz_spark.hdfs.upload.rename", side_effect=fail):
+            with self.assertRaises(Exception):
+                self.uploader.compact_listens()
+        # the counts of the month being replaced are deleted instead of left stale
+        compacted_months = [(year, month) for year, month, _ in utils.get_compacted_listens_partitions()]
+        counted_months = [(year, month) for year, month, _ in utils.get_daily_listen_counts_partitions()]
+        self.assertEqual(len(counted_months), len(compacted_months) - 1)
+
+        self.uploader.compact_listens()
+        counted_months = [(year, month) for year, month, _ in utils.get_daily_listen_counts_partitions()]
+        self.assertListEqual(counted_months, compacted_months)
+        received = [row.asDict() for row in utils.get_daily_listen_counts(None, None).collect()]
+        expected = [row.asDict() for row in utils.count_listens_by_day(get_listens_from_dump(None, None)).collect()]
+        self.assertCountEqual(received, expected)
+        self.assertEqual(sum(x["listen_count"] for x in received), 94)
+
     @patch('listenbrainz_spark.hdfs.upload.tempfile.TemporaryDirectory')
     @patch('listenbrainz_spark.hdfs.ListenbrainzHDFSUploader.upload_archive')
     @patch('listenbrainz_spark.hdfs.upload.ListenbrainzDataUploader.process_json')
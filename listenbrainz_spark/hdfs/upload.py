@@ -1,3 +1,4 @@
+import json
 import os
 from pathlib import Path
 import time
@@ -5,18 +6,44 @@ import tarfile
 import tempfile
 import logging
 
-from listenbrainz_spark import schema, path, utils
+from pyspark.sql import functions
+
+from hdfs.util import HdfsError
+
+from listenbrainz_spark import config, schema, path, utils, hdfs_connection
 from listenbrainz_spark.hdfs.utils import create_dir
 from listenbrainz_spark.hdfs.utils import delete_dir
 from listenbrainz_spark.hdfs.utils import path_exists
-from listenbrainz_spark.hdfs.utils import upload_to_HDFS
 from listenbrainz_spark.hdfs.utils import rename
 from listenbrainz_spark.hdfs import ListenbrainzHDFSUploader, TEMP_DIR_PATH as HDFS_TEMP_DIR
-from listenbrainz_spark.path import INCREMENTAL_DUMPS_SAVE_PATH
+from listenbrainz_spark.hdfs.pipelined_upload import PipelinedUploader
+from listenbrainz_spark.path import INCREMENTAL_DUMPS_SAVE_PATH, COMPACTED_LISTENS_SAVE_PATH, \
+    LISTENBRAINZ_NEW_DATA_DIRECTORY, DAILY_LISTEN_COUNTS_SAVE_PATH, COMPACTION_STAGING_PATH, COMPACTION_STATE_PATH
 from listenbrainz_spark.utils import read_files_from_HDFS
 
 logger = logging.getLogger(__name__)
 
+# maximum number of listens in a parquet file of the compacted listens, months with more
+# listens are split into several files
+COMPACTED_LISTENS_MAX_RECORDS_PER_FILE = 5000000
+
+# the rewritten months and the compacted dump files inside COMPACTION_STAGING_PATH
+COMPACTION_STAGED_LISTENS_PATH = os.path.join(COMPACTION_STAGING_PATH, "listens")
+COMPACTION_STAGED_SOURCES_PATH = os.path.join(COMPACTION_STAGING_PATH, "sources")
+
+
+def _get_compaction_state():
+    """ Get the state of the compaction in progress, None if there is none. """
+    try:
+        with hdfs_connection.client.read(COMPACTION_STATE_PATH, encoding="utf-8") as reader:
+            return json.load(reader)
+    except HdfsError:
+        return None
+
+
+def _save_compaction_state(state: dict):
+    hdfs_connection.client.write(COMPACTION_STATE_PATH, data=json.dumps(state), encoding="utf-8", overwrite=True)
+
 
 class ListenbrainzDataUploader(ListenbrainzHDFSUploader):
 
@@ -62,18 +89,7 @@ class ListenbrainzDataUploader(ListenbrainzHDFSUploader):
 
             create_dir(hdfs_dir)
 
-            for member in tar:
-                t0 = time.monotonic()
-                logger.info(f"Extracting {member.name}")
-                tar.extract(member, path=local_dir)
-                logger.info(f"Done. Total time: {time.monotonic() - t0:.2f} sec")
-
-                t0 = time.monotonic()
-                logger.info(f"Uploading {member.name}")
-                hdfs_path = os.path.join(hdfs_dir, member.name)
-                local_path = os.path.join(local_dir, member.name)
-                upload_to_HDFS(hdfs_path, local_path)
-                logger.info(f"Done. Total time: {time.monotonic() - t0:.2f} sec")
+            PipelinedUploader(local_dir).run(tar, hdfs_dir)
 
     def upload_new_listens_incremental_dump(self, archive: str):
         """ Upload new format parquet listens of an incremental
@@ -81,17 +97,22 @@ class ListenbrainzDataUploader(ListenbrainzHDFSUploader):
             Args:
                 archive: path to parquet listens dump to be uploaded
         """
+        # a half done compaction may still have to move incremental.parquet away
+        self.recover_compaction()
+
         # upload parquet file to temporary path so that we can
         # read it in spark in next step
         hdfs_path = self.upload_archive_to_temp(archive)
 
         # read the parquet file from the temporary path and append
         # it to incremental.parquet for permanent storage
-        read_files_from_HDFS(hdfs_path) \
+        listens = read_files_from_HDFS(hdfs_path)
+        listens \
             .repartition(1) \
             .write \
             .mode("append") \
             .parquet(INCREMENTAL_DUMPS_SAVE_PATH)
+        self.add_upload_to_listens_manifest(listens, Path(archive).stem, "incremental")
 
         # delete parquet from hdfs temporary path
         delete_dir(hdfs_path, recursive=True)
@@ -105,7 +126,7 @@ class ListenbrainzDataUploader(ListenbrainzHDFSUploader):
         """
         src_path = self.upload_archive_to_temp(archive)
         dest_path = path.LISTENBRAINZ_NEW_DATA_DIRECTORY
-        # Delete existing dumps if any
+        # Delete existing dumps if any, this includes the incremental dumps and compacted listens
         if path_exists(dest_path):
             logger.info(f'Removing {dest_path} from HDFS...')
             delete_dir(dest_path, recursive=True)
@@ -122,6 +143,191 @@ class ListenbrainzDataUploader(ListenbrainzHDFSUploader):
         rename(src_path, dest_path)
         utils.logger.info(f"Done! Time taken: {time.monotonic() - t0:.2f}")
 
+        # the old manifest was deleted along with the old dumps
+        listens = read_files_from_HDFS(dest_path)
+        self.add_upload_to_listens_manifest(listens, Path(archive).stem, "full")
+
+    def add_upload_to_listens_manifest(self, listens, dump_name: str, dump_type: str):
+        """ Record the number of listens and the range of listened_at of an uploaded dump in
+        the listens manifest, so that jobs can look these up without scanning the listens.
+
+            Args:
+                listens: dataframe of the listens in the dump
+                dump_name: the name of the dump
+                dump_type: full or incremental
+        """
+        stats = listens.agg(
+            functions.count("*").alias("listen_count"),
+            functions.min("listened_at").alias("min_listened_at"),
+            functions.max("listened_at").alias("max_listened_at")
+        ).collect()[0]
+
+        manifest = utils.get_listens_manifest() or {"uploads": []}
+        manifest["uploads"].append({
+            "dump_name": dump_name,
+            "dump_type": dump_type,
+            "listen_count": stats["listen_count"],
+            "min_listened_at": stats["min_listened_at"].isoformat() if stats["min_listened_at"] else None,
+            "max_listened_at": stats["max_listened_at"].isoformat() if stats["max_listened_at"] else None,
+        })
+        utils.save_listens_manifest(manifest)
+
+    def compact_listens(self) -> dict:
+        """ Move the listens of the full dump and of the incremental dumps imported since the last
+        compaction into the compacted listens, which are partitioned by year and month of listened_at.
+        Only the months for which there are new listens are rewritten, and the daily listen counts
+        of these months are updated.
+
+            Returns:
+                the number of files and bytes which a scan of all listens had to read before and
+                after the compaction, and the number of months rewritten.
+        """
+        t0 = time.monotonic()
+        self.recover_compaction()
+        sources = [
+            os.path.join(LISTENBRAINZ_NEW_DATA_DIRECTORY, file_name)
+            for file_name in utils.get_listen_files_list()
+        ]
+        old_partitions = utils.get_compacted_listens_partitions()
+        files_before, bytes_before = utils.get_files_stats(sources + [COMPACTED_LISTENS_SAVE_PATH])
+        if not sources:
+            logger.info("No new listens to compact.")
+            # count the months whose counts were deleted by a compaction finished by recover_compaction
+            self.update_daily_listen_counts(set())
+            return {
+                "files_before": files_before,
+                "bytes_before": bytes_before,
+                "files_after": files_before,
+                "bytes_after": bytes_before,
+                "partitions_rewritten": 0,
+            }
+
+        new_listens = utils.read_listen_files(sources) \
+            .where("listened_at IS NOT NULL") \
+            .withColumn("year", functions.year("listened_at")) \
+            .withColumn("month", functions.month("listened_at"))
+        months = {(row.year, row.month) for row in new_listens.select("year", "month").distinct().collect()}
+
+        listens = new_listens
+        existing_partitions = [p for year, month, p in old_partitions if (year, month) in months]
+        if existing_partitions:
+            existing_listens = utils.read_listen_files(existing_partitions, base_path=COMPACTED_LISTENS_SAVE_PATH)
+            listens = listens.unionByName(existing_listens)
+
+        logger.info(f"Compacting listens of {len(sources)} dump files into {len(months)} months...")
+        listens \
+            .repartition("year", "month") \
+            .write \
+            .mode("overwrite") \
+            .option("maxRecordsPerFile", COMPACTED_LISTENS_MAX_RECORDS_PER_FILE) \
+            .partitionBy("year", "month") \
+            .parquet(config.HDFS_CLUSTER_URI + COMPACTION_STAGED_LISTENS_PATH)
+
+        # once the state is saved, the compaction is finished by a later run if this one fails
+        _save_compaction_state({
+            "sources": [os.path.basename(source) for source in sources],
+            "months": sorted(months),
+        })
+        self._finish_compaction(sources, months)
+
+        self.update_daily_listen_counts(months)
+
+        files_after, bytes_after = utils.get_files_stats([COMPACTED_LISTENS_SAVE_PATH])
+        logger.info(f"Compacted listens in {time.monotonic() - t0:.2f}s, a scan of all listens reads"
+                    f" {files_after} files and {bytes_after} bytes instead of {files_before} files and"
+                    f" {bytes_before} bytes.")
+        return {
+            "files_before": files_before,
+            "bytes_before": bytes_before,
+            "files_after": files_after,
+            "bytes_after": bytes_after,
+            "partitions_rewritten": len(months),
+        }
+
+    def recover_compaction(self):
+        """ Finish or roll back a compaction which failed half way. If the compaction failed before the
+        rewritten months were completely written to the staging directory, the staging directory is
+        deleted and the listens are left as they were. Otherwise the compacted dump files are moved
+        out of the listens directory and the rewritten months replace the old ones.
+        """
+        state = _get_compaction_state()
+        if state is None:
+            if path_exists(COMPACTION_STAGING_PATH):
+                logger.info("Rolling back an unfinished compaction...")
+                delete_dir(COMPACTION_STAGING_PATH, recursive=True)
+            return
+
+        logger.info("Finishing an interrupted compaction...")
+        sources = [os.path.join(LISTENBRAINZ_NEW_DATA_DIRECTORY, name) for name in state["sources"]]
+        months = {(year, month) for year, month in state["months"]}
+        self._finish_compaction(sources, months)
+
+    def _finish_compaction(self, sources: list, months: set):
+        """ Move the compacted dump files into the staging directory, replace the rewritten months of the
+        compacted listens with the ones in the staging directory and delete it. Every step can be repeated
+        if a previous attempt failed part way through. """
+        # the dump files are moved away first so that a failure leaves their listens missing instead of
+        # counted twice until the compaction is finished
+        create_dir(COMPACTION_STAGED_SOURCES_PATH)
+        for source in sources:
+            if path_exists(source):
+                rename(source, os.path.join(COMPACTION_STAGED_SOURCES_PATH, os.path.basename(source)))
+
+        for year, month in sorted(months):
+            year_dir = f"year={year}"
+            month_dir = f"month={month}"
+            staged_path = os.path.join(COMPACTION_STAGED_LISTENS_PATH, year_dir, month_dir)
+            if not path_exists(staged_path):
+                # already moved into place
+                continue
+            # the stored counts of the month are deleted before its listens are replaced, so that a failure
+            # leaves the month without counts to be counted again instead of with stale counts
+            counts_path = os.path.join(DAILY_LISTEN_COUNTS_SAVE_PATH, year_dir, month_dir)
+            if path_exists(counts_path):
+                delete_dir(counts_path, recursive=True)
+            dest_path = os.path.join(COMPACTED_LISTENS_SAVE_PATH, year_dir, month_dir)
+            if path_exists(dest_path):
+                delete_dir(dest_path, recursive=True)
+            create_dir(os.path.join(COMPACTED_LISTENS_SAVE_PATH, year_dir))
+            rename(staged_path, dest_path)
+
+        delete_dir(COMPACTION_STAGING_PATH, recursive=True)
+
+    def update_daily_listen_counts(self, months: set) -> int:
+        """ Count the listens of each user on each day of the given months of the compacted listens, and
+        store the counts partitioned by year and month like the compacted listens. The compacted months
+        without stored counts, for example the ones compacted before the counts were introduced, are
+        counted as well.
+
+            Args:
+                months: set of (year, month) tuples of the compacted months whose listens have changed
+
+            Returns:
+                the number of months counted
+        """
+        t0 = time.monotonic()
+        stored_months = {(year, month) for year, month, _ in utils.get_daily_listen_counts_partitions()}
+        partitions = [
+            path for year, month, path in utils.get_compacted_listens_partitions()
+            if (year, month) in months or (year, month) not in stored_months
+        ]
+        if not partitions:
+            return 0
+
+        listens = utils.read_listen_files(partitions, base_path=COMPACTED_LISTENS_SAVE_PATH)
+        utils.count_listens_by_day(listens) \
+            .withColumn("year", functions.year("day")) \
+            .withColumn("month", functions.month("day")) \
+            .repartition("year", "month") \
+            .write \
+            .mode("overwrite") \
+            .option("partitionOverwriteMode", "dynamic") \
+            .partitionBy("year", "month") \
+            .parquet(config.HDFS_CLUSTER_URI + DAILY_LISTEN_COUNTS_SAVE_PATH)
+
+        logger.info(f"Counted the daily listens of {len(partitions)} months in {time.monotonic() - t0:.2f}s")
+        return len(partitions)
+
     def upload_archive_to_temp(self, archive: str) -> str:
         """ Upload parquet files in archive to a temporary hdfs directory
 
@@ -6,6 +6,25 @@ LISTENBRAINZ_NEW_DATA_DIRECTORY = os.path.join('/', 'data', 'listenbrainz-new')
 # path to save incremental dumps
 INCREMENTAL_DUMPS_SAVE_PATH = os.path.join(LISTENBRAINZ_NEW_DATA_DIRECTORY, "incremental.parquet")
 
+# path to save listens of the full and incremental dumps after compaction, partitioned by
+# year and month of listened_at. no .parquet suffix, it is not one of the numbered full dump files.
+COMPACTED_LISTENS_SAVE_PATH = os.path.join(LISTENBRAINZ_NEW_DATA_DIRECTORY, "compacted")
+
+# path to save the number of listens of each user on each day of the compacted listens, partitioned by year
+# and month like the compacted listens. the name starts with an underscore so that spark ignores it when
+# reading the listens directory.
+DAILY_LISTEN_COUNTS_SAVE_PATH = os.path.join(LISTENBRAINZ_NEW_DATA_DIRECTORY, "_daily_listen_counts")
+
+# directory in which compact_listens writes the rewritten months and to which it moves the compacted dump files
+# before replacing the months in the compacted listens, and the file recording the state of the compaction.
+# the name starts with an underscore so that spark ignores it when reading the listens directory.
+COMPACTION_STAGING_PATH = os.path.join(LISTENBRAINZ_NEW_DATA_DIRECTORY, "_compaction")
+COMPACTION_STATE_PATH = os.path.join(COMPACTION_STAGING_PATH, "state.json")
+
+# path to save the manifest of uploaded listens dumps with the range of listened_at of each dump. the name
+# starts with an underscore so that spark ignores the file when reading the listens directory.
+LISTENS_MANIFEST_PATH = os.path.join(LISTENBRAINZ_NEW_DATA_DIRECTORY, "_listens_manifest.json")
+
 # Directory containing similar artist relation.
 # (This is a temporary path till incremental dumps for similar artists are prepared)
 SIMILAR_ARTIST_DIR = '/similar_artists'
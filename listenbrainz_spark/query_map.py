@@ -21,6 +21,7 @@ import listenbrainz_spark.year_in_music.listening_time
 import listenbrainz_spark.year_in_music.artist_map
 import listenbrainz_spark.year_in_music.new_artists_discovered
 import listenbrainz_spark.year_in_music.tracks_of_the_year
+import listenbrainz_spark.year_in_music.all_reports
 import listenbrainz_spark.fresh_releases.fresh_releases
 import listenbrainz_spark.similarity.recording
 import listenbrainz_spark.similarity.artist
@@ -29,6 +30,7 @@ import listenbrainz_spark.postgres
 
 functions = {
     'stats.user.entity': listenbrainz_spark.stats.user.entity.get_entity_stats,
+    'stats.user.all_entities': listenbrainz_spark.stats.user.entity.get_all_entity_stats,
     'stats.user.listening_activity': listenbrainz_spark.stats.user.listening_activity.get_listening_activity,
     'stats.user.daily_activity': listenbrainz_spark.stats.user.daily_activity.get_daily_activity,
     'stats.sitewide.entity': listenbrainz_spark.stats.sitewide.entity.get_entity_stats,
@@ -37,6 +39,7 @@ functions = {
     'import.dump.full_id': listenbrainz_spark.request_consumer.jobs.import_dump.import_full_dump_by_id_handler,
     'import.dump.incremental_newest': listenbrainz_spark.request_consumer.jobs.import_dump.import_newest_incremental_dump_handler,
     'import.dump.incremental_id': listenbrainz_spark.request_consumer.jobs.import_dump.import_incremental_dump_by_id_handler,
+    'import.dump.compact_listens': listenbrainz_spark.request_consumer.jobs.import_dump.compact_listens_handler,
     'cf.missing_mb_data': listenbrainz_spark.missing_mb_data.missing_mb_data.main,
     'cf.recommendations.recording.create_dataframes': listenbrainz_spark.recommendations.recording.create_dataframes.main,
     'cf.recommendations.recording.train_model': listenbrainz_spark.recommendations.recording.train_models.main,
@@ -60,6 +63,7 @@ functions = {
     'year_in_music.new_artists_discovered_count': listenbrainz_spark.year_in_music.new_artists_discovered.get_new_artists_discovered_count,
     'year_in_music.listening_time': listenbrainz_spark.year_in_music.listening_time.get_listening_time,
     'year_in_music.artist_map': listenbrainz_spark.year_in_music.artist_map.get_artist_map_stats,
+    'year_in_music.all_reports': listenbrainz_spark.year_in_music.all_reports.calculate_all_reports,
     'import.pg_metadata_tables': listenbrainz_spark.postgres.import_all_pg_tables,
     'releases.fresh': listenbrainz_spark.fresh_releases.fresh_releases.main,
 }
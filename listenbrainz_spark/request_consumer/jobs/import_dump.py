@@ -155,6 +155,22 @@ def import_incremental_dump_by_id_handler(dump_id: int):
     }]
 
 
+def compact_listens_handler():
+    errors = []
+    stats = {}
+    try:
+        stats = ListenbrainzDataUploader().compact_listens()
+    except Exception as e:
+        logger.error("Error while compacting listens: ", exc_info=True)
+        errors.append(str(e))
+    return [{
+        'type': 'compact_listens',
+        'errors': errors,
+        'time': str(datetime.utcnow()),
+        **stats,
+    }]
+
+
 def import_artist_relation_to_hdfs():
     ts = time.monotonic()
     temp_dir = tempfile.mkdtemp()
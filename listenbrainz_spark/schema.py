@@ -16,6 +16,12 @@ listens_new_schema = StructType([
     StructField('artist_credit_mbids', ArrayType(StringType()), nullable=True),
 ])
 
+daily_listen_counts_schema = StructType([
+    StructField('user_id', IntegerType(), nullable=False),
+    StructField('day', TimestampType(), nullable=False),
+    StructField('listen_count', LongType(), nullable=False),
+])
+
 fresh_releases_schema = StructType([
     StructField('release_date', StringType(), nullable=False),
     StructField('artist_credit_name', StringType(), nullable=False),
@@ -44,6 +50,37 @@ recording_similarity_schema = StructType([
     StructField('partial_similarity', FloatType(), nullable=False)
 ])
 
+# the records of the top entities of each user in user entity stats. the fields are in the order in which the
+# entity stats queries create them because the records are cast to these schemas by position. all fields are
+# nullable because the records are cast before the invalid ones are filtered out.
+artist_stats_record_schema = StructType([
+    StructField('listen_count', LongType(), nullable=True),
+    StructField('artist_name', StringType(), nullable=True),
+    StructField('artist_mbid', StringType(), nullable=True),
+])
+
+release_stats_record_schema = StructType([
+    StructField('listen_count', LongType(), nullable=True),
+    StructField('release_name', StringType(), nullable=True),
+    StructField('release_mbid', StringType(), nullable=True),
+    StructField('artist_name', StringType(), nullable=True),
+    StructField('artist_mbids', ArrayType(StringType()), nullable=True),
+    StructField('caa_id', LongType(), nullable=True),
+    StructField('caa_release_mbid', StringType(), nullable=True),
+])
+
+recording_stats_record_schema = StructType([
+    StructField('listen_count', LongType(), nullable=True),
+    StructField('track_name', StringType(), nullable=True),
+    StructField('recording_mbid', StringType(), nullable=True),
+    StructField('artist_name', StringType(), nullable=True),
+    StructField('artist_mbids', ArrayType(StringType()), nullable=True),
+    StructField('release_name', StringType(), nullable=True),
+    StructField('release_mbid', StringType(), nullable=True),
+    StructField('caa_id', LongType(), nullable=True),
+    StructField('caa_release_mbid', StringType(), nullable=True),
+])
+
 # schema to contain model parameters.
 model_param_schema = [
     StructField('alpha', FloatType(), nullable=True),  # Baseline level of confidence weighting applied.
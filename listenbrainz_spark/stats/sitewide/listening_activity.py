@@ -9,7 +9,7 @@ from data.model.common_stat_spark import StatMessage
 from data.model.user_listening_activity import ListeningActivityRecord
 from listenbrainz_spark.stats import run_query
 from listenbrainz_spark.stats.common.listening_activity import setup_time_range
-from listenbrainz_spark.utils import get_listens_from_dump
+from listenbrainz_spark.utils import get_daily_listen_counts
 from pyspark.sql.types import (StringType, StructField, StructType,
                                TimestampType)
 
@@ -23,31 +23,25 @@ time_range_schema = StructType([
 logger = logging.getLogger(__name__)
 
 
-def calculate_listening_activity(spark_date_format):
-    """ Calculate number of listens for each user in time ranges given in the "time_range" table.
-    The time ranges are as follows:
+def calculate_listening_activity_from_daily_counts():
+    """ Calculate number of listens in time ranges given in the "time_range" table from the number of
+    listens of each user on each day in the "daily_listen_counts" table.
+
+    The listens are not scanned, each time range is a whole number of days so its listen count is the
+    sum of the counts of its days. The time ranges are as follows:
         1) week - each day with weekday name of the past 2 weeks.
         2) month - each day the past 2 months.
         3) year - each month of the past 2 years.
         4) all_time - each year starting from LAST_FM_FOUNDING_YEAR (2002)
-
-    Args:
-        spark_date_format: the date format
     """
-    # calculates the number of listens in each time range for each user, count(listened_at) so that
-    # group without listens are counted as 0, count(*) gives 1.
-    # this query is much different that the user listening activity stats query because an earlier
-    # version of this query which was similar to that caused OutOfMemory on yearly and all time
-    # ranges. It turns converting each listened_at to the needed date format and grouping by it is
-    # much cheaper than joining with a separate time range table. We still join the grouped data with
-    # a separate time range table to fill any gaps i.e. time ranges with no listens get a value of 0
-    # instead of being completely omitted from the final result.
-    result = run_query(f"""
+    result = run_query("""
         WITH bucket_listen_counts AS (
-            SELECT date_format(listened_at, '{spark_date_format}') AS time_range
-                 , count(listened_at) AS listen_count
-              FROM listens
-          GROUP BY time_range
+            SELECT time_range.time_range
+                 , sum(daily_listen_counts.listen_count) AS listen_count
+              FROM daily_listen_counts
+              JOIN time_range
+                ON daily_listen_counts.day BETWEEN time_range.start AND time_range.end
+          GROUP BY time_range.time_range
         )
             SELECT sort_array(
                        collect_list(
@@ -74,11 +68,14 @@ def get_listening_activity(stats_range: str) -> Iterator[Optional[Dict]]:
     bin size of the histogram depends on the size of the range (e.g.
     year -> 12 months, month -> ~30 days, week -> ~7 days, see get_time_range for
     details). These values are used on the listening activity reports.
+
+    The listen counts are summed up from the daily listen counts of the users instead of
+    being counted from the listens.
     """
     logger.debug(f"Calculating listening_activity_{stats_range}")
-    from_date, to_date, _, _, spark_date_format = setup_time_range(stats_range)
-    get_listens_from_dump(from_date, to_date).createOrReplaceTempView("listens")
-    data = calculate_listening_activity(spark_date_format)
+    from_date, to_date, _, _, _ = setup_time_range(stats_range)
+    get_daily_listen_counts(from_date, to_date).createOrReplaceTempView("daily_listen_counts")
+    data = calculate_listening_activity_from_daily_counts()
     messages = create_messages(data=data, stats_range=stats_range, from_date=from_date, to_date=to_date)
     logger.debug("Done!")
     return messages
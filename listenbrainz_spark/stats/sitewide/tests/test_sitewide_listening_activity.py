@@ -0,0 +1,65 @@
+from data.model.common_stat import ALLOWED_STATISTICS_RANGE
+from listenbrainz_spark.stats import run_query
+from listenbrainz_spark.stats.common.listening_activity import setup_time_range
+from listenbrainz_spark.stats.sitewide import listening_activity
+from listenbrainz_spark.stats.user.tests import StatsTestCase
+from listenbrainz_spark.utils import get_listens_from_dump, get_daily_listen_counts
+
+
+def calculate_listening_activity_from_listens(spark_date_format):
+    """ The sitewide listening activity counted from the listens in the "listens" table, as it was
+    calculated before the daily listen counts were stored. """
+    # calculates the number of listens in each time range for each user, count(listened_at) so that
+    # group without listens are counted as 0, count(*) gives 1.
+    # this query is much different that the user listening activity stats query because an earlier
+    # version of this query which was similar to that caused OutOfMemory on yearly and all time
+    # ranges. It turns converting each listened_at to the needed date format and grouping by it is
+    # much cheaper than joining with a separate time range table. We still join the grouped data with
+    # a separate time range table to fill any gaps i.e. time ranges with no listens get a value of 0
+    # instead of being completely omitted from the final result.
+    result = run_query(f"""
+        WITH bucket_listen_counts AS (
+            SELECT date_format(listened_at, '{spark_date_format}') AS time_range
+                 , count(listened_at) AS listen_count
+              FROM listens
+          GROUP BY time_range
+        )
+            SELECT sort_array(
+                       collect_list(
+                            struct(
+                                  to_unix_timestamp(start) AS from_ts
+                                , to_unix_timestamp(end) AS to_ts
+                                , time_range
+                                , COALESCE(listen_count, 0) AS listen_count
+                            )
+                        )
+                    ) AS listening_activity
+              FROM time_range
+         LEFT JOIN bucket_listen_counts
+             USING (time_range)
+    """)
+    return result.toLocalIterator()
+
+
+class SitewideListeningActivityTestCase(StatsTestCase):
+
+    def test_calculate_listening_activity_from_daily_counts(self):
+        """ The listening activity summed up from the daily listen counts is the same as the one counted from listens """
+        for stats_range in ALLOWED_STATISTICS_RANGE:
+            with self.subTest(stats_range=stats_range):
+                from_date, to_date, _, _, spark_date_format = setup_time_range(stats_range)
+
+                get_listens_from_dump(from_date, to_date).createOrReplaceTempView("listens")
+                expected = next(calculate_listening_activity_from_listens(spark_date_format)).asDict(recursive=True)
+
+                get_daily_listen_counts(from_date, to_date).createOrReplaceTempView("daily_listen_counts")
+                received = next(listening_activity.calculate_listening_activity_from_daily_counts()).asDict(recursive=True)
+
+                self.assertEqual(received, expected)
+
+    def test_get_listening_activity(self):
+        messages = list(listening_activity.get_listening_activity("all_time"))
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(messages[0]["type"], "sitewide_listening_activity")
+        self.assertEqual(messages[0]["stats_range"], "all_time")
+        self.assertEqual(sum(x["listen_count"] for x in messages[0]["data"]), 85)
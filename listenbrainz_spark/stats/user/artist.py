@@ -1,10 +1,9 @@
-from typing import Iterator
+from pyspark.sql import DataFrame
 
-from data.model.user_artist_stat import ArtistRecord
 from listenbrainz_spark.stats import run_query
 
 
-def get_artists(table: str, cache_table: str, number_of_results: int) -> Iterator[ArtistRecord]:
+def get_artists(table: str, cache_table: str, number_of_results: int) -> DataFrame:
     """ Get artist information (artist_name, artist_credit_id etc) for every user
         ordered by listen count
 
@@ -13,7 +12,7 @@ def get_artists(table: str, cache_table: str, number_of_results: int) -> Iterato
             number_of_results: number of top results to keep per user.
 
         Returns:
-            iterator (iter): an iterator over result
+            dataframe: a dataframe of the result
                     {
                         user1: [
                             {
@@ -90,4 +89,4 @@ def get_artists(table: str, cache_table: str, number_of_results: int) -> Iterato
              USING (user_id)
     """)
 
-    return result.toLocalIterator()
+    return result
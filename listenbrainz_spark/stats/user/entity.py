@@ -1,17 +1,23 @@
-import json
 import logging
+import random
+import time
 from datetime import datetime
 from typing import Iterator, Optional, Dict
 
+import orjson
 from more_itertools import chunked
 from pydantic import ValidationError
+from pyspark import StorageLevel
+from pyspark.sql import DataFrame
 
 from data.model.user_artist_stat import ArtistRecord
-from data.model.user_entity import UserEntityStatMessage, UserEntityRecords
 from data.model.user_recording_stat import RecordingRecord
 from data.model.user_release_stat import ReleaseRecord
+from listenbrainz_spark import config
 from listenbrainz_spark.path import RELEASE_METADATA_CACHE_DATAFRAME, ARTIST_COUNTRY_CODE_DATAFRAME
-from listenbrainz_spark.stats import get_dates_for_stats_range
+from listenbrainz_spark.schema import artist_stats_record_schema, release_stats_record_schema, \
+    recording_stats_record_schema
+from listenbrainz_spark.stats import get_dates_for_stats_range, run_query
 from listenbrainz_spark.stats.user import USERS_PER_MESSAGE
 from listenbrainz_spark.stats.user.artist import get_artists
 from listenbrainz_spark.stats.user.recording import get_recordings
@@ -32,12 +38,65 @@ entity_model_map = {
     "recordings": RecordingRecord
 }
 
+entity_schema_map = {
+    "artists": artist_stats_record_schema,
+    "releases": release_stats_record_schema,
+    "recordings": recording_stats_record_schema
+}
+
+# uuids are only accepted in the canonical format, the pydantic models also accept other formats
+UUID_PATTERN = "(?i)^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$"
+
+
+def _is_valid_uuid(column: str) -> str:
+    return f"({column} IS NULL OR {column} RLIKE '{UUID_PATTERN}')"
+
+
+def _are_valid_uuids(column: str) -> str:
+    return f"({column} IS NOT NULL AND forall({column}, mbid -> mbid RLIKE '{UUID_PATTERN}'))"
+
+
+# conditions, in spark sql, that a record x of each entity must satisfy to be included in the stats. these
+# are the checks of the corresponding pydantic models, so that the driver doesn't need to validate each record.
+entity_condition_map = {
+    "artists": "length(x.artist_name) > 0"
+               " AND x.listen_count >= 0"
+               f" AND {_is_valid_uuid('x.artist_mbid')}",
+    "releases": "x.release_name IS NOT NULL"
+                " AND x.artist_name IS NOT NULL"
+                " AND x.listen_count >= 0"
+                " AND (x.caa_id IS NULL OR x.caa_id >= 0)"
+                f" AND {_is_valid_uuid('x.release_mbid')}"
+                f" AND {_are_valid_uuids('x.artist_mbids')}",
+    "recordings": "length(x.artist_name) > 0"
+                  " AND x.track_name IS NOT NULL"
+                  " AND x.listen_count IS NOT NULL"
+                  " AND (x.caa_id IS NULL OR x.caa_id >= 0)"
+                  f" AND {_is_valid_uuid('x.recording_mbid')}"
+                  f" AND {_is_valid_uuid('x.release_mbid')}"
+                  f" AND {_are_valid_uuids('x.artist_mbids')}"
+}
+
 entity_cache_map = {
     "artists": ARTIST_COUNTRY_CODE_DATAFRAME,
     "releases": RELEASE_METADATA_CACHE_DATAFRAME,
     "recordings": RELEASE_METADATA_CACHE_DATAFRAME
 }
 
+# the entities calculated by get_all_entity_stats
+ALL_ENTITIES = ["artists", "releases", "recordings"]
+
+# the columns of listens used by the entity stats queries, the others are not read by get_all_entity_stats
+ENTITY_STATS_LISTEN_COLUMNS = [
+    "user_id",
+    "artist_name",
+    "artist_credit_mbids",
+    "release_name",
+    "release_mbid",
+    "recording_name",
+    "recording_mbid",
+]
+
 NUMBER_OF_TOP_ENTITIES = 1000  # number of top entities to retain for user stats
 NUMBER_OF_YIM_ENTITIES = 50  # number of top entities to retain for Year in Music stats
 
@@ -66,6 +125,48 @@ def get_entity_stats(entity: str, stats_range: str, message_type: str = "user_en
     return messages
 
 
+def get_all_entity_stats(stats_range: str, message_type: str = "user_entity", database_suffix: str = None)\
+        -> Iterator[Optional[Dict]]:
+    """ Get the top artists, releases and recordings for all users for specified stats_range.
+
+        The listens of the range are read once and persisted, and the stats of all entities are calculated
+        from the persisted listens instead of reading the listens again for each entity.
+
+        Args:
+            stats_range: the range for which to calculate the stats
+            message_type: the type of the messages, see create_messages
+            database_suffix: if given, the stats of each entity are stored in the couchdb database
+                {entity}_{stats_range}_{database_suffix} otherwise in {entity}_{stats_range}
+    """
+    logger.debug(f"Calculating user_entities_{stats_range}...")
+
+    from_date, to_date = get_dates_for_stats_range(stats_range)
+    listens_df = get_listens_from_dump(from_date, to_date)\
+        .select(*ENTITY_STATS_LISTEN_COLUMNS)\
+        .persist(StorageLevel.MEMORY_AND_DISK)
+    table = f"user_entities_{stats_range}"
+    listens_df.createOrReplaceTempView(table)
+
+    # releases and recordings use the same cache table, read each one only once
+    cache_tables = {}
+    for cache_table_path in sorted(set(entity_cache_map.values())):
+        df_name = f"entity_data_cache_{len(cache_tables)}"
+        read_files_from_HDFS(cache_table_path).createOrReplaceTempView(df_name)
+        cache_tables[cache_table_path] = df_name
+
+    try:
+        for entity in ALL_ENTITIES:
+            database = f"{entity}_{stats_range}_{database_suffix}" if database_suffix else None
+            yield from calculate_entity_stats(
+                from_date, to_date, table, cache_tables[entity_cache_map[entity]],
+                entity, stats_range, message_type, database
+            )
+    finally:
+        listens_df.unpersist()
+
+    logger.debug("Done!")
+
+
 def calculate_entity_stats(from_date: datetime, to_date: datetime, table: str, cache_table: str,
                            entity: str, stats_range: str, message_type: str, database: str = None):
     handler = entity_handler_map[entity]
@@ -78,39 +179,75 @@ def calculate_entity_stats(from_date: datetime, to_date: datetime, table: str, c
                            to_date=to_date, message_type=message_type, database=database)
 
 
-def parse_one_user_stats(entry, entity: str, stats_range: str) -> Optional[UserEntityRecords]:
-    _dict = entry.asDict(recursive=True)
-    count_key = f"{entity}_count"
-    total_entity_count = _dict[count_key]
+def get_valid_entity_stats(data: DataFrame, entity: str) -> DataFrame:
+    """ Enforce the schema of the entity stats in spark and convert the stats of each user to json.
 
-    entity_list = []
-    for item in _dict[entity]:
-        try:
-            entity_list.append(entity_model_map[entity](**item))
-        except ValidationError:
-            logger.error("Invalid entry in entity stats", exc_info=True)
-            total_entity_count -= 1
+        The records are cast to the typed schema of the entity and the records that the pydantic model of
+        the entity would reject are removed, the entity count of the user is reduced by the number of removed
+        records. The stats of each user are converted to a json document in the format of UserEntityRecords
+        in the stats column, fields which are null are omitted.
 
-    try:
-        return UserEntityRecords(
-            user_id=_dict["user_id"],
-            data=entity_list,
-            count=total_entity_count
+        Args:
+            data: the dataframe returned by the handler of the entity
+            entity: the entity for which statistics are calculated
+    """
+    table = f"user_{entity}_stats"
+    data.createOrReplaceTempView(table)
+    return run_query(f"""
+        WITH typed_stats AS (
+            SELECT user_id
+                 , {entity}_count AS entity_count
+                 , CAST({entity} AS array<{entity_schema_map[entity].simpleString()}>) AS records
+              FROM {table}
+        ), valid_stats AS (
+            SELECT user_id
+                 , entity_count
+                 , size(records) AS records_count
+                 , filter(records, x -> {entity_condition_map[entity]}) AS valid_records
+              FROM typed_stats
         )
-    except ValidationError:
-        logger.error(f"""ValidationError while calculating {stats_range} top {entity} for user: 
-        {_dict["user_id"]}. Data: {json.dumps(_dict, indent=3)}""", exc_info=True)
-        return None
+            SELECT to_json(
+                        named_struct(
+                            'user_id', user_id
+                          , 'data', valid_records
+                          , 'count', entity_count - (records_count - size(valid_records))
+                        )
+                   ) AS stats
+              FROM valid_stats
+             WHERE user_id >= 0
+    """)
+
+
+def validate_user_stats(user_stats: dict, entity: str, stats_range: str) -> dict:
+    """ Validate the records of the stats of a user with the pydantic model of the entity. The records have
+    already been validated in spark, this is used on a sample of the users to detect the queries and the models
+    disagreeing. Invalid records are logged and removed. """
+    model = entity_model_map[entity]
+    valid_records = []
+    for record in user_stats["data"]:
+        try:
+            model(**record)
+            valid_records.append(record)
+        except ValidationError:
+            logger.error(f"Invalid entry in {stats_range} top {entity} of user {user_stats['user_id']}: {record}",
+                         exc_info=True)
+    user_stats["count"] -= len(user_stats["data"]) - len(valid_records)
+    user_stats["data"] = valid_records
+    return user_stats
 
 
-def create_messages(data, entity: str, stats_range: str, from_date: datetime, to_date: datetime,
+def create_messages(data: DataFrame, entity: str, stats_range: str, from_date: datetime, to_date: datetime,
                     message_type: str, database: str = None) \
         -> Iterator[Optional[Dict]]:
     """
     Create messages to send the data to the webserver via RabbitMQ
 
+    The records are validated in spark by get_valid_entity_stats, the driver only parses the json created by
+    spark. If STATS_VALIDATION_SAMPLE_RATE is set in the config, the stats of that fraction of the users are
+    also validated with the pydantic models.
+
     Args:
-        data: Data to sent to the webserver
+        data: Data to sent to the webserver, the dataframe returned by the handler of the entity
         entity: The entity for which statistics are calculated, i.e 'artists',
             'releases' or 'recordings'
         stats_range: The range for which the statistics have been calculated
@@ -133,28 +270,39 @@ def create_messages(data, entity: str, stats_range: str, from_date: datetime, to
 
     from_ts = int(from_date.timestamp())
     to_ts = int(to_date.timestamp())
+    validation_sample_rate = getattr(config, "STATS_VALIDATION_SAMPLE_RATE", 0)
 
-    for entries in chunked(data, USERS_PER_MESSAGE):
+    # measure the cpu time the driver spends on fetching the stats and creating the messages, excluding
+    # the time spent by the consumer of the messages
+    cpu_time = 0
+    records_count = 0
+    start = time.process_time()
+    for entries in chunked(get_valid_entity_stats(data, entity).toLocalIterator(), USERS_PER_MESSAGE):
         multiple_user_stats = []
         for entry in entries:
-            processed_stat = parse_one_user_stats(entry, entity, stats_range)
-            multiple_user_stats.append(processed_stat)
+            user_stats = orjson.loads(entry.stats)
+            if validation_sample_rate and random.random() < validation_sample_rate:
+                user_stats = validate_user_stats(user_stats, entity, stats_range)
+            records_count += len(user_stats["data"])
+            multiple_user_stats.append(user_stats)
 
-        try:
-            model = UserEntityStatMessage(**{
-                "type": message_type,
-                "stats_range": stats_range,
-                "from_ts": from_ts,
-                "to_ts": to_ts,
-                "entity": entity,
-                "data": multiple_user_stats,
-                "database": database
-            })
-            result = model.dict(exclude_none=True)
-            yield result
-        except ValidationError:
-            logger.error(f"ValidationError while calculating {stats_range} top {entity}:", exc_info=True)
-            yield None
+        message = {
+            "type": message_type,
+            "stats_range": stats_range,
+            "from_ts": from_ts,
+            "to_ts": to_ts,
+            "entity": entity,
+            "data": multiple_user_stats,
+            "database": database
+        }
+        cpu_time += time.process_time() - start
+        yield message
+        start = time.process_time()
+    cpu_time += time.process_time() - start
+
+    if records_count:
+        logger.info("Driver CPU time for %s top %s: %.2fs for %d records, %.2fs per million records",
+                    stats_range, entity, cpu_time, records_count, cpu_time * 1_000_000 / records_count)
 
     yield {
         "type": "couchdb_data_end",
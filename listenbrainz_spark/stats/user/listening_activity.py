@@ -11,15 +11,18 @@ from data.model.user_listening_activity import ListeningActivityRecord
 from listenbrainz_spark.stats import run_query
 from listenbrainz_spark.stats.common.listening_activity import setup_time_range
 from listenbrainz_spark.stats.user import USERS_PER_MESSAGE
-from listenbrainz_spark.utils import get_listens_from_dump
+from listenbrainz_spark.utils import get_daily_listen_counts
 
 
 logger = logging.getLogger(__name__)
 
 
-def calculate_listening_activity():
-    """ Calculate number of listens for each user in time ranges given in the "time_range" table.
-    The time ranges are as follows:
+def calculate_listening_activity_from_daily_counts():
+    """ Calculate number of listens for each user in time ranges given in the "time_range" table from
+    the number of listens of each user on each day in the "daily_listen_counts" table.
+
+    The listens are not scanned, each time range is a whole number of days so its listen count is the
+    sum of the counts of its days. The time ranges are as follows:
         1) week - each day with weekday name of the past 2 weeks
         2) month - each day the past 2 months
         3) quarter - each week of past 2 quarters
@@ -27,24 +30,31 @@ def calculate_listening_activity():
         5) year - each month of the past 2 years
         4) all_time - each year starting from LAST_FM_FOUNDING_YEAR (2002)
     """
-    # calculates the number of listens in each time range for each user, count(listen.listened_at) so that
-    # group without listens are counted as 0, count(*) gives 1.
-    result = run_query(""" 
-        WITH dist_user_id AS (
-            SELECT DISTINCT user_id FROM listens
+    # users without listens in any time range are skipped, the daily counts include the whole
+    # last day of the range which is not part of any time range.
+    result = run_query("""
+        WITH bucket_listen_counts AS (
+            SELECT daily_listen_counts.user_id
+                 , time_range.time_range
+                 , sum(daily_listen_counts.listen_count) AS listen_count
+              FROM daily_listen_counts
+              JOIN time_range
+                ON daily_listen_counts.day BETWEEN time_range.start AND time_range.end
+          GROUP BY daily_listen_counts.user_id
+                 , time_range.time_range
+        ), dist_user_id AS (
+            SELECT DISTINCT user_id FROM bucket_listen_counts
         ), intermediate_table AS (
             SELECT dist_user_id.user_id AS user_id
-                 , to_unix_timestamp(first(time_range.start)) as from_ts
-                 , to_unix_timestamp(first(time_range.end)) as to_ts
+                 , to_unix_timestamp(time_range.start) as from_ts
+                 , to_unix_timestamp(time_range.end) as to_ts
                  , time_range.time_range AS time_range
-                 , count(listens.listened_at) as listen_count
+                 , COALESCE(bucket_listen_counts.listen_count, 0) as listen_count
               FROM dist_user_id
         CROSS JOIN time_range
-         LEFT JOIN listens
-                ON listens.listened_at BETWEEN time_range.start AND time_range.end
-               AND listens.user_id = dist_user_id.user_id
-          GROUP BY dist_user_id.user_id
-                 , time_range.time_range
+         LEFT JOIN bucket_listen_counts
+                ON bucket_listen_counts.user_id = dist_user_id.user_id
+               AND bucket_listen_counts.time_range = time_range.time_range
         )
             SELECT user_id
                  , sort_array(
@@ -67,11 +77,14 @@ def get_listening_activity(stats_range: str, message_type="user_listening_activi
     bin size of the histogram depends on the size of the range (e.g.
     year -> 12 months, month -> ~30 days, week -> ~7 days, see get_time_range for
     details). These values are used on the listening activity reports.
+
+    The listen counts are summed up from the daily listen counts of the users instead of
+    being counted from the listens.
     """
     logger.debug(f"Calculating listening_activity_{stats_range}")
     from_date, to_date, _, _, _ = setup_time_range(stats_range)
-    get_listens_from_dump(from_date, to_date).createOrReplaceTempView("listens")
-    data = calculate_listening_activity()
+    get_daily_listen_counts(from_date, to_date).createOrReplaceTempView("daily_listen_counts")
+    data = calculate_listening_activity_from_daily_counts()
     messages = create_messages(data=data, stats_range=stats_range,
                                from_date=from_date, to_date=to_date,
                                message_type=message_type, database=database)
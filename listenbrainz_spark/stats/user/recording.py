@@ -11,7 +11,7 @@ def get_recordings(table: str, cache_table: str, number_of_results: int):
         number_of_results: number of top results to keep per user.
 
     Returns:
-        iterator (iter): an iterator over result:
+        dataframe: a dataframe of the result
                 {
                     'user1' : [
                         {
@@ -99,4 +99,4 @@ def get_recordings(table: str, cache_table: str, number_of_results: int):
              USING (user_id)
         """)
 
-    return result.toLocalIterator()
+    return result
@@ -2,6 +2,9 @@ import json
 from datetime import datetime
 from unittest.mock import MagicMock, patch
 
+from pyspark.sql.types import StructType, StructField, LongType, ArrayType
+
+import listenbrainz_spark
 from listenbrainz_spark.stats.user import entity
 from listenbrainz_spark.constants import LAST_FM_FOUNDING_YEAR
 from listenbrainz_spark.stats.user.tests import StatsTestCase
@@ -62,62 +65,74 @@ class UserEntityTestCase(StatsTestCase):
                                                 from_date=from_date, to_date=to_date, message_type="user_entity",
                                                 database=None)
 
-    def test_skip_incorrect_artists_stats(self):
-        """ Test to check if entries with incorrect data is skipped for top user artists """
-        with open(self.path_to_data_file('user_top_artists_incorrect.json')) as f:
+    @patch('listenbrainz_spark.stats.user.entity.read_files_from_HDFS')
+    @patch('listenbrainz_spark.stats.user.entity.get_listens_from_dump')
+    @patch('listenbrainz_spark.stats.user.entity.calculate_entity_stats')
+    def test_get_all_entity_stats(self, mock_calculate_entity_stats, mock_get_listens, mock_read_files):
+        mock_calculate_entity_stats.side_effect = lambda *args: [args[4]]
+
+        messages = list(entity.get_all_entity_stats('week', database_suffix='20210809'))
+
+        from_date = datetime(2021, 8, 2)
+        to_date = datetime(2021, 8, 9)
+        # the listens and each cache table are read only once for all entities
+        mock_get_listens.assert_called_once_with(from_date, to_date)
+        self.assertEqual(mock_read_files.call_count, 2)
+        self.assertEqual(messages, ['artists', 'releases', 'recordings'])
+
+        databases = [call.args[7] for call in mock_calculate_entity_stats.call_args_list]
+        self.assertEqual(databases, ['artists_week_20210809', 'releases_week_20210809', 'recordings_week_20210809'])
+        # releases and recordings use the same cache table
+        cache_tables = [call.args[3] for call in mock_calculate_entity_stats.call_args_list]
+        self.assertNotEqual(cache_tables[0], cache_tables[1])
+        self.assertEqual(cache_tables[1], cache_tables[2])
+
+        listens = mock_get_listens.return_value.select.return_value.persist.return_value
+        listens.unpersist.assert_called_once()
+
+    def assert_only_first_record_valid(self, entity_name, file_name):
+        with open(self.path_to_data_file(file_name)) as f:
             data = json.load(f)
 
-        mock_result = MagicMock()
-        mock_result.asDict.return_value = {
-            'user_id': 1,
-            'artists': data,
-            'artists_count': 3
-        }
+        schema = StructType([
+            StructField('user_id', LongType()),
+            StructField(f'{entity_name}_count', LongType()),
+            StructField(entity_name, ArrayType(entity.entity_schema_map[entity_name]))
+        ])
+        document = json.dumps({'user_id': 1, f'{entity_name}_count': len(data), entity_name: data})
+        stats_df = listenbrainz_spark.session.read.json(listenbrainz_spark.context.parallelize([document]), schema)
 
-        messages = entity.create_messages([mock_result], 'artists', 'all_time',
+        messages = entity.create_messages(stats_df, entity_name, 'all_time',
                                           datetime.now(), datetime.now(), "user_entity")
         next(messages)  # skip couchdb database create message
-        received_list = next(messages)["data"][0]["data"]
+        received = next(messages)["data"][0]
 
         # Only the first entry in file is valid, all others must be skipped
-        self.assertListEqual(data[:1], received_list)
+        self.assertListEqual(data[:1], received["data"])
+        self.assertEqual(received["count"], 1)
+
+    def test_skip_incorrect_artists_stats(self):
+        """ Test to check if entries with incorrect data is skipped for top user artists """
+        self.assert_only_first_record_valid('artists', 'user_top_artists_incorrect.json')
 
     def test_skip_incorrect_releases_stats(self):
         """ Test to check if entries with incorrect data is skipped for top user releases """
-        with open(self.path_to_data_file('user_top_releases_incorrect.json')) as f:
-            data = json.load(f)
-
-        mock_result = MagicMock()
-        mock_result.asDict.return_value = {
-            'user_id': 1,
-            'releases': data,
-            'releases_count': 3
-        }
-
-        messages = entity.create_messages([mock_result], 'releases', 'all_time',
-                                          datetime.now(), datetime.now(), "user_entity")
-        next(messages)  # skip couchdb database create message
-        received_list = next(messages)["data"][0]["data"]
-
-        # Only the first entry in file is valid, all others must be skipped
-        self.assertListEqual(data[:1], received_list)
+        self.assert_only_first_record_valid('releases', 'user_top_releases_incorrect.json')
 
     def test_skip_incorrect_recordings_stats(self):
         """ Test to check if entries with incorrect data is skipped for top user recordings """
-        with open(self.path_to_data_file('user_top_recordings_incorrect.json')) as f:
-            data = json.load(f)
+        self.assert_only_first_record_valid('recordings', 'user_top_recordings_incorrect.json')
 
-        mock_result = MagicMock()
-        mock_result.asDict.return_value = {
+    def test_validate_user_stats(self):
+        """ Test that the sampled validation removes the records rejected by the pydantic models """
+        user_stats = {
             'user_id': 1,
-            'recordings': data,
-            'recordings_count': 4
+            'count': 5,
+            'data': [
+                {'artist_name': 'Klergy', 'artist_mbid': '5586fc31-7c41-4a2d-97a2-d358b58b250d', 'listen_count': 5},
+                {'artist_name': 'artist_1', 'artist_mbid': 'not-a-uuid', 'listen_count': 1}
+            ]
         }
-
-        messages = entity.create_messages([mock_result], 'recordings', 'all_time',
-                                          datetime.now(), datetime.now(), "user_entity")
-        next(messages)  # skip couchdb database create message
-        received_list = next(messages)["data"][0]["data"]
-
-        # Only the first entry in file is valid, all others must be skipped
-        self.assertListEqual(data[:1], received_list)
+        result = entity.validate_user_stats(user_stats, 'artists', 'all_time')
+        self.assertEqual(result['count'], 4)
+        self.assertEqual([record['artist_name'] for record in result['data']], ['Klergy'])
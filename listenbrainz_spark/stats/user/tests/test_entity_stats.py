@@ -1,6 +1,6 @@
 import json
 
-from listenbrainz_spark.stats.user.entity import get_entity_stats
+from listenbrainz_spark.stats.user.entity import get_entity_stats, get_all_entity_stats
 from listenbrainz_spark.stats.user.tests import StatsTestCase
 
 
@@ -68,3 +68,18 @@ class EntityTestCase(StatsTestCase):
 
         self.assertEqual(messages[2]["type"], "couchdb_data_end")
         self.assertEqual(messages[2]["database"], "releases_all_time")
+
+    def test_get_all_entity_stats(self):
+        messages = list(get_all_entity_stats('all_time', database_suffix='test'))
+
+        expected = []
+        for entity in ['artists', 'releases', 'recordings']:
+            expected.extend(get_entity_stats(entity, 'all_time', database=f'{entity}_all_time_test'))
+
+        self.assertEqual(len(messages), len(expected))
+        for received, expected_message in zip(messages, expected):
+            self.assertEqual(received["type"], expected_message["type"])
+            self.assertEqual(received["database"], expected_message["database"])
+            if "data" in expected_message:
+                self.assertEqual(received["entity"], expected_message["entity"])
+                self.assertCountEqual(received["data"], expected_message["data"])
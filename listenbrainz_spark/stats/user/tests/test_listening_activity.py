@@ -6,9 +6,45 @@ from dateutil.relativedelta import relativedelta
 
 import listenbrainz_spark.stats.user.listening_activity as listening_activity_stats
 import listenbrainz_spark.stats.common.listening_activity as listening_activity_utils
+from data.model.common_stat import ALLOWED_STATISTICS_RANGE
 from listenbrainz_spark.stats import (offset_days, offset_months, get_day_end,
                                       get_month_end, run_query)
 from listenbrainz_spark.stats.user.tests import StatsTestCase
+from listenbrainz_spark.utils import get_listens_from_dump, get_daily_listen_counts
+
+
+def calculate_listening_activity_from_listens():
+    """ The listening activity counted from the listens in the "listens" table, as it was calculated
+    before the daily listen counts were stored. """
+    # calculates the number of listens in each time range for each user, count(listen.listened_at) so that
+    # group without listens are counted as 0, count(*) gives 1.
+    result = run_query(""" 
+        WITH dist_user_id AS (
+            SELECT DISTINCT user_id FROM listens
+        ), intermediate_table AS (
+            SELECT dist_user_id.user_id AS user_id
+                 , to_unix_timestamp(first(time_range.start)) as from_ts
+                 , to_unix_timestamp(first(time_range.end)) as to_ts
+                 , time_range.time_range AS time_range
+                 , count(listens.listened_at) as listen_count
+              FROM dist_user_id
+        CROSS JOIN time_range
+         LEFT JOIN listens
+                ON listens.listened_at BETWEEN time_range.start AND time_range.end
+               AND listens.user_id = dist_user_id.user_id
+          GROUP BY dist_user_id.user_id
+                 , time_range.time_range
+        )
+            SELECT user_id
+                 , sort_array(
+                       collect_list(
+                           struct(from_ts, to_ts, time_range, listen_count)
+                        )
+                    ) AS listening_activity
+              FROM intermediate_table
+          GROUP BY user_id
+    """)
+    return result.toLocalIterator()
 
 
 class ListeningActivityTestCase(StatsTestCase):
@@ -31,10 +67,28 @@ class ListeningActivityTestCase(StatsTestCase):
         self.assertEqual(messages[2]["type"], "couchdb_data_end")
         self.assertEqual(messages[2]["database"], "listening_activity_all_time")
 
-    @patch('listenbrainz_spark.stats.user.listening_activity.get_listens_from_dump')
-    @patch('listenbrainz_spark.stats.user.listening_activity.calculate_listening_activity', return_value='activity_table')
+    def test_calculate_listening_activity_from_daily_counts(self):
+        """ The listening activity summed up from the daily listen counts is the same as the one counted from listens """
+        for stats_range in ALLOWED_STATISTICS_RANGE:
+            with self.subTest(stats_range=stats_range):
+                from_date, to_date, _, _, _ = listening_activity_utils.setup_time_range(stats_range)
+
+                get_listens_from_dump(from_date, to_date).createOrReplaceTempView("listens")
+                expected = [row.asDict(recursive=True) for row in calculate_listening_activity_from_listens()]
+
+                get_daily_listen_counts(from_date, to_date).createOrReplaceTempView("daily_listen_counts")
+                received = [
+                    row.asDict(recursive=True)
+                    for row in listening_activity_stats.calculate_listening_activity_from_daily_counts()
+                ]
+
+                self.assertNotEqual(expected, [])
+                self.assertCountEqual(received, expected)
+
+    @patch('listenbrainz_spark.stats.user.listening_activity.get_daily_listen_counts')
+    @patch('listenbrainz_spark.stats.user.listening_activity.calculate_listening_activity_from_daily_counts', return_value='activity_table')
     @patch('listenbrainz_spark.stats.user.listening_activity.create_messages')
-    def test_get_listening_activity_week(self, mock_create_messages, _, mock_get_listens):
+    def test_get_listening_activity_week(self, mock_create_messages, _, mock_get_daily_listen_counts):
         listening_activity_stats.get_listening_activity('week')
 
         from_date = day = datetime(2021, 7, 26)
@@ -47,15 +101,15 @@ class ListeningActivityTestCase(StatsTestCase):
         time_range_result = time_range_df.rdd.map(list).collect()
         self.assertListEqual(time_range_result, time_range)
 
-        mock_get_listens.assert_called_with(from_date, to_date)
+        mock_get_daily_listen_counts.assert_called_with(from_date, to_date)
         mock_create_messages.assert_called_with(data='activity_table', stats_range='week',
                                                 from_date=from_date, to_date=to_date,
                                                 message_type='user_listening_activity', database=None)
 
-    @patch('listenbrainz_spark.stats.user.listening_activity.get_listens_from_dump')
-    @patch('listenbrainz_spark.stats.user.listening_activity.calculate_listening_activity', return_value='activity_table')
+    @patch('listenbrainz_spark.stats.user.listening_activity.get_daily_listen_counts')
+    @patch('listenbrainz_spark.stats.user.listening_activity.calculate_listening_activity_from_daily_counts', return_value='activity_table')
     @patch('listenbrainz_spark.stats.user.listening_activity.create_messages')
-    def test_get_listening_activity_month(self, mock_create_messages, _, mock_get_listens):
+    def test_get_listening_activity_month(self, mock_create_messages, _, mock_get_daily_listen_counts):
         listening_activity_stats.get_listening_activity('month')
 
         from_date = day = datetime(2021, 6, 1)
@@ -68,15 +122,15 @@ class ListeningActivityTestCase(StatsTestCase):
         time_range_result = time_range_df.rdd.map(list).collect()
         self.assertListEqual(time_range_result, time_range)
 
-        mock_get_listens.assert_called_with(from_date, to_date)
+        mock_get_daily_listen_counts.assert_called_with(from_date, to_date)
         mock_create_messages.assert_called_with(data='activity_table', stats_range='month',
                                                 from_date=from_date, to_date=to_date,
                                                 message_type='user_listening_activity', database=None)
 
-    @patch('listenbrainz_spark.stats.user.listening_activity.get_listens_from_dump')
-    @patch('listenbrainz_spark.stats.user.listening_activity.calculate_listening_activity', return_value='activity_table')
+    @patch('listenbrainz_spark.stats.user.listening_activity.get_daily_listen_counts')
+    @patch('listenbrainz_spark.stats.user.listening_activity.calculate_listening_activity_from_daily_counts', return_value='activity_table')
     @patch('listenbrainz_spark.stats.user.listening_activity.create_messages')
-    def test_get_listening_activity_year(self, mock_create_messages, _, mock_get_listens):
+    def test_get_listening_activity_year(self, mock_create_messages, _, mock_get_daily_listen_counts):
         listening_activity_stats.get_listening_activity('year')
 
         from_date = month = datetime(2019, 1, 1)
@@ -89,7 +143,7 @@ class ListeningActivityTestCase(StatsTestCase):
         time_range_result = time_range_df.rdd.map(list).collect()
         self.assertListEqual(time_range_result, time_range)
 
-        mock_get_listens.assert_called_with(from_date, to_date)
+        mock_get_daily_listen_counts.assert_called_with(from_date, to_date)
         mock_create_messages.assert_called_with(data='activity_table', stats_range='year',
                                                 from_date=from_date, to_date=to_date,
                                                 message_type='user_listening_activity', database=None)
@@ -1,8 +1,9 @@
 import errno
+import json
 import logging
 import os
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from py4j.protocol import Py4JJavaError
 from pyspark.sql import DataFrame, functions
@@ -18,8 +19,9 @@ from listenbrainz_spark.exceptions import (DataFrameNotAppendedException,
                                            HDFSDirectoryNotDeletedException,
                                            PathNotFoundException,
                                            ViewNotRegisteredException)
-from listenbrainz_spark.path import LISTENBRAINZ_NEW_DATA_DIRECTORY, INCREMENTAL_DUMPS_SAVE_PATH
-from listenbrainz_spark.schema import listens_new_schema
+from listenbrainz_spark.path import LISTENBRAINZ_NEW_DATA_DIRECTORY, INCREMENTAL_DUMPS_SAVE_PATH, \
+    COMPACTED_LISTENS_SAVE_PATH, LISTENS_MANIFEST_PATH, DAILY_LISTEN_COUNTS_SAVE_PATH
+from listenbrainz_spark.schema import listens_new_schema, daily_listen_counts_schema
 
 logger = logging.getLogger(__name__)
 
@@ -111,6 +113,87 @@ def read_files_from_HDFS(path):
         raise FileNotFetchedException(err.java_exception, path)
 
 
+def read_listen_files(paths: List[str], base_path: Optional[str] = None) -> DataFrame:
+    """ Loads the listens stored in the given parquet files or directories in HDFS into a single dataframe.
+
+        Args:
+            paths: HDFS paths of the parquet files or directories
+            base_path: if reading partitions of a partitioned directory, the HDFS path of
+                that directory so that the partition columns are part of the dataframe
+    """
+    reader = listenbrainz_spark.sql_context.read
+    if base_path:
+        reader = reader.option("basePath", config.HDFS_CLUSTER_URI + base_path)
+    try:
+        return reader.parquet(*[config.HDFS_CLUSTER_URI + path for path in paths])
+    except AnalysisException as err:
+        raise PathNotFoundException(str(err), ", ".join(paths))
+    except Py4JJavaError as err:
+        raise FileNotFetchedException(err.java_exception, ", ".join(paths))
+
+
+def get_files_stats(paths: List[str]) -> Tuple[int, int]:
+    """ Get the number of files and the total size in bytes of the files in the given HDFS paths. """
+    files, size = 0, 0
+    for path in paths:
+        content = hdfs_connection.client.content(path, strict=False)
+        if content:
+            files += content["fileCount"]
+            size += content["length"]
+    return files, size
+
+
+def _get_partition_value(name: str) -> int:
+    """ Get the value of a partition from its directory name, like 2021 for year=2021 """
+    return int(name.split("=", 1)[1])
+
+
+def get_compacted_listens_partitions(start: Optional[datetime] = None, end: Optional[datetime] = None) \
+        -> List[Tuple[int, int, str]]:
+    """ Get the year/month partitions of the compacted listens which may contain listens between start and end.
+
+        Args:
+            start: minimum time of listens to include, all partitions before end if not specified
+            end: maximum time of listens to include, all partitions after start if not specified
+
+        Returns:
+            list of (year, month, path) tuples in chronological order
+    """
+    return _get_year_month_partitions(COMPACTED_LISTENS_SAVE_PATH, start, end)
+
+
+def get_daily_listen_counts_partitions(start: Optional[datetime] = None, end: Optional[datetime] = None) \
+        -> List[Tuple[int, int, str]]:
+    """ Get the year/month partitions of the stored daily listen counts which may contain days between
+    start and end, as (year, month, path) tuples in chronological order. """
+    return _get_year_month_partitions(DAILY_LISTEN_COUNTS_SAVE_PATH, start, end)
+
+
+def _get_year_month_partitions(base_path: str, start: Optional[datetime], end: Optional[datetime]) \
+        -> List[Tuple[int, int, str]]:
+    if not hdfs_connection.client.status(base_path, strict=False):
+        return []
+
+    first = (start.year, start.month) if start else None
+    last = (end.year, end.month) if end else None
+    partitions = []
+    for year_dir in hdfs_connection.client.list(base_path):
+        if not year_dir.startswith("year="):
+            continue
+        year = _get_partition_value(year_dir)
+        if (first and year < first[0]) or (last and year > last[0]):
+            continue
+        for month_dir in hdfs_connection.client.list(os.path.join(base_path, year_dir)):
+            if not month_dir.startswith("month="):
+                continue
+            month = _get_partition_value(month_dir)
+            if (first and (year, month) < first) or (last and (year, month) > last):
+                continue
+            partitions.append((year, month, os.path.join(base_path, year_dir, month_dir)))
+    partitions.sort()
+    return partitions
+
+
 def get_listen_files_list() -> List[str]:
     """ Get list of name of parquet files containing the listens.
     The list of file names is in order of newest to oldest listens.
@@ -148,6 +231,9 @@ def get_listen_files_list() -> List[str]:
 def get_listens_from_dump(start: Optional[datetime], end: Optional[datetime]) -> DataFrame:
     """ Load listens with listened_at between from_ts and to_ts from HDFS in a spark dataframe.
 
+        Listens which have been compacted are read only from the year/month partitions which overlap
+        with the requested range, listens of dumps imported since the last compaction are always read.
+
         Args:
             start: minimum time to include a listen in the dataframe
             end: maximum time to include a listen in the dataframe
@@ -156,34 +242,172 @@ def get_listens_from_dump(start: Optional[datetime], end: Optional[datetime]) ->
             dataframe of listens with listened_at between start and end
     """
     df = listenbrainz_spark.session.createDataFrame([], listens_new_schema)
+    scanned_paths = []
+
+    partitions = [path for _, _, path in get_compacted_listens_partitions(start, end)]
+    if partitions:
+        compacted_df = read_listen_files(partitions, base_path=COMPACTED_LISTENS_SAVE_PATH).drop("year", "month")
+        df = df.union(compacted_df)
+        scanned_paths.extend(partitions)
+
+    uncompacted_df, uncompacted_paths = _get_uncompacted_listens()
+    df = df.union(uncompacted_df)
+    scanned_paths.extend(uncompacted_paths)
+
+    logger.info("Reading listens between %s and %s from %d paths", start, end, len(scanned_paths))
+    if logger.isEnabledFor(logging.DEBUG):
+        # one namenode request per path, so only done when debugging
+        files, size = get_files_stats(scanned_paths)
+        logger.debug("Reading listens between %s and %s from %d files, %d bytes", start, end, files, size)
+
+    if start:
+        df = df.where(f"listened_at >= to_timestamp('{start}')")
+    if end:
+        df = df.where(f"listened_at <= to_timestamp('{end}')")
+
+    return df
+
+
+def _get_uncompacted_listens() -> Tuple[DataFrame, List[str]]:
+    """ Load the listens of the full and incremental dumps which have not been compacted yet.
+
+        Returns:
+            the dataframe of the listens and the list of HDFS paths read
+    """
+    df = listenbrainz_spark.session.createDataFrame([], listens_new_schema)
+    scanned_paths = []
 
     # full dump directory always exists because the incremental dumps are stored in a nested dir inside it
     # therefore to check existence of full dump, we instead need to check whether a parquet file of the full
     # dump exists. since files are number from 0, we check for 0.parquet
     full_dump_test_path = os.path.join(LISTENBRAINZ_NEW_DATA_DIRECTORY, "0.parquet")
-    if hdfs_connection.client.status(full_dump_test_path, strict=False):
+    has_full_dump = hdfs_connection.client.status(full_dump_test_path, strict=False)
+    if has_full_dump:
         full_df = read_files_from_HDFS(LISTENBRAINZ_NEW_DATA_DIRECTORY)
         df = df.union(full_df)
+        # the size of the full dump directory includes the nested incremental dumps
+        scanned_paths.append(LISTENBRAINZ_NEW_DATA_DIRECTORY)
     if hdfs_connection.client.status(INCREMENTAL_DUMPS_SAVE_PATH, strict=False):
         inc_df = read_files_from_HDFS(INCREMENTAL_DUMPS_SAVE_PATH)
         df = df.union(inc_df)
+        if not has_full_dump:
+            scanned_paths.append(INCREMENTAL_DUMPS_SAVE_PATH)
+
+    return df, scanned_paths
+
+
+def count_listens_by_day(listens: DataFrame) -> DataFrame:
+    """ Count the listens of each user on each day, the day is the timestamp of the start of the day. """
+    return listens \
+        .where("listened_at IS NOT NULL") \
+        .groupBy("user_id", functions.date_trunc("day", "listened_at").alias("day")) \
+        .agg(functions.count("*").alias("listen_count"))
+
+
+def get_daily_listen_counts(start: Optional[datetime], end: Optional[datetime]) -> DataFrame:
+    """ Load the number of listens of each user on each day between start and end in a spark dataframe.
+
+        The counts of the compacted months are read from the daily listen counts stored when the listens
+        were compacted. Only the listens which have not been compacted yet, and the listens of compacted
+        months without stored counts, are counted here.
+
+        Args:
+            start: the days before the day of start are not included
+            end: the days after the day of end are not included
+
+        Returns:
+            dataframe with the user_id, day and listen_count columns, where day is the timestamp of the start
+            of the day. the counts are of whole days, including the listens of the first and the last day which
+            are before start or after end.
+    """
+    stored_partitions = {(year, month): path for year, month, path in get_daily_listen_counts_partitions(start, end)}
+    counted_paths = []
+    listen_paths = []
+    for year, month, path in get_compacted_listens_partitions(start, end):
+        if (year, month) in stored_partitions:
+            counted_paths.append(stored_partitions[(year, month)])
+        else:
+            listen_paths.append(path)
+
+    listens, scanned_paths = _get_uncompacted_listens()
+    if listen_paths:
+        compacted_df = read_listen_files(listen_paths, base_path=COMPACTED_LISTENS_SAVE_PATH).drop("year", "month")
+        listens = listens.union(compacted_df)
+        scanned_paths.extend(listen_paths)
+
+    logger.info("Reading daily listen counts between %s and %s from %d paths of daily counts and %d paths of listens",
+                start, end, len(counted_paths), len(scanned_paths))
+    if logger.isEnabledFor(logging.DEBUG):
+        files, size = get_files_stats(counted_paths + scanned_paths)
+        logger.debug("Reading daily listen counts between %s and %s from %d files, %d bytes",
+                     start, end, files, size)
 
     if start:
-        df = df.where(f"listened_at >= to_timestamp('{start}')")
+        listens = listens.where(f"listened_at >= date_trunc('day', to_timestamp('{start}'))")
+    df = count_listens_by_day(listens)
+    if counted_paths:
+        counted_df = read_listen_files(counted_paths, base_path=DAILY_LISTEN_COUNTS_SAVE_PATH)\
+            .select(*daily_listen_counts_schema.fieldNames())
+        # listens of a day may be both in the compacted listens and in the dumps imported after the compaction
+        df = df.union(counted_df)\
+            .groupBy("user_id", "day")\
+            .agg(functions.sum("listen_count").alias("listen_count"))
+
+    if start:
+        df = df.where(f"day >= date_trunc('day', to_timestamp('{start}'))")
     if end:
-        df = df.where(f"listened_at <= to_timestamp('{end}')")
+        df = df.where(f"day <= to_timestamp('{end}')")
 
     return df
 
 
+def get_listens_manifest() -> Optional[dict]:
+    """ Get the manifest of the uploaded listens dumps, None if no manifest exists.
+
+        The manifest is of the form {"uploads": [upload, ...]} where each upload is a dict with the
+        dump_name, dump_type, listen_count, min_listened_at and max_listened_at of the dump. The
+        timestamps are in iso format and are None if the dump has no listens.
+    """
+    try:
+        with hdfs_connection.client.read(LISTENS_MANIFEST_PATH, encoding="utf-8") as reader:
+            return json.load(reader)
+    except HdfsError:
+        return None
+    except ValueError:
+        logger.error("Invalid listens manifest:", exc_info=True)
+        return None
+
+
+def save_listens_manifest(manifest: dict):
+    """ Save the manifest of the uploaded listens dumps, overwriting the existing one. """
+    hdfs_connection.client.write(LISTENS_MANIFEST_PATH, data=json.dumps(manifest), encoding="utf-8", overwrite=True)
+
+
 def get_latest_listen_ts() -> datetime:
     """" Get the listened_at time of the latest listen present
      in the imported dumps
+
+     The time is read from the listens manifest if available, otherwise the latest listens are scanned.
      """
-    latest_listen_file = get_listen_files_list()[0]
-    df = read_files_from_HDFS(
-        os.path.join(LISTENBRAINZ_NEW_DATA_DIRECTORY, latest_listen_file)
-    )
+    manifest = get_listens_manifest()
+    if manifest is not None:
+        latest_listen_ts = max(
+            (datetime.fromisoformat(upload["max_listened_at"])
+             for upload in manifest["uploads"] if upload["max_listened_at"]),
+            default=None
+        )
+        if latest_listen_ts is not None:
+            return latest_listen_ts
+
+    listen_files = get_listen_files_list()
+    if listen_files:
+        df = read_files_from_HDFS(
+            os.path.join(LISTENBRAINZ_NEW_DATA_DIRECTORY, listen_files[0])
+        )
+    else:
+        # all listens have been compacted, the latest listen is in the latest partition
+        _, _, latest_partition = get_compacted_listens_partitions()[-1]
+        df = read_listen_files([latest_partition])
     return df \
         .select('listened_at') \
         .agg(functions.max('listened_at').alias('latest_listen_ts'))\
@@ -1,9 +1,11 @@
 import os
 import tempfile
 from datetime import datetime
+from unittest.mock import patch
 
 from listenbrainz_spark.tests import SparkNewTestCase
 from listenbrainz_spark import utils
+from listenbrainz_spark.path import LISTENS_MANIFEST_PATH
 from listenbrainz_spark.hdfs.utils import create_dir
 from listenbrainz_spark.hdfs.utils import delete_dir
 from listenbrainz_spark.hdfs.utils import path_exists
@@ -119,5 +121,17 @@ class UtilsTestCase(SparkNewTestCase):
 
     def test_get_latest_listen_ts(self):
         self.upload_test_listens()
+        manifest = utils.get_listens_manifest()
+        self.assertEqual([upload["dump_type"] for upload in manifest["uploads"]], ["full", "incremental", "incremental"])
+        self.assertEqual([upload["listen_count"] for upload in manifest["uploads"]], [68, 9, 8])
+
+        # the timestamp is read from the manifest without reading the listens
+        with patch("listenbrainz_spark.utils.read_files_from_HDFS") as mock_read:
+            self.assertEqual(utils.get_latest_listen_ts(), datetime(2021, 8, 9, 12, 22, 43))
+            mock_read.assert_not_called()
+
+        # without manifest the latest listens are scanned
+        delete_dir(LISTENS_MANIFEST_PATH)
+        self.assertIsNone(utils.get_listens_manifest())
         self.assertEqual(utils.get_latest_listen_ts(), datetime(2021, 8, 9, 12, 22, 43))
         self.delete_uploaded_listens()
@@ -0,0 +1,63 @@
+import logging
+import time
+
+from listenbrainz_spark.year_in_music.artist_map import get_artist_map_stats
+from listenbrainz_spark.year_in_music.day_of_week import get_day_of_week
+from listenbrainz_spark.year_in_music.listen_count import get_listen_count
+from listenbrainz_spark.year_in_music.listening_time import get_listening_time
+from listenbrainz_spark.year_in_music.listens_per_day import calculate_listens_per_day
+from listenbrainz_spark.year_in_music.most_listened_year import get_most_listened_year
+from listenbrainz_spark.year_in_music.new_artists_discovered import get_new_artists_discovered_count
+from listenbrainz_spark.year_in_music.new_releases_of_top_artists import get_new_releases_of_top_artists
+from listenbrainz_spark.year_in_music.similar_users import get_similar_users
+from listenbrainz_spark.year_in_music.top_stats import calculate_top_entity_stats
+from listenbrainz_spark.year_in_music.tracks_of_the_year import calculate_tracks_of_the_year
+from listenbrainz_spark.year_in_music.utils import cache_listens_for_year, uncache_listens_for_year
+
+logger = logging.getLogger(__name__)
+
+# the reports in the order in which they are calculated, same as the order of the separate requests sent by
+# request_year_in_music before. similar users are calculated from the recommendation dataframes and do not use
+# the cached listens.
+YEAR_IN_MUSIC_REPORTS = [
+    ("new_releases_of_top_artists", get_new_releases_of_top_artists),
+    ("day_of_week", get_day_of_week),
+    ("most_listened_year", get_most_listened_year),
+    ("top_stats", calculate_top_entity_stats),
+    ("listens_per_day", calculate_listens_per_day),
+    ("listen_count", get_listen_count),
+    ("similar_users", get_similar_users),
+    ("new_artists_discovered_count", get_new_artists_discovered_count),
+    ("listening_time", get_listening_time),
+    ("artist_map", get_artist_map_stats),
+    ("tracks_of_the_year", calculate_tracks_of_the_year),
+]
+
+
+def calculate_all_reports(year):
+    """ Calculate all year in music reports for the given year.
+
+    The listens of the year are read once and persisted, and all reports are calculated from the persisted
+    listens instead of reading the listens again for each report. The time taken by each report (including
+    sending its messages) and the total time are logged.
+    """
+    timings = {}
+    total_start = time.monotonic()
+
+    start = time.monotonic()
+    cache_listens_for_year(year)
+    timings["cache_listens"] = time.monotonic() - start
+
+    try:
+        for name, report in YEAR_IN_MUSIC_REPORTS:
+            logger.info("Calculating year in music %s for %d", name, year)
+            start = time.monotonic()
+            yield from report(year)
+            timings[name] = time.monotonic() - start
+            logger.info("Calculated year in music %s for %d in %.2f seconds", name, year, timings[name])
+    finally:
+        uncache_listens_for_year(year)
+
+    total = time.monotonic() - total_start
+    summary = ", ".join(f"{name}: {duration:.2f}s" for name, duration in timings.items())
+    logger.info("Calculated all year in music reports for %d in %.2f seconds (%s)", year, total, summary)
@@ -1,5 +1,3 @@
-from datetime import datetime, date, time
-
 import pycountry
 from more_itertools import chunked
 from pyspark.sql.types import StructField, StringType
@@ -9,16 +7,14 @@ from listenbrainz_spark import config
 from listenbrainz_spark.path import ARTIST_COUNTRY_CODE_DATAFRAME
 from listenbrainz_spark.postgres.artist import create_artist_country_cache
 from listenbrainz_spark.stats import run_query
-from listenbrainz_spark.utils import get_listens_from_dump
+from listenbrainz_spark.year_in_music.utils import get_listens_for_year
 
 
 USERS_PER_MESSAGE = 100
 
 
 def get_artist_map_stats(year):
-    start = datetime.combine(date(year, 1, 1), time.min)
-    end = datetime.combine(date(year, 12, 31), time.max)
-    get_listens_from_dump(start, end).createOrReplaceTempView("listens")
+    get_listens_for_year(year).createOrReplaceTempView("listens")
 
     create_artist_country_cache()
 
@@ -30,14 +26,12 @@ def get_artist_map_stats(year):
 
     create_iso_country_codes_df()
 
-    query = f"""
+    query = """
           WITH exploded_listens as (
             SELECT user_id
                  , explode(artist_credit_mbids) AS artist_mbid
               FROM listens
-             WHERE listened_at >= to_timestamp('{start}')
-               AND listened_at <= to_timestamp('{end}')
-               AND artist_credit_mbids IS NOT NULL
+             WHERE artist_credit_mbids IS NOT NULL
           ), artist_counts AS (
             SELECT user_id
                  , artist_mbid
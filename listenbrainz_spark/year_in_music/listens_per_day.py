@@ -3,8 +3,9 @@ from datetime import datetime, date, time
 from dateutil.relativedelta import relativedelta
 
 from listenbrainz_spark.stats.common.listening_activity import _create_time_range_df
-from listenbrainz_spark.stats.user.listening_activity import calculate_listening_activity, create_messages
-from listenbrainz_spark.utils import get_listens_from_dump
+from listenbrainz_spark.stats.user.listening_activity import calculate_listening_activity_from_daily_counts, \
+    create_messages
+from listenbrainz_spark.utils import get_daily_listen_counts
 
 
 def calculate_listens_per_day(year):
@@ -15,10 +16,9 @@ def calculate_listens_per_day(year):
     spark_date_format = "dd MMMM y"
 
     _create_time_range_df(from_date, to_date, step, date_format, spark_date_format)
-    listens = get_listens_from_dump(from_date, to_date)
-    listens.createOrReplaceTempView("listens")
+    get_daily_listen_counts(from_date, to_date).createOrReplaceTempView("daily_listen_counts")
 
-    data = calculate_listening_activity()
+    data = calculate_listening_activity_from_daily_counts()
     stats = create_messages(data=data, stats_range="year_in_music", from_date=from_date,
                             to_date=to_date, message_type="year_in_music_listens_per_day")
     for message in stats:
@@ -1,5 +1,3 @@
-from datetime import datetime, date, time
-
 import listenbrainz_spark
 from data.model.new_releases_stat import NewReleasesStat
 from listenbrainz_spark import config
@@ -7,13 +5,11 @@ from listenbrainz_spark.path import RELEASE_GROUPS_YEAR_DATAFRAME
 from listenbrainz_spark.postgres.release_group import create_year_release_groups
 
 from listenbrainz_spark.stats import run_query
-from listenbrainz_spark.utils import get_listens_from_dump
+from listenbrainz_spark.year_in_music.utils import get_listens_for_year
 
 
 def get_new_releases_of_top_artists(year):
-    from_date = datetime(year, 1, 1)
-    to_date = datetime.combine(date(year, 12, 31), time.max)
-    get_listens_from_dump(from_date, to_date).createOrReplaceTempView("listens")
+    get_listens_for_year(year).createOrReplaceTempView("listens")
 
     create_year_release_groups(year)
     listenbrainz_spark\
@@ -0,0 +1,76 @@
+import json
+from unittest.mock import patch
+
+from listenbrainz_spark.stats.user.tests import StatsTestCase
+from listenbrainz_spark.year_in_music import all_reports, utils
+from listenbrainz_spark.year_in_music.day_of_week import get_day_of_week
+from listenbrainz_spark.year_in_music.listen_count import get_listen_count
+from listenbrainz_spark.year_in_music.new_artists_discovered import get_new_artists_discovered_count
+
+# the reports which only use the listens of the year
+LISTEN_REPORTS = [
+    ("day_of_week", get_day_of_week),
+    ("listen_count", get_listen_count),
+    ("new_artists_discovered_count", get_new_artists_discovered_count),
+]
+
+
+class AllReportsTestCase(StatsTestCase):
+
+    @staticmethod
+    def parse_messages(messages):
+        # the data of the reports are json objects whose keys are not in a fixed order
+        return [{**message, "data": json.loads(message["data"])} for message in messages]
+
+    @patch("listenbrainz_spark.year_in_music.all_reports.YEAR_IN_MUSIC_REPORTS", LISTEN_REPORTS)
+    def test_calculate_all_reports(self):
+        expected = []
+        for _, report in LISTEN_REPORTS:
+            expected.extend(report(2021))
+
+        with patch("listenbrainz_spark.year_in_music.utils.get_listens_from_dump",
+                   wraps=utils.get_listens_from_dump) as mock_get_listens:
+            received = list(all_reports.calculate_all_reports(2021))
+            # the listens are read once for all reports
+            mock_get_listens.assert_called_once()
+
+        self.assertListEqual(self.parse_messages(received), self.parse_messages(expected))
+        self.assertDictEqual(utils._cached_listens, {})
+
+    @patch("listenbrainz_spark.year_in_music.utils.get_listens_from_dump")
+    def test_calculate_all_reports_uses_cached_listens(self, mock_get_listens):
+        cached_listens = mock_get_listens.return_value.select.return_value.persist.return_value
+        received_listens = []
+
+        def report(year):
+            received_listens.append(utils.get_listens_for_year(year))
+            yield {"type": "test", "year": year}
+
+        def failing_report(year):
+            received_listens.append(utils.get_listens_for_year(year))
+            raise RuntimeError("report failed")
+            yield
+
+        with patch("listenbrainz_spark.year_in_music.all_reports.YEAR_IN_MUSIC_REPORTS",
+                   [("first", report), ("second", report)]):
+            messages = list(all_reports.calculate_all_reports(2021))
+        self.assertListEqual(messages, [{"type": "test", "year": 2021}] * 2)
+        self.assertListEqual(received_listens, [cached_listens, cached_listens])
+        mock_get_listens.assert_called_once()
+        mock_get_listens.return_value.select.assert_called_once_with(*utils.YEAR_IN_MUSIC_LISTEN_COLUMNS)
+        cached_listens.unpersist.assert_called_once()
+        self.assertDictEqual(utils._cached_listens, {})
+
+        # the listens are unpersisted even if a report fails
+        cached_listens.unpersist.reset_mock()
+        with patch("listenbrainz_spark.year_in_music.all_reports.YEAR_IN_MUSIC_REPORTS",
+                   [("first", failing_report)]):
+            with self.assertRaises(RuntimeError):
+                list(all_reports.calculate_all_reports(2021))
+        cached_listens.unpersist.assert_called_once()
+        self.assertDictEqual(utils._cached_listens, {})
+
+        # without caching, the listens are read from the dump for each call
+        mock_get_listens.reset_mock()
+        self.assertEqual(utils.get_listens_for_year(2021), mock_get_listens.return_value)
+        mock_get_listens.assert_called_once_with(*utils.get_year_range(2021))
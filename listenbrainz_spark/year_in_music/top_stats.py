@@ -2,7 +2,8 @@ from datetime import datetime, date, time
 
 from listenbrainz_spark.path import RELEASE_METADATA_CACHE_DATAFRAME
 from listenbrainz_spark.stats.user.entity import calculate_entity_stats, get_entity_stats, entity_cache_map
-from listenbrainz_spark.utils import get_listens_from_dump, read_files_from_HDFS
+from listenbrainz_spark.utils import read_files_from_HDFS
+from listenbrainz_spark.year_in_music.utils import get_listens_for_year
 
 
 def calculate_top_entity_stats(year):
@@ -10,7 +11,7 @@ def calculate_top_entity_stats(year):
     to_date = datetime.combine(date(year, 12, 31), time.max)
     table = "listens_of_year"
 
-    listens = get_listens_from_dump(from_date, to_date)
+    listens = get_listens_for_year(year)
     listens.createOrReplaceTempView(table)
 
     df_name = "entity_data_cache"
@@ -3,14 +3,14 @@ from datetime import datetime, date, time
 from more_itertools import chunked
 
 from listenbrainz_spark.stats import run_query
-from listenbrainz_spark.utils import get_listens_from_dump
+from listenbrainz_spark.year_in_music.utils import get_listens_for_year
 
 
 ENTRIES_PER_MESSAGE = 100000
 
 def calculate_tracks_of_the_year(year):
     """ Calculate all tracks a user has listened to in the given year. """
-    get_listens_from_dump().createOrReplaceTempView("listens")
+    get_listens_for_year(year).createOrReplaceTempView("listens")
 
     start = datetime.combine(date(year, 1, 1), time.min)
     end = datetime.combine(date(year, 12, 31), time.max)
@@ -1,15 +1,68 @@
+import logging
 from datetime import datetime, date, time
 
+from pyspark import StorageLevel
+from pyspark.sql import DataFrame
+
 import listenbrainz_spark
 from listenbrainz_spark import path
 from listenbrainz_spark.utils import get_listens_from_dump
 
+logger = logging.getLogger(__name__)
+
+# the columns of listens used by the year in music reports, the others are not read when listens are cached
+YEAR_IN_MUSIC_LISTEN_COLUMNS = [
+    "listened_at",
+    "user_id",
+    "artist_name",
+    "artist_credit_mbids",
+    "release_name",
+    "release_mbid",
+    "recording_name",
+    "recording_mbid",
+]
+
+# listens of years cached by cache_listens_for_year, by year
+_cached_listens = {}
+
+
+def get_year_range(year):
+    """ Returns the first and the last moment of the given year """
+    return datetime(year, 1, 1), datetime.combine(date(year, 12, 31), time.max)
+
+
+def get_listens_for_year(year) -> DataFrame:
+    """ Get the listens of the given year. If the listens of the year have been cached with
+    cache_listens_for_year, the cached dataframe is returned otherwise the listens are read from HDFS. """
+    if year in _cached_listens:
+        return _cached_listens[year]
+    start, end = get_year_range(year)
+    return get_listens_from_dump(start, end)
+
+
+def cache_listens_for_year(year) -> DataFrame:
+    """ Read the listens of the given year once, with only the columns used by year in music reports, and
+    persist them so that the reports run afterwards share them instead of reading all listens again. """
+    start, end = get_year_range(year)
+    listens = get_listens_from_dump(start, end)\
+        .select(*YEAR_IN_MUSIC_LISTEN_COLUMNS)\
+        .persist(StorageLevel.MEMORY_AND_DISK)
+    # persisting is lazy, count the listens to read them now
+    count = listens.count()
+    logger.info("Cached %d listens of %d", count, year)
+    _cached_listens[year] = listens
+    return listens
+
+
+def uncache_listens_for_year(year):
+    """ Remove the cached listens of the given year """
+    listens = _cached_listens.pop(year, None)
+    if listens is not None:
+        listens.unpersist()
+
 
 def setup_listens_for_year(year):
-    start = datetime(year, 1, 1)
-    end = datetime.combine(date(year, 12, 31), time.max)
-    listens = get_listens_from_dump(start, end)
-    listens.createOrReplaceTempView("listens_of_year")
+    get_listens_for_year(year).createOrReplaceTempView("listens_of_year")
 
 
 def setup_all_releases():
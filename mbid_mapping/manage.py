@@ -16,6 +16,7 @@ from reports.top_discoveries import calculate_top_discoveries
 from mapping.mb_metadata_cache import create_mb_metadata_cache, incremental_update_mb_metadata_cache, \
     cleanup_mbid_mapping_table
 from mapping.spotify_metadata_index import create_spotify_metadata_index
+from mapping.release_cover_art_cache import create_release_cover_art_cache, incremental_update_release_cover_art_cache
 
 
 @click.group()
@@ -142,6 +143,24 @@ def build_spotify_metadata_index(use_lb_conn):
     create_spotify_metadata_index(use_lb_conn)
 
 
+@cli.command()
+@click.option("--use-lb-conn/--use-mb-conn", default=True, help="whether to store the update timestamp in LB or MB")
+def build_release_cover_art_cache(use_lb_conn):
+    """
+        Build the release cover art cache (in the MB database) that LB uses to look up cover art
+    """
+    create_release_cover_art_cache(use_lb_conn)
+
+
+@cli.command()
+@click.option("--use-lb-conn/--use-mb-conn", default=True, help="whether to store the update timestamp in LB or MB")
+def update_release_cover_art_cache(use_lb_conn):
+    """
+        Update the release cover art cache incrementally. Designed to be called hourly by cron.
+    """
+    incremental_update_release_cover_art_cache(use_lb_conn)
+
+
 def usage(command):
     with click.Context(command) as ctx:
         click.echo(command.get_help(ctx))
@@ -13,6 +13,7 @@ from psycopg2.sql import SQL, Literal
 from mapping.utils import insert_rows, log
 from mapping.bulk_table import BulkInsertTable
 from mapping.canonical_recording_release_redirect import CanonicalRecordingReleaseRedirect
+from mapping.recording_gid_redirect import RecordingGidRedirect
 import config
 
 
@@ -70,7 +71,9 @@ class MusicBrainzMetadataCache(BulkInsertTable):
                 ("recording_data ",            "JSONB NOT NULL"),
                 ("artist_data ",               "JSONB NOT NULL"),
                 ("tag_data ",                  "JSONB NOT NULL"),
-                ("release_data",               "JSONB NOT NULL")]
+                ("release_data",               "JSONB NOT NULL"),
+                ("artist_credit_names",        "TEXT[] NOT NULL"),
+                ("artist_credit_join_phrases", "TEXT[] NOT NULL")]
 
     def get_insert_queries_test_values(self):
         if config.USE_MINIMAL_DATASET:
@@ -106,7 +109,8 @@ class MusicBrainzMetadataCache(BulkInsertTable):
 
     def create_json_data(self, row):
         """ Format the data returned into sane JSONB blobs for easy consumption. Return
-            recording_data, artist_data, tag_data JSON strings as a tuple.
+            recording_data, artist_data, tag_data JSON strings and the artist credit names and join phrases
+            as a tuple.
         """
 
         release = {}
@@ -128,6 +132,10 @@ class MusicBrainzMetadataCache(BulkInsertTable):
         }
         artists_rels = []
         artist_mbids = []
+        # the names and join phrases are also stored flattened in the same order as artist_mbids, so that
+        # readers can build the artist credit without unnesting artist_data
+        artist_credit_names = []
+        artist_credit_join_phrases = []
         for mbid, ac_name, ac_jp, begin_year, end_year, artist_type, gender, area, rels in row["artist_data"]:
             data = {
                 "name": ac_name,
@@ -153,6 +161,8 @@ class MusicBrainzMetadataCache(BulkInsertTable):
                 data["gender"] = gender
             artists_rels.append(data)
             artist_mbids.append(uuid.UUID(mbid))
+            artist_credit_names.append(ac_name)
+            artist_credit_join_phrases.append(ac_jp)
 
         artist["artists"] = artists_rels
 
@@ -204,7 +214,9 @@ class MusicBrainzMetadataCache(BulkInsertTable):
                 ujson.dumps(recording),
                 ujson.dumps(artist),
                 ujson.dumps({"recording": recording_tags, "artist": artist_tags, "release_group": release_group_tags}),
-                ujson.dumps(release))
+                ujson.dumps(release),
+                artist_credit_names,
+                artist_credit_join_phrases)
 
     def get_metadata_cache_query(self, with_values=False):
         values_cte = ""
@@ -693,10 +705,10 @@ class MusicBrainzMetadataCache(BulkInsertTable):
         log("mb metadata update: Done!")
 
 
-def select_metadata_cache_timestamp(conn):
-    """ Retrieve the last time the mb metadata cache update was updated """
+def select_metadata_cache_timestamp(conn, key=MB_METADATA_CACHE_TIMESTAMP_KEY):
+    """ Retrieve the last time the mb metadata cache (or the cache stored under the given key) was updated """
     query = SQL("SELECT value FROM background_worker_state WHERE key = {key}")\
-        .format(key=Literal(MB_METADATA_CACHE_TIMESTAMP_KEY))
+        .format(key=Literal(key))
     try:
         with conn.cursor() as curs:
             curs.execute(query)
@@ -710,13 +722,17 @@ def select_metadata_cache_timestamp(conn):
         return None
 
 
-def update_metadata_cache_timestamp(conn, ts: datetime):
+def update_metadata_cache_timestamp(conn, ts: datetime, key=MB_METADATA_CACHE_TIMESTAMP_KEY):
     """ Update the timestamp of metadata creation in database. The incremental update process will read this
      timestamp next time it runs and only update cache for rows updated since then in MB database. """
     query = SQL("UPDATE background_worker_state SET value = %s WHERE key = {key}") \
-        .format(key=Literal(MB_METADATA_CACHE_TIMESTAMP_KEY))
+        .format(key=Literal(key))
     with conn.cursor() as curs:
         curs.execute(query, (ts.isoformat(),))
+        if curs.rowcount == 0:
+            insert_query = SQL("INSERT INTO background_worker_state (key, value) VALUES ({key}, %s)") \
+                .format(key=Literal(key))
+            curs.execute(insert_query, (ts.isoformat(),))
     conn.commit()
 
 
@@ -749,6 +765,8 @@ def create_mb_metadata_cache(use_lb_conn: bool):
         cache.run()
         update_metadata_cache_timestamp(lb_conn or mb_conn, new_timestamp)
 
+        RecordingGidRedirect(mb_conn, lb_conn).run()
+
 
 def incremental_update_mb_metadata_cache(use_lb_conn: bool):
     """ Update the MB metadata cache incrementally """
@@ -777,6 +795,10 @@ def incremental_update_mb_metadata_cache(use_lb_conn: bool):
             return
 
         new_timestamp = datetime.now()
+        # merges in MB remove recordings from the cache, add their redirects so that lookups of the old
+        # mbids keep resolving. the periodic full build rebuilds the whole redirects table.
+        RecordingGidRedirect(mb_conn, lb_conn).update_redirects_since(timestamp)
+
         recording_mbids = cache.query_last_updated_items(timestamp)
         cache.update_dirty_cache_items(recording_mbids)
 
@@ -0,0 +1,98 @@
+from datetime import datetime
+
+import psycopg2.extras
+
+from mapping.bulk_table import BulkInsertTable
+from mapping.utils import insert_rows, log
+
+
+class RecordingGidRedirect(BulkInsertTable):
+    """
+        This class mirrors the musicbrainz.recording_gid_redirect table, with the ids of the target recordings
+        replaced by their mbids. This way recording redirects can be resolved in the same database (and query)
+        as the mb_metadata_cache lookup.
+
+        For documentation on what each of the functions in this class does, please refer
+        to the BulkInsertTable docs.
+    """
+
+    def __init__(self, mb_conn, lb_conn=None, batch_size=None):
+        super().__init__("mapping.recording_gid_redirect", mb_conn, lb_conn, batch_size)
+
+    def get_create_table_columns(self):
+        # this table is created in local development and tables using admin/timescale/create_tables.sql
+        # remember to keep both in sync.
+        return [("recording_mbid",       "UUID NOT NULL"),
+                ("new_recording_mbid",   "UUID NOT NULL")]
+
+    def get_insert_queries(self):
+        return [("MB", self.get_redirects_query())]
+
+    def get_redirects_query(self, since_timestamp=False):
+        """ Returns the query to fetch the redirects with the mbids of their target recordings.
+
+         If since_timestamp is True, only the redirects to recordings which have become the target of a redirect
+         after the timestamp passed as the query parameter are returned. When the target of existing redirects is
+         merged, MB points those redirects to the new target too, so these are all the redirects which have been
+         added or changed since then.
+        """
+        if since_timestamp:
+            where = """
+             WHERE redirect.new_id IN (
+                    SELECT new_id
+                      FROM musicbrainz.recording_gid_redirect
+                     WHERE created > %s
+                   )
+            """
+        else:
+            where = ""
+
+        return f"""
+            SELECT redirect.gid AS recording_mbid
+                 , r.gid AS new_recording_mbid
+              FROM musicbrainz.recording_gid_redirect redirect
+              JOIN musicbrainz.recording r
+                ON r.id = redirect.new_id
+              {where}
+        """
+
+    def get_post_process_queries(self):
+        return []
+
+    def get_index_names(self):
+        return [("recording_gid_redirect_idx_recording_mbid", "recording_mbid", True)]
+
+    def process_row(self, row):
+        return [(row["recording_mbid"], row["new_recording_mbid"])]
+
+    def process_row_complete(self):
+        return []
+
+    def delete_rows(self, recording_mbids):
+        """ Delete the redirects of the given recording mbids from the table """
+        query = f"DELETE FROM {self.table_name} WHERE recording_mbid IN %s"
+        conn = self.lb_conn if self.lb_conn is not None else self.mb_conn
+        with conn.cursor() as curs:
+            curs.execute(query, (tuple(recording_mbids),))
+
+    def update_redirects_since(self, timestamp: datetime):
+        """ Add the redirects created since the given timestamp to the table, and update the existing redirects
+         whose target has been merged since then. Unlike a rebuild of the table, this only touches the redirects
+         of recently merged recordings.
+        """
+        conn = self.lb_conn if self.lb_conn is not None else self.mb_conn
+        with self.mb_conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as mb_curs, \
+                conn.cursor() as ins_curs:
+            mb_curs.execute(self.get_redirects_query(since_timestamp=True), (timestamp,))
+
+            count = 0
+            while True:
+                rows = [self.process_row(row)[0] for row in mb_curs.fetchmany(self.batch_size)]
+                if not rows:
+                    break
+                self.delete_rows([row[0] for row in rows])
+                insert_rows(ins_curs, self.table_name, rows)
+                count += len(rows)
+
+        conn.commit()
+        log("recording gid redirect: updated %d redirects" % count)
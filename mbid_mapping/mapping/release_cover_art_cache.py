@@ -0,0 +1,274 @@
+from datetime import datetime
+from typing import List, Set
+
+import psycopg2
+import psycopg2.extras
+from psycopg2.extras import execute_values
+
+from mapping.utils import insert_rows, log
+from mapping.bulk_table import BulkInsertTable
+from mapping.mb_metadata_cache import select_metadata_cache_timestamp, update_metadata_cache_timestamp
+import config
+
+
+RELEASE_COVER_ART_CACHE_TIMESTAMP_KEY = "release_cover_art_cache_last_update_timestamp"
+
+
+class ReleaseCoverArtCache(BulkInsertTable):
+    """
+        This class creates the release cover art cache, which maps every release mbid to the cover art
+        to show for it: the front cover of the release itself or, if it has none, the front cover of the
+        release group. listenbrainz.db.cover_art reads this table so that resolving cover art for a
+        request becomes a primary key lookup instead of the cover art query on the full CAA tables.
+
+        The table is always created in the MB database because that is where the readers look for it.
+
+        For documentation on what each of the functions in this class does, please refer
+        to the BulkInsertTable docs.
+    """
+
+    def __init__(self, mb_conn, batch_size=None):
+        super().__init__("mapping.release_cover_art_cache", mb_conn, None, batch_size)
+
+    def get_create_table_columns(self):
+        return [("release_mbid",      "UUID NOT NULL"),
+                ("caa_id",            "BIGINT"),
+                ("caa_release_mbid",  "UUID")]
+
+    def get_insert_queries(self):
+        return [("MB", self.get_cover_art_query())]
+
+    def get_post_process_queries(self):
+        return []
+
+    def get_index_names(self):
+        return [("release_cover_art_cache_idx_release_mbid", "release_mbid", True)]
+
+    def process_row(self, row):
+        return [(row["release_mbid"], row["caa_id"], row["caa_release_mbid"])]
+
+    def process_row_complete(self):
+        return []
+
+    def get_cover_art_query(self, with_values=False):
+        """ Returns the query to find the cover art of releases. This is the set-based version of the query in
+         listenbrainz.db.cover_art, keep both in sync.
+
+         If with_values is True, the query only looks at the release groups whose ids are passed in a VALUES
+         list, otherwise all releases are considered.
+        """
+        if with_values:
+            values_cte = "release_group_ids(id) AS (VALUES %s), "
+            values_join = "JOIN release_group_ids rgi ON rgi.id = rel.release_group"
+            values_join_rg = "JOIN release_group_ids rgi ON rgi.id = rg.id"
+        else:
+            values_cte = ""
+            values_join = ""
+            values_join_rg = ""
+
+        return f"""
+              WITH {values_cte} release_cover_art AS (
+                        SELECT DISTINCT ON (rel.id)
+                               rel.id AS release_id
+                             , caa.id AS caa_id
+                             , rel.gid AS caa_release_mbid
+                          FROM musicbrainz.release rel
+                          {values_join}
+                          JOIN cover_art_archive.cover_art caa
+                            ON caa.release = rel.id
+                          JOIN cover_art_archive.cover_art_type cat
+                            ON cat.id = caa.id
+                         WHERE type_id = 1
+                           AND mime_type != 'application/pdf'
+                      ORDER BY rel.id
+                             , caa.ordering
+                ), release_group_cover_art AS (
+                        SELECT DISTINCT ON (rg.id)
+                               rg.id AS release_group_id
+                             , caa.id AS caa_id
+                             , caa_rel.gid AS caa_release_mbid
+                          FROM musicbrainz.release_group rg
+                          {values_join_rg}
+                          JOIN musicbrainz.release caa_rel
+                            ON rg.id = caa_rel.release_group
+                     LEFT JOIN (
+                              SELECT release, date_year, date_month, date_day
+                                FROM musicbrainz.release_country
+                           UNION ALL
+                              SELECT release, date_year, date_month, date_day
+                                FROM musicbrainz.release_unknown_country
+                             ) re
+                            ON (re.release = caa_rel.id)
+                     FULL JOIN cover_art_archive.release_group_cover_art rgca
+                            ON rgca.release = caa_rel.id
+                     LEFT JOIN cover_art_archive.cover_art caa
+                            ON caa.release = caa_rel.id
+                     LEFT JOIN cover_art_archive.cover_art_type cat
+                            ON cat.id = caa.id
+                         WHERE type_id = 1
+                           AND mime_type != 'application/pdf'
+                      ORDER BY rg.id
+                             , rgca.release
+                             , re.date_year
+                             , re.date_month
+                             , re.date_day
+                             , caa.ordering
+                ) SELECT rel.gid AS release_mbid
+                       , COALESCE(rca.caa_id, rgca.caa_id) AS caa_id
+                       , COALESCE(rca.caa_release_mbid, rgca.caa_release_mbid) AS caa_release_mbid
+                    FROM musicbrainz.release rel
+                    {values_join}
+               LEFT JOIN release_cover_art rca
+                      ON rca.release_id = rel.id
+               LEFT JOIN release_group_cover_art rgca
+                      ON rgca.release_group_id = rel.release_group
+        """
+
+    def delete_rows(self, release_mbids: List[str]):
+        """Delete release MBIDs from the release_cover_art_cache table
+
+        Args:
+            release_mbids: a list of release MBIDs to delete
+        """
+        query = f"""
+            DELETE FROM {self.table_name}
+                  WHERE release_mbid IN %s
+        """
+        with self.mb_conn.cursor() as curs:
+            curs.execute(query, (tuple(release_mbids),))
+
+    def query_last_updated_items(self, timestamp):
+        """ Find the release groups whose cover art may have changed since the given timestamp.
+
+        The cover art of a release can fall back to the cover art of any other release in its release group,
+        so a change to any release requires all releases of its release group to be updated. Like the
+        mb metadata cache, this only considers additions and updates, a periodic rebuild removes deleted rows.
+        """
+        query = """
+            SELECT rel.release_group
+              FROM musicbrainz.release rel
+              JOIN cover_art_archive.cover_art caa
+                ON caa.release = rel.id
+             WHERE caa.date_uploaded > %(timestamp)s
+         UNION
+            SELECT rel.release_group
+              FROM musicbrainz.release rel
+             WHERE rel.last_updated > %(timestamp)s
+         UNION
+            SELECT rg.id
+              FROM musicbrainz.release_group rg
+             WHERE rg.last_updated > %(timestamp)s
+        """
+        try:
+            with self.mb_conn.cursor() as curs:
+                log("release cover art cache: querying release groups to update")
+                curs.execute(query, {"timestamp": timestamp})
+                return {row[0] for row in curs.fetchall()}
+        except psycopg2.errors.OperationalError as err:
+            log("release cover art cache: cannot query rows for update", err)
+            return None
+
+    def update_dirty_cache_items(self, release_group_ids: Set[int]):
+        """Refresh the rows of all releases in the given release groups.
+
+        The cover art of the releases is recomputed and then in batches the old rows are deleted and the
+        updated ones inserted.
+        """
+        if not release_group_ids:
+            return
+
+        with self.mb_conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as mb_curs, \
+                self.mb_conn.cursor() as ins_curs:
+            log("release cover art cache: querying cover art of dirty releases")
+            query = self.get_cover_art_query(with_values=True)
+            values = [(rg_id,) for rg_id in release_group_ids]
+            execute_values(mb_curs, query, values, page_size=len(values))
+
+            rows = []
+            count = 0
+            for row in mb_curs.fetchall():
+                count += 1
+                rows.append(self.process_row(row)[0])
+                if len(rows) >= self.batch_size:
+                    self.delete_rows([row[0] for row in rows])
+                    insert_rows(ins_curs, self.table_name, rows)
+                    rows = []
+
+            if rows:
+                self.delete_rows([row[0] for row in rows])
+                insert_rows(ins_curs, self.table_name, rows)
+
+        self.mb_conn.commit()
+        log("release cover art cache: updated %d releases" % count)
+
+
+def create_release_cover_art_cache(use_lb_conn: bool):
+    """
+        Main function for creating the release cover art cache.
+
+        Arguments:
+            use_lb_conn: whether to store the update timestamp in LB or MB
+    """
+    psycopg2.extras.register_uuid()
+
+    with psycopg2.connect(config.MBID_MAPPING_DATABASE_URI) as mb_conn:
+        lb_conn = None
+        if use_lb_conn and config.SQLALCHEMY_TIMESCALE_URI:
+            lb_conn = psycopg2.connect(config.SQLALCHEMY_TIMESCALE_URI)
+
+        try:
+            new_timestamp = datetime.now()
+            cache = ReleaseCoverArtCache(mb_conn)
+            cache.run()
+            update_metadata_cache_timestamp(lb_conn or mb_conn, new_timestamp, RELEASE_COVER_ART_CACHE_TIMESTAMP_KEY)
+        finally:
+            if lb_conn is not None:
+                lb_conn.close()
+
+
+def incremental_update_release_cover_art_cache(use_lb_conn: bool):
+    """ Update the release cover art cache incrementally
+
+        Arguments:
+            use_lb_conn: whether the update timestamp is stored in LB or MB
+    """
+    psycopg2.extras.register_uuid()
+
+    with psycopg2.connect(config.MBID_MAPPING_DATABASE_URI) as mb_conn:
+        lb_conn = None
+        if use_lb_conn and config.SQLALCHEMY_TIMESCALE_URI:
+            lb_conn = psycopg2.connect(config.SQLALCHEMY_TIMESCALE_URI)
+
+        try:
+            _incremental_update(mb_conn, lb_conn or mb_conn)
+        finally:
+            if lb_conn is not None:
+                lb_conn.close()
+
+
+def _incremental_update(mb_conn, state_conn):
+    cache = ReleaseCoverArtCache(mb_conn)
+    if not cache.table_exists():
+        log("release cover art cache: table does not exist, first create the table normally")
+        return
+
+    log("release cover art cache: starting incremental update")
+
+    timestamp = select_metadata_cache_timestamp(state_conn, RELEASE_COVER_ART_CACHE_TIMESTAMP_KEY)
+    log(f"release cover art cache: last update timestamp - {timestamp}")
+    if not timestamp:
+        return
+
+    new_timestamp = datetime.now()
+    release_group_ids = cache.query_last_updated_items(timestamp)
+    if release_group_ids is None:
+        return
+
+    if len(release_group_ids) == 0:
+        log("release cover art cache: no release groups found to update")
+        return
+
+    cache.update_dirty_cache_items(release_group_ids)
+    update_metadata_cache_timestamp(state_conn, new_timestamp, RELEASE_COVER_ART_CACHE_TIMESTAMP_KEY)
+
+    log("release cover art cache: incremental update completed")
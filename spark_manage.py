@@ -16,6 +16,18 @@ def request_consumer():
     main(f'request-consumer-{int(time.time())}')
 
 
+@cli.command(name='benchmark_entity_stats')
+@click.option("--stats-range", default="all_time", help="Stats range to calculate the stats for")
+@click.option("--copies", default=10, help="Number of times to upload the incremental test dump")
+@click.option("--iterations", default=3, help="Number of times to run each benchmark")
+def benchmark_entity_stats(stats_range, copies, iterations):
+    """ Compare calculating the user stats of each entity separately with calculating them together
+    on the synthetic test listens
+    """
+    from listenbrainz_spark.benchmarks.entity_stats import benchmark_entity_stats
+    benchmark_entity_stats(stats_range, copies, iterations)
+
+
 if __name__ == '__main__':
     # The root logger always defaults to WARNING level
     # The level is changed from WARNING to INFO